@@ -2,9 +2,23 @@
 from app.api.auth import router as auth_router
 from app.api.examens import router as examens_router
 from app.api.dashboard import router as dashboard_router
+from app.api.sessions import router as sessions_router
+from app.api.monitoring import router as monitoring_router
+from app.api.sync import router as sync_router
+from app.api.realtime import router as realtime_router
+from app.api.search import router as search_router
+from app.api.snapshots import router as snapshots_router
+from app.api.surveillances import router as surveillances_router
 
 __all__ = [
     "auth_router",
     "examens_router", 
-    "dashboard_router"
+    "dashboard_router",
+    "sessions_router",
+    "monitoring_router",
+    "sync_router",
+    "realtime_router",
+    "search_router",
+    "snapshots_router",
+    "surveillances_router"
 ]
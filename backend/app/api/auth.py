@@ -7,11 +7,12 @@ from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 from app.core.database import get_db
 from app.core.security import (
-    verify_password,
-    get_password_hash,
+    verify_password_async,
+    get_password_hash_async,
     create_access_token,
     create_refresh_token,
     decode_token,
+    forget_user,
     get_current_user
 )
 from app.models import User
@@ -49,7 +50,7 @@ async def login(
         )
     
     # Verify password
-    if not verify_password(form_data.password, user.password_hash):
+    if not await verify_password_async(form_data.password, user.password_hash):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Email ou mot de passe incorrect",
@@ -167,7 +168,7 @@ async def register_user(
     # Create new user
     new_user = User(
         email=user_data.email,
-        password_hash=get_password_hash(user_data.password),
+        password_hash=await get_password_hash_async(user_data.password),
         role=user_data.role.value,
         nom=user_data.nom,
         prenom=user_data.prenom,
@@ -203,7 +204,7 @@ async def change_password(
     Change current user password.
     """
     # Verify old password
-    if not verify_password(old_password, current_user.password_hash):
+    if not await verify_password_async(old_password, current_user.password_hash):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Mot de passe actuel incorrect"
@@ -217,7 +218,7 @@ async def change_password(
         )
     
     # Update password
-    current_user.password_hash = get_password_hash(new_password)
+    current_user.password_hash = await get_password_hash_async(new_password)
     db.commit()
     
     return {"message": "Mot de passe modifié avec succès"}
@@ -225,9 +226,11 @@ async def change_password(
 
 from pydantic import BaseModel, EmailStr
 import random
+from app.core.cache import cache
+from app.core.config import settings
 
-# In-memory store for reset codes (in production, use Redis with expiry)
-reset_codes: dict[str, str] = {}
+# Reset codes live in the shared cache (namespace "reset_codes") and expire
+# after RESET_CODE_TTL_SECONDS
 
 class RequestResetRequest(BaseModel):
     email: EmailStr
@@ -253,8 +256,8 @@ async def request_reset(
     # Generate 6-digit code
     code = ''.join([str(random.randint(0, 9)) for _ in range(6)])
     
-    # Store the code (in production, add expiry time)
-    reset_codes[request.email] = code
+    # Store the code, shared by all workers, with an expiry
+    await cache.aset("reset_codes", request.email, code, ttl=settings.RESET_CODE_TTL_SECONDS)
     
     # In production: send email with code
     # For demo: return code in response
@@ -285,17 +288,6 @@ async def reset_password(
             detail="Aucun compte trouvé avec cet email"
         )
     
-    # Verify the code if provided
-    if request.verification_code:
-        stored_code = reset_codes.get(request.email)
-        if not stored_code or stored_code != request.verification_code:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Code de vérification invalide ou expiré"
-            )
-        # Remove the used code
-        del reset_codes[request.email]
-    
     # Validate new password
     if len(request.new_password) < 6:
         raise HTTPException(
@@ -303,8 +295,18 @@ async def reset_password(
             detail="Le mot de passe doit contenir au moins 6 caractères"
         )
     
+    # Verify the code if provided: read and removed atomically, so a code
+    # is used at most once even by concurrent requests
+    if request.verification_code:
+        stored_code = await cache.apop("reset_codes", request.email)
+        if not stored_code or stored_code != request.verification_code:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Code de vérification invalide ou expiré"
+            )
+    
     # Update password
-    user.password_hash = get_password_hash(request.new_password)
+    user.password_hash = await get_password_hash_async(request.new_password)
     db.commit()
     
     return {"message": "Mot de passe réinitialisé avec succès"}
@@ -324,7 +326,7 @@ async def change_email(
     Change current user email.
     """
     # Verify password
-    if not verify_password(request.password, current_user.password_hash):
+    if not await verify_password_async(request.password, current_user.password_hash):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Mot de passe incorrect"
@@ -339,7 +341,9 @@ async def change_email(
         )
     
     # Update email
+    old_email = current_user.email
     current_user.email = request.new_email
     db.commit()
+    await forget_user(old_email)
     
     return {"message": "Email modifié avec succès"}
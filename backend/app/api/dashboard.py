@@ -1,15 +1,18 @@
 """
 Dashboard and Statistics API endpoints
 """
+from datetime import datetime
 from typing import List, Optional
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from app.core.database import get_db
+from sqlalchemy import func, not_
+from app.core.cache import cache
+from app.core.notifications import schedule_cache_ttl
+from app.core.read_routing import get_read_db
 from app.core.security import get_current_user, require_department_head
 from app.models import (
     User, Departement, Formation, Module, Professeur, 
-    Etudiant, Inscription, Examen, LieuExamen
+    Etudiant, Inscription, Examen, ExamenPlanning, LieuExamen
 )
 from app.schemas import (
     DashboardStats,
@@ -21,8 +24,10 @@ from app.schemas import (
     ProfesseurResponse,
     EtudiantResponse,
     LieuExamenResponse,
+    SalleDisponibleResponse,
     PaginatedResponse
 )
+from app.services.availability import get_occupancy_index, naive_utc, unpublished_exams
 from app.services.scheduler import get_room_occupation_stats
 
 router = APIRouter(prefix="/dashboard", tags=["Dashboard"])
@@ -30,122 +35,178 @@ router = APIRouter(prefix="/dashboard", tags=["Dashboard"])
 
 @router.get("/stats", response_model=DashboardStats)
 async def get_dashboard_stats(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
     """
     Récupère les statistiques globales du dashboard.
     """
-    total_etudiants = db.query(func.count(Etudiant.id)).scalar() or 0
-    total_professeurs = db.query(func.count(Professeur.id)).scalar() or 0
-    total_formations = db.query(func.count(Formation.id)).scalar() or 0
-    total_modules = db.query(func.count(Module.id)).scalar() or 0
-    total_salles = db.query(func.count(LieuExamen.id)).scalar() or 0
-    
-    total_examens = db.query(func.count(Examen.id)).filter(
-        Examen.statut.in_(['scheduled', 'confirmed'])
-    ).scalar() or 0
-    
-    # Calcul du taux d'occupation des salles
-    salles_utilisees = db.query(func.count(func.distinct(Examen.salle_id))).filter(
-        Examen.statut.in_(['scheduled', 'confirmed'])
-    ).scalar() or 0
-    
-    taux_occupation = (salles_utilisees / total_salles * 100) if total_salles > 0 else 0
-    
-    # Nombre de conflits actifs (simplifié)
-    nb_conflits = 0  # TODO: implémenter la détection de conflits
-    
-    return DashboardStats(
-        total_etudiants=total_etudiants,
-        total_professeurs=total_professeurs,
-        total_formations=total_formations,
-        total_modules=total_modules,
-        total_examens_planifies=total_examens,
-        total_salles=total_salles,
-        taux_occupation_salles=round(taux_occupation, 2),
-        nb_conflits_actifs=nb_conflits
-    )
+    def load():
+        total_etudiants = db.query(func.count(Etudiant.id)).scalar() or 0
+        total_professeurs = db.query(func.count(Professeur.id)).scalar() or 0
+        total_formations = db.query(func.count(Formation.id)).scalar() or 0
+        total_modules = db.query(func.count(Module.id)).scalar() or 0
+        total_salles = db.query(func.count(LieuExamen.id)).scalar() or 0
+        
+        total_examens = db.query(func.count(Examen.id)).filter(
+            Examen.statut.in_(['scheduled', 'confirmed']),
+            not_(unpublished_exams())
+        ).scalar() or 0
+        
+        # Calcul du taux d'occupation des salles
+        salles_utilisees = db.query(func.count(func.distinct(Examen.salle_id))).filter(
+            Examen.statut.in_(['scheduled', 'confirmed']),
+            not_(unpublished_exams())
+        ).scalar() or 0
+        
+        taux_occupation = (salles_utilisees / total_salles * 100) if total_salles > 0 else 0
+        
+        # Nombre de conflits actifs (simplifié)
+        nb_conflits = 0  # TODO: implémenter la détection de conflits
+        
+        return DashboardStats(
+            total_etudiants=total_etudiants,
+            total_professeurs=total_professeurs,
+            total_formations=total_formations,
+            total_modules=total_modules,
+            total_examens_planifies=total_examens,
+            total_salles=total_salles,
+            taux_occupation_salles=round(taux_occupation, 2),
+            nb_conflits_actifs=nb_conflits
+        )
+    
+    return await cache.get_or_set("dashboard", "stats", load, ttl=schedule_cache_ttl())
 
 
 @router.get("/kpi/departements", response_model=List[DepartementKPI])
 async def get_departement_kpis(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(require_department_head)
 ):
     """
     Récupère les KPIs par département.
     Optimized: Uses batch queries instead of N+1 queries.
     """
-    # Get all departments
-    departements = db.query(Departement).all()
-    
-    # Pre-fetch all counts in single queries
-    # Students per department
-    student_counts = dict(
-        db.query(Formation.dept_id, func.count(Etudiant.id))
-        .join(Etudiant)
-        .group_by(Formation.dept_id)
-        .all()
-    )
-    
-    # Professors per department
-    prof_counts = dict(
-        db.query(Professeur.dept_id, func.count(Professeur.id))
-        .group_by(Professeur.dept_id)
-        .all()
-    )
-    
-    # Exams per department
-    exam_counts = dict(
-        db.query(Formation.dept_id, func.count(Examen.id))
-        .join(Module, Module.formation_id == Formation.id)
-        .join(Examen, Examen.module_id == Module.id)
-        .filter(Examen.statut.in_(['scheduled', 'confirmed']))
-        .group_by(Formation.dept_id)
-        .all()
-    )
-    
-    # Modules per department
-    module_counts = dict(
-        db.query(Formation.dept_id, func.count(Module.id))
-        .join(Module)
-        .group_by(Formation.dept_id)
-        .all()
-    )
-    
-    # Build KPIs from pre-fetched data
-    kpis = []
-    for dept in departements:
-        nb_etudiants = student_counts.get(dept.id, 0)
-        nb_professeurs = prof_counts.get(dept.id, 0)
-        nb_examens = exam_counts.get(dept.id, 0)
-        nb_modules = module_counts.get(dept.id, 0)
+    def load():
+        # Get all departments
+        departements = db.query(Departement).all()
+        
+        # Pre-fetch all counts in single queries
+        # Students per department
+        student_counts = dict(
+            db.query(Formation.dept_id, func.count(Etudiant.id))
+            .join(Etudiant)
+            .group_by(Formation.dept_id)
+            .all()
+        )
         
-        taux = (nb_examens / nb_modules * 100) if nb_modules > 0 else 0
+        # Professors per department
+        prof_counts = dict(
+            db.query(Professeur.dept_id, func.count(Professeur.id))
+            .group_by(Professeur.dept_id)
+            .all()
+        )
         
-        kpis.append(DepartementKPI(
-            departement_id=dept.id,
-            departement_nom=dept.nom,
-            nb_etudiants=nb_etudiants,
-            nb_professeurs=nb_professeurs,
-            nb_examens=nb_examens,
-            taux_planification=round(taux, 2),
-            nb_conflits=0
-        ))
+        # Exams per department (read model: no join)
+        exam_counts = dict(
+            db.query(ExamenPlanning.dept_id, func.count(ExamenPlanning.examen_id))
+            .filter(
+                ExamenPlanning.statut.in_(['scheduled', 'confirmed']),
+                not_(unpublished_exams(ExamenPlanning))
+            )
+            .group_by(ExamenPlanning.dept_id)
+            .all()
+        )
+        
+        # Modules per department
+        module_counts = dict(
+            db.query(Formation.dept_id, func.count(Module.id))
+            .join(Module)
+            .group_by(Formation.dept_id)
+            .all()
+        )
+        
+        # Build KPIs from pre-fetched data
+        kpis = []
+        for dept in departements:
+            nb_etudiants = student_counts.get(dept.id, 0)
+            nb_professeurs = prof_counts.get(dept.id, 0)
+            nb_examens = exam_counts.get(dept.id, 0)
+            nb_modules = module_counts.get(dept.id, 0)
+        
+            taux = (nb_examens / nb_modules * 100) if nb_modules > 0 else 0
+        
+            kpis.append(DepartementKPI(
+                departement_id=dept.id,
+                departement_nom=dept.nom,
+                nb_etudiants=nb_etudiants,
+                nb_professeurs=nb_professeurs,
+                nb_examens=nb_examens,
+                taux_planification=round(taux, 2),
+                nb_conflits=0
+            ))
+        
+        return kpis
     
-    return kpis
+    return await cache.get_or_set("dashboard", "kpi_departements", load, ttl=schedule_cache_ttl())
 
 
 @router.get("/salles/occupation")
 async def get_occupation_salles(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
     """
     Récupère les statistiques d'occupation des salles.
     """
-    return get_room_occupation_stats(db)
+    def load():
+        return get_room_occupation_stats(db)
+    
+    return await cache.get_or_set("dashboard", "salles_occupation", load, ttl=schedule_cache_ttl())
+
+
+@router.get("/salles/disponibles", response_model=List[SalleDisponibleResponse])
+async def get_salles_disponibles(
+    debut: datetime,
+    fin: datetime,
+    capacite_min: int = Query(0, ge=0, description="Places d'examen minimum"),
+    type: Optional[str] = None,
+    batiment: Optional[str] = None,
+    pmr: Optional[bool] = None,
+    equipement: Optional[List[str]] = Query(None, description="Équipements requis (ex: videoprojection)"),
+    exclude_examen_id: Optional[int] = Query(None, description="Examen à ignorer (déplacement)"),
+    limit: int = Query(50, ge=1, le=500),
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Salles libres sur tout le créneau [debut, fin[, de la plus petite
+    capacité suffisante à la plus grande.
+    """
+    debut, fin = naive_utc(debut), naive_utc(fin)
+    if fin <= debut:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="La fin du créneau doit être postérieure au début"
+        )
+
+    index = get_occupancy_index(db)
+    rooms = index.free_rooms(
+        debut,
+        fin,
+        capacite_min=capacite_min,
+        type=type,
+        batiment=batiment,
+        pmr=pmr,
+        equipements=equipement or (),
+        ignore_examen_ids=[exclude_examen_id] if exclude_examen_id else ()
+    )
+    return [
+        SalleDisponibleResponse.model_validate(
+            {**room, "prochain_examen": index.room_timeline(room["id"]).next_start(fin)}
+        )
+        for room in rooms[:limit]
+    ]
 
 
 # ============================================================================
@@ -155,57 +216,60 @@ async def get_occupation_salles(
 # Départements
 @router.get("/departements", response_model=List[DepartementStats])
 async def list_departements(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
     """Liste tous les départements avec statistiques (optimized)"""
-    departements = db.query(Departement).all()
-    
-    # Pre-fetch all counts in batch queries
-    formation_counts = dict(
-        db.query(Formation.dept_id, func.count(Formation.id))
-        .group_by(Formation.dept_id)
-        .all()
-    )
-    
-    module_counts = dict(
-        db.query(Formation.dept_id, func.count(Module.id))
-        .join(Module)
-        .group_by(Formation.dept_id)
-        .all()
-    )
-    
-    prof_counts = dict(
-        db.query(Professeur.dept_id, func.count(Professeur.id))
-        .group_by(Professeur.dept_id)
-        .all()
-    )
-    
-    student_counts = dict(
-        db.query(Formation.dept_id, func.count(Etudiant.id))
-        .join(Etudiant)
-        .group_by(Formation.dept_id)
-        .all()
-    )
-    
-    result = []
-    for dept in departements:
-        result.append(DepartementStats(
-            id=dept.id,
-            nom=dept.nom,
-            code=dept.code,
-            batiment=dept.batiment,
-            telephone=dept.telephone,
-            email=dept.email,
-            created_at=dept.created_at,
-            updated_at=dept.updated_at,
-            nb_formations=formation_counts.get(dept.id, 0),
-            nb_modules=module_counts.get(dept.id, 0),
-            nb_professeurs=prof_counts.get(dept.id, 0),
-            nb_etudiants=student_counts.get(dept.id, 0)
-        ))
+    def load():
+        departements = db.query(Departement).all()
+        
+        # Pre-fetch all counts in batch queries
+        formation_counts = dict(
+            db.query(Formation.dept_id, func.count(Formation.id))
+            .group_by(Formation.dept_id)
+            .all()
+        )
+        
+        module_counts = dict(
+            db.query(Formation.dept_id, func.count(Module.id))
+            .join(Module)
+            .group_by(Formation.dept_id)
+            .all()
+        )
+        
+        prof_counts = dict(
+            db.query(Professeur.dept_id, func.count(Professeur.id))
+            .group_by(Professeur.dept_id)
+            .all()
+        )
+        
+        student_counts = dict(
+            db.query(Formation.dept_id, func.count(Etudiant.id))
+            .join(Etudiant)
+            .group_by(Formation.dept_id)
+            .all()
+        )
+        
+        result = []
+        for dept in departements:
+            result.append(DepartementStats(
+                id=dept.id,
+                nom=dept.nom,
+                code=dept.code,
+                batiment=dept.batiment,
+                telephone=dept.telephone,
+                email=dept.email,
+                created_at=dept.created_at,
+                updated_at=dept.updated_at,
+                nb_formations=formation_counts.get(dept.id, 0),
+                nb_modules=module_counts.get(dept.id, 0),
+                nb_professeurs=prof_counts.get(dept.id, 0),
+                nb_etudiants=student_counts.get(dept.id, 0)
+            ))
+        
+        return result
     
-    return result
+    return await cache.get_or_set("dashboard", "departements", load, ttl=schedule_cache_ttl())
 
 
 # Formations
@@ -215,7 +279,7 @@ async def list_formations(
     size: int = Query(20, ge=1, le=100),
     dept_id: Optional[int] = None,
     niveau: Optional[str] = None,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
     """Liste les formations avec pagination"""
@@ -245,7 +309,7 @@ async def list_modules(
     size: int = Query(20, ge=1, le=100),
     formation_id: Optional[int] = None,
     semestre: Optional[int] = None,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
     """Liste les modules avec pagination"""
@@ -274,7 +338,7 @@ async def list_professeurs(
     page: int = Query(1, ge=1),
     size: int = Query(20, ge=1, le=100),
     dept_id: Optional[int] = None,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
     """Liste les professeurs avec pagination"""
@@ -302,7 +366,7 @@ async def list_etudiants(
     size: int = Query(20, ge=1, le=100),
     formation_id: Optional[int] = None,
     promo: Optional[str] = None,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(require_department_head)
 ):
     """Liste les étudiants avec pagination"""
@@ -331,7 +395,7 @@ async def list_salles(
     type: Optional[str] = None,
     batiment: Optional[str] = None,
     disponible: Optional[bool] = True,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
     """Liste les salles d'examen"""
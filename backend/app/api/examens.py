@@ -1,28 +1,96 @@
 """
 Exam and EDT API endpoints
 """
-from datetime import datetime
+import time
+from datetime import datetime, timedelta
 from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy.orm import Session, contains_eager, joinedload
+from sqlalchemy import func, not_
+from app.core.cache import cache
+from app.core.config import settings
 from app.core.database import get_db
+from app.core.notifications import (
+    ainvalidate_for_changes, examen_change_keys, examens_namespace, merge_changes, schedule_cache_ttl
+)
+from app.core.read_routing import get_read_db
+from app.core.realtime import hub
 from app.core.security import get_current_user, require_admin, require_department_head
-from app.models import Examen, Module, User, Formation, Departement
+from app.models import (
+    Examen, ExamenPlanning, LieuExamen, Module, PlaceExamen, User, Formation, Departement
+)
 from app.schemas import (
     ExamenCreate,
     ExamenUpdate,
     ExamenResponse,
+    ExamenPlanningResponse,
+    ExamenSalleResponse,
+    PlaceEtudiantInfo,
+    SeatAllocationResponse,
     EDTGenerationRequest,
     EDTGenerationResponse,
+    EDTRepairRequest,
+    EDTRepairResponse,
     ConflictInfo,
+    ExamenBatchRequest,
+    ExamenBatchResponse,
+    ExamenPlacementCheck,
+    ExamenSuggestionsResponse,
+    ExamenValidationResponse,
     PaginatedResponse
 )
+from app.services.availability import (
+    ExamSlot, get_occupancy_index, naive_utc, reset_occupancy_index, unpublished_exams
+)
+from app.services.batch import apply_exam_batch
 from app.services.scheduler import ExamScheduler, detect_conflicts
+from app.services.seating import allocate_seats, detach_rooms, split_exam_ids
+from app.services.staging import lock_schedule
+from app.services.search import contains, module_search_text, planning_search_text
+from app.services.suggestions import cached_shared_students, default_window, suggest_moves
+from app.services.validation import ERROR, validate_placement
 
 router = APIRouter(prefix="/examens", tags=["Examens"])
 
 
+async def _invalidate_exam_caches(*changes: dict):
+    """
+    Invalidation immédiate côté écrivain; les autres workers (caches et
+    WebSocket) sont prévenus par les notifications de la base
+    (app.core.notifications).
+    """
+    merged = merge_changes(*changes)
+    await ainvalidate_for_changes([merged])
+    reset_occupancy_index()
+    hub.publish_local([merged])
+
+
+def scope_examens_query(query, db: Session, current_user: User, model=Examen):
+    """
+    Restreint une requête d'examens au périmètre de l'utilisateur: Examen
+    (jointe à Module et Formation) ou la vue dénormalisée ExamenPlanning.
+    """
+    dept_column = ExamenPlanning.dept_id if model is ExamenPlanning else Formation.dept_id
+    if current_user.role in ("professor", "student"):
+        # Brouillons et sessions non publiées: visibles des administrateurs seulement
+        query = query.filter(model.statut != "draft", not_(unpublished_exams(model)))
+    if current_user.role == "department_head" and current_user.ref_id:
+        query = query.filter(dept_column == current_user.ref_id)
+    elif current_user.role == "professor" and current_user.ref_id:
+        query = query.filter(model.prof_id == current_user.ref_id)
+    elif current_user.role == "student" and current_user.ref_id:
+        # Les étudiants voient seulement leurs examens
+        from app.models import Inscription, Etudiant
+        student = db.query(Etudiant).filter(Etudiant.id == current_user.ref_id).first()
+        if student:
+            inscribed_modules = db.query(Inscription.module_id).filter(
+                Inscription.etudiant_id == student.id,
+                Inscription.statut == 'active'
+            ).subquery()
+            query = query.filter(model.module_id.in_(inscribed_modules))
+    return query
+
+
 @router.get("/", response_model=PaginatedResponse)
 async def list_examens(
     page: int = Query(1, ge=1),
@@ -34,67 +102,155 @@ async def list_examens(
     date_fin: Optional[datetime] = None,
     search: Optional[str] = None,
     sort_order: Optional[str] = None,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
     """
     Liste des examens avec filtres et pagination.
     """
-    query = db.query(Examen).join(Module).join(Formation)
-    
-    # Appliquer les filtres
-    if dept_id:
-        query = query.filter(Formation.dept_id == dept_id)
-    if formation_id:
-        query = query.filter(Module.formation_id == formation_id)
-    if statut:
-        query = query.filter(Examen.statut == statut)
-    if date_debut:
-        query = query.filter(Examen.date_heure >= date_debut)
-    if date_fin:
-        query = query.filter(Examen.date_heure <= date_fin)
-    if search:
-        search_term = f"%{search}%"
-        query = query.filter(
-            (Module.nom.ilike(search_term)) | (Module.code.ilike(search_term))
+    role = getattr(current_user.role, "value", current_user.role)
+    scope = current_user.ref_id if role in ("department_head", "professor", "student") else None
+    namespace = examens_namespace(role, scope, dept_id, formation_id)
+    cache_key = cache.make_key(
+        role, scope, page, size, dept_id, formation_id, statut,
+        date_debut.isoformat() if date_debut else None,
+        date_fin.isoformat() if date_fin else None,
+        search, sort_order
+    )
+    
+    def load():
+        query = db.query(Examen).join(Module).join(Formation)
+        
+        # Appliquer les filtres
+        if dept_id:
+            query = query.filter(Formation.dept_id == dept_id)
+        if formation_id:
+            query = query.filter(Module.formation_id == formation_id)
+        if statut:
+            query = query.filter(Examen.statut == statut)
+        if date_debut:
+            query = query.filter(Examen.date_heure >= date_debut)
+        if date_fin:
+            query = query.filter(Examen.date_heure <= date_fin)
+        if search:
+            # Index trigramme idx_modules_search_trgm
+            query = query.filter(contains(module_search_text(), search))
+        
+        # Filtrer par rôle
+        query = scope_examens_query(query, db, current_user)
+        
+        # Pagination avec tri
+        total = query.count()
+        # Relations imbriquées de ExamenResponse chargées en une seule requête (évite le N+1)
+        query = query.options(
+            contains_eager(Examen.module),
+            joinedload(Examen.professeur),
+            joinedload(Examen.salle)
+        )
+        if sort_order == 'desc':
+            items = query.order_by(Examen.date_heure.desc()).offset((page - 1) * size).limit(size).all()
+        else:
+            items = query.order_by(Examen.date_heure).offset((page - 1) * size).limit(size).all()
+        
+        responses = [ExamenResponse.model_validate(item) for item in items]
+        if role == "student" and current_user.ref_id and responses:
+            # Salle et place de l'étudiant, en une requête pour la page
+            places = {
+                examen_id: PlaceEtudiantInfo(
+                    salle_id=salle_id, salle_nom=nom, salle_batiment=batiment, numero_place=numero_place
+                )
+                for examen_id, salle_id, nom, batiment, numero_place in db.query(
+                    PlaceExamen.examen_id, PlaceExamen.salle_id, LieuExamen.nom,
+                    LieuExamen.batiment, PlaceExamen.numero_place
+                ).join(LieuExamen, LieuExamen.id == PlaceExamen.salle_id).filter(
+                    PlaceExamen.etudiant_id == current_user.ref_id,
+                    PlaceExamen.examen_id.in_([response.id for response in responses])
+                ).all()
+            }
+            for response in responses:
+                response.place = places.get(response.id)
+        
+        return PaginatedResponse(
+            items=responses,
+            total=total,
+            page=page,
+            size=size,
+            pages=(total + size - 1) // size
         )
     
-    # Filtrer par rôle
-    if current_user.role == "department_head" and current_user.ref_id:
-        query = query.filter(Formation.dept_id == current_user.ref_id)
-    elif current_user.role == "professor" and current_user.ref_id:
-        query = query.filter(Examen.prof_id == current_user.ref_id)
-    elif current_user.role == "student" and current_user.ref_id:
-        # Les étudiants voient seulement leurs examens
-        from app.models import Inscription, Etudiant
-        student = db.query(Etudiant).filter(Etudiant.id == current_user.ref_id).first()
-        if student:
-            inscribed_modules = db.query(Inscription.module_id).filter(
-                Inscription.etudiant_id == student.id,
-                Inscription.statut == 'active'
-            ).subquery()
-            query = query.filter(Examen.module_id.in_(inscribed_modules))
-    
-    # Pagination avec tri
-    total = query.count()
-    if sort_order == 'desc':
-        items = query.order_by(Examen.date_heure.desc()).offset((page - 1) * size).limit(size).all()
-    else:
-        items = query.order_by(Examen.date_heure).offset((page - 1) * size).limit(size).all()
-    
-    return PaginatedResponse(
-        items=[ExamenResponse.model_validate(item) for item in items],
-        total=total,
-        page=page,
-        size=size,
-        pages=(total + size - 1) // size
+    return await cache.get_or_set(namespace, cache_key, load, ttl=schedule_cache_ttl())
+
+
+@router.get("/planning", response_model=PaginatedResponse)
+async def list_planning(
+    page: int = Query(1, ge=1),
+    size: int = Query(50, ge=1, le=500),
+    dept_id: Optional[int] = None,
+    formation_id: Optional[int] = None,
+    salle_id: Optional[int] = None,
+    prof_id: Optional[int] = None,
+    statut: Optional[str] = None,
+    date_debut: Optional[datetime] = None,
+    date_fin: Optional[datetime] = None,
+    search: Optional[str] = None,
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Planning des examens à plat (module, formation, département, salle et
+    enseignant sur chaque ligne), lu dans la vue dénormalisée
+    examens_planning: une seule table, sans jointure.
+    """
+    role = getattr(current_user.role, "value", current_user.role)
+    scope = current_user.ref_id if role in ("department_head", "professor", "student") else None
+    namespace = examens_namespace(role, scope, dept_id, formation_id)
+    cache_key = cache.make_key(
+        "planning", role, scope, page, size, dept_id, formation_id, salle_id, prof_id, statut,
+        date_debut.isoformat() if date_debut else None,
+        date_fin.isoformat() if date_fin else None,
+        search
     )
+    
+    def load():
+        query = db.query(ExamenPlanning)
+        if dept_id:
+            query = query.filter(ExamenPlanning.dept_id == dept_id)
+        if formation_id:
+            query = query.filter(ExamenPlanning.formation_id == formation_id)
+        if salle_id:
+            query = query.filter(ExamenPlanning.salle_id == salle_id)
+        if prof_id:
+            query = query.filter(ExamenPlanning.prof_id == prof_id)
+        if statut:
+            query = query.filter(ExamenPlanning.statut == statut)
+        if date_debut:
+            query = query.filter(ExamenPlanning.date_heure >= date_debut)
+        if date_fin:
+            query = query.filter(ExamenPlanning.date_heure <= date_fin)
+        if search:
+            query = query.filter(contains(planning_search_text(), search))
+        query = scope_examens_query(query, db, current_user, model=ExamenPlanning)
+        
+        total = query.count()
+        items = query.order_by(ExamenPlanning.date_heure, ExamenPlanning.examen_id).offset(
+            (page - 1) * size
+        ).limit(size).all()
+        
+        return PaginatedResponse(
+            items=[ExamenPlanningResponse.model_validate(item) for item in items],
+            total=total,
+            page=page,
+            size=size,
+            pages=(total + size - 1) // size
+        )
+    
+    return await cache.get_or_set(namespace, cache_key, load, ttl=schedule_cache_ttl())
 
 
 @router.get("/{examen_id}", response_model=ExamenResponse)
 async def get_examen(
     examen_id: int,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
     """
@@ -141,6 +297,7 @@ async def create_examen(
     db.add(examen)
     db.commit()
     db.refresh(examen)
+    await _invalidate_exam_caches(examen_change_keys(db, [examen]))
     
     return examen
 
@@ -163,14 +320,32 @@ async def update_examen(
             detail="Examen non trouvé"
         )
     
-    # Mettre à jour les champs
+    before = examen_change_keys(db, [examen])
+    # Pas de publication de session concurrente (triggers de l'UPDATE)
+    lock_schedule(db)
+    
     update_data = examen_data.model_dump(exclude_unset=True)
+    room_changed = update_data.get("salle_id") is not None and update_data["salle_id"] != examen.salle_id
+    if room_changed and split_exam_ids(db, [examen.id]):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Examen réparti sur plusieurs salles: salle non modifiable"
+        )
+    
+    # Mettre à jour les champs
     for key, value in update_data.items():
         if value is not None:
             setattr(examen, key, value.value if hasattr(value, 'value') else value)
+    if room_changed:
+        # Répartition des étudiants refaite dans la nouvelle salle (écrite d'abord)
+        db.flush()
+        seated = detach_rooms(db, [examen.id])
+        if seated:
+            allocate_seats(db, seated, numeroter=settings.SCHEDULING_SEAT_NUMBERS)
     
     db.commit()
     db.refresh(examen)
+    await _invalidate_exam_caches(before, examen_change_keys(db, [examen]))
     
     return examen
 
@@ -192,8 +367,10 @@ async def delete_examen(
             detail="Examen non trouvé"
         )
     
+    keys = examen_change_keys(db, [examen])
     db.delete(examen)
     db.commit()
+    await _invalidate_exam_caches(keys)
 
 
 @router.post("/generate", response_model=EDTGenerationResponse)
@@ -218,8 +395,16 @@ async def generate_edt(
             date_fin=request.date_fin,
             dept_ids=request.dept_ids,
             formation_ids=request.formation_ids,
-            user_id=current_user.id
+            user_id=current_user.id,
+            strategy=request.strategy,
+            amelioration_secondes=request.amelioration_secondes,
+            publier=request.publier
         )
+        hub.publish_local([{
+            "table": "sessions_generation",
+            "session_id": result["session_id"],
+            "statut": result["statut"]
+        }])
         
         return EDTGenerationResponse(
             session_id=result["session_id"],
@@ -227,6 +412,7 @@ async def generate_edt(
             nb_examens_planifies=result["nb_examens_planifies"],
             nb_conflits_resolus=result["nb_conflits_resolus"],
             temps_execution_ms=result["temps_execution_ms"],
+            publiee=result.get("publiee"),
             message=result["message"]
         )
         
@@ -235,11 +421,163 @@ async def generate_edt(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Erreur lors de la génération de l'EDT: {str(e)}"
         )
+    finally:
+        # Session (et examens publiés) modifiés, même en cas d'échec
+        await cache.ainvalidate("examens", "dashboard", "sessions")
+
+
+@router.post("/batch", response_model=ExamenBatchResponse)
+async def batch_examens(
+    request: ExamenBatchRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_department_head)
+):
+    """
+    Confirme, annule, déplace ou supprime un ensemble d'examens en une
+    transaction: liste d'ids et/ou filtres (session, département, formation,
+    période). Une seule requête UPDATE/DELETE, une seule invalidation;
+    le résultat est donné examen par examen.
+    
+    Annulation et suppression sont réservées à l'administration; les chefs
+    de département n'agissent que sur leur département.
+    """
+    role = getattr(current_user.role, "value", current_user.role)
+    if request.action in ("cancel", "delete") and role not in ("director", "administrator"):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Annulation et suppression réservées à l'administration"
+        )
+    filters = (request.session_id, request.dept_id, request.formation_id, request.date_debut, request.date_fin)
+    if not request.examen_ids and all(value is None for value in filters):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Indiquer des examens ou au moins un filtre"
+        )
+    changes = request.model_dump(include={"decalage_minutes", "salle_id", "prof_id", "duree_minutes"})
+    if request.action == "move" and not any(changes.values()):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Indiquer un décalage, une salle, un enseignant ou une durée"
+        )
+    
+    query = db.query(
+        Examen.id, Examen.module_id, Examen.salle_id, Examen.prof_id, Examen.date_heure, Examen.statut,
+        unpublished_exams().label("brouillon")
+    ).select_from(Examen).join(Module).join(Formation)
+    query = scope_examens_query(query, db, current_user)
+    if request.examen_ids:
+        query = query.filter(Examen.id.in_(request.examen_ids))
+    if request.session_id:
+        query = query.filter(Examen.session_id == request.session_id)
+    if request.dept_id:
+        query = query.filter(Formation.dept_id == request.dept_id)
+    if request.formation_id:
+        query = query.filter(Module.formation_id == request.formation_id)
+    if request.date_debut:
+        query = query.filter(Examen.date_heure >= naive_utc(request.date_debut))
+    if request.date_fin:
+        query = query.filter(Examen.date_heure <= naive_utc(request.date_fin))
+    
+    rows = query.order_by(Examen.id).limit(settings.EXAM_BATCH_MAX + 1).all()
+    if len(rows) > settings.EXAM_BATCH_MAX:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Plus de {settings.EXAM_BATCH_MAX} examens sélectionnés: affiner les filtres"
+        )
+    
+    try:
+        applied, skipped = apply_exam_batch(db, rows, request.action, changes)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        # Contrôles des triggers (chevauchement de salle, charge enseignant):
+        # rien n'est appliqué
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Opération groupée refusée, aucun examen modifié: {getattr(e, 'orig', e)}"
+        )
+    
+    if applied:
+        applied_ids = set(applied)
+        touched = [row for row in rows if row.id in applied_ids]
+        keys = examen_change_keys(db, touched)
+        if request.action == "move":
+            keys = merge_changes(keys, {
+                "salle_ids": [request.salle_id] if request.salle_id else [],
+                "prof_ids": [request.prof_id] if request.prof_id else []
+            })
+        await _invalidate_exam_caches(keys)
+    
+    found = {row.id for row in rows}
+    resultats = [{"examen_id": examen_id, "resultat": "applique"} for examen_id in applied]
+    resultats += [{"examen_id": item["examen_id"], "resultat": "ignore", "raison": item["raison"]} for item in skipped]
+    resultats += [
+        {"examen_id": examen_id, "resultat": "introuvable", "raison": "Examen inexistant ou hors périmètre"}
+        for examen_id in sorted(set(request.examen_ids or ()) - found)
+    ]
+    return ExamenBatchResponse(
+        action=request.action,
+        nb_selectionnes=len(rows),
+        nb_appliques=len(applied),
+        nb_ignores=len(skipped),
+        resultats=resultats
+    )
+
+
+@router.post("/repair", response_model=EDTRepairResponse)
+async def repair_edt(
+    request: EDTRepairRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_admin)
+):
+    """
+    Répare l'EDT après une perturbation (admin uniquement).
+    
+    Seuls les examens à venir placés dans une salle fermée, surveillés par un
+    enseignant absent, prévus une journée banalisée ou désignés sont
+    replanifiés, au moindre déplacement; les autres examens ne bougent pas.
+    """
+    if not (request.examen_ids or request.salle_ids or request.prof_ids or request.jours):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Indiquer au moins un examen, une salle, un enseignant ou une journée"
+        )
+    
+    try:
+        result = ExamScheduler(db).repair_schedule(
+            examen_ids=request.examen_ids,
+            salle_ids=request.salle_ids,
+            prof_ids=request.prof_ids,
+            jours=request.jours,
+            fenetre_jours=request.fenetre_jours,
+            user_id=current_user.id
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Erreur lors de la réparation de l'EDT: {str(e)}"
+        )
+    
+    deplaces = result["examens_deplaces"]
+    if deplaces:
+        examens = db.query(Examen).filter(Examen.id.in_([d["examen_id"] for d in deplaces])).all()
+        await _invalidate_exam_caches(examen_change_keys(db, examens), {
+            "salle_ids": [d["ancienne_salle_id"] for d in deplaces if d["ancienne_salle_id"]],
+            "prof_ids": [d["ancien_prof_id"] for d in deplaces if d["ancien_prof_id"]]
+        })
+    hub.publish_local([{
+        "table": "sessions_generation",
+        "session_id": result["session_id"],
+        "statut": result["statut"]
+    }])
+    await cache.ainvalidate("sessions")
+    
+    return EDTRepairResponse(**result)
 
 
 @router.get("/conflicts/detect", response_model=List[ConflictInfo])
 async def detect_exam_conflicts(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(require_department_head)
 ):
     """
@@ -255,6 +593,185 @@ async def detect_exam_conflicts(
     ) for c in conflicts]
 
 
+@router.get("/{examen_id}/suggestions", response_model=ExamenSuggestionsResponse)
+async def suggest_examen_moves(
+    examen_id: int,
+    k: int = Query(10, ge=1, le=50),
+    date_debut: Optional[datetime] = None,
+    date_fin: Optional[datetime] = None,
+    jours: int = Query(7, ge=1, le=60, description="Fenêtre par défaut autour de l'examen"),
+    exclure_salle_id: Optional[List[int]] = Query(None, description="Salles indisponibles"),
+    exclure_prof_id: Optional[List[int]] = Query(None, description="Enseignants indisponibles"),
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(require_department_head)
+):
+    """
+    Propose les meilleurs déplacements d'un examen (créneau, salle,
+    enseignant), classés du moins au plus perturbant. Les salles, enseignants
+    et étudiants de l'examen ne doivent avoir aucun chevauchement; les limites
+    journalières des enseignants et des formations sont respectées.
+    """
+    started = time.perf_counter()
+    query = db.query(
+        Examen, Module.formation_id, Formation.dept_id, Module.nb_inscrits_actifs
+    ).select_from(Examen).join(Module).join(Formation)
+    row = scope_examens_query(query, db, current_user).filter(Examen.id == examen_id).first()
+    if not row:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Examen non trouvé"
+        )
+    examen, formation_id, dept_id, nb_inscrits = row
+
+    exam = ExamSlot(
+        examen.id, examen.module_id, formation_id, examen.prof_id, examen.salle_id,
+        examen.date_heure, examen.date_heure + timedelta(minutes=examen.duree_minutes or 120)
+    )
+    window_start, window_end = default_window(exam, jours)
+    date_debut = naive_utc(date_debut) if date_debut else window_start
+    date_fin = naive_utc(date_fin) if date_fin else window_end
+    if date_fin <= date_debut:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="La fin de la fenêtre doit être postérieure au début"
+        )
+
+    index = get_occupancy_index(db)
+    nb_inscrits = nb_inscrits or examen.nb_inscrits or 0
+    suggestions, evaluated = suggest_moves(
+        db, index, exam, nb_inscrits, dept_id, date_debut, date_fin, k=k,
+        exclude_salles=exclure_salle_id or (),
+        exclude_profs=exclure_prof_id or (),
+        shared=cached_shared_students(db, index, exam.module_id)
+    )
+    return ExamenSuggestionsResponse(
+        examen_id=examen.id,
+        date_debut=date_debut,
+        date_fin=date_fin,
+        candidats_evalues=evaluated,
+        took_ms=round((time.perf_counter() - started) * 1000, 2),
+        suggestions=suggestions
+    )
+
+
+@router.post("/{examen_id}/validate", response_model=ExamenValidationResponse)
+async def validate_examen_placement(
+    examen_id: int,
+    proposal: ExamenPlacementCheck,
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(require_department_head)
+):
+    """
+    Vérifie un déplacement d'examen sans l'enregistrer (glisser-déposer):
+    renvoie toutes les contraintes violées avec le nombre d'étudiants
+    concernés. Les champs absents gardent leur valeur actuelle.
+    """
+    started = time.perf_counter()
+    query = db.query(
+        Examen, Module.formation_id, Module.nb_inscrits_actifs
+    ).select_from(Examen).join(Module).join(Formation)
+    row = scope_examens_query(query, db, current_user).filter(Examen.id == examen_id).first()
+    if not row:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Examen non trouvé"
+        )
+    examen, formation_id, nb_inscrits = row
+
+    changes = proposal.model_dump(exclude_unset=True)
+    start = naive_utc(changes.get("date_heure") or examen.date_heure)
+    duree = changes.get("duree_minutes") or examen.duree_minutes or 120
+    placement = ExamSlot(
+        examen.id, examen.module_id, formation_id,
+        changes.get("prof_id", examen.prof_id), changes.get("salle_id", examen.salle_id),
+        start, start + timedelta(minutes=duree)
+    )
+
+    index = get_occupancy_index(db)
+    violations = validate_placement(
+        index, placement, nb_inscrits or examen.nb_inscrits or 0,
+        cached_shared_students(db, index, examen.module_id)
+    )
+    return ExamenValidationResponse(
+        examen_id=examen.id,
+        valide=not any(v["severite"] == ERROR for v in violations),
+        violations=violations,
+        took_ms=round((time.perf_counter() - started) * 1000, 2)
+    )
+
+
+@router.get("/{examen_id}/salles", response_model=List[ExamenSalleResponse])
+async def list_examen_salles(
+    examen_id: int,
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(require_department_head)
+):
+    """
+    Salles de l'examen (plusieurs pour un examen réparti), salle principale
+    en premier, avec le nombre d'étudiants placés dans chacune.
+    """
+    examen = scope_examens_query(
+        db.query(Examen).join(Module).join(Formation), db, current_user
+    ).filter(Examen.id == examen_id).first()
+    if not examen:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Examen non trouvé"
+        )
+    
+    placed = dict(db.query(PlaceExamen.salle_id, func.count(PlaceExamen.id)).filter(
+        PlaceExamen.examen_id == examen_id
+    ).group_by(PlaceExamen.salle_id).all())
+    rooms = [(row.salle, row.nb_places) for row in examen.salles]
+    if not rooms and examen.salle is not None:
+        rooms = [(examen.salle, placed.get(examen.salle_id, examen.nb_inscrits or 0))]
+    return [
+        ExamenSalleResponse(
+            salle_id=salle.id,
+            code=salle.code,
+            nom=salle.nom,
+            batiment=salle.batiment,
+            capacite_examen=salle.capacite // 2,
+            nb_places=nb_places or 0,
+            principale=salle.id == examen.salle_id
+        )
+        for salle, nb_places in rooms
+    ]
+
+
+@router.post("/{examen_id}/places", response_model=SeatAllocationResponse)
+async def allocate_examen_seats(
+    examen_id: int,
+    numeroter: bool = True,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_admin)
+):
+    """
+    (Re)calcule la répartition des inscrits de l'examen entre ses salles,
+    avec un numéro de place si numeroter (une place sur deux).
+    """
+    examen = db.query(Examen).filter(Examen.id == examen_id).first()
+    if not examen:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Examen non trouvé"
+        )
+    if examen.salle_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="L'examen n'a pas de salle"
+        )
+    
+    result = allocate_seats(db, [examen_id], numeroter=numeroter)
+    db.commit()
+    await _invalidate_exam_caches(examen_change_keys(db, [examen]))
+    return SeatAllocationResponse(
+        **result,
+        message=f"{result['nb_etudiants_places']} étudiants placés"
+        + (f", {result['nb_sans_place']} sans place" if result["nb_sans_place"] else "")
+    )
+
+
 @router.post("/{examen_id}/confirm")
 async def confirm_examen(
     examen_id: int,
@@ -280,6 +797,7 @@ async def confirm_examen(
     
     examen.statut = "confirmed"
     db.commit()
+    await _invalidate_exam_caches(examen_change_keys(db, [examen]))
     
     return {"message": "Examen confirmé avec succès"}
 
@@ -303,5 +821,6 @@ async def cancel_examen(
     
     examen.statut = "cancelled"
     db.commit()
+    await _invalidate_exam_caches(examen_change_keys(db, [examen]))
     
     return {"message": "Examen annulé avec succès"}
@@ -0,0 +1,36 @@
+"""
+Monitoring API endpoints
+"""
+from fastapi import APIRouter, Depends, status
+from app.core.config import settings
+from app.core.instrumentation import get_route_stats, reset_route_stats
+from app.core.security import require_admin
+from app.models import User
+
+router = APIRouter(prefix="/monitoring", tags=["Monitoring"])
+
+
+@router.get("/sql")
+async def get_sql_stats(
+    current_user: User = Depends(require_admin)
+):
+    """
+    Statistiques SQL agrégées par route depuis le démarrage du worker:
+    nombre de requêtes, temps base de données, dépassements du budget
+    et suspicions de N+1.
+    """
+    return {
+        "query_budget": settings.SQL_QUERY_BUDGET,
+        "n_plus_one_threshold": settings.SQL_N_PLUS_ONE_THRESHOLD,
+        "routes": get_route_stats()
+    }
+
+
+@router.delete("/sql", status_code=status.HTTP_204_NO_CONTENT)
+async def reset_sql_stats(
+    current_user: User = Depends(require_admin)
+):
+    """
+    Réinitialise les statistiques SQL du worker.
+    """
+    reset_route_stats()
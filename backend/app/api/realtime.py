@@ -0,0 +1,84 @@
+"""
+WebSocket API endpoint (schedule change push)
+"""
+from typing import Optional, Tuple
+from fastapi import APIRouter, HTTPException, Query, WebSocket
+from app.core.database import SessionLocal
+from app.core.realtime import Subscriber, hub
+from app.core.security import decode_token, load_user_by_email
+
+router = APIRouter(prefix="/ws", tags=["Realtime"])
+
+# Codes de fermeture applicatifs (plage 4000-4999)
+WS_UNAUTHORIZED = 4401
+WS_FORBIDDEN = 4403
+
+WS_ROLES = ("director", "administrator", "department_head", "professor")
+
+
+async def _authenticate(token: str) -> Optional[Tuple[str, Optional[int]]]:
+    """Rôle et ref_id du porteur du jeton; la session SQL n'est pas gardée ouverte"""
+    try:
+        payload = decode_token(token)
+    except HTTPException:
+        return None
+    if payload.get("type") != "access" or not payload.get("sub"):
+        return None
+    db = SessionLocal()
+    try:
+        user = await load_user_by_email(db, payload["sub"])
+        if user is None or not user.active:
+            return None
+        return getattr(user.role, "value", user.role), user.ref_id
+    finally:
+        db.close()
+
+
+@router.websocket("/changes")
+async def changes_websocket(
+    websocket: WebSocket,
+    token: str = Query(...),
+    dept_id: Optional[int] = None
+):
+    """
+    Flux des changements d'EDT (examens créés, déplacés, confirmés, annulés;
+    sessions de génération terminées).
+
+    Les chefs de département ne reçoivent que leur département, les
+    enseignants leurs examens; directeurs et administrateurs peuvent filtrer
+    avec `dept_id`. Chaque message indique les examens touchés: le client
+    récupère les données avec /api/sync. Un message `resync` signale que des
+    événements ont été perdus.
+    """
+    identity = await _authenticate(token)
+    if identity is None:
+        await websocket.close(code=WS_UNAUTHORIZED)
+        return
+    role, ref_id = identity
+    if role not in WS_ROLES:
+        await websocket.close(code=WS_FORBIDDEN)
+        return
+
+    if role in ("department_head", "professor") and ref_id is None:
+        # Rôle restreint sans périmètre: rien à recevoir
+        await websocket.close(code=WS_FORBIDDEN)
+        return
+
+    if role == "department_head":
+        dept_id = ref_id
+    elif role == "professor":
+        # Ses examens seulement, quel que soit le département demandé
+        dept_id = None
+    subscriber = Subscriber(
+        websocket,
+        role,
+        dept_id=dept_id,
+        prof_id=ref_id if role == "professor" else None
+    )
+
+    await websocket.accept()
+    hub.subscribe(subscriber)
+    try:
+        await subscriber.run()
+    finally:
+        hub.unsubscribe(subscriber)
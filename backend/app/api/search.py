@@ -0,0 +1,45 @@
+"""
+Search API endpoint
+"""
+import time
+from typing import List, Optional
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+from app.core.read_routing import get_read_db
+from app.core.security import get_current_user
+from app.models import User
+from app.schemas import SearchResponse, SearchResult
+from app.services.search import SEARCH_TYPES, search
+
+router = APIRouter(prefix="/search", tags=["Search"])
+
+# La recherche d'étudiants est réservée aux mêmes rôles que /dashboard/etudiants
+STUDENT_SEARCH_ROLES = ("director", "administrator", "department_head")
+
+
+@router.get("", response_model=SearchResponse)
+async def search_entities(
+    q: str = Query(..., min_length=2, max_length=100),
+    types: Optional[List[str]] = Query(None),
+    limit: int = Query(10, ge=1, le=50),
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Recherche classée (autocomplétion) sur les modules, enseignants,
+    étudiants et salles: code ou matricule, nom, prénom, bâtiment.
+
+    Les préfixes sont classés en premier, puis les correspondances
+    approchantes (tolérance aux fautes de frappe sous PostgreSQL).
+    """
+    start = time.perf_counter()
+    allowed = [t for t in (types or SEARCH_TYPES) if t in SEARCH_TYPES]
+    if current_user.role not in STUDENT_SEARCH_ROLES and "etudiant" in allowed:
+        allowed.remove("etudiant")
+
+    results = search(db, q, allowed, limit) if allowed else []
+    return SearchResponse(
+        query=q,
+        results=[SearchResult(**r) for r in results],
+        took_ms=round((time.perf_counter() - start) * 1000, 2)
+    )
@@ -0,0 +1,185 @@
+"""
+EDT generation sessions API endpoints
+"""
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from sqlalchemy.orm import Session
+from app.core.cache import cache
+from app.core.database import get_db
+from app.core.read_routing import get_read_db
+from app.core.realtime import hub
+from app.core.security import require_admin
+from app.models import SessionGeneration, User
+from app.schemas import (
+    SessionGenerationResponse,
+    SessionGenerationDetail,
+    SessionQualityResponse,
+    SessionPublishResponse,
+    PaginatedResponse
+)
+from app.services.availability import reset_occupancy_index
+from app.services.quality import score_session
+from app.services.staging import discard_session_drafts, publish_session
+
+router = APIRouter(prefix="/sessions", tags=["Sessions"])
+
+
+@router.get("/", response_model=PaginatedResponse)
+async def list_sessions(
+    page: int = Query(1, ge=1),
+    size: int = Query(20, ge=1, le=100),
+    statut: Optional[str] = None,
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(require_admin)
+):
+    """
+    Liste des sessions de génération, les plus récentes en premier.
+    """
+    query = db.query(SessionGeneration)
+    if statut:
+        query = query.filter(SessionGeneration.statut == statut)
+    
+    total = query.count()
+    items = query.order_by(SessionGeneration.id.desc()).offset((page - 1) * size).limit(size).all()
+    
+    return PaginatedResponse(
+        items=[SessionGenerationResponse.model_validate(item) for item in items],
+        total=total,
+        page=page,
+        size=size,
+        pages=(total + size - 1) // size
+    )
+
+
+@router.get("/{session_id}", response_model=SessionGenerationDetail)
+async def get_session(
+    session_id: int,
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(require_admin)
+):
+    """
+    Détail d'une session de génération avec son profil d'exécution
+    (durée, requêtes SQL et lignes par phase, statistiques du solveur, mémoire).
+    """
+    session = db.query(SessionGeneration).filter(SessionGeneration.id == session_id).first()
+    
+    if not session:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Session non trouvée"
+        )
+    
+    return session
+
+
+@router.get("/{session_id}/quality", response_model=SessionQualityResponse)
+async def get_session_quality(
+    session_id: int,
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(require_admin)
+):
+    """
+    Qualité de l'EDT produit par la session: examens par étudiant et par
+    jour, écarts entre examens, conflits, changements de bâtiment,
+    remplissage des salles et équilibre des charges enseignantes.
+    """
+    if not db.query(SessionGeneration.id).filter(SessionGeneration.id == session_id).first():
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Session non trouvée"
+        )
+    
+    report = score_session(db, session_id)
+    if report is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Aucun examen actif dans cette session"
+        )
+    return report
+
+
+def _get_session_for_update(db: Session, session_id: int) -> SessionGeneration:
+    session = db.query(SessionGeneration).filter(
+        SessionGeneration.id == session_id
+    ).with_for_update().first()
+    if not session:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Session non trouvée"
+        )
+    return session
+
+
+async def _notify(session: SessionGeneration, published: bool):
+    await cache.ainvalidate("examens", "dashboard", "sessions")
+    if published:
+        reset_occupancy_index()
+    hub.publish_local([{
+        "table": "sessions_generation",
+        "session_id": session.id,
+        "statut": "published" if published else "discarded"
+    }])
+
+
+@router.post("/{session_id}/publish", response_model=SessionPublishResponse)
+async def publish(
+    session_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_admin)
+):
+    """
+    Publie l'EDT brouillon de la session: son drapeau brouillon est levé et
+    tous ses examens deviennent visibles d'un coup, après vérification
+    contre l'EDT en place.
+    """
+    session = _get_session_for_update(db, session_id)
+    try:
+        published = publish_session(db, session)
+        db.commit()
+    except ValueError as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(e)
+        )
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Publication refusée, aucun examen publié: {getattr(e, 'orig', e)}"
+        )
+
+    await _notify(session, published=True)
+    return SessionPublishResponse(
+        session_id=session.id,
+        nb_examens=published,
+        publiee_at=session.publiee_at,
+        message=f"EDT publié: {published} examens"
+    )
+
+
+@router.delete("/{session_id}/draft", response_model=SessionPublishResponse)
+async def discard_draft(
+    session_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_admin)
+):
+    """
+    Abandonne l'EDT brouillon de la session (examens non publiés supprimés).
+    """
+    session = _get_session_for_update(db, session_id)
+    # Sessions publiées ou antérieures à la publication par étapes: examens en place
+    if not session.brouillon:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Session déjà publiée"
+        )
+    discarded = discard_session_drafts(db, session.id)
+    db.commit()
+
+    await _notify(session, published=False)
+    return SessionPublishResponse(
+        session_id=session.id,
+        nb_examens=discarded,
+        message=f"Brouillon abandonné: {discarded} examens supprimés"
+    )
@@ -0,0 +1,169 @@
+"""
+Schedule versions API endpoints (snapshots, diff, promotion, rollback)
+"""
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from sqlalchemy.orm import Session
+from app.core.database import get_db
+from app.core.notifications import ainvalidate_for_changes, examen_change_keys, merge_changes
+from app.core.read_routing import get_read_db
+from app.core.realtime import hub
+from app.core.security import require_admin
+from app.models import EdtSnapshot, Formation, Module, SessionGeneration, User
+from app.schemas import (
+    SnapshotCreate,
+    SnapshotResponse,
+    SnapshotDiffResponse,
+    SnapshotPromoteResponse
+)
+from app.services.availability import reset_occupancy_index
+from app.services.snapshots import (
+    capture_snapshot, decode, diff_placements, live_placements, promote_snapshot, rollback_snapshot
+)
+
+router = APIRouter(prefix="/snapshots", tags=["Versions"])
+
+
+def _get_snapshot(db: Session, snapshot_id: int) -> EdtSnapshot:
+    snapshot = db.query(EdtSnapshot).filter(EdtSnapshot.id == snapshot_id).first()
+    if not snapshot:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Version non trouvée"
+        )
+    return snapshot
+
+
+@router.get("/", response_model=List[SnapshotResponse])
+async def list_snapshots(
+    session_id: Optional[int] = None,
+    type: Optional[str] = Query(None, pattern="^(generation|manuel|sauvegarde)$"),
+    limit: int = Query(50, ge=1, le=500),
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(require_admin)
+):
+    """
+    Versions d'EDT enregistrées, les plus récentes en premier.
+    """
+    query = db.query(EdtSnapshot)
+    if session_id:
+        query = query.filter(EdtSnapshot.session_id == session_id)
+    if type:
+        query = query.filter(EdtSnapshot.type == type)
+    return query.order_by(EdtSnapshot.id.desc()).limit(limit).all()
+
+
+@router.post("/", response_model=SnapshotResponse, status_code=status.HTTP_201_CREATED)
+async def create_snapshot(
+    request: SnapshotCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_admin)
+):
+    """
+    Enregistre une version: les examens d'une session de génération, ou
+    l'EDT en place (tous les départements ou ceux indiqués).
+    """
+    if request.session_id is not None:
+        if not db.query(SessionGeneration.id).filter(SessionGeneration.id == request.session_id).first():
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Session non trouvée"
+            )
+        placements = live_placements(db, session_id=request.session_id)
+    elif request.dept_ids:
+        module_ids = [module_id for (module_id,) in db.query(Module.id).join(Formation).filter(
+            Formation.dept_id.in_(request.dept_ids)
+        ).all()]
+        placements = live_placements(db, module_ids=module_ids)
+    else:
+        placements = live_placements(db)
+
+    snapshot = capture_snapshot(
+        db, placements, type="manuel", session_id=request.session_id,
+        user_id=current_user.id, libelle=request.libelle
+    )
+    db.commit()
+    db.refresh(snapshot)
+    return snapshot
+
+
+@router.get("/{snapshot_id}/diff", response_model=SnapshotDiffResponse)
+async def diff_snapshot(
+    snapshot_id: int,
+    avec: Optional[int] = Query(None, description="Version de comparaison (défaut: EDT en place)"),
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(require_admin)
+):
+    """
+    Différences entre deux versions: examens déplacés, ajoutés, supprimés
+    et étudiants concernés. Sans `avec`, compare l'EDT en place à la
+    version, c'est-à-dire ce que changerait sa promotion.
+    """
+    after = decode(_get_snapshot(db, snapshot_id).donnees)
+    if avec is None:
+        before = live_placements(db, module_ids=after)
+    else:
+        before = decode(_get_snapshot(db, avec).donnees)
+
+    return {"avant_id": avec, "apres_id": snapshot_id, **diff_placements(db, before, after)}
+
+
+async def _apply(db: Session, snapshot: EdtSnapshot, action, user: User,
+                 done: str, refused: str) -> SnapshotPromoteResponse:
+    try:
+        backup, replaced, written = action(db, snapshot, user.id)
+        db.commit()
+    except ValueError as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(e)
+        )
+    except Exception as e:
+        db.rollback()
+        # Contrôles des triggers (chevauchement de salle, charge enseignant):
+        # l'EDT en place est inchangé
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"{refused}, EDT inchangé: {getattr(e, 'orig', e)}"
+        )
+
+    if replaced or written:
+        merged = merge_changes(examen_change_keys(db, replaced + written))
+        await ainvalidate_for_changes([merged])
+        reset_occupancy_index()
+        hub.publish_local([merged])
+    return SnapshotPromoteResponse(
+        snapshot_id=snapshot.id,
+        sauvegarde_id=backup.id,
+        nb_examens_modifies=len({placement.module_id for placement in replaced + written}),
+        message=f"{done}: {len(written)} examens placés, sauvegarde {backup.id}"
+    )
+
+
+@router.post("/{snapshot_id}/promote", response_model=SnapshotPromoteResponse)
+async def promote(
+    snapshot_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_admin)
+):
+    """
+    Fait de la version l'EDT en place pour ses modules, en une transaction.
+    L'EDT remplacé est enregistré (sauvegarde) pour un retour arrière.
+    """
+    return await _apply(db, _get_snapshot(db, snapshot_id), promote_snapshot, current_user,
+                  "Promotion effectuée", "Promotion refusée")
+
+
+@router.post("/{snapshot_id}/rollback", response_model=SnapshotPromoteResponse)
+async def rollback(
+    snapshot_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_admin)
+):
+    """
+    Annule la promotion de la version: l'EDT sauvegardé à ce moment est
+    remis en place, en une transaction.
+    """
+    return await _apply(db, _get_snapshot(db, snapshot_id), rollback_snapshot, current_user,
+                  "Retour arrière effectué", "Retour arrière refusé")
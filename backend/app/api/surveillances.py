@@ -0,0 +1,79 @@
+"""
+Invigilation API endpoints (surveillances)
+"""
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from sqlalchemy.orm import Session
+from app.core.database import get_db
+from app.core.read_routing import get_read_db
+from app.core.security import require_admin, require_professor
+from app.models import Examen, SessionGeneration, Surveillance, User
+from app.schemas import (
+    SurveillanceResponse,
+    SurveillanceAssignRequest,
+    SurveillanceAssignResponse
+)
+from app.services.invigilation import assign_invigilators
+
+router = APIRouter(prefix="/surveillances", tags=["Surveillances"])
+
+
+@router.get("/", response_model=List[SurveillanceResponse])
+async def list_surveillances(
+    examen_id: Optional[int] = None,
+    prof_id: Optional[int] = None,
+    session_id: Optional[int] = None,
+    limit: int = Query(500, ge=1, le=5000),
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(require_professor)
+):
+    """
+    Surveillances affectées, par examen, enseignant ou session.
+    Un enseignant ne voit que les siennes.
+    """
+    query = db.query(Surveillance)
+    if current_user.role == "professor":
+        prof_id = current_user.ref_id
+    if examen_id:
+        query = query.filter(Surveillance.examen_id == examen_id)
+    if prof_id:
+        query = query.filter(Surveillance.prof_id == prof_id)
+    if session_id:
+        query = query.join(Examen, Examen.id == Surveillance.examen_id).filter(Examen.session_id == session_id)
+    return query.order_by(Surveillance.examen_id, Surveillance.role, Surveillance.prof_id).limit(limit).all()
+
+
+@router.post("/assign", response_model=SurveillanceAssignResponse)
+async def assign(
+    request: SurveillanceAssignRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_admin)
+):
+    """
+    Affecte responsables et surveillants aux examens actifs sélectionnés
+    (session, départements, période), selon leur nombre d'inscrits, en
+    équilibrant les charges et en respectant les plafonds journaliers et
+    les créneaux déjà occupés. Les surveillances existantes de ces examens
+    sont remplacées, en une transaction.
+    """
+    if request.session_id is not None and not db.query(SessionGeneration.id).filter(
+        SessionGeneration.id == request.session_id
+    ).first():
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Session non trouvée"
+        )
+
+    result = assign_invigilators(
+        db,
+        session_id=request.session_id,
+        dept_ids=request.dept_ids,
+        date_debut=request.date_debut,
+        date_fin=request.date_fin
+    )
+    db.commit()
+
+    message = f"{result['nb_surveillances']} surveillances affectées sur {result['nb_examens']} examens"
+    if result["nb_postes_non_pourvus"]:
+        message += f", {result['nb_postes_non_pourvus']} postes non pourvus"
+    return SurveillanceAssignResponse(**result, message=message)
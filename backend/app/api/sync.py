@@ -0,0 +1,135 @@
+"""
+Delta sync API endpoint
+"""
+from datetime import datetime
+from typing import Dict, Optional, Set
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session, contains_eager, joinedload
+from app.api.examens import scope_examens_query
+from app.core.change_log import PreviousExam, current_cursor, cursor_at, pruned_before, read_changes
+from app.core.read_routing import get_read_db
+from app.core.security import get_current_user
+from app.models import Examen, Formation, Inscription, LieuExamen, Module, SessionGeneration, User
+from app.schemas import (
+    ExamenResponse,
+    LieuExamenResponse,
+    SessionGenerationResponse,
+    SyncDeletion,
+    SyncResponse
+)
+
+router = APIRouter(prefix="/sync", tags=["Sync"])
+
+ADMIN_ROLES = ("director", "administrator")
+
+
+def _visible_before(db: Session, current_user: User, previous: Dict[int, PreviousExam]) -> Set[int]:
+    """
+    Examens que l'utilisateur voyait au curseur, d'après leur état d'alors
+    (mêmes règles que scope_examens_query).
+    """
+    role = getattr(current_user.role, "value", current_user.role)
+    if role not in ("professor", "student"):
+        shown = previous
+    else:
+        # Enseignants et étudiants ne voyaient pas les brouillons
+        shown = {examen_id: exam for examen_id, exam in previous.items() if exam.statut != "draft"}
+    if role in ADMIN_ROLES or not current_user.ref_id:
+        return set(shown)
+    if role == "department_head":
+        module_depts = dict(db.query(Module.id, Formation.dept_id).join(Formation).filter(
+            Module.id.in_({exam.module_id for exam in shown.values()})
+        ).all()) if shown else {}
+        return {
+            examen_id for examen_id, exam in shown.items()
+            if module_depts.get(exam.module_id) == current_user.ref_id
+        }
+    if role == "professor":
+        return {examen_id for examen_id, exam in shown.items() if exam.prof_id == current_user.ref_id}
+    if role == "student" and shown:
+        modules = {module_id for (module_id,) in db.query(Inscription.module_id).filter(
+            Inscription.etudiant_id == current_user.ref_id,
+            Inscription.statut == "active",
+            Inscription.module_id.in_({exam.module_id for exam in shown.values()})
+        ).all()}
+        return {examen_id for examen_id, exam in shown.items() if exam.module_id in modules}
+    return set()
+
+
+@router.get("", response_model=SyncResponse)
+async def sync_changes(
+    cursor: Optional[int] = Query(None, ge=0),
+    since: Optional[datetime] = None,
+    limit: int = Query(500, ge=1, le=5000),
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Examens, salles et sessions de génération modifiés depuis un curseur.
+
+    Le client conserve le `cursor` renvoyé et le repasse à l'appel suivant
+    (ou `since` pour repartir d'un horodatage). Sans curseur, ou si le
+    journal a été purgé depuis, la réponse indique `reset`: recharger les
+    listes complètes puis reprendre avec le nouveau curseur. Tant que
+    `has_more` est vrai, rappeler immédiatement.
+    """
+    if cursor is None and since is not None:
+        cursor = cursor_at(db, since)
+    if cursor is None or cursor < pruned_before(db):
+        return SyncResponse(cursor=current_cursor(db), reset=True)
+
+    batch = read_changes(db, cursor, limit)
+    response = SyncResponse(cursor=batch.cursor, has_more=batch.has_more)
+    # Suppressions: seulement ce que l'utilisateur pouvait voir au curseur
+    visible_before = _visible_before(db, current_user, batch.previous)
+    is_admin = current_user.role in ADMIN_ROLES
+    response.suppressions = [
+        SyncDeletion(entity=entity, id=entity_id, change_seq=seq, deleted_at=deleted_at)
+        for entity, entity_id, seq, deleted_at in batch.deleted
+        if entity == "salle"
+        or (entity == "session" and is_admin)
+        or (entity == "examen" and entity_id in visible_before)
+    ]
+
+    examen_ids = batch.changed["examen"]
+    if batch.changed["session"]:
+        # Session publiée depuis le curseur: seule sa ligne est journalisée,
+        # ses examens deviennent visibles d'un coup
+        published = {examen_id for (examen_id,) in db.query(Examen.id).join(
+            SessionGeneration, SessionGeneration.id == Examen.session_id
+        ).filter(
+            SessionGeneration.id.in_(batch.changed["session"]),
+            SessionGeneration.publiee_at.isnot(None),
+            SessionGeneration.brouillon.is_(False)
+        ).all()}
+        examen_ids = sorted(published.union(examen_ids))
+    if examen_ids:
+        query = db.query(Examen).join(Module).join(Formation).filter(Examen.id.in_(examen_ids))
+        query = scope_examens_query(query, db, current_user).options(
+            contains_eager(Examen.module),
+            joinedload(Examen.professeur),
+            joinedload(Examen.salle)
+        )
+        examens = query.order_by(Examen.id).all()
+        response.examens = [ExamenResponse.model_validate(e) for e in examens]
+        # Examens sortis du périmètre (ex: réaffectés à un autre enseignant)
+        visible = {e.id for e in examens}
+        response.suppressions += [
+            SyncDeletion(entity="examen", id=examen_id)
+            for examen_id in examen_ids if examen_id not in visible and examen_id in visible_before
+        ]
+
+    if batch.changed["salle"]:
+        salles = db.query(LieuExamen).filter(
+            LieuExamen.id.in_(batch.changed["salle"])
+        ).order_by(LieuExamen.id).all()
+        response.salles = [LieuExamenResponse.model_validate(s) for s in salles]
+
+    # Sessions de génération: mêmes droits que /api/sessions
+    if batch.changed["session"] and is_admin:
+        sessions = db.query(SessionGeneration).filter(
+            SessionGeneration.id.in_(batch.changed["session"])
+        ).order_by(SessionGeneration.id).all()
+        response.sessions = [SessionGenerationResponse.model_validate(s) for s in sessions]
+
+    return response
@@ -1,9 +1,11 @@
 """Core module exports"""
 from app.core.config import settings
-from app.core.database import Base, get_db, engine
+from app.core.database import Base, get_db, engine, read_engine
 from app.core.security import (
     verify_password,
     get_password_hash,
+    verify_password_async,
+    get_password_hash_async,
     create_access_token,
     create_refresh_token,
     get_current_user,
@@ -20,8 +22,11 @@ __all__ = [
     "Base",
     "get_db",
     "engine",
+    "read_engine",
     "verify_password",
     "get_password_hash",
+    "verify_password_async",
+    "get_password_hash_async",
     "create_access_token",
     "create_refresh_token",
     "get_current_user",
@@ -0,0 +1,217 @@
+"""
+Application startup: schema creation and seed data
+
+Warm boots only read the bootstrap version marker stored in app_metadata
+(one query). Tables, upgrade DDL and seed users are (re)applied only when
+the marker is missing or older than BOOTSTRAP_VERSION.
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Dict, Iterator, List
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.core import metrics
+from app.core.change_log import CHANGE_LOG_DDL
+from app.core.database import Base, SessionLocal
+from app.core.notifications import NOTIFY_DDL
+from app.core.security import get_password_hash
+from app.models import AppMetadata, User, UserRole
+from app.services.enrolment import ENROLMENT_DDL
+from app.services.planning import PLANNING_DDL
+from app.services.search import SEARCH_DDL
+from app.services.seating import SEATING_DDL
+from app.services.staging import CONSTRAINT_DDL
+
+# Bump whenever models, UPGRADE_STATEMENTS or SEED_USERS change
+BOOTSTRAP_VERSION = "2026.10.12"
+BOOTSTRAP_KEY = "bootstrap_version"
+# Serialises the cold path when several workers boot at once
+BOOTSTRAP_LOCK_ID = 724201
+
+# Idempotent trigger, function and index DDL owned by the modules that rely
+# on it, keyed by the database/schema.sql section it is generated into
+# (scripts/sync_schema.py): the Python lists are the single source
+SCHEMA_SECTIONS: Dict[str, List[str]] = {
+    "RECHERCHE": SEARCH_DDL,
+    "CONTRAINTES MÉTIER": CONSTRAINT_DDL,
+    "NOTIFICATIONS": NOTIFY_DDL,
+    "SYNCHRONISATION": CHANGE_LOG_DDL,
+    "COMPTEURS D'INSCRITS": ENROLMENT_DDL,
+    "PLANNING": PLANNING_DDL,
+    "SALLES MULTIPLES": SEATING_DDL,
+}
+
+# Idempotent DDL for columns added after tables were first created
+# (create_all only creates missing tables), then every schema section
+UPGRADE_STATEMENTS: List[str] = [
+    "ALTER TABLE sessions_generation ADD COLUMN IF NOT EXISTS metriques JSONB DEFAULT '{}'",
+    "ALTER TABLE sessions_generation ADD COLUMN IF NOT EXISTS publiee_at TIMESTAMP",
+    "ALTER TABLE sessions_generation ADD COLUMN IF NOT EXISTS brouillon BOOLEAN NOT NULL DEFAULT FALSE",
+    "ALTER TABLE sync_changes ADD COLUMN IF NOT EXISTS old_module_id INTEGER",
+    "ALTER TABLE sync_changes ADD COLUMN IF NOT EXISTS old_prof_id INTEGER",
+    "ALTER TABLE sync_changes ADD COLUMN IF NOT EXISTS old_statut VARCHAR(20)",
+    *(statement for section in SCHEMA_SECTIONS.values() for statement in section),
+]
+
+SEED_USERS = [
+    {
+        "email": "admin@univ.edu",
+        "password": "Director123!",
+        "role": UserRole.DIRECTOR,
+        "nom": "Administrateur",
+        "prenom": "Principal"
+    },
+    {
+        "email": "admin.scolarite@univ.edu",
+        "password": "Admin123!",
+        "role": UserRole.ADMINISTRATOR,
+        "nom": "Martin",
+        "prenom": "Sophie"
+    },
+    {
+        "email": "chef.info@univ.edu",
+        "password": "Chef123!",
+        "role": UserRole.DEPARTMENT_HEAD,
+        "nom": "Dupont",
+        "prenom": "Jean"
+    },
+    {
+        "email": "prof.math@univ.edu",
+        "password": "Prof123!",
+        "role": UserRole.PROFESSOR,
+        "nom": "Bernard",
+        "prenom": "Marie"
+    },
+    {
+        "email": "etudiant@univ.edu",
+        "password": "Etudiant123!",
+        "role": UserRole.STUDENT,
+        "nom": "Petit",
+        "prenom": "Lucas"
+    }
+]
+
+
+class StartupReport:
+    """Durée de chaque phase du démarrage"""
+
+    def __init__(self):
+        self.phases_ms: Dict[str, float] = {}
+        self.cold = False
+        self._start = time.perf_counter()
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.phases_ms[name] = round(elapsed * 1000, 1)
+            metrics.app_startup_phase.set(elapsed, phase=name)
+
+    @property
+    def total_ms(self) -> float:
+        return round((time.perf_counter() - self._start) * 1000, 1)
+
+    def to_dict(self) -> Dict:
+        return {"cold": self.cold, "total_ms": self.total_ms, "phases_ms": self.phases_ms}
+
+
+def read_bootstrap_version(engine: Engine):
+    """Version enregistrée, ou None si app_metadata n'existe pas encore"""
+    try:
+        with engine.connect() as conn:
+            return conn.execute(
+                text("SELECT value FROM app_metadata WHERE key = :key"), {"key": BOOTSTRAP_KEY}
+            ).scalar()
+    except SQLAlchemyError:
+        return None
+
+
+def seed_users(db) -> List[str]:
+    """Crée les comptes de démonstration manquants; renvoie les emails créés"""
+    emails = [user["email"] for user in SEED_USERS]
+    existing = {email for (email,) in db.query(User.email).filter(User.email.in_(emails)).all()}
+    missing = [user for user in SEED_USERS if user["email"] not in existing]
+    if not missing:
+        return []
+
+    # bcrypt releases the GIL: hash the missing passwords in parallel
+    with ThreadPoolExecutor(max_workers=len(missing)) as pool:
+        hashes = list(pool.map(get_password_hash, [user["password"] for user in missing]))
+
+    for user_data, password_hash in zip(missing, hashes):
+        db.add(User(
+            email=user_data["email"],
+            password_hash=password_hash,
+            role=user_data["role"],
+            nom=user_data["nom"],
+            prenom=user_data["prenom"],
+            active=True
+        ))
+    db.commit()
+    return [user["email"] for user in missing]
+
+
+def _apply_bootstrap(engine: Engine, report: StartupReport) -> None:
+    postgres = engine.dialect.name == "postgresql"
+    with engine.connect() as lock_conn:
+        if postgres:
+            lock_conn.execute(text("SELECT pg_advisory_lock(:id)"), {"id": BOOTSTRAP_LOCK_ID})
+        try:
+            # Another worker may have finished while we were waiting for the lock
+            if read_bootstrap_version(engine) == BOOTSTRAP_VERSION:
+                return
+
+            with report.phase("schema"):
+                Base.metadata.create_all(bind=engine)
+                if postgres:
+                    with engine.begin() as conn:
+                        for statement in UPGRADE_STATEMENTS:
+                            conn.exec_driver_sql(statement)
+
+            with report.phase("seed"):
+                db = SessionLocal()
+                try:
+                    for email in seed_users(db):
+                        print(f"User created: {email}")
+                except SQLAlchemyError as e:
+                    # Leave the marker untouched so the next boot retries
+                    print(f"Error seeding users: {e}")
+                    db.rollback()
+                    return
+                finally:
+                    db.close()
+
+            db = SessionLocal()
+            try:
+                db.merge(AppMetadata(key=BOOTSTRAP_KEY, value=BOOTSTRAP_VERSION))
+                db.commit()
+            finally:
+                db.close()
+        finally:
+            if postgres:
+                lock_conn.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": BOOTSTRAP_LOCK_ID})
+
+
+def bootstrap(engine: Engine) -> StartupReport:
+    """
+    Prépare la base au démarrage.
+
+    Démarrage à chaud: une seule requête (lecture du marqueur de version).
+    Démarrage à froid: create_all, DDL de mise à niveau, comptes initiaux,
+    puis écriture du marqueur.
+    """
+    report = StartupReport()
+    with report.phase("version_check"):
+        version = read_bootstrap_version(engine)
+    if version != BOOTSTRAP_VERSION:
+        report.cold = True
+        _apply_bootstrap(engine, report)
+    metrics.app_startup_phase.set(report.total_ms / 1000, phase="total")
+    return report
@@ -0,0 +1,446 @@
+"""
+Shared cache
+
+Cache facade with TTL, namespace-based invalidation and single-flight
+loading, on top of a pluggable backend:
+
+- ``memory``: per-process, size-bounded LRU (default, single worker)
+- ``resp``: networked key-value store speaking the Redis protocol (RESP),
+  shared by every worker; ``scripts/cache_server.py`` is a local stand-in
+
+Async code uses get_or_set() and the ``a``-prefixed methods (aget, aset,
+apop, adelete, ainvalidate), which run the blocking calls of a networked
+backend in a thread instead of on the event loop.
+
+Values are stored as JSON. A backend failure never fails the request: reads
+become misses and writes are skipped.
+"""
+import asyncio
+import json
+import logging
+import socket
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, Union
+from urllib.parse import urlparse
+
+from fastapi.encoders import jsonable_encoder
+
+from app.core import metrics
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class CacheError(Exception):
+    """Erreur de communication avec le backend de cache"""
+
+
+# ============================================================================
+# BACKENDS
+# ============================================================================
+
+class CacheBackend:
+    """Interface commune des backends (clés et valeurs: str)"""
+
+    # Appels réseau: exécutés hors de la boucle d'événements par Cache
+    blocking = False
+
+    def get(self, key: str) -> Optional[str]:
+        raise NotImplementedError
+
+    def set(self, key: str, value: str, ttl: Optional[int] = None) -> None:
+        raise NotImplementedError
+
+    def add(self, key: str, value: str, ttl: Optional[int] = None) -> bool:
+        """Écrit la clé seulement si elle est absente; True si écrite"""
+        raise NotImplementedError
+
+    def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    def pop(self, key: str) -> Optional[str]:
+        """Lit et supprime la clé en une opération atomique"""
+        raise NotImplementedError
+
+    def incr(self, key: str) -> int:
+        raise NotImplementedError
+
+    def clear(self) -> None:
+        raise NotImplementedError
+
+
+class MemoryCacheBackend(CacheBackend):
+    """LRU en mémoire avec expiration, propre au processus"""
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._data: "OrderedDict[str, Tuple[str, Optional[float]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get_live(self, key: str) -> Optional[str]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def _store(self, key: str, value: str, ttl: Optional[int]) -> None:
+        expires_at = time.monotonic() + ttl if ttl else None
+        self._data[key] = (value, expires_at)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            return self._get_live(key)
+
+    def set(self, key: str, value: str, ttl: Optional[int] = None) -> None:
+        with self._lock:
+            self._store(key, value, ttl)
+
+    def add(self, key: str, value: str, ttl: Optional[int] = None) -> bool:
+        with self._lock:
+            if self._get_live(key) is not None:
+                return False
+            self._store(key, value, ttl)
+            return True
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def pop(self, key: str) -> Optional[str]:
+        with self._lock:
+            value = self._get_live(key)
+            self._data.pop(key, None)
+            return value
+
+    def incr(self, key: str) -> int:
+        with self._lock:
+            value = int(self._get_live(key) or 0) + 1
+            self._store(key, str(value), None)
+            return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+class RESPCacheBackend(CacheBackend):
+    """
+    Client minimal du protocole Redis (RESP2).
+
+    Une connexion par thread, rétablie automatiquement une fois en cas
+    d'erreur réseau.
+    """
+
+    blocking = True
+
+    def __init__(self, url: str, timeout: float = 1.0):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.password = parsed.password
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self.timeout = timeout
+        self._local = threading.local()
+
+    # -- connexion ---------------------------------------------------------
+
+    def _connect(self):
+        sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._local.sock = sock
+        self._local.reader = sock.makefile("rb")
+        if self.password:
+            self._roundtrip("AUTH", self.password)
+        if self.db:
+            self._roundtrip("SELECT", str(self.db))
+
+    def _close(self):
+        sock = getattr(self._local, "sock", None)
+        if sock is not None:
+            try:
+                sock.close()
+            except OSError:
+                pass
+        self._local.sock = None
+
+    @staticmethod
+    def _encode(*args: str) -> bytes:
+        parts = [f"*{len(args)}\r\n".encode()]
+        for arg in args:
+            data = arg.encode() if isinstance(arg, str) else arg
+            parts.append(f"${len(data)}\r\n".encode() + data + b"\r\n")
+        return b"".join(parts)
+
+    def _read_reply(self):
+        line = self._local.reader.readline()
+        if not line:
+            raise ConnectionError("connexion fermée par le serveur de cache")
+        kind, payload = line[:1], line[1:-2]
+        if kind == b"+":
+            return payload.decode()
+        if kind == b"-":
+            raise CacheError(payload.decode())
+        if kind == b":":
+            return int(payload)
+        if kind == b"$":
+            length = int(payload)
+            if length < 0:
+                return None
+            data = self._local.reader.read(length + 2)
+            return data[:-2].decode()
+        if kind == b"*":
+            count = int(payload)
+            return None if count < 0 else [self._read_reply() for _ in range(count)]
+        raise CacheError(f"réponse RESP inattendue: {line!r}")
+
+    def _roundtrip(self, *args: str):
+        self._local.sock.sendall(self._encode(*args))
+        return self._read_reply()
+
+    def _command(self, *args: str):
+        try:
+            if getattr(self._local, "sock", None) is None:
+                self._connect()
+            return self._roundtrip(*args)
+        except OSError:
+            self._close()
+        # Connexion perdue (redémarrage du serveur, timeout...): un seul nouvel essai
+        try:
+            self._connect()
+            return self._roundtrip(*args)
+        except OSError as e:
+            self._close()
+            raise CacheError(f"serveur de cache injoignable: {e}") from e
+
+    # -- commandes ---------------------------------------------------------
+
+    def get(self, key: str) -> Optional[str]:
+        return self._command("GET", key)
+
+    def set(self, key: str, value: str, ttl: Optional[int] = None) -> None:
+        if ttl:
+            self._command("SET", key, value, "EX", str(int(ttl)))
+        else:
+            self._command("SET", key, value)
+
+    def add(self, key: str, value: str, ttl: Optional[int] = None) -> bool:
+        args = ["SET", key, value, "NX"]
+        if ttl:
+            args += ["EX", str(int(ttl))]
+        return self._command(*args) == "OK"
+
+    def delete(self, key: str) -> None:
+        self._command("DEL", key)
+
+    def pop(self, key: str) -> Optional[str]:
+        return self._command("GETDEL", key)
+
+    def incr(self, key: str) -> int:
+        return self._command("INCR", key)
+
+    def clear(self) -> None:
+        self._command("FLUSHDB")
+
+
+# ============================================================================
+# FAÇADE
+# ============================================================================
+
+_MISSING = object()
+
+
+class Cache:
+    """
+    Accès au cache par espace de noms.
+
+    Chaque espace de noms a un numéro de version stocké dans le backend;
+    invalidate() l'incrémente, ce qui rend obsolètes toutes ses clés d'un
+    coup (elles expirent ensuite par TTL ou éviction LRU). Invalider la
+    racine ("examens") invalide aussi ses sous-espaces ("examens:dept:3").
+    """
+
+    def __init__(self, backend: CacheBackend, prefix: str = "edt", default_ttl: int = 60):
+        self.backend = backend
+        self.prefix = prefix
+        self.default_ttl = default_ttl
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    def _version(self, namespace: str) -> str:
+        version = self.backend.get(f"{self.prefix}:ns:{namespace}") or "0"
+        root = namespace.split(":", 1)[0]
+        if root != namespace:
+            # "examens:dept:3" is also invalidated by invalidate("examens")
+            version = f"{self.backend.get(f'{self.prefix}:ns:{root}') or '0'}.{version}"
+        return version
+
+    def _key(self, namespace: str, key: str) -> str:
+        return f"{self.prefix}:{namespace}:v{self._version(namespace)}:{key}"
+
+    @staticmethod
+    def make_key(*parts: Any) -> str:
+        """Clé stable à partir de paramètres (None inclus)"""
+        return ":".join("" if part is None else str(part) for part in parts)
+
+    def get(self, namespace: str, key: str, default: Any = None) -> Any:
+        try:
+            raw = self.backend.get(self._key(namespace, key))
+        except CacheError as e:
+            logger.warning("cache indisponible (get %s): %s", namespace, e)
+            raw = None
+        metrics.cache_requests.inc(namespace=namespace, result="hit" if raw is not None else "miss")
+        return default if raw is None else json.loads(raw)
+
+    def set(self, namespace: str, key: str, value: Any, ttl: Optional[int] = None) -> Any:
+        """Enregistre value (convertie en JSON) et renvoie sa forme JSON"""
+        encoded = jsonable_encoder(value)
+        try:
+            self.backend.set(self._key(namespace, key), json.dumps(encoded), ttl or self.default_ttl)
+        except CacheError as e:
+            logger.warning("cache indisponible (set %s): %s", namespace, e)
+        return encoded
+
+    def delete(self, namespace: str, key: str) -> None:
+        try:
+            self.backend.delete(self._key(namespace, key))
+        except CacheError as e:
+            logger.warning("cache indisponible (delete %s): %s", namespace, e)
+
+    def pop(self, namespace: str, key: str, default: Any = None) -> Any:
+        """Lit et supprime la valeur atomiquement (usage unique: codes, jetons)"""
+        try:
+            raw = self.backend.pop(self._key(namespace, key))
+        except CacheError as e:
+            logger.warning("cache indisponible (pop %s): %s", namespace, e)
+            raw = None
+        return default if raw is None else json.loads(raw)
+
+    async def _call(self, fn: Callable, *args: Any) -> Any:
+        """Appel au backend, dans un thread s'il est bloquant (réseau)"""
+        if not self.backend.blocking:
+            return fn(*args)
+        return await asyncio.get_running_loop().run_in_executor(None, fn, *args)
+
+    def invalidate(self, *namespaces: str) -> None:
+        """Rend obsolètes toutes les clés des espaces de noms donnés"""
+        for namespace in namespaces:
+            try:
+                self.backend.incr(f"{self.prefix}:ns:{namespace}")
+            except CacheError as e:
+                logger.warning("cache indisponible (invalidate %s): %s", namespace, e)
+            metrics.cache_invalidations.inc(namespace=namespace)
+
+    # Variantes pour le code asynchrone: avec un backend réseau, chaque appel
+    # fait plusieurs allers-retours (versions des espaces de noms, clé)
+
+    async def aget(self, namespace: str, key: str, default: Any = None) -> Any:
+        return await self._call(self.get, namespace, key, default)
+
+    async def aset(self, namespace: str, key: str, value: Any, ttl: Optional[int] = None) -> Any:
+        return await self._call(self.set, namespace, key, value, ttl)
+
+    async def adelete(self, namespace: str, key: str) -> None:
+        await self._call(self.delete, namespace, key)
+
+    async def apop(self, namespace: str, key: str, default: Any = None) -> Any:
+        return await self._call(self.pop, namespace, key, default)
+
+    async def ainvalidate(self, *namespaces: str) -> None:
+        await self._call(self.invalidate, *namespaces)
+
+    async def get_or_set(
+        self,
+        namespace: str,
+        key: str,
+        loader: Callable[[], Union[Any, Awaitable[Any]]],
+        ttl: Optional[int] = None,
+    ) -> Any:
+        """
+        Renvoie la valeur en cache ou la calcule avec loader().
+
+        Single-flight: dans un processus, les appels concurrents pour la même
+        clé attendent le même calcul; entre processus, un verrou court dans
+        le backend évite que tous les workers recalculent en même temps.
+        """
+        value = await self._call(self.get, namespace, key, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        try:
+            full_key = await self._call(self._key, namespace, key)
+        except CacheError:
+            full_key = f"{namespace}:{key}"
+        inflight = self._inflight.get(full_key)
+        if inflight is not None:
+            metrics.cache_requests.inc(namespace=namespace, result="coalesced")
+            return await asyncio.shield(inflight)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[full_key] = future
+        try:
+            value = await self._load(namespace, key, full_key, loader, ttl)
+            future.set_result(value)
+            return value
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # marque l'exception comme récupérée
+            raise
+        finally:
+            del self._inflight[full_key]
+
+    async def _load(self, namespace, key, full_key, loader, ttl) -> Any:
+        lock_key = f"{full_key}:lock"
+        lock_ttl = settings.CACHE_LOCK_TIMEOUT
+        try:
+            acquired = await self._call(self.backend.add, lock_key, "1", lock_ttl)
+        except CacheError:
+            acquired = True
+
+        if not acquired:
+            # Un autre worker calcule la valeur: l'attendre un court instant
+            deadline = time.monotonic() + lock_ttl
+            while time.monotonic() < deadline:
+                await asyncio.sleep(0.05)
+                try:
+                    raw = await self._call(self.backend.get, full_key)
+                except CacheError:
+                    break
+                if raw is not None:
+                    metrics.cache_requests.inc(namespace=namespace, result="coalesced")
+                    return json.loads(raw)
+
+        try:
+            value = loader()
+            if asyncio.iscoroutine(value):
+                value = await value
+            return await self._call(self.set, namespace, key, value, ttl)
+        finally:
+            if acquired:
+                try:
+                    await self._call(self.backend.delete, lock_key)
+                except CacheError:
+                    pass
+
+
+def create_backend(name: str, url: str = "") -> CacheBackend:
+    if name == "memory":
+        return MemoryCacheBackend(max_entries=settings.CACHE_MAX_ENTRIES)
+    if name == "resp":
+        return RESPCacheBackend(url, timeout=settings.CACHE_TIMEOUT_SECONDS)
+    raise ValueError(f"Backend de cache inconnu: {name}")
+
+
+cache = Cache(
+    create_backend(settings.CACHE_BACKEND, settings.CACHE_URL),
+    prefix=settings.CACHE_KEY_PREFIX,
+    default_ttl=settings.CACHE_DEFAULT_TTL,
+)
@@ -0,0 +1,160 @@
+"""
+Change log for client delta sync (/api/sync)
+
+Constraint triggers deferred to commit time append one sync_changes row per
+modified exam, room or generation session. Numbers are taken from the
+edt_change_seq sequence under a transaction-level advisory lock, so they are
+handed out in commit order: once a client has seen change N, every change
+below N is already visible and a cursor can never skip a late commit (a long
+generation transaction, for instance).
+
+Exam updates and deletions also record the row's previous module, professor
+and status, so /api/sync only sends a deletion to users who could see the
+exam before the change; the exams of an unpublished session are recorded as
+drafts. Publishing a session only logs the session row, and /api/sync then
+sends all of its exams.
+"""
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.models import AppMetadata, SyncChange
+
+ENTITIES = ("examen", "salle", "session")
+# app_metadata key: changes below this number have been pruned
+PRUNED_KEY = "sync_pruned_before"
+
+CHANGE_LOG_DDL: List[str] = [
+    """
+-- Fonction: Ajouter une entrée au journal (déclenchée au commit)
+CREATE OR REPLACE FUNCTION record_sync_change()
+RETURNS TRIGGER AS $$
+BEGIN
+    -- Verrou tenu jusqu'au commit: numéros attribués dans l'ordre des commits
+    PERFORM pg_advisory_xact_lock(724202);
+    IF TG_ARGV[0] = 'examen' AND TG_OP <> 'INSERT' THEN
+        -- Périmètre avant modification: seuls ceux qui voyaient l'examen reçoivent sa suppression
+        INSERT INTO sync_changes (change_seq, entity, entity_id, op, changed_at,
+                                  old_module_id, old_prof_id, old_statut)
+        VALUES (
+            nextval('edt_change_seq'), TG_ARGV[0], OLD.id, TG_OP, clock_timestamp(),
+            OLD.module_id, OLD.prof_id,
+            -- Examen d'une session non publiée: invisible comme un brouillon
+            CASE WHEN EXISTS (
+                SELECT 1 FROM sessions_generation sg WHERE sg.id = OLD.session_id AND sg.brouillon
+            ) THEN 'draft' ELSE OLD.statut::TEXT END
+        );
+    ELSE
+        INSERT INTO sync_changes (change_seq, entity, entity_id, op, changed_at)
+        VALUES (
+            nextval('edt_change_seq'),
+            TG_ARGV[0],
+            CASE WHEN TG_OP = 'DELETE' THEN OLD.id ELSE NEW.id END,
+            TG_OP,
+            clock_timestamp()
+        );
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql
+""",
+    "DROP TRIGGER IF EXISTS trg_sync_examens ON examens",
+    """
+CREATE CONSTRAINT TRIGGER trg_sync_examens
+    AFTER INSERT OR UPDATE OR DELETE ON examens
+    DEFERRABLE INITIALLY DEFERRED
+    FOR EACH ROW EXECUTE FUNCTION record_sync_change('examen')
+""",
+    "DROP TRIGGER IF EXISTS trg_sync_lieux_examen ON lieux_examen",
+    """
+CREATE CONSTRAINT TRIGGER trg_sync_lieux_examen
+    AFTER INSERT OR UPDATE OR DELETE ON lieux_examen
+    DEFERRABLE INITIALLY DEFERRED
+    FOR EACH ROW EXECUTE FUNCTION record_sync_change('salle')
+""",
+    "DROP TRIGGER IF EXISTS trg_sync_sessions_generation ON sessions_generation",
+    """
+CREATE CONSTRAINT TRIGGER trg_sync_sessions_generation
+    AFTER INSERT OR UPDATE OR DELETE ON sessions_generation
+    DEFERRABLE INITIALLY DEFERRED
+    FOR EACH ROW EXECUTE FUNCTION record_sync_change('session')
+""",
+]
+
+
+class PreviousExam(NamedTuple):
+    """État d'un examen au curseur du client (avant son premier changement)"""
+    module_id: int
+    prof_id: Optional[int]
+    statut: Optional[str]
+
+
+@dataclass
+class ChangeBatch:
+    """Dernière opération par entité pour une page du journal"""
+    cursor: int
+    has_more: bool
+    changed: Dict[str, List[int]] = field(default_factory=lambda: {e: [] for e in ENTITIES})
+    deleted: List[Tuple[str, int, int, datetime]] = field(default_factory=list)
+    # Examens qui existaient au curseur, avec leur état d'alors
+    previous: Dict[int, PreviousExam] = field(default_factory=dict)
+
+
+def current_cursor(db: Session) -> int:
+    return db.query(func.max(SyncChange.change_seq)).scalar() or 0
+
+
+def cursor_at(db: Session, since: datetime) -> int:
+    """Curseur correspondant à un horodatage (dernier changement antérieur)"""
+    return db.query(func.max(SyncChange.change_seq)).filter(
+        SyncChange.changed_at < since
+    ).scalar() or 0
+
+
+def pruned_before(db: Session) -> int:
+    value = db.query(AppMetadata.value).filter(AppMetadata.key == PRUNED_KEY).scalar()
+    return int(value) if value else 0
+
+
+def read_changes(db: Session, cursor: int, limit: int) -> ChangeBatch:
+    """
+    Changements postérieurs au curseur, par ordre de numéro (parcours de la
+    clé primaire). Une entité modifiée plusieurs fois n'apparaît qu'une fois.
+    """
+    rows = db.query(SyncChange).filter(
+        SyncChange.change_seq > cursor
+    ).order_by(SyncChange.change_seq).limit(limit + 1).all()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    batch = ChangeBatch(cursor=rows[-1].change_seq if rows else cursor, has_more=has_more)
+
+    latest: Dict[Tuple[str, int], SyncChange] = {}
+    for row in rows:
+        if row.entity == "examen" and (row.entity, row.entity_id) not in latest \
+                and row.op != "INSERT" and row.old_module_id is not None:
+            batch.previous[row.entity_id] = PreviousExam(row.old_module_id, row.old_prof_id, row.old_statut)
+        latest[(row.entity, row.entity_id)] = row
+    for (entity, entity_id), row in latest.items():
+        if row.op == "DELETE":
+            batch.deleted.append((entity, entity_id, row.change_seq, row.changed_at))
+        elif entity in batch.changed:
+            batch.changed[entity].append(entity_id)
+    return batch
+
+
+def prune_changes(db: Session, older_than: datetime) -> Optional[int]:
+    """
+    Supprime les entrées antérieures à une date et mémorise la limite: les
+    clients dont le curseur est plus ancien devront tout recharger.
+    """
+    boundary = cursor_at(db, older_than)
+    if not boundary:
+        return None
+    db.query(SyncChange).filter(SyncChange.change_seq <= boundary).delete(synchronize_session=False)
+    db.merge(AppMetadata(key=PRUNED_KEY, value=str(boundary)))
+    db.commit()
+    return boundary
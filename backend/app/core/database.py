@@ -1,26 +1,82 @@
 """
 Database connection and session management
 """
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
+from app.core import metrics
 from app.core.config import settings
 import os
+import time
 
-# Get database URL from environment or config
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool publiant l'attente d'obtention d'une connexion (/metrics)"""
+
+    def _do_get(self):
+        name = self.logging_name or "primary"
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            metrics.db_pool_checkout_timeouts.inc(engine=name)
+            raise
+        finally:
+            metrics.db_pool_wait.observe(time.perf_counter() - start, engine=name)
+
+
+def _create_engine(url: str, name: str) -> Engine:
+    """Engine avec pool dimensionné par la configuration et instrumenté"""
+    new_engine = create_engine(
+        url,
+        pool_size=settings.DATABASE_POOL_SIZE,
+        max_overflow=settings.DATABASE_MAX_OVERFLOW,
+        pool_timeout=settings.DATABASE_POOL_TIMEOUT,
+        pool_recycle=settings.DATABASE_POOL_RECYCLE,
+        pool_pre_ping=True,
+        poolclass=InstrumentedQueuePool,
+        pool_logging_name=name,
+        echo=False
+    )
+
+    @event.listens_for(new_engine, "checkout")
+    def _count_checkout(dbapi_connection, connection_record, connection_proxy):
+        metrics.db_pool_checkouts.inc(engine=name)
+
+    return new_engine
+
+
+# Get database URLs from environment or config
 database_url = os.environ.get("DATABASE_URL", settings.DATABASE_URL)
+read_database_url = os.environ.get("DATABASE_READ_URL", settings.DATABASE_READ_URL)
+
+# Primary engine: every write goes here
+engine = _create_engine(database_url, "primary")
+
+# Read-only replica for read-heavy routes; falls back to the primary when
+# DATABASE_READ_URL is not set
+replica_enabled = bool(read_database_url)
+read_engine = _create_engine(read_database_url, "replica") if replica_enabled else engine
+
+_engines = {"primary": engine}
+if replica_enabled:
+    _engines["replica"] = read_engine
+
+
+def _pool_gauge(reader):
+    return lambda: [({"engine": name}, reader(pooled.pool)) for name, pooled in _engines.items()]
+
 
-# Create database engine - simplified for Railway compatibility
-engine = create_engine(
-    database_url,
-    pool_size=5,
-    max_overflow=10,
-    pool_pre_ping=True,
-    echo=False
-)
+metrics.db_pool_size.set_function(_pool_gauge(lambda pool: pool.size()))
+metrics.db_pool_checked_out.set_function(_pool_gauge(lambda pool: pool.checkedout()))
+metrics.db_pool_overflow.set_function(_pool_gauge(lambda pool: max(pool.overflow(), 0)))
 
-# Session factory
+# Session factories
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
 
 # Base class for models
 Base = declarative_base()
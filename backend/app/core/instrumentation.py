@@ -0,0 +1,208 @@
+"""
+Request-level SQL instrumentation
+
+Counts the SQL statements issued while serving each HTTP request, exposes
+the figures as response headers (Server-Timing, X-DB-*), flags requests
+that exceed the query budget or repeat the same statement (N+1 pattern)
+and aggregates the data per route.
+"""
+import logging
+import threading
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class RequestSQLStats:
+    """Statistiques SQL d'une requête HTTP"""
+    queries: int = 0
+    db_time_ms: float = 0.0
+    slowest_ms: float = 0.0
+    slowest_statement: Optional[str] = None
+    statements: Dict[str, int] = field(default_factory=dict)
+
+    def record(self, statement: str, elapsed_ms: float) -> None:
+        self.queries += 1
+        self.db_time_ms += elapsed_ms
+        self.statements[statement] = self.statements.get(statement, 0) + 1
+        if elapsed_ms > self.slowest_ms:
+            self.slowest_ms = elapsed_ms
+            self.slowest_statement = statement
+
+    def repeated_statement(self) -> Optional[tuple]:
+        """Requête la plus répétée si elle dépasse le seuil N+1"""
+        if not self.statements:
+            return None
+        statement, count = max(self.statements.items(), key=lambda item: item[1])
+        if count >= settings.SQL_N_PLUS_ONE_THRESHOLD:
+            return statement, count
+        return None
+
+
+@dataclass
+class RouteSQLStats:
+    """Agrégat par route"""
+    requests: int = 0
+    queries: int = 0
+    max_queries: int = 0
+    db_time_ms: float = 0.0
+    max_db_time_ms: float = 0.0
+    duration_ms: float = 0.0
+    over_budget: int = 0
+    n_plus_one: int = 0
+    slowest_ms: float = 0.0
+    slowest_statement: Optional[str] = None
+
+    def to_dict(self) -> Dict:
+        requests = self.requests or 1
+        return {
+            "requests": self.requests,
+            "avg_queries": round(self.queries / requests, 2),
+            "max_queries": self.max_queries,
+            "avg_db_time_ms": round(self.db_time_ms / requests, 2),
+            "max_db_time_ms": round(self.max_db_time_ms, 2),
+            "avg_duration_ms": round(self.duration_ms / requests, 2),
+            "over_budget": self.over_budget,
+            "n_plus_one": self.n_plus_one,
+            "slowest_ms": round(self.slowest_ms, 2),
+            "slowest_statement": self.slowest_statement,
+        }
+
+
+_current_stats: ContextVar[Optional[RequestSQLStats]] = ContextVar("request_sql_stats", default=None)
+_route_stats: Dict[str, RouteSQLStats] = {}
+_route_lock = threading.Lock()
+_endpoint_paths: Dict[object, str] = {}
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current_stats.get() is not None:
+        conn.info.setdefault("request_query_start", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current_stats.get()
+    starts = conn.info.get("request_query_start")
+    if stats is None or not starts:
+        return
+    stats.record(statement, (time.perf_counter() - starts.pop()) * 1000)
+
+
+def current_request_stats() -> Optional[RequestSQLStats]:
+    """Statistiques SQL de la requête HTTP en cours (None hors requête)"""
+    return _current_stats.get()
+
+
+def get_route_stats() -> Dict[str, Dict]:
+    """Agrégats par route, triés par nombre moyen de requêtes SQL décroissant"""
+    with _route_lock:
+        snapshot = {route: stats.to_dict() for route, stats in _route_stats.items()}
+    return dict(sorted(snapshot.items(), key=lambda item: item[1]["avg_queries"], reverse=True))
+
+
+def reset_route_stats() -> None:
+    with _route_lock:
+        _route_stats.clear()
+
+
+def route_path(scope: Scope) -> str:
+    """Chemin déclaré de la route (ex: /api/examens/{examen_id})"""
+    endpoint = scope.get("endpoint")
+    if endpoint is None:
+        return "<unmatched>"
+    path = _endpoint_paths.get(endpoint)
+    if path is None:
+        path = next(
+            (route.path for route in getattr(scope.get("app"), "routes", [])
+             if getattr(route, "endpoint", None) is endpoint),
+            scope.get("path", "")
+        )
+        _endpoint_paths[endpoint] = path
+    return path
+
+
+def _route_template(scope: Scope) -> str:
+    return f"{scope['method']} {route_path(scope)}"
+
+
+class SQLInstrumentationMiddleware:
+    """
+    Middleware ASGI: instrumentation SQL par requête.
+
+    Ajoute à chaque réponse les en-têtes Server-Timing, X-DB-Query-Count et
+    X-DB-Time-Ms, ainsi que X-DB-Query-Budget-Exceeded / X-DB-N-Plus-One
+    lorsqu'une requête dépasse le budget ou répète la même instruction.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestSQLStats()
+        token = _current_stats.set(stats)
+        start = time.perf_counter()
+
+        async def send_with_headers(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                duration_ms = (time.perf_counter() - start) * 1000
+                headers = MutableHeaders(scope=message)
+                headers.append(
+                    "Server-Timing",
+                    f'db;dur={stats.db_time_ms:.1f};desc="{stats.queries} queries", '
+                    f'app;dur={duration_ms:.1f}'
+                )
+                headers["X-DB-Query-Count"] = str(stats.queries)
+                headers["X-DB-Time-Ms"] = f"{stats.db_time_ms:.1f}"
+                if stats.queries > settings.SQL_QUERY_BUDGET:
+                    headers["X-DB-Query-Budget-Exceeded"] = str(settings.SQL_QUERY_BUDGET)
+                repeated = stats.repeated_statement()
+                if repeated:
+                    headers["X-DB-N-Plus-One"] = str(repeated[1])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_headers)
+        finally:
+            _current_stats.reset(token)
+            self._record(scope, stats, (time.perf_counter() - start) * 1000)
+
+    def _record(self, scope: Scope, stats: RequestSQLStats, duration_ms: float) -> None:
+        route = _route_template(scope)
+        over_budget = stats.queries > settings.SQL_QUERY_BUDGET
+        repeated = stats.repeated_statement()
+
+        if over_budget:
+            logger.warning("%s: %d requêtes SQL (budget %d)", route, stats.queries, settings.SQL_QUERY_BUDGET)
+        if repeated:
+            logger.warning("%s: N+1 probable, %d exécutions de: %s", route, repeated[1], repeated[0][:200])
+
+        with _route_lock:
+            agg = _route_stats.setdefault(route, RouteSQLStats())
+            agg.requests += 1
+            agg.queries += stats.queries
+            agg.max_queries = max(agg.max_queries, stats.queries)
+            agg.db_time_ms += stats.db_time_ms
+            agg.max_db_time_ms = max(agg.max_db_time_ms, stats.db_time_ms)
+            agg.duration_ms += duration_ms
+            agg.over_budget += int(over_budget)
+            agg.n_plus_one += int(repeated is not None)
+            if stats.slowest_ms > agg.slowest_ms:
+                agg.slowest_ms = stats.slowest_ms
+                agg.slowest_statement = (stats.slowest_statement or "")[:500]
@@ -0,0 +1,255 @@
+"""
+Prometheus-style metrics
+
+Minimal in-process registry (counters, gauges, histograms) rendered in the
+Prometheus text exposition format by the /metrics endpoint. Each worker
+exposes its own figures.
+"""
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{str(value).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+             for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    type_name = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {} if self.labelnames else {(): 0.0}
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items]
+
+
+class Gauge(_Metric):
+    """Jauge; peut être calculée à la collecte via set_function()"""
+    type_name = "gauge"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {} if self.labelnames else {(): 0.0}
+        self._function: Optional[Callable[[], Iterable[Tuple[Dict[str, str], float]]]] = None
+
+    def set(self, value: float, **labels) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def set_function(self, function: Callable[[], Iterable[Tuple[Dict[str, str], float]]]) -> None:
+        """function() renvoie des couples (labels, valeur) lus au moment du scrape"""
+        self._function = function
+
+    def samples(self) -> List[str]:
+        if self._function is not None:
+            items = [(self._key(labels), value) for labels, value in self._function()]
+        else:
+            with self._lock:
+                items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items]
+
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        # key -> ([compteurs par bucket], somme, nombre)
+        self._values: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for idx, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[0][idx] += 1
+                    break
+            entry[1] += value
+            entry[2] += 1
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = [(key, list(entry[0]), entry[1], entry[2]) for key, entry in self._values.items()]
+        lines = []
+        for key, counts, total, count in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        return "\n".join(metric.render() for metric in self._metrics) + "\n"
+
+
+REGISTRY = Registry()
+
+# ============================================================================
+# MÉTRIQUES DE L'APPLICATION
+# ============================================================================
+
+# Démarrage
+app_startup_phase = REGISTRY.register(Gauge(
+    "app_startup_phase_seconds", "Durée des phases du dernier démarrage", ("phase",)))
+
+# HTTP
+http_request_duration = REGISTRY.register(Histogram(
+    "http_request_duration_seconds", "Latence des requêtes HTTP par route",
+    ("method", "route", "status")))
+http_requests_in_flight = REGISTRY.register(Gauge(
+    "http_requests_in_flight", "Requêtes HTTP en cours de traitement", ("method",)))
+
+# Pool de connexions SQLAlchemy
+db_pool_size = REGISTRY.register(Gauge(
+    "db_pool_size", "Taille configurée du pool de connexions", ("engine",)))
+db_pool_checked_out = REGISTRY.register(Gauge(
+    "db_pool_checked_out", "Connexions actuellement empruntées au pool", ("engine",)))
+db_pool_overflow = REGISTRY.register(Gauge(
+    "db_pool_overflow", "Connexions ouvertes au-delà de pool_size", ("engine",)))
+db_pool_checkouts = REGISTRY.register(Counter(
+    "db_pool_checkouts_total", "Emprunts de connexions au pool", ("engine",)))
+db_pool_checkout_timeouts = REGISTRY.register(Counter(
+    "db_pool_checkout_timeouts_total", "Emprunts abandonnés après pool_timeout", ("engine",)))
+db_read_sessions = REGISTRY.register(Counter(
+    "db_read_sessions_total", "Sessions de lecture par engine (réplique ou primaire)", ("engine",)))
+db_pool_wait = REGISTRY.register(Histogram(
+    "db_pool_wait_seconds", "Attente pour obtenir une connexion du pool", ("engine",),
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)))
+
+# Cache
+cache_requests = REGISTRY.register(Counter(
+    "cache_requests_total", "Lectures du cache (hit, miss, coalesced)", ("namespace", "result")))
+cache_invalidations = REGISTRY.register(Counter(
+    "cache_invalidations_total", "Invalidations d'espaces de noms du cache", ("namespace",)))
+
+# Génération d'EDT
+edt_generations = REGISTRY.register(Counter(
+    "edt_generations_total", "Générations d'EDT terminées", ("strategy", "statut")))
+edt_generations_in_progress = REGISTRY.register(Gauge(
+    "edt_generations_in_progress", "Générations d'EDT en cours"))
+edt_generation_duration = REGISTRY.register(Histogram(
+    "edt_generation_duration_seconds", "Durée des générations d'EDT", ("strategy",),
+    buckets=(0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 45.0, 60.0, 120.0, 300.0)))
+
+# WebSocket (/api/ws/changes)
+ws_connections = REGISTRY.register(Gauge(
+    "ws_connections", "Connexions WebSocket ouvertes", ("role",)))
+ws_events_sent = REGISTRY.register(Counter(
+    "ws_events_sent_total", "Messages de changements poussés aux clients WebSocket"))
+ws_overflows = REGISTRY.register(Counter(
+    "ws_overflows_total", "Files de clients trop lents vidées (resynchronisation demandée)"))
+
+# Pool bcrypt
+bcrypt_queue_depth = REGISTRY.register(Gauge(
+    "bcrypt_pool_queue_depth", "Opérations bcrypt en attente d'un thread"))
+bcrypt_active = REGISTRY.register(Gauge(
+    "bcrypt_pool_active", "Opérations bcrypt en cours"))
+bcrypt_duration = REGISTRY.register(Histogram(
+    "bcrypt_duration_seconds", "Durée des opérations bcrypt (hors attente)", ("operation",),
+    buckets=(0.05, 0.1, 0.2, 0.3, 0.5, 1.0, 2.0)))
+
+
+def render_metrics() -> str:
+    return REGISTRY.render()
+
+
+class MetricsMiddleware:
+    """Middleware ASGI: latence par route et requêtes en cours"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        from app.core.instrumentation import route_path
+
+        method = scope["method"]
+        status_code = {"value": 500}
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                status_code["value"] = message["status"]
+            await send(message)
+
+        http_requests_in_flight.inc(method=method)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            http_requests_in_flight.dec(method=method)
+            http_request_duration.observe(
+                time.perf_counter() - start,
+                method=method, route=route_path(scope), status=status_code["value"]
+            )
@@ -0,0 +1,293 @@
+"""
+Database change notifications (PostgreSQL LISTEN/NOTIFY)
+
+Triggers on examens and sessions_generation publish the keys affected by
+each change (exam, room, professor, module, formation, department) on the
+``edt_changes`` channel. Every worker runs a ChangeListener thread that
+turns those keys into cache invalidations, so schedules can be cached with
+long TTLs without going stale.
+"""
+import json
+import logging
+import select
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.core.cache import cache
+from app.core.config import settings
+from app.core.database import replica_enabled
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "edt_changes"
+
+NOTIFY_DDL: List[str] = [
+    """
+-- Fonction: Publier les clés affectées par un changement d'examen sur edt_changes
+CREATE OR REPLACE FUNCTION notify_examen_change()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_examen_id INTEGER;
+    v_module_ids INTEGER[] := ARRAY[]::INTEGER[];
+    v_salle_ids INTEGER[] := ARRAY[]::INTEGER[];
+    v_prof_ids INTEGER[] := ARRAY[]::INTEGER[];
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        v_examen_id := OLD.id;
+        v_module_ids := v_module_ids || OLD.module_id;
+        v_salle_ids := v_salle_ids || OLD.salle_id;
+        v_prof_ids := v_prof_ids || OLD.prof_id;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        v_examen_id := NEW.id;
+        v_module_ids := v_module_ids || NEW.module_id;
+        v_salle_ids := v_salle_ids || NEW.salle_id;
+        v_prof_ids := v_prof_ids || NEW.prof_id;
+    END IF;
+
+    PERFORM pg_notify('edt_changes', json_build_object(
+        'table', 'examens',
+        'op', TG_OP,
+        'examen_ids', ARRAY[v_examen_id],
+        'module_ids', (SELECT array_agg(DISTINCT x) FROM unnest(v_module_ids) x WHERE x IS NOT NULL),
+        'salle_ids', (SELECT array_agg(DISTINCT x) FROM unnest(v_salle_ids) x WHERE x IS NOT NULL),
+        'prof_ids', (SELECT array_agg(DISTINCT x) FROM unnest(v_prof_ids) x WHERE x IS NOT NULL),
+        'formation_ids', (SELECT array_agg(DISTINCT m.formation_id) FROM modules m
+                          WHERE m.id = ANY(v_module_ids)),
+        'dept_ids', (SELECT array_agg(DISTINCT f.dept_id) FROM modules m
+                     JOIN formations f ON f.id = m.formation_id
+                     WHERE m.id = ANY(v_module_ids))
+    )::text);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql
+""",
+    "DROP TRIGGER IF EXISTS trg_notify_examen_change ON examens",
+    """
+CREATE TRIGGER trg_notify_examen_change
+    AFTER INSERT OR UPDATE OR DELETE ON examens
+    FOR EACH ROW EXECUTE FUNCTION notify_examen_change()
+""",
+    """
+-- Fonction: Publier la fin ou la publication d'une session de génération
+CREATE OR REPLACE FUNCTION notify_session_change()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM pg_notify('edt_changes', json_build_object(
+        'table', 'sessions_generation',
+        'op', TG_OP,
+        'session_id', NEW.id,
+        'statut', CASE WHEN OLD.brouillon AND NOT NEW.brouillon THEN 'published' ELSE NEW.statut::TEXT END
+    )::text);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql
+""",
+    "DROP TRIGGER IF EXISTS trg_notify_session_change ON sessions_generation",
+    """
+CREATE TRIGGER trg_notify_session_change
+    AFTER UPDATE OF statut, brouillon ON sessions_generation
+    FOR EACH ROW
+    WHEN ((OLD.statut IS DISTINCT FROM NEW.statut AND NEW.statut IN ('completed', 'failed'))
+          OR (OLD.brouillon AND NOT NEW.brouillon))
+    EXECUTE FUNCTION notify_session_change()
+""",
+]
+
+
+# ============================================================================
+# CLÉS AFFECTÉES -> ESPACES DE NOMS DU CACHE
+# ============================================================================
+
+def examens_namespace(role: str, ref_id: Optional[int], dept_id: Optional[int] = None,
+                      formation_id: Optional[int] = None) -> str:
+    """
+    Espace de noms d'une liste d'examens, le plus étroit possible pour que
+    seules les modifications qui la concernent l'invalident.
+    """
+    if role == "professor" and ref_id:
+        return f"examens:prof:{ref_id}"
+    if role == "department_head" and ref_id:
+        return f"examens:dept:{ref_id}"
+    if role != "student":
+        if formation_id:
+            return f"examens:formation:{formation_id}"
+        if dept_id:
+            return f"examens:dept:{dept_id}"
+    # Les plannings étudiants dépendent des inscriptions: invalidés à chaque changement
+    return "examens:all"
+
+
+def namespaces_for_change(change: Dict) -> Set[str]:
+    """Espaces de noms à invalider pour une notification edt_changes"""
+    if change.get("table") == "sessions_generation":
+        if change.get("statut") == "published":
+            # Tous les examens de la session deviennent visibles
+            return {"dashboard", "sessions", "examens"}
+        return {"dashboard", "sessions"}
+    namespaces = {"dashboard", "examens:all"}
+    namespaces.update(f"examens:dept:{dept_id}" for dept_id in change.get("dept_ids") or [])
+    namespaces.update(f"examens:formation:{fid}" for fid in change.get("formation_ids") or [])
+    namespaces.update(f"examens:prof:{prof_id}" for prof_id in change.get("prof_ids") or [])
+    return namespaces
+
+
+def examen_change_keys(db: Session, examens: Iterable) -> Dict[str, List[int]]:
+    """
+    Clés affectées par des examens (même format que les notifications),
+    pour invalider immédiatement côté écrivain.
+    """
+    from app.models import Formation, Module
+
+    examens = list(examens)
+    module_ids = sorted({e.module_id for e in examens if e.module_id})
+    rows = db.query(Module.formation_id, Formation.dept_id).join(
+        Formation, Formation.id == Module.formation_id
+    ).filter(Module.id.in_(module_ids)).distinct().all() if module_ids else []
+    return {
+        "table": "examens",
+        "examen_ids": sorted({e.id for e in examens if e.id}),
+        "module_ids": module_ids,
+        "salle_ids": sorted({e.salle_id for e in examens if e.salle_id}),
+        "prof_ids": sorted({e.prof_id for e in examens if e.prof_id}),
+        "formation_ids": sorted({formation_id for formation_id, _ in rows}),
+        "dept_ids": sorted({dept_id for _, dept_id in rows}),
+    }
+
+
+def merge_changes(*changes: Dict) -> Dict:
+    merged: Dict = {"table": "examens"}
+    for change in changes:
+        for key, values in change.items():
+            if isinstance(values, list):
+                merged[key] = sorted(set(merged.get(key, [])) | set(values))
+    return merged
+
+
+def _changed_namespaces(changes: Iterable[Dict]) -> List[str]:
+    namespaces: Set[str] = set()
+    for change in changes:
+        namespaces |= namespaces_for_change(change)
+    return sorted(namespaces)
+
+
+def invalidate_for_changes(changes: Iterable[Dict]) -> None:
+    namespaces = _changed_namespaces(changes)
+    if namespaces:
+        cache.invalidate(*namespaces)
+
+
+async def ainvalidate_for_changes(changes: Iterable[Dict]) -> None:
+    """invalidate_for_changes() depuis le code asynchrone (backend réseau)"""
+    namespaces = _changed_namespaces(changes)
+    if namespaces:
+        await cache.ainvalidate(*namespaces)
+
+
+# ============================================================================
+# LISTENER
+# ============================================================================
+
+class ChangeListener(threading.Thread):
+    """
+    Thread d'écoute du canal edt_changes sur une connexion dédiée.
+
+    Les notifications reçues ensemble sont traitées par lot (une seule
+    invalidation par espace de noms). La connexion est rétablie en cas de
+    perte.
+    """
+
+    def __init__(self, engine: Engine):
+        super().__init__(name="edt-change-listener", daemon=True)
+        self.dsn = engine.url.set(drivername="postgresql").render_as_string(hide_password=False)
+        self.handlers: List[Callable[[List[Dict]], None]] = [invalidate_for_changes]
+        self._stop_event = threading.Event()
+
+    def add_handler(self, handler: Callable[[List[Dict]], None]) -> None:
+        self.handlers.append(handler)
+
+    def stop(self) -> None:
+        self._stop_event.set()
+
+    def run(self) -> None:
+        import psycopg2
+        import psycopg2.extensions
+
+        backoff = 1.0
+        while not self._stop_event.is_set():
+            try:
+                conn = psycopg2.connect(self.dsn)
+                conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+                with conn.cursor() as cursor:
+                    cursor.execute(f"LISTEN {CHANNEL}")
+                logger.info("Écoute des notifications %s", CHANNEL)
+                # Des changements ont pu être manqués pendant la déconnexion
+                if backoff > 1.0:
+                    cache.invalidate("examens", "dashboard", "sessions")
+                backoff = 1.0
+                self._listen(conn)
+            except Exception as e:
+                logger.warning("Listener %s interrompu: %s", CHANNEL, e)
+                self._stop_event.wait(backoff)
+                backoff = min(backoff * 2, 30.0)
+
+    def _listen(self, conn) -> None:
+        try:
+            while not self._stop_event.is_set():
+                if select.select([conn], [], [], 1.0) == ([], [], []):
+                    continue
+                conn.poll()
+                changes = []
+                while conn.notifies:
+                    notify = conn.notifies.pop(0)
+                    try:
+                        changes.append(json.loads(notify.payload))
+                    except ValueError:
+                        logger.warning("Notification illisible: %s", notify.payload[:200])
+                if changes:
+                    self._dispatch(changes)
+        finally:
+            conn.close()
+
+    def _dispatch(self, changes: List[Dict]) -> None:
+        for handler in self.handlers:
+            try:
+                handler(changes)
+            except Exception:
+                logger.exception("Erreur du gestionnaire de notifications")
+
+
+change_listener: Optional[ChangeListener] = None
+
+
+def start_change_listener(engine: Engine) -> Optional[ChangeListener]:
+    """Démarre le listener (PostgreSQL uniquement, si activé)"""
+    global change_listener
+    if not settings.CACHE_NOTIFY_ENABLED or engine.dialect.name != "postgresql":
+        return None
+    change_listener = ChangeListener(engine)
+    change_listener.start()
+    return change_listener
+
+
+def stop_change_listener() -> None:
+    global change_listener
+    if change_listener is not None:
+        change_listener.stop()
+        change_listener.join(timeout=5)
+        change_listener = None
+
+
+def schedule_cache_ttl() -> int:
+    """
+    TTL des plannings: long si l'invalidation par notifications est active
+    et que les lectures se font sur le primaire. Avec un réplica, le
+    rechargement qui suit une notification peut lire une donnée en retard
+    que rien n'invaliderait plus: le TTL reste court.
+    """
+    if change_listener is None or replica_enabled:
+        return settings.CACHE_DEFAULT_TTL
+    return settings.CACHE_SCHEDULE_TTL
@@ -0,0 +1,81 @@
+"""
+Read-replica routing with read-your-writes
+
+Read-heavy routes depend on get_read_db(), which opens a session on the
+replica. A user who has just sent a write request (any method other than
+GET/HEAD/OPTIONS) is served by the primary for READ_YOUR_WRITES_SECONDS so
+they see their own changes despite replication lag.
+"""
+from typing import Optional
+
+from fastapi import Request
+from jose import JWTError, jwt
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.core import metrics
+from app.core.cache import cache
+from app.core.config import settings
+from app.core.database import ReadSessionLocal, SessionLocal, replica_enabled
+
+SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+
+def _subject_from_authorization(authorization: Optional[str]) -> Optional[str]:
+    """Sujet (email) du jeton Bearer, sans vérification de signature"""
+    if not authorization or not authorization.lower().startswith("bearer "):
+        return None
+    try:
+        return jwt.get_unverified_claims(authorization[7:]).get("sub")
+    except JWTError:
+        return None
+
+
+async def record_write(subject: Optional[str]) -> None:
+    """Les écrivains récents sont partagés entre workers via le cache"""
+    if subject:
+        await cache.aset("writers", subject, 1, ttl=settings.READ_YOUR_WRITES_SECONDS)
+
+
+def wrote_recently(subject: Optional[str]) -> bool:
+    # Appelé depuis get_read_db, dépendance synchrone exécutée dans un thread
+    return bool(subject) and cache.get("writers", subject) is not None
+
+
+class ReadYourWritesMiddleware:
+    """Middleware ASGI: mémorise les utilisateurs ayant écrit récemment"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] in SAFE_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        authorization = next(
+            (value.decode("latin-1") for key, value in scope["headers"] if key == b"authorization"),
+            None
+        )
+        subject = _subject_from_authorization(authorization)
+        # Reads issued while the write is in flight also go to the primary
+        await record_write(subject)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            await record_write(subject)
+
+
+def get_read_db(request: Request):
+    """
+    Dependency that provides a read session.
+    Uses the replica unless none is configured or the caller wrote recently.
+    """
+    use_primary = not replica_enabled or wrote_recently(
+        _subject_from_authorization(request.headers.get("authorization"))
+    )
+    metrics.db_read_sessions.inc(engine="primary" if use_primary else "replica")
+    db = SessionLocal() if use_primary else ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
@@ -0,0 +1,161 @@
+"""
+WebSocket push of schedule changes
+
+The ChangeHub lives on the event loop of each worker. It is fed by the
+ChangeListener thread (PostgreSQL LISTEN on edt_changes), so a change made
+through any worker reaches every connected dashboard. Each subscriber only
+receives the changes of its scope (department, professor) and events queued
+while a message is being sent are merged into the next one.
+"""
+import asyncio
+import logging
+from typing import Dict, Iterable, List, Optional, Set
+
+from fastapi import WebSocket, WebSocketDisconnect
+
+from app.core import metrics
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def build_event(changes: Iterable[Dict]) -> Dict:
+    """Fusionne des notifications edt_changes en un seul message"""
+    examen_ids: Set[int] = set()
+    dept_ids: Set[int] = set()
+    sessions: Dict[int, Optional[str]] = {}
+    for change in changes:
+        if change.get("table") == "sessions_generation":
+            sessions[change["session_id"]] = change.get("statut")
+        else:
+            examen_ids.update(change.get("examen_ids") or [])
+            dept_ids.update(change.get("dept_ids") or [])
+    return {
+        "type": "changes",
+        "examen_ids": sorted(examen_ids),
+        "dept_ids": sorted(dept_ids),
+        "sessions": [{"id": sid, "statut": statut} for sid, statut in sorted(sessions.items())],
+    }
+
+
+class Subscriber:
+    """Une connexion WebSocket et son périmètre"""
+
+    def __init__(self, websocket: WebSocket, role: str, dept_id: Optional[int] = None,
+                 prof_id: Optional[int] = None):
+        self.websocket = websocket
+        self.role = role
+        self.dept_id = dept_id
+        self.prof_id = prof_id
+        self.queue: "asyncio.Queue[List[Dict]]" = asyncio.Queue(maxsize=settings.WS_QUEUE_SIZE)
+        self.overflowed = False
+
+    def wants(self, change: Dict) -> bool:
+        if change.get("table") == "sessions_generation":
+            return True
+        if self.prof_id is not None:
+            return self.prof_id in (change.get("prof_ids") or [])
+        if self.dept_id is not None:
+            return self.dept_id in (change.get("dept_ids") or [])
+        return True
+
+    def push(self, changes: List[Dict]) -> None:
+        try:
+            self.queue.put_nowait(changes)
+        except asyncio.QueueFull:
+            # Client trop lent: on vide la file et on lui demande de se resynchroniser
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.overflowed = True
+            self.queue.put_nowait([])
+            metrics.ws_overflows.inc()
+
+    async def run(self) -> None:
+        """Envoie les événements jusqu'à la déconnexion du client"""
+        sender = asyncio.ensure_future(self._send_loop())
+        receiver = asyncio.ensure_future(self._receive_loop())
+        try:
+            await asyncio.wait({sender, receiver}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in (sender, receiver):
+                task.cancel()
+            await asyncio.gather(sender, receiver, return_exceptions=True)
+
+    async def _send_loop(self) -> None:
+        while True:
+            try:
+                changes = await asyncio.wait_for(self.queue.get(), timeout=settings.WS_PING_SECONDS)
+            except asyncio.TimeoutError:
+                await self.websocket.send_json({"type": "ping"})
+                continue
+            while not self.queue.empty():
+                changes = changes + self.queue.get_nowait()
+            if self.overflowed:
+                self.overflowed = False
+                message = {"type": "resync"}
+            else:
+                message = build_event(changes)
+            await self.websocket.send_json(message)
+            metrics.ws_events_sent.inc()
+
+    async def _receive_loop(self) -> None:
+        # Les messages du client sont ignorés; seule la déconnexion compte
+        try:
+            while True:
+                message = await self.websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    return
+        except WebSocketDisconnect:
+            return
+
+
+class ChangeHub:
+    """Diffusion des changements aux connexions WebSocket d'un worker"""
+
+    def __init__(self):
+        self.subscribers: Set[Subscriber] = set()
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def attach(self, loop: asyncio.AbstractEventLoop) -> None:
+        self.loop = loop
+
+    def subscribe(self, subscriber: Subscriber) -> None:
+        self.subscribers.add(subscriber)
+        metrics.ws_connections.inc(role=subscriber.role)
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        if subscriber in self.subscribers:
+            self.subscribers.discard(subscriber)
+            metrics.ws_connections.dec(role=subscriber.role)
+
+    def handle_changes(self, changes: List[Dict]) -> None:
+        """Gestionnaire du ChangeListener (appelé depuis son thread)"""
+        if self.loop is not None and self.subscribers:
+            self.loop.call_soon_threadsafe(self.publish, changes)
+
+    def publish(self, changes: List[Dict]) -> None:
+        for subscriber in list(self.subscribers):
+            relevant = [change for change in changes if subscriber.wants(change)]
+            if relevant:
+                subscriber.push(relevant)
+
+    def publish_local(self, changes: List[Dict]) -> None:
+        """
+        Changements faits par ce worker. Sans listener (SQLite, notifications
+        désactivées) ils ne reviennent pas par la base: diffusion directe.
+        """
+        from app.core import notifications
+
+        if notifications.change_listener is None:
+            self.publish(changes)
+
+    async def close(self) -> None:
+        for subscriber in list(self.subscribers):
+            try:
+                await subscriber.websocket.close(code=1001)
+            except Exception:
+                logger.debug("Fermeture WebSocket ignorée", exc_info=True)
+            self.unsubscribe(subscriber)
+
+
+hub = ChangeHub()
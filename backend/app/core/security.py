@@ -1,13 +1,18 @@
 """
 Security utilities for JWT authentication and password hashing
 """
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional, Union
+from typing import Callable, Optional, Union
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, make_transient_to_detached
+from app.core import metrics
+from app.core.cache import cache
 from app.core.config import settings
 from app.core.database import get_db
 
@@ -28,6 +33,38 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+# Bounded thread pool for bcrypt so hashing never blocks the event loop
+_bcrypt_executor = ThreadPoolExecutor(
+    max_workers=settings.BCRYPT_POOL_SIZE, thread_name_prefix="bcrypt"
+)
+
+
+async def _run_bcrypt(operation: str, func: Callable, *args):
+    metrics.bcrypt_queue_depth.inc()
+
+    def task():
+        metrics.bcrypt_queue_depth.dec()
+        metrics.bcrypt_active.inc()
+        start = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            metrics.bcrypt_active.dec()
+            metrics.bcrypt_duration.observe(time.perf_counter() - start, operation=operation)
+
+    return await asyncio.get_running_loop().run_in_executor(_bcrypt_executor, task)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password in the bcrypt thread pool"""
+    return await _run_bcrypt("verify", verify_password, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    """Generate a password hash in the bcrypt thread pool"""
+    return await _run_bcrypt("hash", get_password_hash, password)
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Create a JWT access token"""
     to_encode = data.copy()
@@ -63,6 +100,37 @@ def decode_token(token: str) -> dict:
         )
 
 
+# Columns kept in the shared cache (never the password hash)
+USER_CACHE_FIELDS = ("id", "email", "role", "ref_id", "nom", "prenom", "active")
+
+
+async def load_user_by_email(db: Session, email: str):
+    """
+    Load a user through the shared cache.
+    A cache hit attaches the user to the session without querying; columns
+    that are not cached (password_hash, dates) load lazily on first access.
+    """
+    from app.models.models import User, UserRole
+
+    data = await cache.aget("users", email)
+    if data is None:
+        user = db.query(User).filter(User.email == email).first()
+        if user is not None:
+            await cache.aset("users", email, {field: getattr(user, field) for field in USER_CACHE_FIELDS},
+                             ttl=settings.USER_CACHE_TTL)
+        return user
+
+    user = User(**{**data, "role": UserRole(data["role"])})
+    make_transient_to_detached(user)
+    db.add(user)
+    return user
+
+
+async def forget_user(email: str) -> None:
+    """Drop a user from the shared cache (after any change to the account)"""
+    await cache.adelete("users", email)
+
+
 async def get_current_user(
     token: str = Depends(oauth2_scheme),
     db: Session = Depends(get_db)
@@ -84,7 +152,7 @@ async def get_current_user(
     except JWTError:
         raise credentials_exception
     
-    user = db.query(User).filter(User.email == email).first()
+    user = await load_user_by_email(db, email)
     if user is None:
         raise credentials_exception
     if not user.active:
@@ -2,95 +2,45 @@
 Plateforme d'Optimisation des Emplois du Temps d'Examens Universitaires
 Main FastAPI Application
 """
+import asyncio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from contextlib import asynccontextmanager
 from app.core.config import settings
-from app.api import auth_router, examens_router, dashboard_router
-from app.core.database import engine, SessionLocal, Base
-from app.models import User, UserRole
-from app.core.security import get_password_hash
+from app.api import (
+    auth_router, examens_router, dashboard_router, sessions_router, monitoring_router, sync_router,
+    realtime_router, search_router, snapshots_router, surveillances_router
+)
+from app.core.bootstrap import bootstrap
+from app.core.database import engine, replica_enabled
+from app.core.instrumentation import SQLInstrumentationMiddleware
+from app.core.metrics import MetricsMiddleware, render_metrics
+from app.core.notifications import start_change_listener, stop_change_listener
+from app.core.read_routing import ReadYourWritesMiddleware
+from app.core.realtime import hub
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """
     Startup and shutdown events.
-    Creates database tables and seeds admin user if not exists.
+    Creates tables and seeds users only when the bootstrap version changed.
     """
-    # Startup: Create tables
-    print("Creating database tables...")
-    Base.metadata.create_all(bind=engine)
-    print("Database tables created successfully!")
-    
-    # Seed users for all roles if they don't exist
-    users_to_seed = [
-        {
-            "email": "admin@univ.edu",
-            "password": "Director123!",
-            "role": UserRole.DIRECTOR,
-            "nom": "Administrateur",
-            "prenom": "Principal"
-        },
-        {
-            "email": "admin.scolarite@univ.edu",
-            "password": "Admin123!",
-            "role": UserRole.ADMINISTRATOR,
-            "nom": "Martin",
-            "prenom": "Sophie"
-        },
-        {
-            "email": "chef.info@univ.edu",
-            "password": "Chef123!",
-            "role": UserRole.DEPARTMENT_HEAD,
-            "nom": "Dupont",
-            "prenom": "Jean"
-        },
-        {
-            "email": "prof.math@univ.edu",
-            "password": "Prof123!",
-            "role": UserRole.PROFESSOR,
-            "nom": "Bernard",
-            "prenom": "Marie"
-        },
-        {
-            "email": "etudiant@univ.edu",
-            "password": "Etudiant123!",
-            "role": UserRole.STUDENT,
-            "nom": "Petit",
-            "prenom": "Lucas"
-        }
-    ]
-    
-    db = SessionLocal()
-    try:
-        for user_data in users_to_seed:
-            existing_user = db.query(User).filter(User.email == user_data["email"]).first()
-            if not existing_user:
-                print(f"Creating user: {user_data['email']} ({user_data['role'].value})...")
-                new_user = User(
-                    email=user_data["email"],
-                    password_hash=get_password_hash(user_data["password"]),
-                    role=user_data["role"],
-                    nom=user_data["nom"],
-                    prenom=user_data["prenom"],
-                    active=True
-                )
-                db.add(new_user)
-                db.commit()
-                print(f"User created: {user_data['email']} / {user_data['password']}")
-            else:
-                print(f"User already exists: {existing_user.email}")
-    except Exception as e:
-        print(f"Error seeding admin user: {e}")
-        db.rollback()
-    finally:
-        db.close()
+    report = bootstrap(engine)
+    app.state.startup = report.to_dict()
+    print(f"Startup ({'cold' if report.cold else 'warm'}) in {report.total_ms}ms: {report.phases_ms}")
+    # Cache invalidation and WebSocket push driven by database notifications
+    hub.attach(asyncio.get_running_loop())
+    listener = start_change_listener(engine)
+    if listener is not None:
+        listener.add_handler(hub.handle_changes)
     
     yield
     # Shutdown
     print("Shutting down...")
+    await hub.close()
+    stop_change_listener()
 
 # Create FastAPI application
 app = FastAPI(
@@ -121,6 +71,8 @@ app = FastAPI(
         {"name": "Authentication", "description": "Authentification et gestion des tokens JWT"},
         {"name": "Examens", "description": "Gestion des examens et génération d'EDT"},
         {"name": "Dashboard", "description": "Statistiques et KPIs"},
+        {"name": "Sessions", "description": "Sessions de génération et profils d'exécution"},
+        {"name": "Monitoring", "description": "Instrumentation SQL et métriques"},
     ]
 )
 
@@ -131,12 +83,33 @@ app.add_middleware(
     allow_credentials=False,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing", "X-DB-Query-Count", "X-DB-Time-Ms",
+                    "X-DB-Query-Budget-Exceeded", "X-DB-N-Plus-One"],
 )
 
+# SQL instrumentation per request (Server-Timing, query budget, N+1)
+if settings.SQL_INSTRUMENTATION_ENABLED:
+    app.add_middleware(SQLInstrumentationMiddleware)
+
+# Read-your-writes: recent writers keep reading from the primary
+if replica_enabled:
+    app.add_middleware(ReadYourWritesMiddleware)
+
+# Prometheus metrics: per-route latency and in-flight requests
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
 # Include routers
 app.include_router(auth_router, prefix="/api")
 app.include_router(examens_router, prefix="/api")
 app.include_router(dashboard_router, prefix="/api")
+app.include_router(sessions_router, prefix="/api")
+app.include_router(monitoring_router, prefix="/api")
+app.include_router(sync_router, prefix="/api")
+app.include_router(realtime_router, prefix="/api")
+app.include_router(search_router, prefix="/api")
+app.include_router(snapshots_router, prefix="/api")
+app.include_router(surveillances_router, prefix="/api")
 
 
 @app.get("/", tags=["Root"])
@@ -157,7 +130,19 @@ async def health_check():
     """
     Vérification de l'état de l'API.
     """
-    return {"status": "healthy", "version": settings.APP_VERSION}
+    return {
+        "status": "healthy",
+        "version": settings.APP_VERSION,
+        "startup": getattr(app.state, "startup", None)
+    }
+
+
+@app.get("/metrics", tags=["Health"], response_class=PlainTextResponse, include_in_schema=False)
+async def metrics():
+    """
+    Métriques au format d'exposition Prometheus.
+    """
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
 
 
 @app.exception_handler(Exception)
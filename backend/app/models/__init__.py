@@ -15,7 +15,13 @@ from app.models.models import (
     Examen,
     User,
     SessionGeneration,
-    Surveillance
+    Surveillance,
+    ExamenSalle,
+    PlaceExamen,
+    AppMetadata,
+    ExamenPlanning,
+    SyncChange,
+    EdtSnapshot
 )
 
 __all__ = [
@@ -34,5 +40,11 @@ __all__ = [
     "Examen",
     "User",
     "SessionGeneration",
-    "Surveillance"
+    "Surveillance",
+    "ExamenSalle",
+    "PlaceExamen",
+    "AppMetadata",
+    "ExamenPlanning",
+    "SyncChange",
+    "EdtSnapshot"
 ]
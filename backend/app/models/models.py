@@ -3,9 +3,9 @@ SQLAlchemy Models for the Exam Scheduler Platform
 """
 from datetime import datetime
 from sqlalchemy import (
-    Column, Integer, String, Boolean, DateTime, ForeignKey, 
+    Column, Integer, BigInteger, String, Boolean, DateTime, ForeignKey, 
     Text, Numeric, Enum, JSON, CheckConstraint, UniqueConstraint,
-    Computed
+    Computed, Sequence, Index
 )
 from sqlalchemy.orm import relationship
 from app.core.database import Base
@@ -113,6 +113,8 @@ class Module(Base):
     pre_req_id = Column(Integer, ForeignKey("modules.id", ondelete="SET NULL"))
     duree_examen_min = Column(Integer, default=120)
     coefficient = Column(Numeric(3, 1), default=1.0)
+    # Inscriptions actives, maintenu par trigger (app.services.enrolment)
+    nb_inscrits_actifs = Column(Integer, nullable=False, default=0, server_default="0")
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
@@ -256,6 +258,7 @@ class Examen(Base):
     salle = relationship("LieuExamen", back_populates="examens")
     session = relationship("SessionGeneration", back_populates="examens")
     surveillances = relationship("Surveillance", back_populates="examen")
+    salles = relationship("ExamenSalle", back_populates="examen", order_by="ExamenSalle.id")
     
     __table_args__ = (
         CheckConstraint("duree_minutes >= 30 AND duree_minutes <= 240"),
@@ -300,6 +303,10 @@ class SessionGeneration(Base):
     nb_conflits_resolus = Column(Integer, default=0)
     temps_execution_ms = Column(Integer)
     log = Column(Text)
+    metriques = Column(JSON, default={})
+    # Examens générés invisibles tant que la session n'est pas publiée
+    brouillon = Column(Boolean, default=False, nullable=False)
+    publiee_at = Column(DateTime)
     created_at = Column(DateTime, default=datetime.utcnow)
     
     # Relations
@@ -325,3 +332,135 @@ class Surveillance(Base):
         UniqueConstraint("examen_id", "prof_id"),
         CheckConstraint("role IN ('responsable', 'surveillant')"),
     )
+
+
+class ExamenSalle(Base):
+    """Salles d'un examen réparti sur plusieurs salles (salle principale comprise)"""
+    __tablename__ = "examen_salles"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    examen_id = Column(Integer, ForeignKey("examens.id", ondelete="CASCADE"), nullable=False, index=True)
+    salle_id = Column(Integer, ForeignKey("lieux_examen.id", ondelete="CASCADE"), nullable=False, index=True)
+    nb_places = Column(Integer, default=0)  # étudiants placés dans la salle
+    created_at = Column(DateTime, default=datetime.utcnow)
+    
+    # Relations
+    examen = relationship("Examen", back_populates="salles")
+    salle = relationship("LieuExamen")
+    
+    __table_args__ = (
+        UniqueConstraint("examen_id", "salle_id"),
+    )
+
+
+class PlaceExamen(Base):
+    """Salle (et place) de chaque étudiant à un examen"""
+    __tablename__ = "places_examen"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    examen_id = Column(Integer, ForeignKey("examens.id", ondelete="CASCADE"), nullable=False)
+    etudiant_id = Column(Integer, ForeignKey("etudiants.id", ondelete="CASCADE"), nullable=False, index=True)
+    salle_id = Column(Integer, ForeignKey("lieux_examen.id", ondelete="CASCADE"), nullable=False)
+    numero_place = Column(Integer)  # None: salle seulement
+    
+    __table_args__ = (
+        UniqueConstraint("examen_id", "etudiant_id"),
+    )
+
+
+class AppMetadata(Base):
+    """Marqueurs internes (version d'initialisation du schéma et des données)"""
+    __tablename__ = "app_metadata"
+    
+    key = Column(String(100), primary_key=True)
+    value = Column(String(255), nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class ExamenPlanning(Base):
+    """
+    Vue dénormalisée des examens pour les lectures (listes, plannings,
+    agrégats). Lecture seule: maintenue par les triggers de
+    app.services.planning.
+    """
+    __tablename__ = "examens_planning"
+    
+    examen_id = Column(Integer, ForeignKey("examens.id", ondelete="CASCADE"), primary_key=True)
+    module_id = Column(Integer, nullable=False)
+    module_code = Column(String(20), nullable=False)
+    module_nom = Column(String(150), nullable=False)
+    formation_id = Column(Integer, nullable=False)
+    formation_code = Column(String(20), nullable=False)
+    formation_nom = Column(String(150), nullable=False)
+    dept_id = Column(Integer, nullable=False)
+    dept_code = Column(String(10), nullable=False)
+    dept_nom = Column(String(100), nullable=False)
+    prof_id = Column(Integer)
+    prof_nom = Column(String(201))
+    salle_id = Column(Integer)
+    salle_code = Column(String(20))
+    salle_nom = Column(String(100))
+    salle_batiment = Column(String(50))
+    salle_capacite = Column(Integer)
+    date_heure = Column(DateTime, nullable=False)
+    date_fin = Column(DateTime, nullable=False)
+    duree_minutes = Column(Integer, nullable=False)
+    statut = Column(String(20), nullable=False)
+    session_id = Column(Integer)
+    nb_inscrits = Column(Integer, default=0)
+    updated_at = Column(DateTime)
+    
+    __table_args__ = (
+        Index("idx_planning_dept_date", "dept_id", "date_heure"),
+        Index("idx_planning_formation_date", "formation_id", "date_heure"),
+        Index("idx_planning_salle_date", "salle_id", "date_heure"),
+        Index("idx_planning_prof_date", "prof_id", "date_heure"),
+        Index("idx_planning_date", "date_heure"),
+        Index("idx_planning_statut", "statut"),
+    )
+
+
+class SyncChange(Base):
+    """Journal des modifications (synchronisation incrémentale des clients)"""
+    __tablename__ = "sync_changes"
+    
+    # Numéro attribué dans l'ordre des commits (voir app.core.change_log)
+    change_seq = Column(BigInteger, Sequence("edt_change_seq"), primary_key=True)
+    entity = Column(String(20), nullable=False)
+    entity_id = Column(Integer, nullable=False)
+    op = Column(String(10), nullable=False)
+    changed_at = Column(DateTime, default=datetime.utcnow, index=True)
+    # Examen modifié ou supprimé: état précédent (périmètre des suppressions)
+    old_module_id = Column(Integer)
+    old_prof_id = Column(Integer)
+    old_statut = Column(String(20))
+    
+    __table_args__ = (
+        CheckConstraint("entity IN ('examen', 'salle', 'session')"),
+        CheckConstraint("op IN ('INSERT', 'UPDATE', 'DELETE')"),
+    )
+
+
+class EdtSnapshot(Base):
+    """
+    Version d'un EDT: tableaux parallèles par module (créneau, durée, salle,
+    enseignant, statut; voir app.services.snapshots)
+    """
+    __tablename__ = "edt_snapshots"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    session_id = Column(Integer, ForeignKey("sessions_generation.id", ondelete="SET NULL"), index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"))
+    type = Column(String(20), nullable=False, default="manuel")
+    libelle = Column(String(150))
+    nb_examens = Column(Integer, default=0)
+    donnees = Column(JSON, nullable=False)
+    # Instantané de l'EDT en place pris à la promotion (retour arrière)
+    sauvegarde_id = Column(Integer, ForeignKey("edt_snapshots.id", ondelete="SET NULL"))
+    promu_at = Column(DateTime)
+    annule_at = Column(DateTime)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        CheckConstraint("type IN ('generation', 'manuel', 'sauvegarde')"),
+    )
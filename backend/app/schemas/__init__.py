@@ -31,6 +31,7 @@ from app.schemas.schemas import (
     LieuExamenBase,
     LieuExamenCreate,
     LieuExamenResponse,
+    SalleDisponibleResponse,
     # Professeur
     ProfesseurBase,
     ProfesseurCreate,
@@ -48,13 +49,50 @@ from app.schemas.schemas import (
     ExamenCreate,
     ExamenUpdate,
     ExamenResponse,
+    ExamenPlanningResponse,
+    PlaceEtudiantInfo,
+    ExamenSalleResponse,
+    SeatAllocationResponse,
     # EDT Generation
     EDTGenerationRequest,
     EDTGenerationResponse,
+    EDTRepairRequest,
+    EDTRepairResponse,
+    ExamenDeplacement,
+    SessionGenerationResponse,
+    SessionGenerationDetail,
+    SnapshotCreate,
+    SnapshotResponse,
+    PlacementInfo,
+    SnapshotDiffItem,
+    SnapshotDiffResponse,
+    SnapshotPromoteResponse,
+    QualiteEtudiants,
+    QualiteSalles,
+    QualiteEnseignants,
+    SessionQualityResponse,
+    SessionPublishResponse,
+    SurveillanceResponse,
+    SurveillanceAssignRequest,
+    SurveillanceAssignResponse,
     ConflictInfo,
+    ExamenBatchRequest,
+    ExamenBatchItem,
+    ExamenBatchResponse,
+    ExamenPlacementCheck,
+    ContrainteViolation,
+    ExamenValidationResponse,
+    ExamenSuggestion,
+    ExamenSuggestionsResponse,
     # Statistics
     DashboardStats,
     DepartementKPI,
+    # Search
+    SearchResult,
+    SearchResponse,
+    # Sync
+    SyncDeletion,
+    SyncResponse,
     # Pagination
     PaginationParams,
     PaginatedResponse
@@ -85,6 +123,7 @@ __all__ = [
     "LieuExamenBase",
     "LieuExamenCreate",
     "LieuExamenResponse",
+    "SalleDisponibleResponse",
     "ProfesseurBase",
     "ProfesseurCreate",
     "ProfesseurResponse",
@@ -98,11 +137,46 @@ __all__ = [
     "ExamenCreate",
     "ExamenUpdate",
     "ExamenResponse",
+    "ExamenPlanningResponse",
+    "PlaceEtudiantInfo",
+    "ExamenSalleResponse",
+    "SeatAllocationResponse",
     "EDTGenerationRequest",
     "EDTGenerationResponse",
+    "EDTRepairRequest",
+    "EDTRepairResponse",
+    "ExamenDeplacement",
+    "SessionGenerationResponse",
+    "SessionGenerationDetail",
+    "SnapshotCreate",
+    "SnapshotResponse",
+    "PlacementInfo",
+    "SnapshotDiffItem",
+    "SnapshotDiffResponse",
+    "SnapshotPromoteResponse",
+    "QualiteEtudiants",
+    "QualiteSalles",
+    "QualiteEnseignants",
+    "SessionQualityResponse",
+    "SessionPublishResponse",
+    "SurveillanceResponse",
+    "SurveillanceAssignRequest",
+    "SurveillanceAssignResponse",
     "ConflictInfo",
+    "ExamenBatchRequest",
+    "ExamenBatchItem",
+    "ExamenBatchResponse",
+    "ExamenPlacementCheck",
+    "ContrainteViolation",
+    "ExamenValidationResponse",
+    "ExamenSuggestion",
+    "ExamenSuggestionsResponse",
     "DashboardStats",
     "DepartementKPI",
+    "SearchResult",
+    "SearchResponse",
+    "SyncDeletion",
+    "SyncResponse",
     "PaginationParams",
     "PaginatedResponse"
 ]
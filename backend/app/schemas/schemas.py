@@ -1,9 +1,9 @@
 """
 Pydantic Schemas for API validation and serialization
 """
-from datetime import datetime
-from typing import Optional, List, Any
-from pydantic import BaseModel, EmailStr, Field, ConfigDict
+from datetime import date, datetime
+from typing import Optional, List, Any, Dict
+from pydantic import BaseModel, EmailStr, Field, ConfigDict, field_validator
 from enum import Enum
 
 
@@ -191,6 +191,7 @@ class ModuleResponse(ModuleBase):
     """Module response schema"""
     id: int
     pre_req_id: Optional[int] = None
+    nb_inscrits_actifs: int = 0
     created_at: datetime
     updated_at: datetime
     
@@ -229,6 +230,11 @@ class LieuExamenResponse(LieuExamenBase):
     model_config = ConfigDict(from_attributes=True)
 
 
+class SalleDisponibleResponse(LieuExamenResponse):
+    """Salle libre sur un créneau"""
+    prochain_examen: Optional[datetime] = None  # début du prochain examen après le créneau
+
+
 # ============================================================================
 # PROFESSEUR SCHEMAS
 # ============================================================================
@@ -347,6 +353,14 @@ class ExamenUpdate(BaseModel):
     notes: Optional[str] = None
 
 
+class PlaceEtudiantInfo(BaseModel):
+    """A student's own room and seat for an exam"""
+    salle_id: int
+    salle_nom: str
+    salle_batiment: Optional[str] = None
+    numero_place: Optional[int] = None
+
+
 class ExamenResponse(ExamenBase):
     """Examen response schema"""
     id: int
@@ -361,6 +375,56 @@ class ExamenResponse(ExamenBase):
     module: Optional[ModuleResponse] = None
     professeur: Optional[ProfesseurResponse] = None
     salle: Optional[LieuExamenResponse] = None
+    # Étudiant: sa salle (examen sur plusieurs salles) et sa place
+    place: Optional[PlaceEtudiantInfo] = None
+    
+    model_config = ConfigDict(from_attributes=True)
+
+
+class ExamenSalleResponse(BaseModel):
+    """Room of an exam with the number of students seated in it"""
+    salle_id: int
+    code: str
+    nom: str
+    batiment: Optional[str] = None
+    capacite_examen: int
+    nb_places: int
+    principale: bool
+
+
+class SeatAllocationResponse(BaseModel):
+    """Seat allocation result"""
+    nb_examens: int
+    nb_etudiants_places: int
+    nb_sans_place: int
+    message: str
+
+
+class ExamenPlanningResponse(BaseModel):
+    """Flat exam row from the examens_planning read model"""
+    examen_id: int
+    module_id: int
+    module_code: str
+    module_nom: str
+    formation_id: int
+    formation_code: str
+    formation_nom: str
+    dept_id: int
+    dept_code: str
+    dept_nom: str
+    prof_id: Optional[int] = None
+    prof_nom: Optional[str] = None
+    salle_id: Optional[int] = None
+    salle_code: Optional[str] = None
+    salle_nom: Optional[str] = None
+    salle_batiment: Optional[str] = None
+    salle_capacite: Optional[int] = None
+    date_heure: datetime
+    date_fin: datetime
+    duree_minutes: int
+    statut: str
+    session_id: Optional[int] = None
+    nb_inscrits: int = 0
     
     model_config = ConfigDict(from_attributes=True)
 
@@ -377,6 +441,9 @@ class EDTGenerationRequest(BaseModel):
     formation_ids: Optional[List[int]] = None
     force_regenerate: bool = False
     respect_priorites: bool = True
+    strategy: Optional[str] = Field(default=None, pattern="^(greedy|ortools)$")
+    amelioration_secondes: Optional[float] = Field(default=None, ge=0, le=300)  # recherche locale
+    publier: Optional[bool] = None  # None = SCHEDULING_AUTO_PUBLISH
 
 
 class EDTGenerationResponse(BaseModel):
@@ -386,6 +453,210 @@ class EDTGenerationResponse(BaseModel):
     nb_examens_planifies: int
     nb_conflits_resolus: int
     temps_execution_ms: int
+    publiee: Optional[bool] = None  # False: brouillon à publier
+    message: str
+
+
+class EDTRepairRequest(BaseModel):
+    """Incremental repair request: what became unavailable"""
+    examen_ids: Optional[List[int]] = None
+    salle_ids: Optional[List[int]] = None  # salles fermées
+    prof_ids: Optional[List[int]] = None  # enseignants absents
+    jours: Optional[List[date]] = None  # journées banalisées
+    fenetre_jours: int = Field(default=7, ge=1, le=60)
+
+
+class ExamenDeplacement(BaseModel):
+    """One exam moved by a repair"""
+    examen_id: int
+    ancienne_date: datetime
+    nouvelle_date: datetime
+    ancienne_salle_id: Optional[int] = None
+    nouvelle_salle_id: int
+    ancien_prof_id: Optional[int] = None
+    nouveau_prof_id: int
+    changements: List[str]
+
+
+class EDTRepairResponse(EDTGenerationResponse):
+    """EDT repair response"""
+    examens_deplaces: List[ExamenDeplacement] = []
+    examens_non_replaces: List[int] = []
+
+
+class SessionGenerationResponse(BaseModel):
+    """Generation session summary"""
+    id: int
+    user_id: int
+    date_debut: Optional[datetime] = None
+    date_fin: Optional[datetime] = None
+    parametres: dict = {}
+    statut: str
+    nb_examens_planifies: int = 0
+    nb_conflits_resolus: int = 0
+    temps_execution_ms: Optional[int] = None
+    log: Optional[str] = None
+    brouillon: bool = False
+    publiee_at: Optional[datetime] = None
+    created_at: datetime
+    
+    model_config = ConfigDict(from_attributes=True)
+    
+    @field_validator("statut", mode="before")
+    @classmethod
+    def _statut_value(cls, value):
+        return getattr(value, "value", value)
+
+
+class SessionGenerationDetail(SessionGenerationResponse):
+    """Generation session with execution profile"""
+    metriques: Optional[dict] = None
+
+
+class SnapshotCreate(BaseModel):
+    """Capture of a schedule version (session exams, or the live schedule)"""
+    session_id: Optional[int] = None  # None = EDT en place
+    dept_ids: Optional[List[int]] = None  # périmètre de l'EDT en place
+    libelle: Optional[str] = Field(default=None, max_length=150)
+
+
+class SnapshotResponse(BaseModel):
+    """Schedule version (without its placements)"""
+    id: int
+    session_id: Optional[int] = None
+    user_id: Optional[int] = None
+    type: str
+    libelle: Optional[str] = None
+    nb_examens: int = 0
+    sauvegarde_id: Optional[int] = None
+    promu_at: Optional[datetime] = None
+    annule_at: Optional[datetime] = None
+    created_at: Optional[datetime] = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class PlacementInfo(BaseModel):
+    """Placement of a module's exam in a version"""
+    examen_id: Optional[int] = None
+    date_heure: datetime
+    duree_minutes: Optional[int] = None
+    salle_id: Optional[int] = None
+    prof_id: Optional[int] = None
+    statut: Optional[str] = None
+
+
+class SnapshotDiffItem(BaseModel):
+    """One module whose exam differs between two versions"""
+    module_id: int
+    module_code: Optional[str] = None
+    nb_inscrits: int = 0
+    avant: Optional[PlacementInfo] = None
+    apres: Optional[PlacementInfo] = None
+    changements: List[str] = []
+
+
+class SnapshotDiffResponse(BaseModel):
+    """Differences between two schedule versions"""
+    avant_id: Optional[int] = None  # None = EDT en place
+    apres_id: int
+    deplaces: List[SnapshotDiffItem]
+    ajoutes: List[SnapshotDiffItem]
+    supprimes: List[SnapshotDiffItem]
+    nb_inchanges: int
+    etudiants_concernes: int
+
+
+class SnapshotPromoteResponse(BaseModel):
+    """Result of a promotion or rollback"""
+    snapshot_id: int
+    sauvegarde_id: int
+    nb_examens_modifies: int
+    message: str
+
+
+class QualiteEtudiants(BaseModel):
+    """Student-side quality indicators of a schedule"""
+    nb_etudiants: int
+    nb_epreuves: int  # couples (étudiant, examen)
+    examens_par_jour: Dict[str, int]  # journées étudiant avec 1, 2, 3+ examens
+    max_examens_jour: int
+    conflits: int  # examens simultanés
+    ecarts_jours: Dict[str, int]  # écart entre examens successifs: 0, 1, 2, 3+ jours
+    ecart_moyen_jours: float
+    etudiants_rapproches: int  # au moins deux examens le même jour ou à J+1
+    changements_batiment: int  # dans une même journée
+
+
+class QualiteSalles(BaseModel):
+    """Room fill indicators (enrolled / exam seats)"""
+    nb_examens_avec_salle: int
+    taux_remplissage_moyen: float
+    taux_remplissage_median: float
+    taux_remplissage_p10: float
+    salles_moins_50: int
+    depassements_capacite: int
+
+
+class QualiteEnseignants(BaseModel):
+    """Professor load balance indicators"""
+    nb_enseignants: int
+    charge_moyenne: float
+    charge_ecart_type: float
+    charge_min: int
+    charge_max: int
+    coefficient_variation: float
+    max_examens_jour: int
+
+
+class SessionQualityResponse(BaseModel):
+    """Quality report of a generation session"""
+    session_id: int
+    nb_examens: int
+    score_global: float  # 0-100
+    etudiants: QualiteEtudiants
+    salles: QualiteSalles
+    enseignants: QualiteEnseignants
+    temps_calcul_ms: int
+
+
+class SessionPublishResponse(BaseModel):
+    """Publication or discard of a session's draft exams"""
+    session_id: int
+    nb_examens: int
+    publiee_at: Optional[datetime] = None
+    message: str
+
+
+class SurveillanceResponse(BaseModel):
+    """Invigilator assigned to an exam"""
+    id: int
+    examen_id: int
+    prof_id: int
+    role: str  # responsable | surveillant
+    created_at: Optional[datetime] = None
+    
+    model_config = ConfigDict(from_attributes=True)
+
+
+class SurveillanceAssignRequest(BaseModel):
+    """Exams whose invigilators are (re)computed; no filter = all active exams"""
+    session_id: Optional[int] = None
+    dept_ids: Optional[List[int]] = None
+    date_debut: Optional[datetime] = None
+    date_fin: Optional[datetime] = None
+
+
+class SurveillanceAssignResponse(BaseModel):
+    """Invigilator assignment result"""
+    nb_examens: int
+    nb_surveillances: int
+    nb_postes_non_pourvus: int
+    nb_examens_incomplets: int
+    charge_min: int
+    charge_max: int
+    charge_moyenne: float
+    temps_calcul_ms: int
     message: str
 
 
@@ -397,6 +668,86 @@ class ConflictInfo(BaseModel):
     resolution: Optional[str] = None
 
 
+class ExamenBatchRequest(BaseModel):
+    """Batch operation: explicit ids and/or filters, one action"""
+    action: str = Field(pattern="^(confirm|cancel|move|delete)$")
+    examen_ids: Optional[List[int]] = None
+    session_id: Optional[int] = None
+    dept_id: Optional[int] = None
+    formation_id: Optional[int] = None
+    date_debut: Optional[datetime] = None
+    date_fin: Optional[datetime] = None
+    # action = move
+    decalage_minutes: Optional[int] = None
+    salle_id: Optional[int] = None
+    prof_id: Optional[int] = None
+    duree_minutes: Optional[int] = Field(default=None, ge=30, le=240)
+
+
+class ExamenBatchItem(BaseModel):
+    """Outcome for one exam of a batch"""
+    examen_id: int
+    resultat: str  # applique | ignore | introuvable
+    raison: Optional[str] = None
+
+
+class ExamenBatchResponse(BaseModel):
+    """Batch operation result"""
+    action: str
+    nb_selectionnes: int
+    nb_appliques: int
+    nb_ignores: int
+    resultats: List[ExamenBatchItem]
+
+
+class ExamenPlacementCheck(BaseModel):
+    """Proposed placement to validate (missing fields keep their current value)"""
+    date_heure: Optional[datetime] = None
+    salle_id: Optional[int] = None
+    prof_id: Optional[int] = None
+    duree_minutes: Optional[int] = Field(default=None, ge=30, le=240)
+
+
+class ContrainteViolation(BaseModel):
+    """Violated scheduling constraint"""
+    type: str
+    severite: str  # erreur | avertissement
+    description: str
+    examens_ids: List[int] = []
+    etudiants_concernes: int = 0
+
+
+class ExamenValidationResponse(BaseModel):
+    """Validation result of a proposed placement"""
+    examen_id: int
+    valide: bool  # aucune erreur (les avertissements n'empêchent pas le déplacement)
+    violations: List[ContrainteViolation]
+    took_ms: float
+
+
+class ExamenSuggestion(BaseModel):
+    """Alternative placement for one exam"""
+    date_heure: datetime
+    salle_id: int
+    salle_code: str
+    salle_nom: str
+    capacite_examen: int
+    prof_id: int
+    prof_nom: str
+    score: float  # perturbation (plus bas = meilleur)
+    changements: List[str]
+
+
+class ExamenSuggestionsResponse(BaseModel):
+    """Ranked alternative placements"""
+    examen_id: int
+    date_debut: datetime
+    date_fin: datetime
+    candidats_evalues: int
+    took_ms: float
+    suggestions: List[ExamenSuggestion]
+
+
 # ============================================================================
 # STATISTICS SCHEMAS
 # ============================================================================
@@ -424,6 +775,49 @@ class DepartementKPI(BaseModel):
     nb_conflits: int
 
 
+# ============================================================================
+# SEARCH SCHEMAS
+# ============================================================================
+
+class SearchResult(BaseModel):
+    """Search hit"""
+    type: str  # module | professeur | etudiant | salle
+    id: int
+    label: str
+    detail: Optional[str] = None
+    score: float
+
+
+class SearchResponse(BaseModel):
+    """Ranked search results"""
+    query: str
+    results: List[SearchResult]
+    took_ms: float
+
+
+# ============================================================================
+# SYNC SCHEMAS
+# ============================================================================
+
+class SyncDeletion(BaseModel):
+    """Deleted entity (or no longer visible to the user)"""
+    entity: str
+    id: int
+    change_seq: Optional[int] = None
+    deleted_at: Optional[datetime] = None
+
+
+class SyncResponse(BaseModel):
+    """Changes since a client cursor"""
+    cursor: int
+    has_more: bool = False
+    reset: bool = False  # curseur inconnu ou trop ancien: recharger les listes
+    examens: List[ExamenResponse] = []
+    salles: List[LieuExamenResponse] = []
+    sessions: List[SessionGenerationResponse] = []
+    suppressions: List[SyncDeletion] = []
+
+
 # ============================================================================
 # PAGINATION SCHEMAS
 # ============================================================================
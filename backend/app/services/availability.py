@@ -0,0 +1,332 @@
+"""
+Room availability engine
+
+OccupancyIndex is an in-memory snapshot of the schedule: the exams that occupy
+a room or a professor (live_exams(): every status but cancelled and draft,
+outside unpublished generation sessions, as in the scheduler) as intervals
+sorted by start time, plus the per-day exam counts of professors and
+formations. A free-room query is one bisect per room on the
+running maximum of interval ends, so answering "which rooms with
+capacite_examen >= N are free between T1 and T2" costs O(rooms x log exams)
+in memory instead of one overlap query per room.
+
+An exam split across several rooms (examen_salles) occupies each of them.
+
+The index is shared by the requests of a worker and rebuilt when the change
+log (app.core.change_log) has moved, i.e. after any committed write to an
+exam or a room. It also expires after AVAILABILITY_INDEX_TTL seconds: the
+change log does not cover enrolments and professors, whose shared-student
+counts and daily limits the index holds too.
+"""
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+from sqlalchemy import and_, exists, not_, or_
+from sqlalchemy.orm import Session
+
+from app.core.change_log import current_cursor
+from app.core.config import settings
+from app.models import Examen, ExamenSalle, LieuExamen, Module, Professeur, SessionGeneration
+
+INACTIVE_STATUSES = ("cancelled", "draft")
+
+
+def unpublished_exams(model=Examen):
+    """
+    Examens d'une génération non publiée (brouillons de session,
+    app.services.staging), pour Examen ou ExamenPlanning.
+    """
+    return exists().where(SessionGeneration.id == model.session_id, SessionGeneration.brouillon)
+
+
+def unpublished_sql(alias: str) -> str:
+    """unpublished_exams() en SQL brut, pour un alias de examens ou examens_planning"""
+    return f"EXISTS (SELECT 1 FROM sessions_generation sg WHERE sg.id = {alias}.session_id AND sg.brouillon)"
+
+
+def live_exams(model=Examen):
+    """Examens actifs: ni annulés, ni brouillons, ni d'une session non publiée"""
+    return and_(model.statut.notin_(INACTIVE_STATUSES), not_(unpublished_exams(model)))
+
+
+def naive_utc(value: datetime) -> datetime:
+    """Dates reçues avec fuseau (ISO 8601 du frontend) -> UTC naïf, comme en base"""
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+class ExamSlot(NamedTuple):
+    id: int
+    module_id: int
+    formation_id: int
+    prof_id: Optional[int]
+    salle_id: Optional[int]
+    start: datetime
+    end: datetime
+
+
+class Timeline:
+    """Examens d'une salle ou d'un enseignant triés par début, avec le maximum courant des fins"""
+
+    def __init__(self, intervals: Iterable[tuple]):
+        ordered = sorted(intervals)
+        self.starts = [start for start, _, _ in ordered]
+        self.ends = [end for _, end, _ in ordered]
+        self.examen_ids = [examen_id for _, _, examen_id in ordered]
+        self.max_ends: List[datetime] = []
+        for end in self.ends:
+            self.max_ends.append(max(end, self.max_ends[-1]) if self.max_ends else end)
+
+    def conflicts(self, start: datetime, end: datetime, ignore: Iterable[int] = ()) -> List[int]:
+        """Examens qui chevauchent [start, end["""
+        # Premier intervalle dont une fin (cumulée) dépasse start
+        idx = bisect_right(self.max_ends, start)
+        found = []
+        while idx < len(self.starts) and self.starts[idx] < end:
+            if self.ends[idx] > start and self.examen_ids[idx] not in ignore:
+                found.append(self.examen_ids[idx])
+            idx += 1
+        return found
+
+    def is_free(self, start: datetime, end: datetime, ignore: Iterable[int] = ()) -> bool:
+        return not self.conflicts(start, end, ignore)
+
+    def next_start(self, after: datetime) -> Optional[datetime]:
+        """Début du premier examen qui commence à partir de after"""
+        idx = bisect_left(self.starts, after)
+        return self.starts[idx] if idx < len(self.starts) else None
+
+
+_EMPTY = Timeline(())
+
+
+class OccupancyIndex:
+    """Index en mémoire des salles, des enseignants et de leurs créneaux occupés"""
+
+    def __init__(
+        self,
+        rooms: Dict[int, Dict],
+        professors: Dict[int, Dict],
+        exams: Dict[int, ExamSlot],
+        version: int,
+        extra_rooms: Optional[Dict[int, List[int]]] = None
+    ):
+        self.rooms = rooms
+        self.professors = professors
+        self.exams = exams
+        self.version = version
+        # Salles supplémentaires des examens sur plusieurs salles
+        self.extra_rooms = extra_rooms or {}
+        self.built_at = time.monotonic()
+        # Inscrits communs par module, chargés à la demande (app.services.suggestions)
+        self.shared_students: Dict[int, Dict[int, int]] = {}
+
+        by_room: Dict[int, List[tuple]] = {}
+        by_prof: Dict[int, List[tuple]] = {}
+        self.prof_days: Counter = Counter()
+        self.formation_days: Counter = Counter()
+        self.module_exams: Dict[int, List[int]] = {}
+        for exam in exams.values():
+            self.module_exams.setdefault(exam.module_id, []).append(exam.id)
+            for salle_id in self.exam_rooms(exam):
+                by_room.setdefault(salle_id, []).append((exam.start, exam.end, exam.id))
+            if exam.prof_id is not None:
+                by_prof.setdefault(exam.prof_id, []).append((exam.start, exam.end, exam.id))
+            self._count(exam, 1)
+        self.room_timelines = {salle_id: Timeline(items) for salle_id, items in by_room.items()}
+        self.prof_timelines = {prof_id: Timeline(items) for prof_id, items in by_prof.items()}
+
+    def exam_rooms(self, exam: ExamSlot) -> List[int]:
+        """Salles occupées par l'examen: principale et supplémentaires"""
+        rooms = [] if exam.salle_id is None else [exam.salle_id]
+        return rooms + [salle_id for salle_id in self.extra_rooms.get(exam.id, ()) if salle_id != exam.salle_id]
+
+    def _count(self, exam: ExamSlot, delta: int) -> None:
+        if exam.prof_id is not None:
+            self.prof_days[(exam.prof_id, exam.start.date())] += delta
+        self.formation_days[(exam.formation_id, exam.start.date())] += delta
+
+    @classmethod
+    def build(cls, db: Session, version: int = 0, session_id: Optional[int] = None) -> "OccupancyIndex":
+        """session_id: brouillons de cette session compris (génération en cours)"""
+        rooms = {}
+        for salle in db.query(LieuExamen).all():
+            rooms[salle.id] = {
+                "id": salle.id,
+                "nom": salle.nom,
+                "code": salle.code,
+                "capacite": salle.capacite,
+                "capacite_examen": salle.capacite // 2,
+                "type": getattr(salle.type, "value", salle.type),
+                "batiment": salle.batiment,
+                "etage": salle.etage,
+                "disponible": salle.disponible,
+                "equipements": salle.equipements or {},
+                "accessibilite_pmr": salle.accessibilite_pmr,
+                "created_at": salle.created_at,
+                "updated_at": salle.updated_at,
+            }
+
+        professors = {
+            prof_id: {
+                "id": prof_id,
+                "nom": f"{prenom} {nom}",
+                "dept_id": dept_id,
+                "max_surveillances": max_surveillances or 3,
+            }
+            for prof_id, prenom, nom, dept_id, max_surveillances in db.query(
+                Professeur.id, Professeur.prenom, Professeur.nom,
+                Professeur.dept_id, Professeur.max_surveillances
+            ).all()
+        }
+
+        rows = db.query(
+            Examen.id, Examen.module_id, Module.formation_id, Examen.prof_id,
+            Examen.salle_id, Examen.date_heure, Examen.duree_minutes
+        ).join(Module, Module.id == Examen.module_id)
+        if session_id is None:
+            rows = rows.filter(live_exams())
+        else:
+            rows = rows.filter(or_(
+                live_exams(),
+                and_(Examen.session_id == session_id, Examen.statut.notin_(INACTIVE_STATUSES))
+            ))
+        rows = rows.all()
+        exams = {
+            examen_id: ExamSlot(
+                examen_id, module_id, formation_id, prof_id, salle_id,
+                start, start + timedelta(minutes=duree or 120)
+            )
+            for examen_id, module_id, formation_id, prof_id, salle_id, start, duree in rows
+        }
+        extra_rooms: Dict[int, List[int]] = {}
+        for examen_id, salle_id in db.query(ExamenSalle.examen_id, ExamenSalle.salle_id).order_by(ExamenSalle.id).all():
+            if examen_id in exams:
+                extra_rooms.setdefault(examen_id, []).append(salle_id)
+        return cls(rooms, professors, exams, version, extra_rooms)
+
+    def replace_exam(self, exam: ExamSlot) -> None:
+        """
+        Met à jour l'index après le déplacement d'un examen (réparation):
+        seules les chronologies de l'ancienne et de la nouvelle salle ou
+        enseignant sont recalculées. L'index partagé n'est jamais modifié.
+        """
+        old = self.exams.get(exam.id)
+        if old is not None:
+            self._count(old, -1)
+        else:
+            self.module_exams.setdefault(exam.module_id, []).append(exam.id)
+        self.exams[exam.id] = exam
+        self._count(exam, 1)
+        for timelines, old_keys, new_keys in (
+            (self.room_timelines, set(self.exam_rooms(old)) if old else set(), set(self.exam_rooms(exam))),
+            (self.prof_timelines, {old.prof_id if old else None}, {exam.prof_id}),
+        ):
+            for key in (old_keys | new_keys) - {None}:
+                current = timelines.get(key, _EMPTY)
+                intervals = [
+                    interval for interval in zip(current.starts, current.ends, current.examen_ids)
+                    if interval[2] != exam.id
+                ]
+                if key in new_keys:
+                    intervals.append((exam.start, exam.end, exam.id))
+                timelines[key] = Timeline(intervals)
+
+    def exams_of_modules(self, module_ids: Iterable[int]) -> List[ExamSlot]:
+        return [
+            self.exams[examen_id]
+            for module_id in module_ids
+            for examen_id in self.module_exams.get(module_id, ())
+        ]
+
+    def room_timeline(self, salle_id: int) -> Timeline:
+        return self.room_timelines.get(salle_id, _EMPTY)
+
+    def prof_timeline(self, prof_id: int) -> Timeline:
+        return self.prof_timelines.get(prof_id, _EMPTY)
+
+    def prof_load(self, prof_id: int, day: date, ignore: Optional[ExamSlot] = None) -> int:
+        """Examens surveillés par l'enseignant ce jour-là (sans l'examen ignoré)"""
+        count = self.prof_days.get((prof_id, day), 0)
+        if ignore is not None and ignore.prof_id == prof_id and ignore.start.date() == day:
+            count -= 1
+        return count
+
+    def formation_load(self, formation_id: int, day: date, ignore: Optional[ExamSlot] = None) -> int:
+        """Examens de la formation ce jour-là (sans l'examen ignoré)"""
+        count = self.formation_days.get((formation_id, day), 0)
+        if ignore is not None and ignore.formation_id == formation_id and ignore.start.date() == day:
+            count -= 1
+        return count
+
+    def free_rooms(
+        self,
+        start: datetime,
+        end: datetime,
+        capacite_min: int = 0,
+        type: Optional[str] = None,
+        batiment: Optional[str] = None,
+        pmr: Optional[bool] = None,
+        equipements: Iterable[str] = (),
+        ignore_examen_ids: Iterable[int] = ()
+    ) -> List[Dict]:
+        """
+        Salles disponibles sur tout le créneau, de la plus petite capacité
+        suffisante à la plus grande.
+        """
+        ignore = set(ignore_examen_ids)
+        equipements = list(equipements)
+        result = []
+        for room in self.rooms.values():
+            if not room["disponible"] or room["capacite_examen"] < capacite_min:
+                continue
+            if type and room["type"] != type:
+                continue
+            if batiment and room["batiment"] != batiment:
+                continue
+            if pmr is not None and bool(room["accessibilite_pmr"]) != pmr:
+                continue
+            if any(not room["equipements"].get(item) for item in equipements):
+                continue
+            timeline = self.room_timelines.get(room["id"])
+            if timeline is not None and not timeline.is_free(start, end, ignore):
+                continue
+            result.append(room)
+        result.sort(key=lambda room: (room["capacite_examen"], room["code"]))
+        return result
+
+
+_index: Optional[OccupancyIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_occupancy_index(db: Session) -> OccupancyIndex:
+    """
+    Index courant, reconstruit si une écriture a été validée depuis ou
+    s'il a expiré (inscriptions et enseignants hors journal).
+    """
+    global _index
+    version = current_cursor(db)
+    with _index_lock:
+        index = _index
+        stale = (
+            index is None
+            or index.version != version
+            or time.monotonic() - index.built_at > settings.AVAILABILITY_INDEX_TTL
+        )
+        if stale:
+            index = OccupancyIndex.build(db, version)
+            _index = index
+        return index
+
+
+def reset_occupancy_index() -> None:
+    """Force la reconstruction au prochain appel (écriture locale sans journal)"""
+    global _index
+    with _index_lock:
+        _index = None
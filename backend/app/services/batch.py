@@ -0,0 +1,127 @@
+"""
+Set-based operations on many exams
+
+apply_exam_batch() applies one action (confirm, cancel, move, delete) to a
+selection of exams with a single UPDATE or DELETE statement: the planning
+read model and change-log triggers fire once per statement, the caller
+commits once and emits one invalidation. Exams whose status does not allow
+the action, including when it changed after the selection was read, and the
+exams of unpublished generation sessions (published only as a whole, by
+app.services.staging) are reported and left untouched. So are split exams
+when the move changes the room: their extra rooms and seat allocation
+(app.services.seating) only fit their own room.
+"""
+from datetime import timedelta
+from typing import Dict, List, Sequence, Tuple
+
+from sqlalchemy import delete, update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models import Examen, ExamStatus
+from app.services.seating import allocate_seats, detach_rooms, split_exam_ids
+from app.services.staging import lock_schedule
+
+BATCH_ACTIONS = ("confirm", "cancel", "move", "delete")
+
+# Statuts à partir desquels l'action est permise (None = tous)
+ALLOWED_STATUSES = {
+    "confirm": ("draft", "scheduled"),
+    "cancel": ("draft", "scheduled", "confirmed"),
+    "move": ("draft", "scheduled", "confirmed"),
+    "delete": None,
+}
+
+TARGET_STATUS = {
+    "confirm": ExamStatus.CONFIRMED,
+    "cancel": ExamStatus.CANCELLED,
+}
+
+
+def apply_exam_batch(db: Session, rows: Sequence, action: str, changes: Dict) -> Tuple[List[int], List[Dict]]:
+    """
+    Applique l'action aux examens sélectionnés (lignes id, date_heure,
+    statut, brouillon: session non publiée), sans valider la transaction.
+    changes (move): decalage_minutes, salle_id, prof_id, duree_minutes.
+    Renvoie (ids modifiés, examens ignorés avec la raison).
+    """
+    allowed = ALLOWED_STATUSES[action]
+    eligible, skipped = [], []
+    for row in rows:
+        statut = getattr(row.statut, "value", row.statut)
+        if row.brouillon:
+            skipped.append({"examen_id": row.id, "raison": "Session non publiée: publier ou abandonner la session"})
+        elif allowed is None or statut in allowed:
+            eligible.append(row)
+        else:
+            skipped.append({"examen_id": row.id, "raison": f"Statut {statut}: action {action} impossible"})
+    if action == "move" and changes.get("salle_id"):
+        split = split_exam_ids(db, [row.id for row in eligible])
+        skipped += [
+            {"examen_id": row.id, "raison": "Examen réparti sur plusieurs salles: salle non modifiable"}
+            for row in eligible if row.id in split
+        ]
+        eligible = [row for row in eligible if row.id not in split]
+    ids = [row.id for row in eligible]
+    if not ids:
+        return ids, skipped
+    # Pas de publication de session entre les contrôles et l'écriture
+    lock_schedule(db)
+
+    # Les lignes ont été lues sans verrou: le statut est revérifié dans la
+    # clause WHERE et seules les lignes effectivement touchées comptent
+    status_filter = [Examen.statut.in_(allowed)] if allowed is not None else []
+
+    if action == "delete":
+        result = db.execute(
+            delete(Examen).where(Examen.id.in_(ids), *status_filter)
+            .returning(Examen.id).execution_options(synchronize_session=False)
+        )
+        return _applied(ids, result, action, skipped)
+
+    if action in TARGET_STATUS:
+        values = {"statut": TARGET_STATUS[action]}
+    else:
+        values = {key: changes[key] for key in ("salle_id", "prof_id", "duree_minutes") if changes.get(key)}
+
+    shift = timedelta(minutes=changes.get("decalage_minutes") or 0)
+    if action == "move" and shift and db.get_bind().dialect.name != "postgresql":
+        # Pas d'arithmétique de dates portable: une requête par examen
+        applied = set()
+        for row in eligible:
+            applied.update(db.execute(
+                update(Examen).where(Examen.id == row.id, *status_filter)
+                .values(date_heure=row.date_heure + shift, **values)
+                .returning(Examen.id).execution_options(synchronize_session=False)
+            ).scalars())
+        return _reseat(db, values, *_applied(ids, applied, action, skipped))
+    if action == "move" and shift:
+        values["date_heure"] = Examen.date_heure + shift
+
+    result = db.execute(
+        update(Examen).where(Examen.id.in_(ids), *status_filter).values(**values)
+        .returning(Examen.id).execution_options(synchronize_session=False)
+    )
+    return _reseat(db, values, *_applied(ids, result, action, skipped))
+
+
+def _reseat(db: Session, values: Dict, applied: List[int], skipped: List[Dict]) -> Tuple[List[int], List[Dict]]:
+    """Salle changée: répartition des étudiants refaite dans la nouvelle salle"""
+    if "salle_id" in values:
+        seated = detach_rooms(db, applied)
+        if seated:
+            allocate_seats(db, seated, numeroter=settings.SCHEDULING_SEAT_NUMBERS)
+    return applied, skipped
+
+
+def _applied(ids: List[int], result, action: str, skipped: List[Dict]) -> Tuple[List[int], List[Dict]]:
+    """
+    Sépare les examens réellement modifiés (ids renvoyés par RETURNING) de
+    ceux modifiés ou supprimés entre la lecture et l'écriture.
+    """
+    touched = set(result if isinstance(result, set) else result.scalars())
+    skipped = skipped + [
+        {"examen_id": examen_id, "raison": f"Examen modifié entre-temps: action {action} non appliquée"}
+        for examen_id in ids if examen_id not in touched
+    ]
+    return [examen_id for examen_id in ids if examen_id in touched], skipped
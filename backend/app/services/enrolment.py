@@ -0,0 +1,138 @@
+"""
+Active enrolment counters (modules.nb_inscrits_actifs)
+
+Statement-level triggers on inscriptions apply the per-module delta of each
+INSERT, UPDATE (status or module change) or DELETE in the same transaction,
+so the scheduler and the room capacity check read one column instead of
+counting inscriptions. reconcile_enrolment_counts() repairs any drift
+(bulk loads with triggers disabled, manual fixes).
+"""
+from typing import List, Tuple
+
+from sqlalchemy import func, select, text, update
+from sqlalchemy.orm import Session
+
+from app.models import Inscription, InscriptionStatus, Module
+
+ENROLMENT_DDL: List[str] = [
+    "ALTER TABLE modules ADD COLUMN IF NOT EXISTS nb_inscrits_actifs INTEGER NOT NULL DEFAULT 0",
+    """
+-- Fonction: Appliquer le delta d'inscriptions actives par module (une fois par instruction)
+CREATE OR REPLACE FUNCTION apply_inscriptions_delta()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        UPDATE modules m SET nb_inscrits_actifs = m.nb_inscrits_actifs + d.delta
+        FROM (SELECT module_id, COUNT(*) AS delta FROM new_rows
+              WHERE statut = 'active' GROUP BY module_id) d
+        WHERE m.id = d.module_id;
+    ELSIF TG_OP = 'DELETE' THEN
+        UPDATE modules m SET nb_inscrits_actifs = m.nb_inscrits_actifs - d.delta
+        FROM (SELECT module_id, COUNT(*) AS delta FROM old_rows
+              WHERE statut = 'active' GROUP BY module_id) d
+        WHERE m.id = d.module_id;
+    ELSE
+        UPDATE modules m SET nb_inscrits_actifs = m.nb_inscrits_actifs + d.delta
+        FROM (SELECT module_id, SUM(delta) AS delta FROM (
+                  SELECT module_id, 1 AS delta FROM new_rows WHERE statut = 'active'
+                  UNION ALL
+                  SELECT module_id, -1 AS delta FROM old_rows WHERE statut = 'active'
+              ) changes GROUP BY module_id HAVING SUM(delta) <> 0) d
+        WHERE m.id = d.module_id;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql
+""",
+    "DROP TRIGGER IF EXISTS trg_inscriptions_count_insert ON inscriptions",
+    """
+CREATE TRIGGER trg_inscriptions_count_insert
+    AFTER INSERT ON inscriptions
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION apply_inscriptions_delta()
+""",
+    "DROP TRIGGER IF EXISTS trg_inscriptions_count_update ON inscriptions",
+    """
+CREATE TRIGGER trg_inscriptions_count_update
+    AFTER UPDATE ON inscriptions
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION apply_inscriptions_delta()
+""",
+    "DROP TRIGGER IF EXISTS trg_inscriptions_count_delete ON inscriptions",
+    """
+CREATE TRIGGER trg_inscriptions_count_delete
+    AFTER DELETE ON inscriptions
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION apply_inscriptions_delta()
+""",
+    # Rattrapage des compteurs existants (idempotent)
+    """
+UPDATE modules m SET nb_inscrits_actifs = c.nb
+FROM (SELECT mo.id, COUNT(i.id) AS nb FROM modules mo
+      LEFT JOIN inscriptions i ON i.module_id = mo.id AND i.statut = 'active'
+      GROUP BY mo.id) c
+WHERE m.id = c.id AND m.nb_inscrits_actifs <> c.nb
+""",
+    """
+-- Fonction: Vérifier la capacité de la salle
+CREATE OR REPLACE FUNCTION check_room_capacity()
+RETURNS TRIGGER AS $$
+DECLARE
+    room_capacity INTEGER;
+    student_count INTEGER;
+BEGIN
+    IF NEW.salle_id IS NOT NULL THEN
+        SELECT capacite / 2 INTO room_capacity
+        FROM lieux_examen WHERE id = NEW.salle_id;
+
+        SELECT nb_inscrits_actifs INTO student_count
+        FROM modules WHERE id = NEW.module_id;
+
+        IF student_count > room_capacity THEN
+            RAISE WARNING 'Capacité insuffisante: % étudiants pour % places', student_count, room_capacity;
+        END IF;
+
+        NEW.nb_inscrits := student_count;
+    END IF;
+
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql
+""",
+    "DROP TRIGGER IF EXISTS trg_check_room_capacity ON examens",
+    """
+CREATE TRIGGER trg_check_room_capacity
+    BEFORE INSERT OR UPDATE ON examens
+    FOR EACH ROW EXECUTE FUNCTION check_room_capacity()
+""",
+]
+
+
+def reconcile_enrolment_counts(db: Session, dry_run: bool = False) -> List[Tuple[int, int, int]]:
+    """
+    Recalcule les compteurs à partir des inscriptions actives.
+    Renvoie les modules corrigés: (module_id, ancien, nouveau).
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        # Bloque les écritures d'inscriptions le temps du recalcul (sinon un
+        # delta appliqué entre la lecture et la mise à jour serait perdu)
+        db.execute(text("LOCK TABLE inscriptions IN SHARE MODE"))
+
+    actual = select(func.count(Inscription.id)).where(
+        Inscription.module_id == Module.id,
+        Inscription.statut == InscriptionStatus.ACTIVE
+    ).correlate(Module).scalar_subquery()
+
+    drift = [
+        (module_id, stored, counted)
+        for module_id, stored, counted in db.query(Module.id, Module.nb_inscrits_actifs, actual).all()
+        if stored != counted
+    ]
+    if dry_run or not drift:
+        db.rollback()
+        return drift
+
+    for module_id, _, counted in drift:
+        db.execute(update(Module).where(Module.id == module_id).values(nb_inscrits_actifs=counted))
+    db.commit()
+    return drift
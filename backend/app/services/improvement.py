@@ -0,0 +1,358 @@
+"""
+Local-search improvement of a generated schedule
+
+improve_schedule() runs simulated annealing over the slot assignment of the
+exams just placed by the greedy or CP-SAT phase. A move either relocates one
+exam to another slot or swaps a Kempe chain between two slots (the exams of
+both slots connected to the chosen one in the shared-student graph). Rooms
+follow their exam when still free, otherwise the smallest free room that fits
+is taken; professors are kept. The hard rules stay those of the generator:
+room and professor overlaps, capacity, professor and formation daily limits.
+
+The objective counts students with two overlapping exams (heavily), students
+with exams on the same or close days (spread), and the squared number of
+exams per formation and day (fairness between days). A move re-evaluates only
+the edges of the moved exams and the counters of the days involved, so its
+cost is proportional to their degree, not to the size of the schedule.
+"""
+import math
+import random
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from app.services.availability import ExamSlot, OccupancyIndex
+from app.services.scheduler import MAX_EXAMS_PER_FORMATION_DAY
+
+# Pénalité par étudiant commun selon l'écart en jours (même jour, +1, +2, +3)
+SPREAD_WEIGHTS = (8.0, 4.0, 2.0, 1.0)
+# Pénalité par étudiant ayant deux examens simultanés
+CLASH_WEIGHT = 1000.0
+# Poids du carré du nombre d'examens par formation et par jour (x inscrits moyens)
+FAIRNESS_WEIGHT = 1.0
+KEMPE_PROBABILITY = 0.3
+MAX_KEMPE_CHAIN = 50
+# Arrêt anticipé après ce nombre de mouvements sans amélioration
+MAX_IDLE_MOVES = 200_000
+
+_EPOCH = datetime(2000, 1, 1)
+
+
+def _minutes(value: datetime) -> int:
+    return int((value - _EPOCH).total_seconds()) // 60
+
+
+def _pair_cost(start_a: int, duration_a: int, day_a: int,
+               start_b: int, duration_b: int, day_b: int, count: int) -> float:
+    if start_a < start_b + duration_b and start_b < start_a + duration_a:
+        return CLASH_WEIGHT * count
+    gap = abs(day_a - day_b)
+    return SPREAD_WEIGHTS[gap] * count if gap < len(SPREAD_WEIGHTS) else 0.0
+
+
+class ScheduleImprover:
+    """État du recuit simulé: créneau et salle de chaque examen déplaçable"""
+
+    def __init__(
+        self,
+        index: OccupancyIndex,
+        exams: Sequence[ExamSlot],
+        nb_inscrits: Dict[int, int],
+        time_slots: Sequence[datetime],
+        shared: Dict[int, Dict[int, int]],
+        seed: Optional[int] = None
+    ):
+        self.index = index
+        self.rng = random.Random(seed)
+        self.slots = sorted(set(time_slots))
+        slot_of = {slot: position for position, slot in enumerate(self.slots)}
+        self.slot_minutes = [_minutes(slot) for slot in self.slots]
+        self.slot_days = [slot.date().toordinal() for slot in self.slots]
+
+        # Seuls les examens placés sur la grille sont déplaçables
+        self.exams = [exam for exam in exams if exam.start in slot_of]
+        self.movable = {exam.id for exam in self.exams}
+        self.duration = [_minutes(exam.end) - _minutes(exam.start) for exam in self.exams]
+        self.formation = [exam.formation_id for exam in self.exams]
+        self.prof = [exam.prof_id for exam in self.exams]
+        self.size = [nb_inscrits.get(exam.id, 0) for exam in self.exams]
+        self.slot = [slot_of[exam.start] for exam in self.exams]
+        self.room = [exam.salle_id for exam in self.exams]
+        self.initial = (list(self.slot), list(self.room))
+
+        # Graphe des conflits: (voisin, inscrits communs) entre examens déplaçables,
+        # coût par créneau des examens figés ayant des étudiants en commun
+        positions: Dict[int, List[int]] = {}
+        for i, exam in enumerate(self.exams):
+            positions.setdefault(exam.module_id, []).append(i)
+        self.neighbours: List[List[Tuple[int, int]]] = [[] for _ in self.exams]
+        self.fixed_cost: List[Optional[List[float]]] = [None] * len(self.exams)
+        for i, exam in enumerate(self.exams):
+            counts = shared.get(exam.module_id, {})
+            for module_id, count in counts.items():
+                for j in positions.get(module_id, ()):
+                    if j != i:
+                        self.neighbours[i].append((j, count))
+            fixed = [
+                (_minutes(other.start), _minutes(other.end) - _minutes(other.start),
+                 other.start.date().toordinal(), counts[other.module_id])
+                for other in index.exams_of_modules(counts) if other.id not in self.movable
+            ]
+            if fixed:
+                self.fixed_cost[i] = [
+                    sum(_pair_cost(self.slot_minutes[s], self.duration[i], self.slot_days[s], *other)
+                        for other in fixed)
+                    for s in range(len(self.slots))
+                ]
+
+        # Charges par jour: examens figés comptés une fois, déplaçables suivis
+        self.formation_days: Counter = Counter()
+        self.fixed_prof_days: Counter = Counter()
+        for exam in index.exams.values():
+            if exam.id not in self.movable:
+                day = exam.start.date().toordinal()
+                self.formation_days[(exam.formation_id, day)] += 1
+                if exam.prof_id is not None:
+                    self.fixed_prof_days[(exam.prof_id, day)] += 1
+        self.prof_day_exams: Dict[Tuple[int, int], List[int]] = {}
+        self.room_day_exams: Dict[Tuple[int, int], List[int]] = {}
+        for i in range(len(self.exams)):
+            self._place(i, self.slot[i], self.room[i])
+
+        self.rooms = sorted(
+            (room for room in index.rooms.values() if room["disponible"]),
+            key=lambda room: (room["capacite_examen"], room["code"])
+        )
+        self._fixed_free: Dict[tuple, bool] = {}
+        mean_size = sum(self.size) / len(self.size) if self.size else 0
+        self.fairness_weight = FAIRNESS_WEIGHT * max(mean_size, 1)
+
+    # --- état -------------------------------------------------------------
+
+    def _place(self, i: int, s: int, room: Optional[int]) -> None:
+        day = self.slot_days[s]
+        self.slot[i] = s
+        self.room[i] = room
+        self.formation_days[(self.formation[i], day)] += 1
+        if self.prof[i] is not None:
+            self.prof_day_exams.setdefault((self.prof[i], day), []).append(i)
+        if room is not None:
+            self.room_day_exams.setdefault((room, day), []).append(i)
+
+    def _remove(self, i: int) -> None:
+        day = self.slot_days[self.slot[i]]
+        self.formation_days[(self.formation[i], day)] -= 1
+        if self.prof[i] is not None:
+            self.prof_day_exams[(self.prof[i], day)].remove(i)
+        if self.room[i] is not None:
+            self.room_day_exams[(self.room[i], day)].remove(i)
+
+    def _overlaps(self, i: int, s: int, others: Sequence[int]) -> bool:
+        start, end = self.slot_minutes[s], self.slot_minutes[s] + self.duration[i]
+        return any(
+            self.slot_minutes[self.slot[j]] < end and start < self.slot_minutes[self.slot[j]] + self.duration[j]
+            for j in others
+        )
+
+    def _free_of_fixed(self, kind: str, key: int, s: int, duration: int) -> bool:
+        """Salle ou enseignant libre vis-à-vis des examens figés (mémorisé)"""
+        memo_key = (kind, key, s, duration)
+        free = self._fixed_free.get(memo_key)
+        if free is None:
+            timeline = self.index.room_timeline(key) if kind == "salle" else self.index.prof_timeline(key)
+            start = self.slots[s]
+            free = timeline.is_free(start, start + timedelta(minutes=duration), self.movable)
+            self._fixed_free[memo_key] = free
+        return free
+
+    def _fit(self, i: int, s: int, preferred: Optional[int]) -> Tuple[bool, Optional[int]]:
+        """Placement de i au créneau s possible ? (oui/non, salle retenue)"""
+        day = self.slot_days[s]
+        if self.formation_days[(self.formation[i], day)] >= MAX_EXAMS_PER_FORMATION_DAY:
+            return False, None
+        prof_id = self.prof[i]
+        if prof_id is not None:
+            others = self.prof_day_exams.get((prof_id, day), ())
+            prof = self.index.professors.get(prof_id)
+            limit = prof["max_surveillances"] if prof else 3
+            if self.fixed_prof_days[(prof_id, day)] + len(others) >= limit:
+                return False, None
+            if self._overlaps(i, s, others) or not self._free_of_fixed("prof", prof_id, s, self.duration[i]):
+                return False, None
+        if preferred is None:
+            return True, None
+        candidates = [self.index.rooms.get(preferred)] + self.rooms
+        for room in candidates:
+            if room is None or not room["disponible"] or room["capacite_examen"] < self.size[i]:
+                continue
+            if self._overlaps(i, s, self.room_day_exams.get((room["id"], day), ())):
+                continue
+            if self._free_of_fixed("salle", room["id"], s, self.duration[i]):
+                return True, room["id"]
+        return False, None
+
+    # --- objectif -----------------------------------------------------------
+
+    def _exam_cost(self, i: int, skip: Optional[set] = None) -> float:
+        s = self.slot[i]
+        start, duration, day = self.slot_minutes[s], self.duration[i], self.slot_days[s]
+        cost = self.fixed_cost[i][s] if self.fixed_cost[i] else 0.0
+        for j, count in self.neighbours[i]:
+            # Arête interne à l'ensemble déplacé: comptée une seule fois
+            if skip is not None and j in skip and j < i:
+                continue
+            t = self.slot[j]
+            cost += _pair_cost(start, duration, day, self.slot_minutes[t], self.duration[j], self.slot_days[t], count)
+        return cost
+
+    def _local_cost(self, moved: Sequence[int], moved_set: set, keys: set) -> float:
+        cost = sum(self._exam_cost(i, moved_set) for i in moved)
+        return cost + self.fairness_weight * sum(self.formation_days[key] ** 2 for key in keys)
+
+    def total_cost(self) -> float:
+        spread = sum(self._exam_cost(i) for i in range(len(self.exams)))
+        # Arêtes entre déplaçables comptées deux fois ci-dessus
+        fixed = sum(self.fixed_cost[i][self.slot[i]] for i in range(len(self.exams)) if self.fixed_cost[i])
+        # Tous les jours des formations déplaçables, y compris ceux qui ne
+        # portent que des examens figés: un déplacement peut y arriver
+        formations = set(self.formation)
+        fairness = self.fairness_weight * sum(
+            count ** 2 for (formation_id, _), count in self.formation_days.items() if formation_id in formations
+        )
+        return (spread + fixed) / 2 + fairness
+
+    # --- mouvements ---------------------------------------------------------
+
+    def _kempe_chain(self, i: int, t: int) -> Optional[List[Tuple[int, int]]]:
+        s = self.slot[i]
+        chain, stack = {i}, [i]
+        while stack:
+            current = stack.pop()
+            for j, _ in self.neighbours[current]:
+                if j not in chain and self.slot[j] in (s, t):
+                    chain.add(j)
+                    if len(chain) > MAX_KEMPE_CHAIN:
+                        return None
+                    stack.append(j)
+        return [(j, t if self.slot[j] == s else s) for j in chain]
+
+    def try_moves(self, moves: List[Tuple[int, int]], temperature: float) -> Optional[float]:
+        """Applique les déplacements s'ils sont faisables et acceptés; renvoie le delta"""
+        moved = [i for i, _ in moves]
+        moved_set = set(moved)
+        keys = {(self.formation[i], self.slot_days[self.slot[i]]) for i in moved}
+        keys.update((self.formation[i], self.slot_days[s]) for i, s in moves)
+        before = self._local_cost(moved, moved_set, keys)
+        previous = [(i, self.slot[i], self.room[i]) for i in moved]
+
+        for i in moved:
+            self._remove(i)
+        placed = []
+        for i, s in moves:
+            ok, room = self._fit(i, s, self.room[i])
+            if not ok:
+                self._restore(placed, previous)
+                return None
+            self._place(i, s, room)
+            placed.append(i)
+
+        delta = self._local_cost(moved, moved_set, keys) - before
+        if delta <= 0 or (temperature > 0 and self.rng.random() < math.exp(-delta / temperature)):
+            return delta
+        self._restore(placed, previous)
+        return None
+
+    def _restore(self, placed: List[int], previous: List[Tuple[int, int, Optional[int]]]) -> None:
+        for i in placed:
+            self._remove(i)
+        for i, s, room in previous:
+            self._place(i, s, room)
+
+    def run(self, seconds: float) -> Dict:
+        """Recuit simulé pendant au plus seconds secondes; conserve le meilleur état"""
+        n, nb_slots = len(self.exams), len(self.slots)
+        cost = initial = self.total_cost()
+        stats = {"examens": n, "cout_initial": round(initial, 1), "iterations": 0,
+                 "mouvements_acceptes": 0, "chaines_kempe": 0}
+        if n == 0 or nb_slots < 2 or seconds <= 0:
+            stats.update(cout_final=stats["cout_initial"], duree_ms=0)
+            return stats
+
+        # Température initiale: accepter souvent un étudiant commun à J+1
+        weights = [count for edges in self.neighbours for _, count in edges]
+        t0 = 2 * SPREAD_WEIGHTS[1] * (sum(weights) / len(weights) if weights else 1.0)
+        t_end = t0 / 1000
+        best, best_state = cost, (list(self.slot), list(self.room))
+        started = time.perf_counter()
+        temperature, iterations, idle = t0, 0, 0
+        while True:
+            if iterations % 256 == 0:
+                elapsed = time.perf_counter() - started
+                if elapsed >= seconds or best <= 0 or idle > MAX_IDLE_MOVES:
+                    break
+                temperature = t0 * (t_end / t0) ** (elapsed / seconds)
+            iterations += 1
+            idle += 1
+
+            i = self.rng.randrange(n)
+            t = self.rng.randrange(nb_slots - 1)
+            if t >= self.slot[i]:
+                t += 1
+            if self.rng.random() < KEMPE_PROBABILITY:
+                moves = self._kempe_chain(i, t)
+                if moves is None:
+                    continue
+            else:
+                moves = [(i, t)]
+            delta = self.try_moves(moves, temperature)
+            if delta is None:
+                continue
+            cost += delta
+            stats["mouvements_acceptes"] += 1
+            if len(moves) > 1:
+                stats["chaines_kempe"] += 1
+            if cost < best - 1e-9:
+                best, best_state, idle = cost, (list(self.slot), list(self.room)), 0
+
+        elapsed = time.perf_counter() - started
+        for i in range(n):
+            self._remove(i)
+        for i in range(n):
+            self._place(i, best_state[0][i], best_state[1][i])
+        stats.update(
+            iterations=iterations,
+            cout_final=round(self.total_cost(), 1),
+            duree_ms=int(elapsed * 1000),
+            mouvements_par_seconde=int(iterations / elapsed) if elapsed else 0,
+        )
+        return stats
+
+    def changes(self) -> List[Dict]:
+        """Examens dont le créneau ou la salle a changé depuis l'état initial"""
+        return [
+            {"id": exam.id, "date_heure": self.slots[self.slot[i]], "salle_id": self.room[i]}
+            for i, exam in enumerate(self.exams)
+            if (self.slot[i], self.room[i]) != (self.initial[0][i], self.initial[1][i])
+        ]
+
+
+def improve_schedule(
+    index: OccupancyIndex,
+    exams: Sequence[ExamSlot],
+    nb_inscrits: Dict[int, int],
+    time_slots: Sequence[datetime],
+    shared: Dict[int, Dict[int, int]],
+    seconds: float,
+    seed: Optional[int] = None
+) -> Tuple[List[Dict], Dict]:
+    """
+    Améliore le placement des examens donnés (les autres restent figés).
+    shared: inscrits communs par module (shared_students()).
+    Renvoie (examens modifiés: id, date_heure, salle_id; statistiques).
+    """
+    improver = ScheduleImprover(index, exams, nb_inscrits, time_slots, shared, seed)
+    stats = improver.run(seconds)
+    changes = improver.changes()
+    stats["examens_deplaces"] = len(changes)
+    return changes, stats
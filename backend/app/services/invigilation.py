@@ -0,0 +1,400 @@
+"""
+Invigilator assignment (surveillances) by minimum-cost flow
+
+Every selected exam needs one responsible invigilator (its professor when it
+has one) and assistants, in proportion to its enrolment. Exams that overlap
+in time form a group; a professor invigilates at most one exam per group,
+none in a group that overlaps one of their kept exams or surveillances, and
+no more than max_surveillances exams per day.
+
+The network is source -> (group, department) -> professor and day (daily
+cap) -> professor -> sink, with one unit arc per professor and group.
+Professor-to-sink arcs have increasing unit costs (2k - 1 for the k-th exam,
+existing load included), so the minimum-cost flow minimises the sum of
+squared loads, i.e. balances them; going from a department to another
+through the group's common pool costs OTHER_DEPARTMENT_COST, so invigilators
+come from the exam's department when loads allow. Flow amounts are small
+integers and costs take few distinct values: the primal-dual solver below
+(one Dijkstra per cost level, then blocking flows on zero reduced-cost arcs)
+handles thousands of exams in a few seconds.
+"""
+import heapq
+import math
+import time
+from collections import Counter, defaultdict
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from sqlalchemy import delete, insert
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models import Examen, Formation, Module, Professeur, Surveillance
+from app.services.availability import live_exams
+
+# Coût d'un surveillant d'un autre département (x charge marginale)
+OTHER_DEPARTMENT_COST = 4
+
+_INFINITY = float("inf")
+
+
+class InvigilationExam(NamedTuple):
+    id: int
+    start: datetime
+    end: datetime
+    dept_id: Optional[int]
+    prof_id: Optional[int]  # responsable désigné
+    needed: int  # surveillants à affecter, responsable désigné non compris
+
+
+class InvigilationProf(NamedTuple):
+    id: int
+    dept_id: Optional[int]
+    max_per_day: int
+
+
+class _DeptArcs:
+    """Arcs d'un département dans un groupe d'examens"""
+
+    def __init__(self, node: int):
+        self.node = node
+        self.supply: Optional[int] = None  # source -> département (demande)
+        self.to_pool: Optional[int] = None  # département -> vivier commun
+        self.profs: List[Tuple[int, int]] = []  # (enseignant, arc)
+
+
+class MinCostFlow:
+    """Flot maximal de coût minimal (coûts entiers positifs), algorithme primal-dual"""
+
+    def __init__(self, nodes: int):
+        self.adjacency: List[List[int]] = [[] for _ in range(nodes)]
+        self.to: List[int] = []
+        self.capacity: List[int] = []
+        self.cost: List[int] = []
+
+    def add_node(self) -> int:
+        self.adjacency.append([])
+        return len(self.adjacency) - 1
+
+    def add_arc(self, tail: int, head: int, capacity: int, cost: int = 0) -> int:
+        """Ajoute un arc (et son arc inverse); renvoie son numéro pour flow()"""
+        arc = len(self.to)
+        self.to += [head, tail]
+        self.capacity += [capacity, 0]
+        self.cost += [cost, -cost]
+        self.adjacency[tail].append(arc)
+        self.adjacency[head].append(arc + 1)
+        return arc
+
+    def flow(self, arc: int) -> int:
+        return self.capacity[arc + 1]
+
+    def solve(self, source: int, sink: int) -> Tuple[int, int]:
+        """Renvoie (flot, coût)"""
+        n = len(self.adjacency)
+        adjacency, to, capacity, cost = self.adjacency, self.to, self.capacity, self.cost
+        potential = [0] * n
+        total_flow = total_cost = 0
+        while True:
+            # Plus courts chemins en coûts réduits (positifs grâce aux potentiels)
+            distance = [_INFINITY] * n
+            distance[source] = 0
+            heap = [(0, source)]
+            while heap:
+                d, u = heapq.heappop(heap)
+                if d > distance[u]:
+                    continue
+                if u == sink:
+                    break
+                base = d + potential[u]
+                for arc in adjacency[u]:
+                    if capacity[arc]:
+                        v = to[arc]
+                        candidate = base + cost[arc] - potential[v]
+                        if candidate < distance[v]:
+                            distance[v] = candidate
+                            heapq.heappush(heap, (candidate, v))
+            reach = distance[sink]
+            if reach == _INFINITY:
+                return total_flow, total_cost
+            for v in range(n):
+                potential[v] += min(distance[v], reach)
+
+            # Flot bloquant sur les arcs de coût réduit nul (niveaux BFS, type Dinic)
+            while True:
+                level = [-1] * n
+                level[source] = 0
+                queue = [source]
+                for u in queue:
+                    for arc in adjacency[u]:
+                        v = to[arc]
+                        if level[v] < 0 and capacity[arc] and cost[arc] + potential[u] == potential[v]:
+                            level[v] = level[u] + 1
+                            queue.append(v)
+                if level[sink] < 0:
+                    break
+                cursor = [0] * n
+                path: List[int] = []
+                u = source
+                while True:
+                    if u == sink:
+                        pushed = min(capacity[arc] for arc in path)
+                        for arc in path:
+                            capacity[arc] -= pushed
+                            capacity[arc ^ 1] += pushed
+                            total_cost += pushed * cost[arc]
+                        total_flow += pushed
+                        path.clear()
+                        u = source
+                        continue
+                    arcs = adjacency[u]
+                    position = cursor[u]
+                    while position < len(arcs):
+                        arc = arcs[position]
+                        v = to[arc]
+                        if (capacity[arc] and level[v] == level[u] + 1
+                                and cost[arc] + potential[u] == potential[v]):
+                            break
+                        position += 1
+                    cursor[u] = position
+                    if position < len(arcs):
+                        path.append(arcs[position])
+                        u = to[arcs[position]]
+                        continue
+                    # Impasse: retrait du nœud et retour en arrière
+                    if u == source:
+                        break
+                    level[u] = -1
+                    u = to[path.pop() ^ 1]
+                    cursor[u] += 1
+
+
+def invigilators_needed(nb_inscrits: Optional[int]) -> int:
+    """Surveillants d'un examen, responsable compris"""
+    per_invigilator = max(settings.INVIGILATION_STUDENTS_PER_INVIGILATOR, 1)
+    return max(1, math.ceil((nb_inscrits or 0) / per_invigilator))
+
+
+def _overlap_groups(exams: Sequence[InvigilationExam]) -> List[List[InvigilationExam]]:
+    """Examens qui se chevauchent (de proche en proche), par ordre chronologique"""
+    groups: List[List[InvigilationExam]] = []
+    group_end = None
+    for exam in sorted(exams, key=lambda exam: (exam.start, exam.id)):
+        if group_end is not None and exam.start < group_end:
+            groups[-1].append(exam)
+            group_end = max(group_end, exam.end)
+        else:
+            groups.append([exam])
+            group_end = exam.end
+    return groups
+
+
+def plan_invigilation(
+    exams: Sequence[InvigilationExam],
+    profs: Sequence[InvigilationProf],
+    busy: Dict[int, List[Tuple[datetime, datetime]]],
+    load: Dict[int, int],
+    day_load: Dict[Tuple[int, date], int]
+) -> Dict[int, List[int]]:
+    """
+    Surveillants affectés à chaque examen (par ordre de préférence), sans
+    accès à la base. busy: créneaux déjà occupés par enseignant (examens et
+    surveillances conservés); load et day_load: charge déjà affectée, au
+    total et par jour.
+    """
+    groups = _overlap_groups([exam for exam in exams if exam.needed > 0])
+    network = MinCostFlow(2)
+    source, sink = 0, 1
+
+    prof_node, prof_day_node = {}, {}
+    prof_capacity: Counter = Counter()
+
+    group_arcs = []  # par groupe: (examens, {dept_id: DeptArcs})
+    for group in groups:
+        start = min(exam.start for exam in group)
+        end = max(exam.end for exam in group)
+        day = start.date()
+        demand: Counter = Counter()
+        for exam in group:
+            demand[exam.dept_id] += exam.needed
+
+        # Un nœud par département (demande du département, enseignants du
+        # département) et un vivier commun pour les affectations croisées
+        any_node = network.add_node()
+        total = sum(demand.values())
+        depts: Dict[Optional[int], _DeptArcs] = {}
+
+        def dept_node(dept_id):
+            if dept_id not in depts:
+                node = network.add_node()
+                network.add_arc(any_node, node, total)
+                depts[dept_id] = _DeptArcs(node)
+            return depts[dept_id]
+
+        for dept_id, needed in demand.items():
+            arcs = dept_node(dept_id)
+            arcs.supply = network.add_arc(source, arcs.node, needed)
+            arcs.to_pool = network.add_arc(arcs.node, any_node, needed, OTHER_DEPARTMENT_COST)
+
+        for prof in profs:
+            remaining = prof.max_per_day - day_load.get((prof.id, day), 0)
+            if remaining <= 0:
+                continue
+            if any(busy_start < end and start < busy_end for busy_start, busy_end in busy.get(prof.id, ())):
+                continue
+            if prof.id not in prof_node:
+                prof_node[prof.id] = network.add_node()
+            if (prof.id, day) not in prof_day_node:
+                prof_day_node[prof.id, day] = network.add_node()
+                network.add_arc(prof_day_node[prof.id, day], prof_node[prof.id], remaining)
+                prof_capacity[prof.id] += remaining
+            # Arc unique de capacité 1: au plus un examen du groupe par enseignant
+            arcs = dept_node(prof.dept_id)
+            arcs.profs.append((prof.id, network.add_arc(arcs.node, prof_day_node[prof.id, day], 1)))
+        group_arcs.append((group, depts))
+
+    # Enseignant -> puits: coût marginal croissant de la charge totale
+    total_demand = sum(exam.needed for group in groups for exam in group)
+    for prof_id, node in prof_node.items():
+        existing = load.get(prof_id, 0)
+        for k in range(1, min(prof_capacity[prof_id], total_demand) + 1):
+            network.add_arc(node, sink, 1, 2 * (existing + k) - 1)
+
+    network.solve(source, sink)
+
+    # Répartition entre les examens du groupe: enseignants du département
+    # de l'examen, puis ceux du vivier; un surveillant par examen et par tour
+    assigned: Dict[int, List[int]] = {exam.id: [] for exam in exams}
+    for group, depts in group_arcs:
+        own, pool = {}, []
+        for dept_id, arcs in depts.items():
+            chosen = [prof_id for prof_id, arc in arcs.profs if network.flow(arc)]
+            kept = network.flow(arcs.supply) - network.flow(arcs.to_pool) if arcs.supply is not None else 0
+            own[dept_id] = chosen[:kept]
+            pool += chosen[kept:]
+        for dept_id, arcs in depts.items():
+            if arcs.supply is None:
+                continue
+            from_pool = network.flow(arcs.to_pool)
+            candidates = own[dept_id] + pool[:from_pool]
+            del pool[:from_pool]
+            dept_exams = [exam for exam in group if exam.dept_id == dept_id]
+            while candidates:
+                progressed = False
+                for exam in dept_exams:
+                    if candidates and len(assigned[exam.id]) < exam.needed:
+                        assigned[exam.id].append(candidates.pop(0))
+                        progressed = True
+                if not progressed:
+                    break
+    return assigned
+
+
+def assign_invigilators(
+    db: Session,
+    session_id: Optional[int] = None,
+    dept_ids: Optional[Iterable[int]] = None,
+    date_debut: Optional[datetime] = None,
+    date_fin: Optional[datetime] = None
+) -> Dict:
+    """
+    (Re)calcule les surveillances des examens actifs sélectionnés, sans
+    valider la transaction. Les surveillances des autres examens sont
+    conservées et comptent dans la charge des enseignants.
+    """
+    started = time.perf_counter()
+    query = db.query(
+        Examen.id, Examen.date_heure, Examen.duree_minutes, Examen.prof_id,
+        Examen.nb_inscrits, Formation.dept_id
+    ).join(Module, Module.id == Examen.module_id).join(
+        Formation, Formation.id == Module.formation_id
+    ).filter(live_exams())
+    if session_id is not None:
+        query = query.filter(Examen.session_id == session_id)
+    if dept_ids:
+        query = query.filter(Formation.dept_id.in_(list(dept_ids)))
+    if date_debut:
+        query = query.filter(Examen.date_heure >= date_debut)
+    if date_fin:
+        query = query.filter(Examen.date_heure <= date_fin)
+
+    exams = []
+    for row in query.all():
+        total = invigilators_needed(row.nb_inscrits)
+        exams.append(InvigilationExam(
+            row.id, row.date_heure, row.date_heure + timedelta(minutes=row.duree_minutes or 120),
+            row.dept_id, row.prof_id, total - 1 if row.prof_id else total
+        ))
+    selected = {exam.id for exam in exams}
+
+    profs = [
+        InvigilationProf(prof_id, dept_id, max_surveillances or 3)
+        for prof_id, dept_id, max_surveillances in db.query(
+            Professeur.id, Professeur.dept_id, Professeur.max_surveillances
+        ).order_by(Professeur.id).all()
+    ]
+
+    # Engagements conservés: examens dont l'enseignant est responsable et
+    # surveillances des examens non sélectionnés
+    engagements = {}
+    for examen_id, prof_id, start, duree in db.query(
+        Examen.id, Examen.prof_id, Examen.date_heure, Examen.duree_minutes
+    ).filter(live_exams(), Examen.prof_id.isnot(None)).all():
+        engagements[examen_id, prof_id] = (start, start + timedelta(minutes=duree or 120))
+    kept = db.query(
+        Surveillance.examen_id, Surveillance.prof_id, Examen.date_heure, Examen.duree_minutes
+    ).join(Examen, Examen.id == Surveillance.examen_id).filter(
+        live_exams()
+    )
+    if selected:
+        kept = kept.filter(Surveillance.examen_id.notin_(selected))
+    for examen_id, prof_id, start, duree in kept.all():
+        engagements[examen_id, prof_id] = (start, start + timedelta(minutes=duree or 120))
+
+    days = {exam.start.date() for exam in exams}
+    busy: Dict[int, List[Tuple[datetime, datetime]]] = defaultdict(list)
+    load: Counter = Counter()
+    day_load: Counter = Counter()
+    for (_, prof_id), (start, end) in engagements.items():
+        load[prof_id] += 1
+        day_load[prof_id, start.date()] += 1
+        if start.date() in days:
+            busy[prof_id].append((start, end))
+
+    assigned = plan_invigilation(exams, profs, busy, load, day_load)
+
+    rows = []
+    missing = incomplete = 0
+    for exam in exams:
+        invigilators = assigned[exam.id]
+        responsible = exam.prof_id or (invigilators[0] if invigilators else None)
+        if responsible is not None:
+            rows.append({"examen_id": exam.id, "prof_id": responsible, "role": "responsable"})
+        rows += [
+            {"examen_id": exam.id, "prof_id": prof_id, "role": "surveillant"}
+            for prof_id in invigilators if prof_id != responsible
+        ]
+        if len(invigilators) < exam.needed:
+            missing += exam.needed - len(invigilators)
+            incomplete += 1
+        for prof_id in invigilators:
+            load[prof_id] += 1
+
+    if selected:
+        db.execute(delete(Surveillance).where(
+            Surveillance.examen_id.in_(selected)
+        ).execution_options(synchronize_session=False))
+    if rows:
+        db.execute(insert(Surveillance), rows)
+
+    loads = [load.get(prof.id, 0) for prof in profs]
+    return {
+        "nb_examens": len(exams),
+        "nb_surveillances": len(rows),
+        "nb_postes_non_pourvus": missing,
+        "nb_examens_incomplets": incomplete,
+        "charge_min": min(loads) if loads else 0,
+        "charge_max": max(loads) if loads else 0,
+        "charge_moyenne": round(sum(loads) / len(loads), 2) if loads else 0.0,
+        "temps_calcul_ms": int((time.perf_counter() - started) * 1000),
+    }
@@ -0,0 +1,154 @@
+"""
+Denormalized exam read model (examens_planning)
+
+One row per exam with the module, formation, department, room and professor
+columns that listings and aggregates display or filter on, so those reads hit
+a single indexed table instead of joining six. PostgreSQL triggers keep it in
+sync: statement-level triggers on examens (one refresh per INSERT/UPDATE
+statement, however many rows a generation writes), row-level triggers on the
+referenced tables when a displayed column changes, and ON DELETE CASCADE.
+"""
+from typing import List
+
+PLANNING_DDL: List[str] = [
+    """
+-- Fonction: (Re)calculer les lignes de examens_planning pour des examens
+CREATE OR REPLACE FUNCTION refresh_examens_planning(p_ids INTEGER[])
+RETURNS VOID AS $$
+BEGIN
+    IF p_ids IS NULL OR cardinality(p_ids) = 0 THEN
+        RETURN;
+    END IF;
+
+    INSERT INTO examens_planning (
+        examen_id, module_id, module_code, module_nom,
+        formation_id, formation_code, formation_nom,
+        dept_id, dept_code, dept_nom,
+        prof_id, prof_nom,
+        salle_id, salle_code, salle_nom, salle_batiment, salle_capacite,
+        date_heure, date_fin, duree_minutes, statut, session_id, nb_inscrits, updated_at
+    )
+    SELECT
+        e.id, m.id, m.code, m.nom,
+        f.id, f.code, f.nom,
+        d.id, d.code, d.nom,
+        p.id, p.prenom || ' ' || p.nom,
+        l.id, l.code, l.nom, l.batiment, l.capacite / 2,
+        e.date_heure, e.date_heure + make_interval(mins => e.duree_minutes), e.duree_minutes,
+        e.statut::text, e.session_id, e.nb_inscrits, e.updated_at
+    FROM examens e
+    JOIN modules m ON m.id = e.module_id
+    JOIN formations f ON f.id = m.formation_id
+    JOIN departements d ON d.id = f.dept_id
+    LEFT JOIN professeurs p ON p.id = e.prof_id
+    LEFT JOIN lieux_examen l ON l.id = e.salle_id
+    WHERE e.id = ANY(p_ids)
+    ON CONFLICT (examen_id) DO UPDATE SET
+        module_id = EXCLUDED.module_id,
+        module_code = EXCLUDED.module_code,
+        module_nom = EXCLUDED.module_nom,
+        formation_id = EXCLUDED.formation_id,
+        formation_code = EXCLUDED.formation_code,
+        formation_nom = EXCLUDED.formation_nom,
+        dept_id = EXCLUDED.dept_id,
+        dept_code = EXCLUDED.dept_code,
+        dept_nom = EXCLUDED.dept_nom,
+        prof_id = EXCLUDED.prof_id,
+        prof_nom = EXCLUDED.prof_nom,
+        salle_id = EXCLUDED.salle_id,
+        salle_code = EXCLUDED.salle_code,
+        salle_nom = EXCLUDED.salle_nom,
+        salle_batiment = EXCLUDED.salle_batiment,
+        salle_capacite = EXCLUDED.salle_capacite,
+        date_heure = EXCLUDED.date_heure,
+        date_fin = EXCLUDED.date_fin,
+        duree_minutes = EXCLUDED.duree_minutes,
+        statut = EXCLUDED.statut,
+        session_id = EXCLUDED.session_id,
+        nb_inscrits = EXCLUDED.nb_inscrits,
+        updated_at = EXCLUDED.updated_at;
+END;
+$$ LANGUAGE plpgsql
+""",
+    """
+-- Fonction: Rafraîchir les examens insérés ou modifiés (une fois par instruction)
+CREATE OR REPLACE FUNCTION sync_examens_planning()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM refresh_examens_planning(ARRAY(SELECT id FROM new_rows));
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql
+""",
+    "DROP TRIGGER IF EXISTS trg_examens_planning_insert ON examens",
+    """
+CREATE TRIGGER trg_examens_planning_insert
+    AFTER INSERT ON examens
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION sync_examens_planning()
+""",
+    "DROP TRIGGER IF EXISTS trg_examens_planning_update ON examens",
+    """
+CREATE TRIGGER trg_examens_planning_update
+    AFTER UPDATE ON examens
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION sync_examens_planning()
+""",
+    """
+-- Fonction: Propager les changements de module, formation, département, enseignant ou salle
+CREATE OR REPLACE FUNCTION sync_examens_planning_refs()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_ids INTEGER[];
+BEGIN
+    IF TG_TABLE_NAME = 'modules' THEN
+        SELECT array_agg(id) INTO v_ids FROM examens WHERE module_id = NEW.id;
+    ELSIF TG_TABLE_NAME = 'formations' THEN
+        SELECT array_agg(examen_id) INTO v_ids FROM examens_planning WHERE formation_id = NEW.id;
+    ELSIF TG_TABLE_NAME = 'departements' THEN
+        SELECT array_agg(examen_id) INTO v_ids FROM examens_planning WHERE dept_id = NEW.id;
+    ELSIF TG_TABLE_NAME = 'professeurs' THEN
+        SELECT array_agg(id) INTO v_ids FROM examens WHERE prof_id = NEW.id;
+    ELSIF TG_TABLE_NAME = 'lieux_examen' THEN
+        SELECT array_agg(id) INTO v_ids FROM examens WHERE salle_id = NEW.id;
+    END IF;
+    PERFORM refresh_examens_planning(v_ids);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql
+""",
+    "DROP TRIGGER IF EXISTS trg_planning_modules ON modules",
+    """
+CREATE TRIGGER trg_planning_modules
+    AFTER UPDATE OF code, nom, formation_id ON modules
+    FOR EACH ROW EXECUTE FUNCTION sync_examens_planning_refs()
+""",
+    "DROP TRIGGER IF EXISTS trg_planning_formations ON formations",
+    """
+CREATE TRIGGER trg_planning_formations
+    AFTER UPDATE OF code, nom, dept_id ON formations
+    FOR EACH ROW EXECUTE FUNCTION sync_examens_planning_refs()
+""",
+    "DROP TRIGGER IF EXISTS trg_planning_departements ON departements",
+    """
+CREATE TRIGGER trg_planning_departements
+    AFTER UPDATE OF code, nom ON departements
+    FOR EACH ROW EXECUTE FUNCTION sync_examens_planning_refs()
+""",
+    "DROP TRIGGER IF EXISTS trg_planning_professeurs ON professeurs",
+    """
+CREATE TRIGGER trg_planning_professeurs
+    AFTER UPDATE OF nom, prenom ON professeurs
+    FOR EACH ROW EXECUTE FUNCTION sync_examens_planning_refs()
+""",
+    "DROP TRIGGER IF EXISTS trg_planning_lieux_examen ON lieux_examen",
+    """
+CREATE TRIGGER trg_planning_lieux_examen
+    AFTER UPDATE OF code, nom, batiment, capacite ON lieux_examen
+    FOR EACH ROW EXECUTE FUNCTION sync_examens_planning_refs()
+""",
+    "CREATE INDEX IF NOT EXISTS idx_planning_module_search_trgm ON examens_planning "
+    "USING gin ((module_code || ' ' || module_nom) gin_trgm_ops)",
+    # Rattrapage des examens existants (idempotent)
+    "SELECT refresh_examens_planning(ARRAY(SELECT id FROM examens))",
+]
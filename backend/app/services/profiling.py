@@ -0,0 +1,102 @@
+"""
+Instrumentation of EDT generation runs
+"""
+import resource
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+
+class GenerationProfiler:
+    """
+    Collecte les métriques d'une génération d'EDT, phase par phase.
+
+    Pour chaque phase (chargement, modélisation, résolution, persistance):
+    durée, nombre de requêtes SQL, temps passé en base et lignes traitées.
+    S'y ajoutent les statistiques du solveur et la mémoire maximale du
+    processus. Seules les requêtes émises par le thread de la génération
+    sont comptées.
+    """
+
+    def __init__(self, db: Session):
+        self.engine: Engine = db.get_bind()
+        self.thread_id = threading.get_ident()
+        self.phases: Dict[str, Dict[str, float]] = {}
+        self.solver: Dict = {}
+        self._current: Optional[str] = None
+        self._started = time.perf_counter()
+        self._rss_start_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        self._totals = {"requetes": 0, "lignes": 0, "db_ms": 0.0}
+        event.listen(self.engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(self.engine, "after_cursor_execute", self._after_cursor_execute)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if threading.get_ident() == self.thread_id:
+            conn.info.setdefault("profiler_start", []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if threading.get_ident() != self.thread_id or not conn.info.get("profiler_start"):
+            return
+        elapsed_ms = (time.perf_counter() - conn.info["profiler_start"].pop()) * 1000
+        rows = max(cursor.rowcount or 0, 0)
+        targets = [self._totals]
+        if self._current:
+            targets.append(self.phases[self._current])
+        for target in targets:
+            target["requetes"] += 1
+            target["lignes"] += rows
+            target["db_ms"] += elapsed_ms
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Mesure une phase; les appels répétés d'une même phase se cumulent"""
+        previous = self._current
+        stats = self.phases.setdefault(name, {"ms": 0.0, "requetes": 0, "lignes": 0, "db_ms": 0.0})
+        self._current = name
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            stats["ms"] += (time.perf_counter() - start) * 1000
+            self._current = previous
+
+    def phases_ms(self) -> Dict[str, int]:
+        """Durée de chaque phase en millisecondes"""
+        return {name: int(stats["ms"]) for name, stats in self.phases.items()}
+
+    def close(self) -> None:
+        """Détache les écouteurs SQL (à appeler en fin de génération)"""
+        if event.contains(self.engine, "before_cursor_execute", self._before_cursor_execute):
+            event.remove(self.engine, "before_cursor_execute", self._before_cursor_execute)
+            event.remove(self.engine, "after_cursor_execute", self._after_cursor_execute)
+
+    def to_dict(self) -> Dict:
+        """Métriques sérialisables en JSON (colonne sessions_generation.metriques)"""
+        rss_peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return {
+            "total_ms": int((time.perf_counter() - self._started) * 1000),
+            "phases": {
+                name: {
+                    "ms": int(stats["ms"]),
+                    "requetes": int(stats["requetes"]),
+                    "lignes": int(stats["lignes"]),
+                    "db_ms": round(stats["db_ms"], 1),
+                }
+                for name, stats in self.phases.items()
+            },
+            "sql": {
+                "requetes": int(self._totals["requetes"]),
+                "lignes": int(self._totals["lignes"]),
+                "db_ms": round(self._totals["db_ms"], 1),
+            },
+            "solveur": self.solver,
+            "memoire": {
+                "rss_max_kb": rss_peak_kb,
+                "rss_croissance_kb": max(rss_peak_kb - self._rss_start_kb, 0),
+            },
+        }
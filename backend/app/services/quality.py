@@ -0,0 +1,177 @@
+"""
+Quality indicators of a generated schedule
+
+score_session() loads the exams of a generation session and the matching
+active enrolments as NumPy arrays (one row per student and exam) and computes
+every indicator with array operations: exams per student and day, gaps
+between a student's successive exams, simultaneous exams, building changes
+within a day, room fill ratio (over every room of a split exam) and
+professor load balance. A few queries and sorts, so a full university
+session is scored in well under a second.
+"""
+import time
+from datetime import datetime
+from typing import Dict, Optional
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.models import (
+    Examen, ExamenSalle, ExamStatus, Formation, Inscription, InscriptionStatus, LieuExamen, Module, Professeur
+)
+
+_EPOCH = datetime(2000, 1, 1)
+_MINUTES_PER_DAY = 24 * 60
+
+
+def _round(value, digits: int = 3) -> float:
+    return round(float(value), digits)
+
+
+def _student_indicators(student: np.ndarray, start: np.ndarray, end: np.ndarray,
+                        day: np.ndarray, building: np.ndarray) -> Dict:
+    """Indicateurs étudiants; une ligne par (étudiant, examen)"""
+    order = np.lexsort((start, student))
+    student, start, end, day, building = student[order], start[order], end[order], day[order], building[order]
+
+    # Examens successifs d'un même étudiant
+    same = student[1:] == student[:-1]
+    clash = same & (start[1:] < end[:-1])
+    gap = day[1:] - day[:-1]
+    same_day = same & ~clash & (gap == 0)
+    building_change = same & (gap == 0) & (building[1:] != building[:-1]) & (building[1:] >= 0) & (building[:-1] >= 0)
+
+    # Examens par étudiant et par jour
+    _, per_day = np.unique(student.astype(np.int64) * 100_000 + day, return_counts=True)
+    per_day_hist = np.bincount(np.minimum(per_day, 3), minlength=4)
+    gaps = gap[same]
+    gap_hist = np.bincount(np.minimum(gaps, 3), minlength=4) if gaps.size else np.zeros(4, dtype=np.int64)
+
+    return {
+        "nb_etudiants": int(np.unique(student).size),
+        "nb_epreuves": int(student.size),
+        "examens_par_jour": {"1": int(per_day_hist[1]), "2": int(per_day_hist[2]), "3+": int(per_day_hist[3])},
+        "max_examens_jour": int(per_day.max()) if per_day.size else 0,
+        "conflits": int(clash.sum()),
+        "ecarts_jours": {
+            "0": int(gap_hist[0]), "1": int(gap_hist[1]), "2": int(gap_hist[2]), "3+": int(gap_hist[3])
+        },
+        "ecart_moyen_jours": _round(gaps.mean(), 2) if gaps.size else 0.0,
+        "etudiants_rapproches": int(np.unique(student[1:][same & (gap <= 1)]).size),
+        "changements_batiment": int(building_change.sum()),
+        # Pour le score global
+        "_paires": int(same.sum()),
+        "_meme_jour": int(same_day.sum()),
+        "_consecutifs": int((same & (gap == 1)).sum()),
+        "_jour_commun": int((same & (gap == 0)).sum()),
+    }
+
+
+def score_session(db: Session, session_id: int) -> Optional[Dict]:
+    """
+    Indicateurs de qualité des examens de la session, brouillons compris
+    (None si elle n'a aucun examen). score_global (0-100) est la moyenne de
+    quatre notes: étudiants (conflits, même jour, jours consécutifs), remplissage des
+    salles, équilibre des charges enseignantes et changements de bâtiment.
+    """
+    started = time.perf_counter()
+    exams = db.query(
+        Examen.id, Examen.prof_id, Examen.date_heure, Examen.duree_minutes,
+        LieuExamen.capacite, LieuExamen.batiment, Formation.dept_id
+    ).select_from(Examen).join(Module, Module.id == Examen.module_id).join(
+        Formation, Formation.id == Module.formation_id
+    ).outerjoin(LieuExamen, LieuExamen.id == Examen.salle_id).filter(
+        Examen.session_id == session_id,
+        Examen.statut != ExamStatus.CANCELLED
+    ).order_by(Examen.id).all()
+    if not exams:
+        return None
+
+    n = len(exams)
+    exam_ids = np.fromiter((row.id for row in exams), dtype=np.int64, count=n)
+    exam_start = np.fromiter(
+        (int((row.date_heure - _EPOCH).total_seconds()) // 60 for row in exams), dtype=np.int64, count=n
+    )
+    exam_end = exam_start + np.fromiter((row.duree_minutes or 120 for row in exams), dtype=np.int64, count=n)
+    buildings: Dict[str, int] = {}
+    exam_building = np.fromiter(
+        (buildings.setdefault(row.batiment, len(buildings)) if row.batiment else -1 for row in exams),
+        dtype=np.int64, count=n
+    )
+    # Examens répartis: places de toutes leurs salles (salle principale comprise)
+    split_capacity: Dict[int, int] = {}
+    for examen_id, room_capacity in db.query(ExamenSalle.examen_id, LieuExamen.capacite).join(
+        LieuExamen, LieuExamen.id == ExamenSalle.salle_id
+    ).join(Examen, Examen.id == ExamenSalle.examen_id).filter(Examen.session_id == session_id).all():
+        split_capacity[examen_id] = split_capacity.get(examen_id, 0) + (room_capacity or 0) // 2
+    capacity = np.fromiter(
+        (split_capacity.get(row.id, (row.capacite or 0) // 2) for row in exams), dtype=np.int64, count=n
+    )
+    prof = np.fromiter((row.prof_id or 0 for row in exams), dtype=np.int64, count=n)
+
+    pairs = np.array(db.query(Inscription.etudiant_id, Examen.id).join(
+        Examen, Examen.module_id == Inscription.module_id
+    ).filter(
+        Examen.session_id == session_id,
+        Examen.statut != ExamStatus.CANCELLED,
+        Inscription.statut == InscriptionStatus.ACTIVE
+    ).all(), dtype=np.int64).reshape(-1, 2)
+    exam_index = np.searchsorted(exam_ids, pairs[:, 1])
+    students = _student_indicators(
+        pairs[:, 0], exam_start[exam_index], exam_end[exam_index],
+        exam_start[exam_index] // _MINUTES_PER_DAY, exam_building[exam_index]
+    )
+
+    # Remplissage des salles: inscrits / places d'examen (capacité / 2)
+    enrolled = np.bincount(exam_index, minlength=n)
+    with_room = capacity > 0
+    fill = enrolled[with_room] / capacity[with_room]
+    rooms = {
+        "nb_examens_avec_salle": int(with_room.sum()),
+        "taux_remplissage_moyen": _round(fill.mean()) if fill.size else 0.0,
+        "taux_remplissage_median": _round(np.median(fill)) if fill.size else 0.0,
+        "taux_remplissage_p10": _round(np.percentile(fill, 10)) if fill.size else 0.0,
+        "salles_moins_50": int((fill < 0.5).sum()),
+        "depassements_capacite": int((fill > 1).sum()),
+    }
+
+    # Charge des enseignants des départements concernés (y compris sans examen)
+    dept_ids = {row.dept_id for row in exams}
+    prof_ids = np.array(sorted(
+        {prof_id for (prof_id,) in db.query(Professeur.id).filter(Professeur.dept_id.in_(dept_ids)).all()}
+        | set(prof[prof > 0].tolist())
+    ), dtype=np.int64)
+    assigned = prof > 0
+    load = np.bincount(np.searchsorted(prof_ids, prof[assigned]), minlength=prof_ids.size)
+    _, per_day = np.unique(prof[assigned] * 100_000 + exam_start[assigned] // _MINUTES_PER_DAY, return_counts=True)
+    mean_load = load.mean() if load.size else 0.0
+    cv = load.std() / mean_load if mean_load else 0.0
+    professors = {
+        "nb_enseignants": int(prof_ids.size),
+        "charge_moyenne": _round(mean_load, 2),
+        "charge_ecart_type": _round(load.std(), 2) if load.size else 0.0,
+        "charge_min": int(load.min()) if load.size else 0,
+        "charge_max": int(load.max()) if load.size else 0,
+        "coefficient_variation": _round(cv),
+        "max_examens_jour": int(per_day.max()) if per_day.size else 0,
+    }
+
+    paires = students.pop("_paires")
+    meme_jour = students.pop("_meme_jour")
+    consecutifs = students.pop("_consecutifs")
+    jour_commun = students.pop("_jour_commun")
+    notes = [
+        1 - min((students["conflits"] + 0.5 * meme_jour + 0.25 * consecutifs) / paires, 1) if paires else 1.0,
+        float(np.minimum(fill, 1).mean()) if fill.size else 1.0,
+        max(0.0, 1 - cv),
+        1 - students["changements_batiment"] / jour_commun if jour_commun else 1.0,
+    ]
+    return {
+        "session_id": session_id,
+        "nb_examens": n,
+        "score_global": round(100 * sum(notes) / len(notes), 1),
+        "etudiants": students,
+        "salles": rooms,
+        "enseignants": professors,
+        "temps_calcul_ms": int((time.perf_counter() - started) * 1000),
+    }
@@ -1,26 +1,63 @@
 """
 Exam Scheduling Service with OR-Tools Optimization
 """
+import importlib.util
 import time
-from datetime import datetime, timedelta
+from contextlib import nullcontext
+from datetime import date, datetime, timedelta
 from typing import List, Dict, Optional, Tuple
 from sqlalchemy.orm import Session
-from sqlalchemy import func, and_, or_
+from sqlalchemy import and_, or_, text, update
 
-# Try to import ortools, but don't fail if not available
-try:
-    from ortools.sat.python import cp_model
-    ORTOOLS_AVAILABLE = True
-except ImportError:
-    ORTOOLS_AVAILABLE = False
-    cp_model = None
+# OR-Tools is optional and slow to import: only check that it is installed
+# here, the module itself is loaded on first use by _load_cp_model()
+ORTOOLS_AVAILABLE = importlib.util.find_spec("ortools") is not None
+_cp_model = None
+
+
+def _load_cp_model():
+    """Importe ortools.sat.python.cp_model au premier appel"""
+    global _cp_model
+    if _cp_model is None:
+        from ortools.sat.python import cp_model
+        _cp_model = cp_model
+    return _cp_model
 
 from app.models import (
-    Examen, Module, LieuExamen, Professeur, Inscription, 
+    Examen, Module, LieuExamen, Professeur,
     Etudiant, Formation, Departement, SessionGeneration,
-    ExamStatus, SessionStatus, InscriptionStatus
+    ExamStatus, SessionStatus, ExamenSalle
 )
+from app.core import metrics
 from app.core.config import settings
+from app.services.profiling import GenerationProfiler
+from app.services.seating import allocate_seats, choose_rooms, detach_rooms
+from app.services.availability import INACTIVE_STATUSES, live_exams, unpublished_sql
+from app.services.snapshots import capture_snapshot, live_placements
+from app.services.staging import discard_session_drafts, lock_schedule, publish_session
+
+
+# Créneaux d'examen (heures de début), du lundi au vendredi
+SLOT_HOURS = (8, 10, 14, 16)
+# Examens par jour et par formation (assoupli à 2 pour rester faisable)
+MAX_EXAMS_PER_FORMATION_DAY = 2
+
+
+def generate_time_slots(date_debut: datetime, date_fin: datetime) -> List[datetime]:
+    """Créneaux d'examen entre deux dates (week-ends exclus)"""
+    slots = []
+    current = date_debut.replace(hour=8, minute=0, second=0, microsecond=0)
+    
+    while current <= date_fin:
+        # Skip weekends
+        if current.weekday() < 5:  # Lundi à Vendredi
+            for hour in SLOT_HOURS:
+                slot = current.replace(hour=hour)
+                if slot <= date_fin:
+                    slots.append(slot)
+        current += timedelta(days=1)
+    
+    return slots
 
 
 class ExamScheduler:
@@ -29,16 +66,30 @@ class ExamScheduler:
     utilisant Google OR-Tools (Constraint Programming) ou algorithme glouton
     """
     
-    def __init__(self, db: Session):
+    STRATEGIES = ("greedy", "ortools")
+    
+    def __init__(
+        self,
+        db: Session,
+        max_modules: Optional[int] = None,
+        max_rooms: Optional[int] = None,
+        max_professors: Optional[int] = None
+    ):
         self.db = db
         self.ortools_available = ORTOOLS_AVAILABLE
-        if ORTOOLS_AVAILABLE:
-            self.model = cp_model.CpModel()
-            self.solver = cp_model.CpSolver()
-            self.solver.parameters.max_time_in_seconds = settings.SCHEDULING_TIMEOUT_SECONDS
-        else:
-            self.model = None
-            self.solver = None
+        # Limites de taille du problème (None = configuration, 0 = sans limite)
+        self.max_modules = settings.SCHEDULING_MAX_MODULES if max_modules is None else max_modules
+        self.max_rooms = settings.SCHEDULING_MAX_ROOMS if max_rooms is None else max_rooms
+        self.max_professors = settings.SCHEDULING_MAX_PROFESSORS if max_professors is None else max_professors
+        # Instrumentation de la génération en cours
+        self.profiler: Optional[GenerationProfiler] = None
+        # Modèle CP-SAT, créé à la demande par _ortools_schedule()
+        self.model = None
+        self.solver = None
+    
+    def _phase(self, name: str):
+        """Mesure une phase si une génération est instrumentée"""
+        return self.profiler.phase(name) if self.profiler else nullcontext()
         
     def generate_schedule(
         self,
@@ -46,13 +97,40 @@ class ExamScheduler:
         date_fin: datetime,
         dept_ids: Optional[List[int]] = None,
         formation_ids: Optional[List[int]] = None,
-        user_id: int = None
+        user_id: int = None,
+        strategy: Optional[str] = None,
+        amelioration_secondes: Optional[float] = None,
+        publier: Optional[bool] = None
     ) -> Dict:
         """
         Génère un emploi du temps optimisé pour les examens.
-        Uses OR-Tools first, falls back to greedy algorithm if OR-Tools fails.
+        
+        strategy: "greedy" (par défaut) ou "ortools". La stratégie OR-Tools
+        se replie sur l'algorithme glouton si le solveur est absent ou ne
+        trouve pas de solution.
+        amelioration_secondes: budget de la recherche locale qui étale les
+        examens des étudiants après le placement (None = configuration,
+        0 = désactivée).
+        
+        Un module plus grand que toutes les salles est réparti sur plusieurs
+        salles du même créneau (app.services.seating), ses étudiants affectés
+        à une salle et, selon SCHEDULING_SEAT_NUMBERS, à une place.
+        
+        Les examens sont écrits dans une session brouillon, invisibles
+        jusqu'à sa publication (app.services.staging): immédiatement si
+        publier (None = SCHEDULING_AUTO_PUBLISH), sinon par
+        POST /api/sessions/{id}/publish. Une génération en échec ne laisse
+        aucun examen.
         """
         start_time = time.time()
+        strategy = strategy or settings.SCHEDULING_STRATEGY
+        if amelioration_secondes is None:
+            amelioration_secondes = settings.SCHEDULING_IMPROVE_SECONDS
+        if publier is None:
+            publier = settings.SCHEDULING_AUTO_PUBLISH
+        if strategy not in self.STRATEGIES:
+            raise ValueError(f"Stratégie inconnue: {strategy}")
+        self.profiler = GenerationProfiler(self.db)
         
         # Créer une session de génération
         session = SessionGeneration(
@@ -62,40 +140,82 @@ class ExamScheduler:
                 "date_debut": date_debut.isoformat(),
                 "date_fin": date_fin.isoformat(),
                 "dept_ids": dept_ids,
-                "formation_ids": formation_ids
+                "formation_ids": formation_ids,
+                "strategy": strategy,
+                "amelioration_secondes": amelioration_secondes,
+                "publier": publier
             },
-            statut=SessionStatus.IN_PROGRESS
+            statut=SessionStatus.IN_PROGRESS,
+            brouillon=True
         )
         self.db.add(session)
         self.db.commit()
         
+        outcome = "error"
+        metrics.edt_generations_in_progress.inc()
         try:
-            # 1. Récupérer les modules à planifier
-            modules = self._get_modules_to_schedule(dept_ids, formation_ids)
-            
-            # 2. Récupérer les ressources disponibles
-            salles = self._get_available_rooms()
-            professeurs = self._get_available_professors(dept_ids)
-            
-            # 3. Générer les créneaux horaires disponibles
-            time_slots = self._generate_time_slots(date_debut, date_fin)
+            with self._phase("chargement"):
+                # 1. Récupérer les modules à planifier
+                modules = self._get_modules_to_schedule(dept_ids, formation_ids)
+                
+                # 2. Récupérer les ressources disponibles
+                salles = self._get_available_rooms()
+                professeurs = self._get_available_professors(dept_ids)
+                
+                # 3. Générer les créneaux horaires disponibles
+                time_slots = self._generate_time_slots(date_debut, date_fin)
             
             if not modules or not salles or not professeurs or not time_slots:
                 session.date_fin = datetime.utcnow()
                 session.statut = SessionStatus.FAILED
                 session.log = f"Ressources insuffisantes: {len(modules)} modules, {len(salles)} salles, {len(professeurs)} profs, {len(time_slots)} créneaux"
+                session.metriques = self.profiler.to_dict()
                 self.db.commit()
+                outcome = "failed"
                 return {
                     "session_id": session.id,
                     "statut": "failed",
                     "nb_examens_planifies": 0,
                     "nb_conflits_resolus": 0,
                     "temps_execution_ms": int((time.time() - start_time) * 1000),
+                    "phases_ms": self.profiler.phases_ms(),
                     "message": "Ressources insuffisantes pour la génération"
                 }
             
-            # Try greedy algorithm (fast and reliable)
-            examens_planifies = self._greedy_schedule(modules, salles, time_slots, professeurs, session.id)
+            examens_planifies = None
+            algorithme = "algorithme glouton"
+            if strategy == "ortools" and self.ortools_available:
+                examens_planifies = self._ortools_schedule(modules, salles, time_slots, professeurs, session.id)
+                algorithme = "OR-Tools CP-SAT"
+            if examens_planifies is None:
+                examens_planifies = self._greedy_schedule(modules, salles, time_slots, professeurs, session.id)
+                algorithme = "algorithme glouton"
+            
+            amelioration = ""
+            if examens_planifies and amelioration_secondes > 0:
+                improvement = self._improve_schedule(session.id, time_slots, amelioration_secondes)
+                amelioration = (
+                    f", recherche locale: {improvement['examens_deplaces']} examens déplacés, "
+                    f"coût {improvement['cout_initial']} -> {improvement['cout_final']}"
+                )
+            
+            if examens_planifies:
+                # Répartition des étudiants des examens sur plusieurs salles
+                with self._phase("places"):
+                    split = [examen_id for (examen_id,) in self.db.query(ExamenSalle.examen_id).join(
+                        Examen, Examen.id == ExamenSalle.examen_id
+                    ).filter(Examen.session_id == session.id).distinct().all()]
+                    if split:
+                        self.profiler.solver["places"] = allocate_seats(
+                            self.db, split, numeroter=settings.SCHEDULING_SEAT_NUMBERS
+                        )
+                
+                # Version de l'EDT produite par la session (comparaison, promotion)
+                capture_snapshot(
+                    self.db, live_placements(self.db, session_id=session.id, include_drafts=True),
+                    type="generation", session_id=session.id, user_id=user_id,
+                    libelle=f"Génération {session.id} ({algorithme})"
+                )
             
             execution_time = int((time.time() - start_time) * 1000)
             
@@ -104,8 +224,15 @@ class ExamScheduler:
             session.nb_examens_planifies = len(examens_planifies)
             session.nb_conflits_resolus = len(modules)  # All modules resolved
             session.temps_execution_ms = execution_time
-            session.log = f"Génération réussie (algorithme glouton): {len(examens_planifies)} examens planifiés"
+            session.log = f"Génération réussie ({algorithme}{amelioration}): {len(examens_planifies)} examens planifiés"
+            session.metriques = self.profiler.to_dict()
+            publiee = False
+            if publier and examens_planifies:
+                # Même transaction que la clôture de la session
+                publish_session(self.db, session)
+                publiee = True
             self.db.commit()
+            outcome = "completed"
             
             return {
                 "session_id": session.id,
@@ -113,15 +240,257 @@ class ExamScheduler:
                 "nb_examens_planifies": len(examens_planifies),
                 "nb_conflits_resolus": len(modules),
                 "temps_execution_ms": execution_time,
+                "phases_ms": self.profiler.phases_ms(),
+                "publiee": publiee,
                 "message": f"EDT généré avec succès en {execution_time}ms"
+                + ("" if publiee or not examens_planifies else " (brouillon, à publier)")
             }
                 
         except Exception as e:
+            self.db.rollback()
+            # Aucun examen partiel ne subsiste
+            discard_session_drafts(self.db, session.id)
             session.date_fin = datetime.utcnow()
             session.statut = SessionStatus.FAILED
             session.log = str(e)
+            session.metriques = self.profiler.to_dict()
             self.db.commit()
             raise
+        finally:
+            self.profiler.close()
+            metrics.edt_generations_in_progress.dec()
+            metrics.edt_generations.inc(strategy=strategy, statut=outcome)
+            metrics.edt_generation_duration.observe(time.time() - start_time, strategy=strategy)
+    
+    def _improve_schedule(self, session_id: int, time_slots: List[datetime], seconds: float) -> Dict:
+        """
+        Recherche locale (app.services.improvement) sur les brouillons de la
+        session: seuls les créneaux et salles changent, en une requête.
+        """
+        # Imports locaux: ces modules dépendent de scheduler.py
+        from app.services.availability import OccupancyIndex
+        from app.services.improvement import improve_schedule
+        from app.services.suggestions import shared_students
+        
+        with self._phase("amelioration"):
+            index = OccupancyIndex.build(self.db, session_id=session_id)
+            nb_inscrits = dict(self.db.query(Examen.id, Examen.nb_inscrits).filter(
+                Examen.session_id == session_id,
+                Examen.statut.notin_(INACTIVE_STATUSES)
+            ).all())
+            # Les examens répartis sur plusieurs salles ne sont pas déplacés
+            split = {examen_id for (examen_id,) in self.db.query(ExamenSalle.examen_id).filter(
+                ExamenSalle.examen_id.in_(list(nb_inscrits))
+            ).distinct().all()} if nb_inscrits else set()
+            exams = [
+                index.exams[examen_id] for examen_id in nb_inscrits
+                if examen_id in index.exams and examen_id not in split
+            ]
+            shared = shared_students(self.db, {exam.module_id for exam in exams})
+            changes, stats = improve_schedule(
+                index, exams, {k: v or 0 for k, v in nb_inscrits.items()}, time_slots, shared, seconds
+            )
+            if changes:
+                self.db.execute(update(Examen), changes)
+                self.db.commit()
+        if self.profiler:
+            self.profiler.solver["amelioration"] = stats
+        return stats
+    
+    def repair_schedule(
+        self,
+        examen_ids: Optional[List[int]] = None,
+        salle_ids: Optional[List[int]] = None,
+        prof_ids: Optional[List[int]] = None,
+        jours: Optional[List[date]] = None,
+        fenetre_jours: int = 7,
+        user_id: int = None
+    ) -> Dict:
+        """
+        Réparation incrémentale après une perturbation: salles fermées,
+        enseignants absents, journées banalisées ou examens désignés.
+        
+        Seuls les examens à venir touchés sont replanifiés, chacun vers le
+        placement le moins perturbant (app.services.suggestions) dans une
+        fenêtre de fenetre_jours autour de sa date; les autres examens ne
+        bougent pas. Un examen resté valide (examen désigné sans autre
+        contrainte) garde sa place; un examen sans solution reste inchangé
+        et est signalé.
+        """
+        # Imports locaux: ces modules dépendent de scheduler.py
+        from app.services.availability import ExamSlot, OccupancyIndex
+        from app.services.suggestions import default_window, shared_students, suggest_moves
+        
+        start_time = time.time()
+        salle_ids, prof_ids, jours = salle_ids or [], prof_ids or [], jours or []
+        self.profiler = GenerationProfiler(self.db)
+        
+        session = SessionGeneration(
+            user_id=user_id,
+            date_debut=datetime.utcnow(),
+            parametres={
+                "mode": "repair",
+                "examen_ids": examen_ids,
+                "salle_ids": salle_ids,
+                "prof_ids": prof_ids,
+                "jours": [jour.isoformat() for jour in jours],
+                "fenetre_jours": fenetre_jours
+            },
+            statut=SessionStatus.IN_PROGRESS
+        )
+        self.db.add(session)
+        self.db.commit()
+        
+        outcome = "error"
+        metrics.edt_generations_in_progress.inc()
+        try:
+            with self._phase("chargement"):
+                # Pas de publication de session pendant la réparation
+                lock_schedule(self.db)
+                affected = self._get_affected_exams(examen_ids, salle_ids, prof_ids, jours)
+                index = OccupancyIndex.build(self.db)
+                shared = shared_students(self.db, {examen.module_id for examen, *_ in affected})
+            
+            stats = {"algorithme": "repair", "examens_touches": len(affected), "candidats_testes": 0}
+            deplaces, non_replaces, reseat = [], [], []
+            with self._phase("resolution"):
+                for examen, formation_id, dept_id, nb_inscrits in affected:
+                    exam = ExamSlot(
+                        examen.id, examen.module_id, formation_id,
+                        examen.prof_id, examen.salle_id, examen.date_heure,
+                        examen.date_heure + timedelta(minutes=examen.duree_minutes or 120)
+                    )
+                    window_start, window_end = default_window(exam, fenetre_jours)
+                    suggestions, evaluated = suggest_moves(
+                        self.db, index, exam, nb_inscrits, dept_id, window_start, window_end, k=1,
+                        exclude_salles=salle_ids, exclude_profs=prof_ids, exclude_days=jours,
+                        include_current=True, shared=shared[examen.module_id]
+                    )
+                    stats["candidats_testes"] += evaluated
+                    if not suggestions:
+                        non_replaces.append(examen.id)
+                        continue
+                    best = suggestions[0]
+                    if not best["changements"]:
+                        continue
+                    
+                    deplaces.append({
+                        "examen_id": examen.id,
+                        "ancienne_date": examen.date_heure,
+                        "nouvelle_date": best["date_heure"],
+                        "ancienne_salle_id": examen.salle_id,
+                        "nouvelle_salle_id": best["salle_id"],
+                        "ancien_prof_id": examen.prof_id,
+                        "nouveau_prof_id": best["prof_id"],
+                        "changements": best["changements"]
+                    })
+                    if best["salle_id"] != examen.salle_id:
+                        # Répartition des étudiants à refaire dans la nouvelle salle
+                        reseat += detach_rooms(self.db, [examen.id])
+                    examen.date_heure = best["date_heure"]
+                    examen.salle_id = best["salle_id"]
+                    examen.prof_id = best["prof_id"]
+                    # Les examens suivants voient ce déplacement
+                    index.replace_exam(exam._replace(
+                        salle_id=best["salle_id"],
+                        prof_id=best["prof_id"],
+                        start=best["date_heure"],
+                        end=best["date_heure"] + (exam.end - exam.start)
+                    ))
+            
+            with self._phase("persistance"):
+                execution_time = int((time.time() - start_time) * 1000)
+                if reseat:
+                    self.db.flush()
+                    allocate_seats(self.db, reseat, numeroter=settings.SCHEDULING_SEAT_NUMBERS)
+                stats["examens_deplaces"] = len(deplaces)
+                stats["examens_non_replaces"] = len(non_replaces)
+                self.profiler.solver = stats
+                
+                session.date_fin = datetime.utcnow()
+                session.statut = SessionStatus.COMPLETED
+                session.nb_examens_planifies = len(deplaces)
+                session.nb_conflits_resolus = len(affected) - len(non_replaces)
+                session.temps_execution_ms = execution_time
+                session.log = (
+                    f"Réparation: {len(affected)} examens touchés, {len(deplaces)} déplacés, "
+                    f"{len(non_replaces)} sans solution"
+                )
+                session.metriques = self.profiler.to_dict()
+                self.db.commit()
+            outcome = "completed"
+            
+            return {
+                "session_id": session.id,
+                "statut": "success" if not non_replaces else "partial",
+                "nb_examens_planifies": len(deplaces),
+                "nb_conflits_resolus": len(affected) - len(non_replaces),
+                "temps_execution_ms": execution_time,
+                "phases_ms": self.profiler.phases_ms(),
+                "message": session.log,
+                "examens_deplaces": deplaces,
+                "examens_non_replaces": non_replaces
+            }
+        
+        except Exception as e:
+            self.db.rollback()
+            session.date_fin = datetime.utcnow()
+            session.statut = SessionStatus.FAILED
+            session.log = str(e)
+            session.metriques = self.profiler.to_dict()
+            self.db.commit()
+            raise
+        finally:
+            self.profiler.close()
+            metrics.edt_generations_in_progress.dec()
+            metrics.edt_generations.inc(strategy="repair", statut=outcome)
+            metrics.edt_generation_duration.observe(time.time() - start_time, strategy="repair")
+    
+    def _get_affected_exams(
+        self,
+        examen_ids: Optional[List[int]],
+        salle_ids: List[int],
+        prof_ids: List[int],
+        jours: List[date]
+    ) -> List[Tuple[Examen, int, int, int]]:
+        """
+        Examens à venir touchés par la perturbation, avec la formation, le
+        département et le nombre d'inscrits du module; les plus gros examens
+        d'abord.
+        """
+        conditions = []
+        if examen_ids:
+            conditions.append(Examen.id.in_(examen_ids))
+        if salle_ids:
+            conditions.append(Examen.salle_id.in_(salle_ids))
+            # Examens répartis: salles supplémentaires comprises
+            conditions.append(Examen.id.in_(
+                self.db.query(ExamenSalle.examen_id).filter(ExamenSalle.salle_id.in_(salle_ids))
+            ))
+        if prof_ids:
+            conditions.append(Examen.prof_id.in_(prof_ids))
+        for jour in jours:
+            day_start = datetime.combine(jour, datetime.min.time())
+            conditions.append(and_(
+                Examen.date_heure >= day_start,
+                Examen.date_heure < day_start + timedelta(days=1)
+            ))
+        if not conditions:
+            return []
+        
+        rows = self.db.query(
+            Examen, Module.formation_id, Formation.dept_id, Module.nb_inscrits_actifs
+        ).select_from(
+            Examen
+        ).join(Module).join(Formation).filter(
+            or_(*conditions),
+            Examen.statut.in_(['scheduled', 'confirmed']),
+            Examen.date_heure >= datetime.utcnow()
+        ).order_by(Module.nb_inscrits_actifs.desc(), Examen.date_heure, Examen.id).all()
+        return [
+            (examen, formation_id, dept_id, nb_inscrits or examen.nb_inscrits or 0)
+            for examen, formation_id, dept_id, nb_inscrits in rows
+        ]
     
     def _greedy_schedule(
         self,
@@ -137,21 +506,158 @@ class ExamScheduler:
         Checks for existing exams in database to avoid conflicts.
         """
         examens_planifies = []
+        stats = {"algorithme": "greedy", "modules_deja_planifies": 0,
+                 "candidats_testes": 0, "echecs_insertion": 0, "examens_multi_salles": 0}
         
         # Track occupied slots for rooms and professors
-        room_slots = {}  # {(room_id, slot_idx): True}
-        prof_slots = {}  # {(prof_id, slot_idx): True}
-        prof_daily_count = {}  # {(prof_id, date): count}
+        with self._phase("chargement"):
+            room_slots, prof_slots, prof_daily_count = self._load_existing_occupancy(time_slots, session_id)
         formation_daily_count = {}  # {(formation_id, date): count}
+        max_capacity = max((salle.capacite_examen for salle in salles), default=0)
+        
+        with self._phase("resolution"):
+            for module in modules:
+                # Skip if module already has an exam scheduled
+                existing_module_exam = self.db.query(Examen).filter(
+                    Examen.module_id == module.id,
+                    live_exams()
+                ).first()
+                if existing_module_exam:
+                    stats["modules_deja_planifies"] += 1
+                    continue
+                
+                scheduled = False
+                # Compteur maintenu par trigger (modules.nb_inscrits_actifs)
+                nb_inscrits = module.nb_inscrits_actifs or 0
+                
+                for slot_idx, slot in enumerate(time_slots):
+                    if scheduled:
+                        break
+                        
+                    slot_date = slot.date()
+                    
+                    # Check formation daily limit (max 2 exams per day per formation)
+                    formation_key = (module.formation_id, slot_date)
+                    if formation_daily_count.get(formation_key, 0) >= MAX_EXAMS_PER_FORMATION_DAY:
+                        continue
+                    
+                    # Salles candidates: une salle libre assez grande, ou
+                    # plusieurs salles du créneau si aucune ne suffit
+                    if nb_inscrits > max_capacity:
+                        rooms = choose_rooms(
+                            [salle for salle in salles if (salle.id, slot_idx) not in room_slots], nb_inscrits
+                        )
+                        candidates = [rooms] if rooms else []
+                    else:
+                        candidates = [
+                            [salle] for salle in salles
+                            if (salle.id, slot_idx) not in room_slots and nb_inscrits <= salle.capacite_examen
+                        ]
+                    
+                    for rooms in candidates:
+                        if scheduled:
+                            break
+                        salle = rooms[0]
+                        
+                        for prof in professeurs:
+                            # Check if professor is free at this slot
+                            if (prof.id, slot_idx) in prof_slots:
+                                continue
+                            
+                            # Check professor daily limit
+                            prof_day_key = (prof.id, slot_date)
+                            if prof_daily_count.get(prof_day_key, 0) >= prof.max_surveillances:
+                                continue
+                            stats["candidats_testes"] += 1
+                            
+                            # Create the exam
+                            examen = Examen(
+                                module_id=module.id,
+                                prof_id=prof.id,
+                                salle_id=salle.id,
+                                date_heure=slot,
+                                duree_minutes=module.duree_examen_min if module.duree_examen_min else 120,
+                                statut=ExamStatus.SCHEDULED,
+                                session_id=session_id,
+                                nb_inscrits=nb_inscrits
+                            )
+                            
+                            # Try to add and commit individually to let DB trigger validate
+                            try:
+                                self.db.add(examen)
+                                self.db.flush()  # This will trigger the DB constraint check
+                                if len(rooms) > 1:
+                                    self.db.add_all([
+                                        ExamenSalle(examen_id=examen.id, salle_id=room.id) for room in rooms
+                                    ])
+                                    self.db.flush()
+                                    stats["examens_multi_salles"] += 1
+                                examens_planifies.append(examen)
+                                
+                                # Mark slots as occupied only if successful
+                                for room in rooms:
+                                    room_slots[(room.id, slot_idx)] = True
+                                prof_slots[(prof.id, slot_idx)] = True
+                                prof_daily_count[prof_day_key] = prof_daily_count.get(prof_day_key, 0) + 1
+                                formation_daily_count[formation_key] = formation_daily_count.get(formation_key, 0) + 1
+                                
+                                scheduled = True
+                                break
+                            except Exception as e:
+                                # Room/professor conflict detected by DB trigger, rollback and try next
+                                self.db.rollback()
+                                stats["echecs_insertion"] += 1
+                                # Re-create session after rollback
+                                continue
+        
+        # Final commit for all successful exams
+        with self._phase("persistance"):
+            try:
+                self.db.commit()
+            except Exception:
+                self.db.rollback()
+        
+        stats["modules_places"] = len(examens_planifies)
+        stats["modules_non_places"] = len(modules) - stats["modules_deja_planifies"] - len(examens_planifies)
+        if self.profiler:
+            self.profiler.solver = stats
+        return examens_planifies
+    
+    def _load_existing_occupancy(
+        self,
+        time_slots: List[datetime],
+        session_id: Optional[int] = None
+    ) -> Tuple[Dict, Dict, Dict]:
+        """
+        Charge les examens déjà planifiés qui chevauchent les créneaux
+        (brouillons de session_id compris), salles supplémentaires comprises.
+        
+        Returns:
+            (room_slots, prof_slots, prof_daily_count) avec
+            {(room_id, slot_idx): True}, {(prof_id, slot_idx): True}
+            et {(prof_id, date): count}
+        """
+        room_slots = {}
+        prof_slots = {}
+        prof_daily_count = {}
         
         # CRITICAL: Load existing exams from database to avoid conflicts
         existing_exams = []
+        extra_rooms = {}
         if time_slots:
+            active = live_exams()
+            if session_id is not None:
+                active = or_(active, and_(Examen.session_id == session_id, Examen.statut.notin_(INACTIVE_STATUSES)))
             existing_exams = self.db.query(Examen).filter(
-                Examen.statut.notin_(['cancelled', 'draft']),
+                active,
                 Examen.date_heure >= time_slots[0],
                 Examen.date_heure <= time_slots[-1] + timedelta(hours=3)
             ).all()
+            if existing_exams:
+                for examen_id, salle_id in self.db.query(ExamenSalle.examen_id, ExamenSalle.salle_id).filter(
+                    ExamenSalle.examen_id.in_([existing.id for existing in existing_exams])
+                ).all():
+                    extra_rooms.setdefault(examen_id, []).append(salle_id)
         
         # Pre-populate occupied slots from existing database exams
         for existing in existing_exams:
@@ -167,98 +673,85 @@ class ExamScheduler:
                     
                     # Check for overlap
                     if existing_start < slot_end and slot_time < existing_end:
-                        if existing.salle_id:
-                            room_slots[(existing.salle_id, slot_idx)] = True
+                        for salle_id in {existing.salle_id, *extra_rooms.get(existing.id, ())} - {None}:
+                            room_slots[(salle_id, slot_idx)] = True
                         if existing.prof_id:
                             prof_slots[(existing.prof_id, slot_idx)] = True
                             # Count for daily limit
                             day_key = (existing.prof_id, existing_start.date())
                             prof_daily_count[day_key] = prof_daily_count.get(day_key, 0) + 1
         
-        for module in modules:
-            # Skip if module already has an exam scheduled
-            existing_module_exam = self.db.query(Examen).filter(
-                Examen.module_id == module.id,
-                Examen.statut.notin_(['cancelled', 'draft'])
-            ).first()
-            if existing_module_exam:
-                continue
-            
-            scheduled = False
-            
-            for slot_idx, slot in enumerate(time_slots):
-                if scheduled:
-                    break
-                    
-                slot_date = slot.date()
-                
-                # Check formation daily limit (max 2 exams per day per formation)
-                formation_key = (module.formation_id, slot_date)
-                if formation_daily_count.get(formation_key, 0) >= 2:
-                    continue
-                
-                for salle in salles:
-                    if scheduled:
-                        break
-                        
-                    # Check if room is free
-                    if (salle.id, slot_idx) in room_slots:
-                        continue
-                    
-                    for prof in professeurs:
-                        # Check if professor is free at this slot
-                        if (prof.id, slot_idx) in prof_slots:
-                            continue
-                        
-                        # Check professor daily limit
-                        prof_day_key = (prof.id, slot_date)
-                        if prof_daily_count.get(prof_day_key, 0) >= prof.max_surveillances:
-                            continue
-                        
-                        # Count inscribed students for this module
-                        nb_inscrits = self.db.query(func.count(Inscription.id)).filter(
-                            Inscription.module_id == module.id,
-                            Inscription.statut == InscriptionStatus.ACTIVE
-                        ).scalar() or 0
-                        
-                        # Create the exam
-                        examen = Examen(
-                            module_id=module.id,
-                            prof_id=prof.id,
-                            salle_id=salle.id,
-                            date_heure=slot,
-                            duree_minutes=module.duree_examen_min if module.duree_examen_min else 120,
-                            statut=ExamStatus.SCHEDULED,
-                            session_id=session_id,
-                            nb_inscrits=nb_inscrits
-                        )
-                        
-                        # Try to add and commit individually to let DB trigger validate
-                        try:
-                            self.db.add(examen)
-                            self.db.flush()  # This will trigger the DB constraint check
-                            examens_planifies.append(examen)
-                            
-                            # Mark slots as occupied only if successful
-                            room_slots[(salle.id, slot_idx)] = True
-                            prof_slots[(prof.id, slot_idx)] = True
-                            prof_daily_count[prof_day_key] = prof_daily_count.get(prof_day_key, 0) + 1
-                            formation_daily_count[formation_key] = formation_daily_count.get(formation_key, 0) + 1
-                            
-                            scheduled = True
-                            break
-                        except Exception as e:
-                            # Room/professor conflict detected by DB trigger, rollback and try next
-                            self.db.rollback()
-                            # Re-create session after rollback
-                            continue
+        return room_slots, prof_slots, prof_daily_count
+    
+    def _ortools_schedule(
+        self,
+        modules: List[Module],
+        salles: List[LieuExamen],
+        time_slots: List[datetime],
+        professeurs: List[Professeur],
+        session_id: int
+    ) -> Optional[List[Examen]]:
+        """
+        Résolution par programmation par contraintes (CP-SAT).
         
-        # Final commit for all successful exams
-        try:
-            self.db.commit()
-        except Exception:
-            self.db.rollback()
-        return examens_planifies
+        Les modules plus grands que toutes les salles sont placés ensuite
+        sur plusieurs salles par l'algorithme glouton.
+        
+        Returns:
+            Les examens créés, ou None si aucune solution n'a été trouvée
+            (l'appelant se replie alors sur l'algorithme glouton).
+        """
+        with self._phase("chargement"):
+            # Seuls les modules sans examen actif sont planifiés
+            planned = {
+                module_id for (module_id,) in self.db.query(Examen.module_id).filter(
+                    Examen.module_id.in_([m.id for m in modules]),
+                    live_exams()
+                ).all()
+            }
+            modules = [m for m in modules if m.id not in planned]
+            max_capacity = max((salle.capacite_examen for salle in salles), default=0)
+            oversized = [m for m in modules if (m.nb_inscrits_actifs or 0) > max_capacity]
+            modules = [m for m in modules if (m.nb_inscrits_actifs or 0) <= max_capacity]
+            if not modules:
+                return self._greedy_schedule(oversized, salles, time_slots, professeurs, session_id) if oversized else []
+            room_slots, prof_slots, _ = self._load_existing_occupancy(time_slots)
+        
+        with self._phase("modelisation"):
+            cp_model = _load_cp_model()
+            self.model = cp_model.CpModel()
+            self.solver = cp_model.CpSolver()
+            self.solver.parameters.max_time_in_seconds = settings.SCHEDULING_TIMEOUT_SECONDS
+            exam_vars = self._create_decision_variables(modules, salles, time_slots, professeurs)
+            self._add_constraints(exam_vars, modules, salles, time_slots, professeurs)
+            # Les salles et professeurs déjà occupés sont exclus
+            for (module_id, slot_idx, salle_id, prof_id), var in exam_vars.items():
+                if (salle_id, slot_idx) in room_slots or (prof_id, slot_idx) in prof_slots:
+                    self.model.Add(var == 0)
+        
+        with self._phase("resolution"):
+            status = self.solver.Solve(self.model)
+        if self.profiler:
+            self.profiler.solver = {
+                "algorithme": "ortools",
+                "statut": self.solver.StatusName(status),
+                "variables": len(exam_vars),
+                "contraintes": len(self.model.Proto().constraints),
+                "temps_solveur_s": round(self.solver.WallTime(), 3),
+                "conflits": self.solver.NumConflicts(),
+                "branches": self.solver.NumBranches(),
+            }
+        if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+            return None
+        
+        with self._phase("persistance"):
+            examens = self._extract_and_save_solution(exam_vars, modules, salles, time_slots, professeurs, session_id)
+        if oversized:
+            solver_stats = self.profiler.solver if self.profiler else None
+            examens += self._greedy_schedule(oversized, salles, time_slots, professeurs, session_id)
+            if self.profiler:
+                self.profiler.solver = {**solver_stats, "multi_salles": self.profiler.solver}
+        return examens
     
     def _get_modules_to_schedule(
         self, 
@@ -275,22 +768,29 @@ class ExamScheduler:
         
         # OPTIMIZATION: Limit modules to keep problem tractable for OR-Tools
         # With 15 modules × 15 rooms × 15 profs × ~40 slots = 135,000 variables (manageable)
-        return query.limit(15).all()
+        if self.max_modules:
+            query = query.limit(self.max_modules)
+        return query.all()
     
     def _get_available_rooms(self) -> List[LieuExamen]:
         """Récupère les salles disponibles"""
-        # OPTIMIZATION: Limit to 15 best rooms (largest capacity) to reduce variables
-        return self.db.query(LieuExamen).filter(
+        # OPTIMIZATION: Limit to the best rooms (largest capacity) to reduce variables
+        query = self.db.query(LieuExamen).filter(
             LieuExamen.disponible == True
-        ).order_by(LieuExamen.capacite.desc()).limit(15).all()
+        ).order_by(LieuExamen.capacite.desc())
+        if self.max_rooms:
+            query = query.limit(self.max_rooms)
+        return query.all()
     
     def _get_available_professors(self, dept_ids: Optional[List[int]]) -> List[Professeur]:
         """Récupère les professeurs disponibles"""
         query = self.db.query(Professeur)
         if dept_ids:
             query = query.filter(Professeur.dept_id.in_(dept_ids))
-        # OPTIMIZATION: Limit to 15 professors to reduce variable count
-        return query.limit(15).all()
+        # OPTIMIZATION: Limit professors to reduce variable count
+        if self.max_professors:
+            query = query.limit(self.max_professors)
+        return query.all()
     
     def _generate_time_slots(
         self, 
@@ -298,20 +798,7 @@ class ExamScheduler:
         date_fin: datetime
     ) -> List[datetime]:
         """Génère les créneaux horaires disponibles"""
-        slots = []
-        current = date_debut.replace(hour=8, minute=0, second=0, microsecond=0)
-        
-        while current <= date_fin:
-            # Skip weekends
-            if current.weekday() < 5:  # Lundi à Vendredi
-                # Créneaux: 8h, 10h, 14h, 16h
-                for hour in [8, 10, 14, 16]:
-                    slot = current.replace(hour=hour)
-                    if slot <= date_fin:
-                        slots.append(slot)
-            current += timedelta(days=1)
-            
-        return slots
+        return generate_time_slots(date_debut, date_fin)
     
     def _create_decision_variables(
         self,
@@ -419,15 +906,12 @@ class ExamScheduler:
                 
                 if day_formation_exams:
                     # Maximum 2 examens par jour par formation (relaxed for feasibility)
-                    self.model.Add(sum(day_formation_exams) <= 2)
+                    self.model.Add(sum(day_formation_exams) <= MAX_EXAMS_PER_FORMATION_DAY)
                     conflicts_detected += 1
         
         # Contrainte 5: Capacité des salles
         for module in modules:
-            nb_inscrits = self.db.query(func.count(Inscription.id)).filter(
-                Inscription.module_id == module.id,
-                Inscription.statut == 'active'
-            ).scalar() or 0
+            nb_inscrits = module.nb_inscrits_actifs or 0
             
             for slot_idx in range(len(time_slots)):
                 for salle in salles:
@@ -451,16 +935,12 @@ class ExamScheduler:
     ) -> List[Examen]:
         """Extrait la solution et crée les examens en base de données"""
         examens_planifies = []
+        modules_by_id = {m.id: m for m in modules}
         
         for (module_id, slot_idx, salle_id, prof_id), var in exam_vars.items():
             if self.solver.Value(var) == 1:
-                module = next((m for m in modules if m.id == module_id), None)
-                
-                # Compter les inscrits
-                nb_inscrits = self.db.query(func.count(Inscription.id)).filter(
-                    Inscription.module_id == module_id,
-                    Inscription.statut == 'active'
-                ).scalar() or 0
+                module = modules_by_id.get(module_id)
+                nb_inscrits = (module.nb_inscrits_actifs or 0) if module else 0
                 
                 examen = Examen(
                     module_id=module_id,
@@ -468,7 +948,7 @@ class ExamScheduler:
                     salle_id=salle_id,
                     date_heure=time_slots[slot_idx],
                     duree_minutes=module.duree_examen_min if module else 120,
-                    statut="scheduled",
+                    statut=ExamStatus.SCHEDULED,
                     session_id=session_id,
                     nb_inscrits=nb_inscrits
                 )
@@ -489,19 +969,32 @@ def detect_conflicts(db: Session) -> List[Dict]:
     """
     conflicts = []
     
-    # 1. Conflits de chevauchement de salles
-    room_conflicts = db.execute("""
+    # 1. Conflits de chevauchement de salles (salles supplémentaires comprises)
+    room_conflicts = db.execute(text(f"""
+        WITH occupation AS (
+            SELECT e.id AS examen_id, e.salle_id
+            FROM examens e
+            WHERE e.salle_id IS NOT NULL
+                AND e.statut NOT IN ('cancelled', 'draft')
+                AND NOT {unpublished_sql("e")}
+            UNION
+            SELECT es.examen_id, es.salle_id
+            FROM examen_salles es
+            JOIN examens e ON e.id = es.examen_id
+            WHERE e.statut NOT IN ('cancelled', 'draft')
+                AND NOT {unpublished_sql("e")}
+        )
         SELECT e1.id as exam1_id, e2.id as exam2_id, 
                l.nom as salle, e1.date_heure
-        FROM examens e1
-        JOIN examens e2 ON e1.salle_id = e2.salle_id 
-            AND e1.id < e2.id
-            AND e1.statut NOT IN ('cancelled', 'draft')
-            AND e2.statut NOT IN ('cancelled', 'draft')
-        JOIN lieux_examen l ON l.id = e1.salle_id
+        FROM occupation o1
+        JOIN occupation o2 ON o1.salle_id = o2.salle_id 
+            AND o1.examen_id < o2.examen_id
+        JOIN examens e1 ON e1.id = o1.examen_id
+        JOIN examens e2 ON e2.id = o2.examen_id
+        JOIN lieux_examen l ON l.id = o1.salle_id
         WHERE (e1.date_heure, e1.date_heure + (e1.duree_minutes || ' minutes')::INTERVAL)
             OVERLAPS (e2.date_heure, e2.date_heure + (e2.duree_minutes || ' minutes')::INTERVAL)
-    """).fetchall()
+    """)).fetchall()
     
     for conflict in room_conflicts:
         conflicts.append({
@@ -512,14 +1005,15 @@ def detect_conflicts(db: Session) -> List[Dict]:
         })
     
     # 2. Conflits de professeurs (plus de 3 examens par jour)
-    prof_conflicts = db.execute("""
+    prof_conflicts = db.execute(text(f"""
         SELECT p.nom, p.prenom, DATE(e.date_heure) as jour, COUNT(*) as nb_examens
         FROM examens e
         JOIN professeurs p ON p.id = e.prof_id
         WHERE e.statut NOT IN ('cancelled', 'draft')
+            AND NOT {unpublished_sql("e")}
         GROUP BY p.id, p.nom, p.prenom, DATE(e.date_heure)
         HAVING COUNT(*) > 3
-    """).fetchall()
+    """)).fetchall()
     
     for conflict in prof_conflicts:
         conflicts.append({
@@ -536,20 +1030,25 @@ def get_room_occupation_stats(db: Session) -> List[Dict]:
     """
     Calcule les statistiques d'occupation des salles.
     """
-    stats = db.execute("""
+    # Agrégat sur la vue dénormalisée examens_planning (indexée par salle)
+    stats = db.execute(text(f"""
         SELECT 
             l.id,
             l.nom,
             l.code,
-            l.capacite_examen,
+            l.capacite / 2 AS capacite_examen,
             l.type,
             l.batiment,
-            COUNT(e.id) as nb_examens_planifies,
-            COALESCE(SUM(e.nb_inscrits), 0) as total_etudiants
+            COALESCE(p.nb_examens, 0) as nb_examens_planifies,
+            COALESCE(p.total_etudiants, 0) as total_etudiants
         FROM lieux_examen l
-        LEFT JOIN examens e ON e.salle_id = l.id AND e.statut NOT IN ('cancelled', 'draft')
-        GROUP BY l.id, l.nom, l.code, l.capacite_examen, l.type, l.batiment
+        LEFT JOIN (
+            SELECT salle_id, COUNT(*) AS nb_examens, SUM(nb_inscrits) AS total_etudiants
+            FROM examens_planning ep
+            WHERE ep.statut NOT IN ('cancelled', 'draft') AND NOT {unpublished_sql("ep")}
+            GROUP BY salle_id
+        ) p ON p.salle_id = l.id
         ORDER BY nb_examens_planifies DESC
-    """).fetchall()
+    """)).fetchall()
     
     return [dict(row._mapping) for row in stats]
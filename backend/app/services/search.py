@@ -0,0 +1,138 @@
+"""
+Search over modules, professors, students and rooms
+
+Each entity is searched through one text expression (code/matricule and
+names) backed by a pg_trgm GIN index, so substring (ILIKE '%term%') and fuzzy
+(word similarity) matches are index scans instead of sequential scans.
+Results are ranked: prefix of the expression, then prefix of a word, then
+trigram word similarity.
+"""
+from typing import Dict, List, Optional, Sequence
+
+from sqlalchemy import case, func, literal, literal_column, or_
+from sqlalchemy.orm import Session
+
+from app.models import Etudiant, ExamenPlanning, LieuExamen, Module, Professeur
+
+SEARCH_TYPES = ("module", "professeur", "etudiant", "salle")
+
+
+def _concat(*columns):
+    """col1 || ' ' || col2 ...: doit rester identique aux index de SEARCH_DDL"""
+    expression = columns[0]
+    for column in columns[1:]:
+        expression = expression.op("||")(literal_column("' '")).op("||")(column)
+    return expression
+
+
+def module_search_text():
+    return _concat(Module.code, Module.nom)
+
+
+def planning_search_text():
+    """Index idx_planning_module_search_trgm (app.services.planning)"""
+    return _concat(ExamenPlanning.module_code, ExamenPlanning.module_nom)
+
+
+def professeur_search_text():
+    return _concat(Professeur.matricule, Professeur.prenom, Professeur.nom)
+
+
+def etudiant_search_text():
+    return _concat(Etudiant.matricule, Etudiant.prenom, Etudiant.nom)
+
+
+def salle_search_text():
+    return _concat(LieuExamen.code, LieuExamen.nom, LieuExamen.batiment)
+
+
+SEARCH_DDL: List[str] = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS idx_modules_search_trgm ON modules "
+    "USING gin ((code || ' ' || nom) gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS idx_professeurs_search_trgm ON professeurs "
+    "USING gin ((matricule || ' ' || prenom || ' ' || nom) gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS idx_etudiants_search_trgm ON etudiants "
+    "USING gin ((matricule || ' ' || prenom || ' ' || nom) gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS idx_lieux_search_trgm ON lieux_examen "
+    "USING gin ((code || ' ' || nom || ' ' || batiment) gin_trgm_ops)",
+]
+
+
+def escape_like(term: str) -> str:
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def contains(expression, term: str):
+    """ILIKE '%term%' (indexable par pg_trgm)"""
+    return expression.ilike(f"%{escape_like(term)}%", escape="\\")
+
+
+def _targets():
+    return {
+        "module": (
+            Module, module_search_text(),
+            (Module.id, Module.nom.label("label"), Module.code.label("detail")),
+        ),
+        "professeur": (
+            Professeur, professeur_search_text(),
+            (Professeur.id, _concat(Professeur.prenom, Professeur.nom).label("label"),
+             Professeur.matricule.label("detail")),
+        ),
+        "etudiant": (
+            Etudiant, etudiant_search_text(),
+            (Etudiant.id, _concat(Etudiant.prenom, Etudiant.nom).label("label"),
+             Etudiant.matricule.label("detail")),
+        ),
+        "salle": (
+            LieuExamen, salle_search_text(),
+            (LieuExamen.id, LieuExamen.nom.label("label"),
+             _concat(LieuExamen.code, LieuExamen.batiment).label("detail")),
+        ),
+    }
+
+
+def search(db: Session, term: str, types: Optional[Sequence[str]] = None,
+           limit: int = 10) -> List[Dict]:
+    """
+    Recherche classée sur les entités demandées (toutes par défaut).
+    Hors PostgreSQL, seule la recherche par sous-chaîne est disponible.
+    """
+    term = " ".join(term.split())
+    if not term:
+        return []
+    fuzzy = db.get_bind().dialect.name == "postgresql"
+    escaped = escape_like(term)
+
+    results: List[Dict] = []
+    for entity, (model, text_expr, columns) in _targets().items():
+        if types and entity not in types:
+            continue
+        # 2: début du texte (code, matricule), 1: début d'un mot, 0: ailleurs
+        tier = case(
+            (text_expr.ilike(f"{escaped}%", escape="\\"), 2),
+            (text_expr.ilike(f"% {escaped}%", escape="\\"), 1),
+            else_=0
+        )
+        if fuzzy:
+            score = func.word_similarity(term, text_expr)
+            # <% : similarité de mots, tolère les fautes de frappe
+            match = or_(contains(text_expr, term), literal(term).op("<%")(text_expr))
+        else:
+            score = literal(0.0)
+            match = contains(text_expr, term)
+
+        rows = db.query(*columns, tier.label("tier"), score.label("score")).filter(
+            match
+        ).order_by(tier.desc(), score.desc(), model.id).limit(limit).all()
+
+        results.extend({
+            "type": entity,
+            "id": row.id,
+            "label": row.label,
+            "detail": row.detail,
+            "score": round(float(row.tier) + float(row.score), 4),
+        } for row in rows)
+
+    results.sort(key=lambda r: (-r["score"], r["type"], r["id"]))
+    return results[:limit]
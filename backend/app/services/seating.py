@@ -0,0 +1,313 @@
+"""
+Multi-room exams and seat allocation
+
+A module whose enrolment exceeds every room's exam capacity is split across
+several rooms of the same slot (examen_salles, main room included; the exam
+keeps its main room in examens.salle_id). choose_rooms() picks them: the
+fewest rooms of a single building when one building suffices, otherwise the
+largest rooms first, building by building.
+
+allocate_seats() then assigns each enrolled student to a room of the exam,
+in alphabetical order, and optionally to a seat (one seat out of two, the
+exam capacity being half the room capacity). The allocation is stored in
+places_examen, so a student's timetable shows their own room. Everything is
+set-based: a few queries for the exams, their rooms and students, then one
+DELETE, one INSERT and one bulk UPDATE of the room counts.
+
+A change of main room invalidates both tables: batch moves and exam edits
+refuse it for a split exam (split_exam_ids()), and detach_rooms() drops the
+extra rooms and the allocation of the exams whose room does change, before
+allocate_seats() redoes the allocation of those that had one. A change of
+slot keeps the rooms, which the overlap trigger checks at the new time.
+"""
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Sequence, Set
+
+from sqlalchemy import delete, insert, update
+from sqlalchemy.orm import Session
+
+from app.models import Etudiant, Examen, ExamenSalle, Inscription, InscriptionStatus, LieuExamen, PlaceExamen
+
+SEATING_DDL: List[str] = [
+    """
+-- Fonction: Vérifier les chevauchements horaires pour une salle (salles supplémentaires comprises)
+CREATE OR REPLACE FUNCTION check_room_overlap()
+RETURNS TRIGGER AS $$
+DECLARE
+    overlap_count INTEGER;
+    rooms INTEGER[];
+BEGIN
+    IF NEW.date_heure IS NOT NULL THEN
+        -- Salle principale et salles supplémentaires de l'examen
+        rooms := ARRAY(SELECT salle_id FROM examen_salles WHERE examen_id = COALESCE(NEW.id, 0));
+        IF NEW.salle_id IS NOT NULL THEN
+            rooms := rooms || NEW.salle_id;
+        END IF;
+        IF cardinality(rooms) = 0 THEN
+            RETURN NEW;
+        END IF;
+
+        SELECT COUNT(*) INTO overlap_count
+        FROM examens e
+        WHERE e.id IN (
+            SELECT id FROM examens WHERE salle_id = ANY(rooms)
+            UNION
+            SELECT examen_id FROM examen_salles WHERE salle_id = ANY(rooms)
+        )
+        AND e.id != COALESCE(NEW.id, 0)
+        AND e.statut NOT IN ('cancelled', 'draft')
+        -- Examens des sessions non publiées: invisibles (brouillons)
+        AND NOT EXISTS (SELECT 1 FROM sessions_generation sg WHERE sg.id = e.session_id AND sg.brouillon)
+        AND (
+            (NEW.date_heure, NEW.date_heure + (NEW.duree_minutes || ' minutes')::INTERVAL)
+            OVERLAPS
+            (e.date_heure, e.date_heure + (e.duree_minutes || ' minutes')::INTERVAL)
+        );
+
+        IF overlap_count > 0 THEN
+            RAISE EXCEPTION 'La salle est déjà occupée pendant ce créneau';
+        END IF;
+    END IF;
+
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql
+""",
+    "DROP TRIGGER IF EXISTS trg_check_room_overlap ON examens",
+    """
+CREATE TRIGGER trg_check_room_overlap
+    BEFORE INSERT OR UPDATE ON examens
+    FOR EACH ROW EXECUTE FUNCTION check_room_overlap()
+""",
+    """
+-- Fonction: Vérifier qu'une salle supplémentaire est libre pendant l'examen
+CREATE OR REPLACE FUNCTION check_examen_salle_overlap()
+RETURNS TRIGGER AS $$
+DECLARE
+    overlap_count INTEGER;
+BEGIN
+    SELECT COUNT(*) INTO overlap_count
+    FROM examens own
+    JOIN examens e ON e.id != own.id
+    WHERE own.id = NEW.examen_id
+    AND e.id IN (
+        SELECT id FROM examens WHERE salle_id = NEW.salle_id
+        UNION
+        SELECT examen_id FROM examen_salles WHERE salle_id = NEW.salle_id
+    )
+    AND e.statut NOT IN ('cancelled', 'draft')
+    AND NOT EXISTS (SELECT 1 FROM sessions_generation sg WHERE sg.id = e.session_id AND sg.brouillon)
+    AND (
+        (own.date_heure, own.date_heure + (own.duree_minutes || ' minutes')::INTERVAL)
+        OVERLAPS
+        (e.date_heure, e.date_heure + (e.duree_minutes || ' minutes')::INTERVAL)
+    );
+
+    IF overlap_count > 0 THEN
+        RAISE EXCEPTION 'La salle est déjà occupée pendant ce créneau';
+    END IF;
+
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql
+""",
+    "DROP TRIGGER IF EXISTS trg_check_examen_salle_overlap ON examen_salles",
+    """
+CREATE TRIGGER trg_check_examen_salle_overlap
+    BEFORE INSERT OR UPDATE ON examen_salles
+    FOR EACH ROW EXECUTE FUNCTION check_examen_salle_overlap()
+""",
+    """
+-- Vue: Planning étudiant
+CREATE OR REPLACE VIEW v_planning_etudiant AS
+SELECT
+    et.id as etudiant_id,
+    et.nom,
+    et.prenom,
+    et.matricule,
+    e.id as examen_id,
+    m.nom as module_nom,
+    e.date_heure,
+    e.duree_minutes,
+    l.nom as salle,
+    l.batiment,
+    e.statut,
+    p.numero_place
+FROM etudiants et
+JOIN inscriptions i ON i.etudiant_id = et.id AND i.statut = 'active'
+JOIN modules m ON m.id = i.module_id
+JOIN examens e ON e.module_id = m.id
+    AND NOT EXISTS (SELECT 1 FROM sessions_generation sg WHERE sg.id = e.session_id AND sg.brouillon)
+LEFT JOIN places_examen p ON p.examen_id = e.id AND p.etudiant_id = et.id
+LEFT JOIN lieux_examen l ON l.id = COALESCE(p.salle_id, e.salle_id)
+ORDER BY et.id, e.date_heure
+""",
+]
+
+
+def _minimal_cover(rooms: Sequence, needed: int) -> Optional[List]:
+    """
+    Plus grandes salles d'abord jusqu'à couvrir needed, la dernière
+    remplacée par la plus petite salle suffisante (None si impossible).
+    """
+    ordered = sorted(rooms, key=lambda room: (-room.capacite_examen, room.id))
+    chosen, covered = [], 0
+    for room in ordered:
+        if covered >= needed:
+            break
+        chosen.append(room)
+        covered += room.capacite_examen
+    if covered < needed:
+        return None
+    remainder = needed - (covered - chosen[-1].capacite_examen)
+    smallest = min(
+        (room for room in ordered[len(chosen) - 1:] if room.capacite_examen >= remainder),
+        key=lambda room: (room.capacite_examen, room.id)
+    )
+    chosen[-1] = smallest
+    return chosen
+
+
+def choose_rooms(free_rooms: Sequence, needed: int) -> Optional[List]:
+    """
+    Salles (objets avec id, capacite_examen, batiment) pour needed
+    étudiants dans un même créneau: une seule si possible, sinon le moins
+    de salles d'un même bâtiment, sinon plusieurs bâtiments. La première
+    est la plus grande (salle principale). None si la capacité libre ne
+    suffit pas.
+    """
+    single = [room for room in free_rooms if room.capacite_examen >= needed]
+    if single:
+        return [min(single, key=lambda room: (room.capacite_examen, room.id))]
+
+    by_building: Dict[str, List] = defaultdict(list)
+    for room in free_rooms:
+        by_building[room.batiment].append(room)
+    best = None
+    for rooms in by_building.values():
+        chosen = _minimal_cover(rooms, needed)
+        if chosen is not None:
+            waste = sum(room.capacite_examen for room in chosen) - needed
+            if best is None or (len(chosen), waste) < (len(best[0]), best[1]):
+                best = (chosen, waste)
+    if best is not None:
+        chosen = best[0]
+    else:
+        # Bâtiments les plus grands d'abord, pour en utiliser le moins possible
+        buildings = sorted(
+            by_building.values(), key=lambda rooms: -sum(room.capacite_examen for room in rooms)
+        )
+        chosen, covered = [], 0
+        for rooms in buildings:
+            if covered >= needed:
+                break
+            remaining = needed - covered
+            capacity = sum(room.capacite_examen for room in rooms)
+            part = _minimal_cover(rooms, remaining) if capacity >= remaining else list(rooms)
+            chosen += part
+            covered += sum(room.capacite_examen for room in part)
+        if covered < needed:
+            return None
+    return sorted(chosen, key=lambda room: (-room.capacite_examen, room.id))
+
+
+def allocate_seats(db: Session, examen_ids: Iterable[int], numeroter: bool = True) -> Dict:
+    """
+    Répartit les inscrits actifs de chaque examen entre ses salles (ordre
+    alphabétique, salles dans l'ordre de examen_salles), avec un numéro de
+    place si numeroter. Remplace la répartition précédente, sans valider
+    la transaction.
+    """
+    examen_ids = list(examen_ids)
+    if not examen_ids:
+        return {"nb_examens": 0, "nb_etudiants_places": 0, "nb_sans_place": 0}
+
+    exams = {
+        examen_id: (module_id, salle_id)
+        for examen_id, module_id, salle_id in db.query(
+            Examen.id, Examen.module_id, Examen.salle_id
+        ).filter(Examen.id.in_(examen_ids)).all()
+    }
+    capacities = dict(db.query(LieuExamen.id, LieuExamen.capacite).all())
+    # (salle, ligne examen_salles) par examen; salle principale seule sinon
+    rooms: Dict[int, List[tuple]] = defaultdict(list)
+    for row_id, examen_id, salle_id in db.query(ExamenSalle.id, ExamenSalle.examen_id, ExamenSalle.salle_id).filter(
+        ExamenSalle.examen_id.in_(exams)
+    ).order_by(ExamenSalle.examen_id, ExamenSalle.id).all():
+        rooms[examen_id].append((salle_id, row_id))
+    for examen_id, (_, salle_id) in exams.items():
+        if not rooms[examen_id] and salle_id is not None:
+            rooms[examen_id].append((salle_id, None))
+
+    students: Dict[int, List[int]] = defaultdict(list)
+    for module_id, etudiant_id in db.query(Inscription.module_id, Inscription.etudiant_id).join(
+        Etudiant, Etudiant.id == Inscription.etudiant_id
+    ).filter(
+        Inscription.module_id.in_({module_id for module_id, _ in exams.values()}),
+        Inscription.statut == InscriptionStatus.ACTIVE
+    ).order_by(Inscription.module_id, Etudiant.nom, Etudiant.prenom, Etudiant.matricule).all():
+        students[module_id].append(etudiant_id)
+
+    places, counts = [], []
+    unplaced = 0
+    for examen_id, (module_id, _) in exams.items():
+        queue = students.get(module_id, [])
+        position = 0
+        for salle_id, row_id in rooms[examen_id]:
+            seats = (capacities.get(salle_id) or 0) // 2
+            placed = queue[position:position + seats]
+            places += [
+                {
+                    "examen_id": examen_id,
+                    "etudiant_id": etudiant_id,
+                    "salle_id": salle_id,
+                    # Une place sur deux (capacité d'examen = capacité / 2)
+                    "numero_place": 2 * seat + 1 if numeroter else None,
+                }
+                for seat, etudiant_id in enumerate(placed)
+            ]
+            if row_id is not None:
+                counts.append({"id": row_id, "nb_places": len(placed)})
+            position += len(placed)
+        unplaced += len(queue) - position
+
+    db.execute(delete(PlaceExamen).where(
+        PlaceExamen.examen_id.in_(list(exams))
+    ).execution_options(synchronize_session=False))
+    if places:
+        db.execute(insert(PlaceExamen), places)
+    if counts:
+        db.execute(update(ExamenSalle), counts)
+    return {"nb_examens": len(exams), "nb_etudiants_places": len(places), "nb_sans_place": unplaced}
+
+
+def split_exam_ids(db: Session, examen_ids: Iterable[int]) -> Set[int]:
+    """Examens répartis sur plusieurs salles (lignes examen_salles) parmi examen_ids"""
+    examen_ids = list(examen_ids)
+    if not examen_ids:
+        return set()
+    return {examen_id for (examen_id,) in db.query(ExamenSalle.examen_id).filter(
+        ExamenSalle.examen_id.in_(examen_ids)
+    ).distinct().all()}
+
+
+def detach_rooms(db: Session, examen_ids: Iterable[int]) -> List[int]:
+    """
+    Salle principale changée: supprime les salles supplémentaires et la
+    répartition des étudiants des examens, sans valider la transaction.
+    Renvoie les examens qui avaient une répartition, à refaire par
+    allocate_seats() une fois la nouvelle salle écrite.
+    """
+    examen_ids = list(examen_ids)
+    if not examen_ids:
+        return []
+    seated = sorted(examen_id for (examen_id,) in db.query(PlaceExamen.examen_id).filter(
+        PlaceExamen.examen_id.in_(examen_ids)
+    ).distinct().all())
+    db.execute(delete(ExamenSalle).where(
+        ExamenSalle.examen_id.in_(examen_ids)
+    ).execution_options(synchronize_session=False))
+    db.execute(delete(PlaceExamen).where(
+        PlaceExamen.examen_id.in_(examen_ids)
+    ).execution_options(synchronize_session=False))
+    return seated
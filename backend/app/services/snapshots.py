@@ -0,0 +1,336 @@
+"""
+Schedule versions: snapshots, diff, promotion and rollback
+
+A snapshot (EdtSnapshot.donnees) stores one placement per module as parallel
+arrays sorted by module id: exam id, start (minutes since 2000-01-01, null
+when the module has no active exam), duration, room, professor and status.
+Each generation session is captured when it completes; the live schedule can
+be captured at any time.
+
+diff_placements() compares two versions module by module in memory (moved,
+added, removed exams) and counts the affected students in one query.
+promote_snapshot() makes a snapshot the live schedule of its modules in one
+transaction, after capturing what it replaces, so that a rollback is the
+promotion of that backup. Removed exams are cancelled and moved rows set to
+draft before any row gets its final placement, so that the per-row overlap
+triggers never see a half-applied swap. The exams of an unpublished
+generation session are left out: they only go live through
+app.services.staging.publish_session(). A version records the main room only, so an exam promoted to another room
+loses its extra rooms and has its seat allocation redone in that room.
+"""
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import func, insert, not_, update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models import EdtSnapshot, Examen, ExamStatus, Inscription, InscriptionStatus, Module, SessionGeneration
+from app.services.availability import INACTIVE_STATUSES, live_exams, unpublished_exams
+from app.services.seating import allocate_seats, detach_rooms
+from app.services.staging import lock_schedule
+
+_EPOCH = datetime(2000, 1, 1)
+
+
+class Placement(NamedTuple):
+    module_id: int
+    examen_id: Optional[int]
+    date_heure: Optional[datetime]  # None: aucun examen actif
+    duree_minutes: Optional[int]
+    salle_id: Optional[int]
+    prof_id: Optional[int]
+    statut: Optional[str]
+
+    # Même interface qu'un examen pour examen_change_keys()
+    @property
+    def id(self) -> Optional[int]:
+        return self.examen_id
+
+
+def encode(placements: Dict[int, Optional[Placement]]) -> Dict[str, List]:
+    """Placements par module -> tableaux parallèles (colonne donnees)"""
+    data: Dict[str, List] = {key: [] for key in (
+        "module_ids", "examen_ids", "debuts", "durees", "salle_ids", "prof_ids", "statuts"
+    )}
+    for module_id in sorted(placements):
+        placement = placements[module_id]
+        data["module_ids"].append(module_id)
+        if placement is None or placement.date_heure is None:
+            for key in ("examen_ids", "debuts", "durees", "salle_ids", "prof_ids", "statuts"):
+                data[key].append(None)
+            continue
+        data["examen_ids"].append(placement.examen_id)
+        data["debuts"].append(int((placement.date_heure - _EPOCH).total_seconds()) // 60)
+        data["durees"].append(placement.duree_minutes)
+        data["salle_ids"].append(placement.salle_id)
+        data["prof_ids"].append(placement.prof_id)
+        data["statuts"].append(placement.statut)
+    return data
+
+
+def decode(data: Dict[str, List]) -> Dict[int, Optional[Placement]]:
+    """Tableaux parallèles -> placements par module (None: pas d'examen)"""
+    placements: Dict[int, Optional[Placement]] = {}
+    for module_id, examen_id, debut, duree, salle_id, prof_id, statut in zip(
+        data["module_ids"], data["examen_ids"], data["debuts"], data["durees"],
+        data["salle_ids"], data["prof_ids"], data["statuts"]
+    ):
+        placements[module_id] = None if debut is None else Placement(
+            module_id, examen_id, _EPOCH + timedelta(minutes=debut), duree, salle_id, prof_id, statut
+        )
+    return placements
+
+
+def live_placements(
+    db: Session,
+    module_ids: Optional[Iterable[int]] = None,
+    session_id: Optional[int] = None,
+    include_drafts: bool = False
+) -> Dict[int, Optional[Placement]]:
+    """
+    EDT en place: examen actif de chaque module (le plus ancien s'il y en a
+    plusieurs). Les modules demandés sans examen actif valent None.
+    include_drafts: examens des sessions non publiées compris (version
+    d'une session non publiée, app.services.staging).
+    """
+    query = db.query(
+        Examen.module_id, Examen.id, Examen.date_heure, Examen.duree_minutes,
+        Examen.salle_id, Examen.prof_id, Examen.statut
+    )
+    if include_drafts:
+        query = query.filter(Examen.statut.notin_(INACTIVE_STATUSES))
+    else:
+        query = query.filter(live_exams())
+    if module_ids is not None:
+        module_ids = list(module_ids)
+        query = query.filter(Examen.module_id.in_(module_ids))
+    if session_id is not None:
+        query = query.filter(Examen.session_id == session_id)
+
+    placements: Dict[int, Optional[Placement]] = {module_id: None for module_id in module_ids or ()}
+    for row in query.order_by(Examen.id.desc()).all():
+        placements[row.module_id] = Placement(
+            row.module_id, row.id, row.date_heure, row.duree_minutes,
+            row.salle_id, row.prof_id, getattr(row.statut, "value", row.statut)
+        )
+    return placements
+
+
+def capture_snapshot(
+    db: Session,
+    placements: Dict[int, Optional[Placement]],
+    type: str = "manuel",
+    session_id: Optional[int] = None,
+    user_id: Optional[int] = None,
+    libelle: Optional[str] = None
+) -> EdtSnapshot:
+    """Enregistre une version (sans valider la transaction)"""
+    snapshot = EdtSnapshot(
+        session_id=session_id,
+        user_id=user_id,
+        type=type,
+        libelle=libelle,
+        nb_examens=sum(1 for placement in placements.values() if placement is not None),
+        donnees=encode(placements)
+    )
+    db.add(snapshot)
+    db.flush()
+    return snapshot
+
+
+def _changes(before: Placement, after: Placement) -> List[str]:
+    changes = []
+    if before.date_heure != after.date_heure:
+        days = (after.date_heure.date() - before.date_heure.date()).days
+        changes.append(f"jour ({days:+d})" if days else "horaire")
+    if before.duree_minutes != after.duree_minutes:
+        changes.append("duree")
+    if before.salle_id != after.salle_id:
+        changes.append("salle")
+    if before.prof_id != after.prof_id:
+        changes.append("enseignant")
+    if before.statut != after.statut:
+        changes.append("statut")
+    return changes
+
+
+def _summary(placement: Placement) -> Dict:
+    return {
+        "examen_id": placement.examen_id,
+        "date_heure": placement.date_heure,
+        "duree_minutes": placement.duree_minutes,
+        "salle_id": placement.salle_id,
+        "prof_id": placement.prof_id,
+        "statut": placement.statut,
+    }
+
+
+def diff_placements(
+    db: Session,
+    before: Dict[int, Optional[Placement]],
+    after: Dict[int, Optional[Placement]]
+) -> Dict:
+    """
+    Différences de before à after: examens déplacés, ajoutés, supprimés,
+    et nombre d'étudiants (inscrits actifs) concernés.
+    """
+    moved, added, removed = [], [], []
+    unchanged = 0
+    for module_id in sorted(set(before) | set(after)):
+        old, new = before.get(module_id), after.get(module_id)
+        if old is None and new is None:
+            continue
+        if old is None:
+            added.append({"module_id": module_id, "apres": _summary(new), "changements": []})
+        elif new is None:
+            removed.append({"module_id": module_id, "avant": _summary(old), "changements": []})
+        else:
+            changes = _changes(old, new)
+            if changes:
+                moved.append({"module_id": module_id, "avant": _summary(old), "apres": _summary(new),
+                              "changements": changes})
+            else:
+                unchanged += 1
+
+    changed = [item["module_id"] for item in moved + added + removed]
+    students = 0
+    if changed:
+        modules = {
+            module_id: (code, nb_inscrits or 0)
+            for module_id, code, nb_inscrits in db.query(
+                Module.id, Module.code, Module.nb_inscrits_actifs
+            ).filter(Module.id.in_(changed)).all()
+        }
+        for item in moved + added + removed:
+            item["module_code"], item["nb_inscrits"] = modules.get(item["module_id"], (None, 0))
+        students = db.query(func.count(func.distinct(Inscription.etudiant_id))).filter(
+            Inscription.module_id.in_(changed),
+            Inscription.statut == InscriptionStatus.ACTIVE
+        ).scalar() or 0
+
+    return {
+        "deplaces": moved,
+        "ajoutes": added,
+        "supprimes": removed,
+        "nb_inchanges": unchanged,
+        "etudiants_concernes": students,
+    }
+
+
+def promote_snapshot(
+    db: Session,
+    snapshot: EdtSnapshot,
+    user_id: Optional[int] = None
+) -> Tuple[EdtSnapshot, List[Placement], List[Placement]]:
+    """
+    Remplace l'EDT en place des modules de la version par celle-ci, sans
+    valider la transaction. Renvoie (sauvegarde de l'EDT remplacé,
+    placements remplacés, placements écrits).
+    ValueError pour la version d'une session non publiée (à publier).
+    """
+    if snapshot.session_id is not None and db.query(SessionGeneration.brouillon).filter(
+        SessionGeneration.id == snapshot.session_id
+    ).scalar():
+        raise ValueError("Version d'une génération non publiée: publier la session")
+    lock_schedule(db)
+    target = decode(snapshot.donnees)
+    module_ids = list(target)
+    # Brouillons des sessions non publiées ni remplacés ni réactivés
+    rows = db.query(
+        Examen.id, Examen.module_id, Examen.date_heure, Examen.duree_minutes,
+        Examen.salle_id, Examen.prof_id, Examen.statut
+    ).filter(
+        Examen.module_id.in_(module_ids),
+        not_(unpublished_exams())
+    ).order_by(Examen.id.desc()).with_for_update().all()
+    by_id, live = {}, {module_id: None for module_id in module_ids}
+    for row in rows:
+        placement = Placement(
+            row.module_id, row.id, row.date_heure, row.duree_minutes,
+            row.salle_id, row.prof_id, getattr(row.statut, "value", row.statut)
+        )
+        by_id[row.id] = placement
+        if placement.statut not in INACTIVE_STATUSES:
+            live[row.module_id] = placement
+
+    backup = capture_snapshot(
+        db, live, type="sauvegarde", session_id=snapshot.session_id, user_id=user_id,
+        libelle=f"Avant promotion de la version {snapshot.id}"
+    )
+
+    updates, inserts, cancelled, replaced, written, rehoused = [], [], [], [], [], []
+    for module_id, wanted in target.items():
+        current = live[module_id]
+        if wanted is None:
+            if current is not None:
+                cancelled.append(current.examen_id)
+                replaced.append(current)
+            continue
+        row = current
+        if row is None and wanted.examen_id in by_id and by_id[wanted.examen_id].module_id == module_id:
+            # Examen de la version annulé depuis: réactivé plutôt que recréé
+            row = by_id[wanted.examen_id]
+        values = {
+            "date_heure": wanted.date_heure,
+            "duree_minutes": wanted.duree_minutes,
+            "salle_id": wanted.salle_id,
+            "prof_id": wanted.prof_id,
+            "statut": ExamStatus(wanted.statut or "scheduled"),
+        }
+        if row is None:
+            inserts.append({"module_id": module_id, "session_id": snapshot.session_id, **values})
+            written.append(wanted)
+        elif _changes(row, wanted):
+            updates.append({"id": row.id, **values})
+            if row.salle_id != wanted.salle_id:
+                rehoused.append(row.id)
+            replaced.append(row)
+            written.append(wanted._replace(examen_id=row.id))
+
+    # Salles supplémentaires retirées avant l'écriture: le trigger de
+    # chevauchement les vérifierait au nouveau créneau
+    seated = detach_rooms(db, rehoused)
+    # Examens retirés annulés et examens déplacés passés en brouillon avant
+    # tout placement final: les triggers de chevauchement ignorent les deux
+    if cancelled:
+        db.execute(update(Examen).where(Examen.id.in_(cancelled)).values(
+            statut=ExamStatus.CANCELLED
+        ).execution_options(synchronize_session=False))
+    if updates:
+        db.execute(update(Examen).where(Examen.id.in_([item["id"] for item in updates])).values(
+            statut=ExamStatus.DRAFT
+        ).execution_options(synchronize_session=False))
+        db.execute(update(Examen), updates)
+    if inserts:
+        counts = dict(db.query(Module.id, Module.nb_inscrits_actifs).filter(
+            Module.id.in_([item["module_id"] for item in inserts])
+        ).all())
+        for item in inserts:
+            item["nb_inscrits"] = counts.get(item["module_id"]) or 0
+        db.execute(insert(Examen), inserts)
+    if seated:
+        allocate_seats(db, seated, numeroter=settings.SCHEDULING_SEAT_NUMBERS)
+
+    now = datetime.utcnow()
+    snapshot.promu_at = now
+    snapshot.annule_at = None
+    snapshot.sauvegarde_id = backup.id
+    return backup, replaced, written
+
+
+def rollback_snapshot(
+    db: Session,
+    snapshot: EdtSnapshot,
+    user_id: Optional[int] = None
+) -> Tuple[EdtSnapshot, List[Placement], List[Placement]]:
+    """
+    Annule la promotion de la version: l'EDT sauvegardé à ce moment est
+    promu à son tour (sans valider la transaction).
+    """
+    backup = db.get(EdtSnapshot, snapshot.sauvegarde_id) if snapshot.sauvegarde_id else None
+    if snapshot.promu_at is None or snapshot.annule_at is not None or backup is None:
+        raise ValueError("Cette version n'est pas promue ou sa sauvegarde n'existe plus")
+    result = promote_snapshot(db, backup, user_id)
+    snapshot.annule_at = datetime.utcnow()
+    return result
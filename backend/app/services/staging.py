@@ -0,0 +1,197 @@
+"""
+Staged generation: session drafts and atomic publication
+
+A generation writes its exams into the live table under a session flagged
+brouillon. unpublished_exams() (app.services.availability) hides the exams of
+such a session from every active-exam query, trigger, index and view, so a
+run in progress or a failed run is never visible; the triggers still check
+each draft against the live schedule while it is written.
+
+publish_session() makes the whole schedule live by clearing the session's
+flag: one row of sessions_generation is written whatever the number of
+exams, and no exam trigger fires. The overlap and daily-limit checks are
+done instead by publication_conflict() on a fresh occupancy index, under a
+transaction-level advisory lock (lock_schedule()) that every write to a live
+exam also takes: a concurrent publication, manual edit or batch move waits
+for the check-and-flip to commit, and the row triggers of those writes then
+see the published exams. discard_session_drafts() drops a candidate schedule
+with one DELETE.
+
+CONSTRAINT_DDL holds the per-day checks of the exam triggers, which skip the
+exams of unpublished sessions like the overlap checks of app.services.seating.
+"""
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from sqlalchemy import delete, func, text
+from sqlalchemy.orm import Session
+
+from app.models import Examen, ExamenSalle, SessionGeneration, SessionStatus
+from app.services.availability import INACTIVE_STATUSES, OccupancyIndex, live_exams
+
+# Verrou consultatif: publication et écritures d'examens en place
+SCHEDULE_LOCK_ID = 724203
+
+CONSTRAINT_DDL: List[str] = [
+    """
+-- Fonction: Vérifier qu'un étudiant n'a pas plus d'1 examen par jour
+CREATE OR REPLACE FUNCTION check_student_exam_per_day()
+RETURNS TRIGGER AS $$
+DECLARE
+    conflict_count INTEGER;
+BEGIN
+    SELECT COUNT(*) INTO conflict_count
+    FROM examens e
+    JOIN inscriptions i ON i.module_id = e.module_id
+    WHERE i.etudiant_id IN (
+        SELECT etudiant_id FROM inscriptions WHERE module_id = NEW.module_id
+    )
+    AND DATE(e.date_heure) = DATE(NEW.date_heure)
+    AND e.id != COALESCE(NEW.id, 0)
+    AND e.statut NOT IN ('cancelled', 'draft')
+    -- Examens des sessions non publiées: invisibles (brouillons)
+    AND NOT EXISTS (SELECT 1 FROM sessions_generation sg WHERE sg.id = e.session_id AND sg.brouillon);
+    
+    IF conflict_count > 0 THEN
+        RAISE WARNING 'Conflit détecté: % étudiant(s) ont déjà un examen ce jour', conflict_count;
+    END IF;
+    
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql
+""",
+    "DROP TRIGGER IF EXISTS trg_check_student_exam ON examens",
+    """
+CREATE TRIGGER trg_check_student_exam
+    BEFORE INSERT OR UPDATE ON examens
+    FOR EACH ROW EXECUTE FUNCTION check_student_exam_per_day()
+""",
+    """
+-- Fonction: Vérifier qu'un professeur n'a pas plus de 3 examens par jour
+CREATE OR REPLACE FUNCTION check_professor_exam_limit()
+RETURNS TRIGGER AS $$
+DECLARE
+    exam_count INTEGER;
+BEGIN
+    IF NEW.prof_id IS NOT NULL THEN
+        SELECT COUNT(*) INTO exam_count
+        FROM examens e
+        WHERE e.prof_id = NEW.prof_id
+        AND DATE(e.date_heure) = DATE(NEW.date_heure)
+        AND e.id != COALESCE(NEW.id, 0)
+        AND e.statut NOT IN ('cancelled', 'draft')
+        AND NOT EXISTS (SELECT 1 FROM sessions_generation sg WHERE sg.id = e.session_id AND sg.brouillon);
+        
+        IF exam_count >= 3 THEN
+            RAISE EXCEPTION 'Le professeur a déjà 3 examens planifiés ce jour';
+        END IF;
+    END IF;
+    
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql
+""",
+    "DROP TRIGGER IF EXISTS trg_check_professor_limit ON examens",
+    """
+CREATE TRIGGER trg_check_professor_limit
+    BEFORE INSERT OR UPDATE ON examens
+    FOR EACH ROW EXECUTE FUNCTION check_professor_exam_limit()
+""",
+]
+
+
+def lock_schedule(db: Session) -> None:
+    """
+    Sérialise la publication et les écritures d'examens en place jusqu'à la
+    fin de la transaction (PostgreSQL seulement). À prendre avant d'écrire.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(text("SELECT pg_advisory_xact_lock(:id)"), {"id": SCHEDULE_LOCK_ID})
+
+
+def discard_session_drafts(db: Session, session_id: int) -> int:
+    """Supprime les examens de la session non publiée (sans valider); renvoie leur nombre"""
+    return db.execute(delete(Examen).where(
+        Examen.session_id == session_id
+    ).execution_options(synchronize_session=False)).rowcount or 0
+
+
+def publication_conflict(db: Session, session_id: int) -> Optional[str]:
+    """
+    Premier conflit entre les examens de la session et l'EDT en place
+    (saisi depuis la génération): module déjà planifié, salle ou
+    enseignant occupé, charge journalière dépassée. Lecture seule, sur un
+    index d'occupation reconstruit (à appeler sous lock_schedule()).
+    """
+    exams = db.query(
+        Examen.id, Examen.module_id, Examen.salle_id, Examen.prof_id,
+        Examen.date_heure, Examen.duree_minutes
+    ).filter(
+        Examen.session_id == session_id,
+        Examen.statut.notin_(INACTIVE_STATUSES)
+    ).all()
+    if not exams:
+        return None
+
+    duplicate = db.query(Examen.id, Examen.module_id).filter(
+        Examen.module_id.in_({exam.module_id for exam in exams}),
+        live_exams()
+    ).first()
+    if duplicate is not None:
+        return f"Le module {duplicate.module_id} a déjà un examen planifié (examen {duplicate.id})"
+
+    extra_rooms = {}
+    for examen_id, salle_id in db.query(ExamenSalle.examen_id, ExamenSalle.salle_id).join(
+        Examen, Examen.id == ExamenSalle.examen_id
+    ).filter(Examen.session_id == session_id).all():
+        extra_rooms.setdefault(examen_id, set()).add(salle_id)
+
+    # Pas l'index partagé: il peut précéder une écriture validée à l'instant
+    index = OccupancyIndex.build(db)
+    prof_days = Counter()
+    for exam in exams:
+        start = exam.date_heure
+        end = start + timedelta(minutes=exam.duree_minutes or 120)
+        for salle_id in ({exam.salle_id} | extra_rooms.get(exam.id, set())) - {None}:
+            occupied = index.room_timeline(salle_id).conflicts(start, end)
+            if occupied:
+                return f"Salle {salle_id} déjà occupée par l'examen {occupied[0]} (examen {exam.id})"
+        if exam.prof_id is None:
+            continue
+        occupied = index.prof_timeline(exam.prof_id).conflicts(start, end)
+        if occupied:
+            return f"Enseignant {exam.prof_id} déjà pris par l'examen {occupied[0]} (examen {exam.id})"
+        prof_days[(exam.prof_id, start.date())] += 1
+        prof = index.professors.get(exam.prof_id)
+        limit = prof["max_surveillances"] if prof else 3
+        if index.prof_load(exam.prof_id, start.date()) + prof_days[(exam.prof_id, start.date())] > limit:
+            return f"Enseignant {exam.prof_id}: plus de {limit} examens le {start.date()}"
+    return None
+
+
+def publish_session(db: Session, session: SessionGeneration) -> int:
+    """
+    Publie les examens de la session (sans valider la transaction) en
+    levant son drapeau brouillon; renvoie leur nombre.
+    ValueError si la session n'est pas publiable ou si ses examens entrent
+    en conflit avec l'EDT en place (publication concurrente, saisie
+    manuelle).
+    """
+    if not session.brouillon:
+        raise ValueError("Session déjà publiée")
+    if session.statut != SessionStatus.COMPLETED:
+        raise ValueError("Seule une génération terminée peut être publiée")
+
+    lock_schedule(db)
+    conflict = publication_conflict(db, session.id)
+    if conflict is not None:
+        raise ValueError(conflict)
+
+    session.brouillon = False
+    session.publiee_at = datetime.utcnow()
+    db.flush()
+    return db.query(func.count(Examen.id)).filter(
+        Examen.session_id == session.id,
+        Examen.statut.notin_(INACTIVE_STATUSES)
+    ).scalar() or 0
@@ -0,0 +1,225 @@
+"""
+Alternative placements for one exam
+
+suggest_moves() evaluates every (slot, room, professor) candidate for an exam
+against the in-memory schedule snapshot (app.services.availability): room and
+professor overlaps, professor daily limit, formation daily limit and overlaps
+with exams that share students. Only the shared-student counts are read from
+the database, in one query. The disruption score is a sum of per-slot,
+per-room and per-professor terms, so the top k candidates of a slot are among
+its k best rooms combined with its k best professors. An exam split across
+several rooms keeps them: only slots where all of them are free are
+candidates.
+"""
+import heapq
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session, aliased
+
+from app.models import Inscription, InscriptionStatus
+from app.services.availability import ExamSlot, OccupancyIndex
+from app.services.scheduler import MAX_EXAMS_PER_FORMATION_DAY, generate_time_slots
+
+# Poids du score de perturbation (plus bas = moins perturbant)
+DISRUPTION_WEIGHTS = {
+    "horaire": 1.0,           # changement d'heure
+    "jour": 2.0,              # par jour de décalage
+    "salle": 2.0,
+    "batiment": 1.0,
+    "enseignant": 4.0,
+    "meme_jour": 3.0,         # x part des inscrits ayant un autre examen ce jour-là
+    "places_libres": 0.5,     # x part des places inoccupées
+}
+
+
+def shared_students(db: Session, module_ids: Iterable[int]) -> Dict[int, Dict[int, int]]:
+    """Inscrits communs avec chaque module, par autre module (une requête)"""
+    module_ids = list(module_ids)
+    mine = aliased(Inscription)
+    other = aliased(Inscription)
+    rows = db.query(mine.module_id, other.module_id, func.count(other.id)).join(
+        other, other.etudiant_id == mine.etudiant_id
+    ).filter(
+        mine.module_id.in_(module_ids),
+        mine.statut == InscriptionStatus.ACTIVE,
+        other.module_id != mine.module_id,
+        other.statut == InscriptionStatus.ACTIVE
+    ).group_by(mine.module_id, other.module_id).all()
+    shared: Dict[int, Dict[int, int]] = {module_id: {} for module_id in module_ids}
+    for module_id, other_id, count in rows:
+        shared[module_id][other_id] = count
+    return shared
+
+
+def cached_shared_students(db: Session, index: OccupancyIndex, module_id: int) -> Dict[int, int]:
+    """shared_students() d'un module, mémorisé avec l'index courant"""
+    shared = index.shared_students.get(module_id)
+    if shared is None:
+        shared = shared_students(db, [module_id])[module_id]
+        index.shared_students[module_id] = shared
+    return shared
+
+
+def suggest_moves(
+    db: Session,
+    index: OccupancyIndex,
+    exam: ExamSlot,
+    nb_inscrits: int,
+    dept_id: int,
+    date_debut: datetime,
+    date_fin: datetime,
+    k: int = 10,
+    exclude_salles: Iterable[int] = (),
+    exclude_profs: Iterable[int] = (),
+    exclude_days: Iterable[date] = (),
+    include_current: bool = False,
+    shared: Optional[Dict[int, int]] = None,
+    now: Optional[datetime] = None
+) -> Tuple[List[Dict], int]:
+    """
+    Meilleurs déplacements de l'examen, du moins au plus perturbant.
+    include_current: l'affectation actuelle est un candidat (score 0 hors
+    pénalités) si elle reste valide. shared: inscrits communs déjà chargés
+    par shared_students().
+    Renvoie (suggestions, nombre de candidats valides évalués).
+    """
+    weights = DISRUPTION_WEIGHTS
+    duration = exam.end - exam.start
+    now = now or datetime.utcnow()
+    exclude_salles = set(exclude_salles)
+    exclude_profs = set(exclude_profs)
+    exclude_days = set(exclude_days)
+    ignore = {exam.id}
+    current_room = index.rooms.get(exam.salle_id)
+    # Examen réparti (app.services.seating): salles conservées, créneau seul
+    split_rooms = None
+    if index.extra_rooms.get(exam.id) and current_room is not None:
+        split_rooms = [index.rooms.get(salle_id) for salle_id in index.exam_rooms(exam)]
+
+    # Examens ayant des étudiants en commun: (début, fin, inscrits communs)
+    if shared is None:
+        shared = shared_students(db, [exam.module_id])[exam.module_id]
+    student_exams = [
+        (other.start, other.end, shared[other.module_id])
+        for other in index.exams_of_modules(shared)
+        if other.id != exam.id
+    ]
+
+    # Enseignants candidats: l'actuel puis ceux du département du module
+    professors = [
+        prof for prof in index.professors.values()
+        if prof["id"] not in exclude_profs and (prof["id"] == exam.prof_id or prof["dept_id"] == dept_id)
+    ]
+
+    slots = set(generate_time_slots(date_debut, date_fin))
+    if date_debut <= exam.start <= date_fin:
+        slots.add(exam.start)
+
+    heap: List[tuple] = []
+    evaluated = 0
+    for slot in sorted(slots):
+        if slot < now or slot.date() in exclude_days:
+            continue
+        start, end, day = slot, slot + duration, slot.date()
+
+        if index.formation_load(exam.formation_id, day, ignore=exam) >= MAX_EXAMS_PER_FORMATION_DAY:
+            continue
+        same_day = 0
+        clash = False
+        for other_start, other_end, count in student_exams:
+            if other_start < end and start < other_end:
+                clash = True
+                break
+            if other_start.date() == day:
+                same_day += count
+        if clash:
+            continue
+
+        changes = []
+        slot_cost = 0.0
+        if slot != exam.start:
+            days = (day - exam.start.date()).days
+            slot_cost += weights["horaire"] + weights["jour"] * abs(days)
+            changes.append(f"jour ({days:+d})" if days else "horaire")
+        if same_day and nb_inscrits:
+            slot_cost += weights["meme_jour"] * min(same_day / nb_inscrits, 1.0)
+
+        rooms = []
+        if split_rooms is not None:
+            if all(
+                room is not None and room["disponible"] and room["id"] not in exclude_salles
+                and index.room_timeline(room["id"]).is_free(start, end, ignore)
+                for room in split_rooms
+            ):
+                capacity = sum(room["capacite_examen"] for room in split_rooms)
+                cost = weights["places_libres"] * (1 - nb_inscrits / capacity) if capacity else 0.0
+                rooms.append((cost, exam.salle_id, {**current_room, "capacite_examen": capacity}))
+        else:
+            for room in index.free_rooms(start, end, capacite_min=nb_inscrits, ignore_examen_ids=ignore):
+                if room["id"] in exclude_salles:
+                    continue
+                cost = 0.0
+                if room["id"] != exam.salle_id:
+                    cost += weights["salle"]
+                    if current_room is None or room["batiment"] != current_room["batiment"]:
+                        cost += weights["batiment"]
+                if room["capacite_examen"]:
+                    cost += weights["places_libres"] * (1 - nb_inscrits / room["capacite_examen"])
+                rooms.append((cost, room["id"], room))
+        if not rooms:
+            continue
+
+        profs = []
+        for prof in professors:
+            if not index.prof_timeline(prof["id"]).is_free(start, end, ignore):
+                continue
+            load = index.prof_load(prof["id"], day, ignore=exam)
+            if load >= prof["max_surveillances"]:
+                continue
+            cost = 0.0 if prof["id"] == exam.prof_id else weights["enseignant"] + 0.1 * load
+            profs.append((cost, prof["id"], prof))
+        if not profs:
+            continue
+
+        evaluated += len(rooms) * len(profs)
+        # k + 1: l'affectation actuelle peut figurer parmi les meilleures
+        for room_cost, _, room in heapq.nsmallest(k + 1, rooms, key=lambda r: r[:2]):
+            for prof_cost, _, prof in heapq.nsmallest(k + 1, profs, key=lambda p: p[:2]):
+                if (not include_current and slot == exam.start
+                        and room["id"] == exam.salle_id and prof["id"] == exam.prof_id):
+                    continue
+                score = round(slot_cost + room_cost + prof_cost, 3)
+                candidate = (-score, -slot.timestamp(), -room["id"], -prof["id"])
+                item = (candidate, slot, room, prof, changes)
+                if len(heap) < k:
+                    heapq.heappush(heap, item)
+                elif candidate > heap[0][0]:
+                    heapq.heapreplace(heap, item)
+
+    suggestions = []
+    for candidate, slot, room, prof, changes in sorted(heap, reverse=True):
+        moved = list(changes)
+        if room["id"] != exam.salle_id:
+            moved.append("salle")
+        if prof["id"] != exam.prof_id:
+            moved.append("enseignant")
+        suggestions.append({
+            "date_heure": slot,
+            "salle_id": room["id"],
+            "salle_code": room["code"],
+            "salle_nom": room["nom"],
+            "capacite_examen": room["capacite_examen"],
+            "prof_id": prof["id"],
+            "prof_nom": prof["nom"],
+            "score": -candidate[0],
+            "changements": moved,
+        })
+    return suggestions, evaluated
+
+
+def default_window(exam: ExamSlot, days: int) -> Tuple[datetime, datetime]:
+    """Fenêtre de recherche par défaut: +/- days jours autour de l'examen"""
+    start = exam.start.replace(hour=0, minute=0, second=0, microsecond=0)
+    return start - timedelta(days=days), start + timedelta(days=days + 1) - timedelta(seconds=1)
@@ -0,0 +1,126 @@
+"""
+Constraint check of a proposed exam placement
+
+validate_placement() checks a (date, room, professor, duration) proposal for
+one exam against the in-memory schedule snapshot (app.services.availability)
+without writing anything, and reports every violated rule: errors for what
+the generator never produces (overlaps, capacity, professor load, students
+with two simultaneous exams), warnings for softer rules (formation daily
+limit, students with another exam the same day, off-grid slot). With the
+index and the module's shared-student counts cached, a check is a handful of
+bisects and dictionary lookups.
+"""
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from app.services.availability import ExamSlot, OccupancyIndex
+from app.services.scheduler import MAX_EXAMS_PER_FORMATION_DAY, SLOT_HOURS
+
+ERROR = "erreur"
+WARNING = "avertissement"
+
+
+def _violation(type: str, severite: str, description: str,
+               examens_ids: Optional[List[int]] = None, etudiants: int = 0) -> Dict:
+    return {
+        "type": type,
+        "severite": severite,
+        "description": description,
+        "examens_ids": examens_ids or [],
+        "etudiants_concernes": etudiants,
+    }
+
+
+def validate_placement(
+    index: OccupancyIndex,
+    proposal: ExamSlot,
+    nb_inscrits: int,
+    shared: Dict[int, int],
+    now: Optional[datetime] = None
+) -> List[Dict]:
+    """
+    Contraintes violées par le placement proposé (liste vide si valide).
+    shared: inscrits communs avec les autres modules (shared_students()).
+    """
+    now = now or datetime.utcnow()
+    current = index.exams.get(proposal.id)
+    ignore = {proposal.id}
+    day = proposal.start.date()
+    violations = []
+
+    if proposal.start < now:
+        violations.append(_violation("creneau_passe", ERROR, "Le créneau proposé est passé"))
+    if proposal.start.weekday() >= 5 or proposal.start.hour not in SLOT_HOURS or proposal.start.minute:
+        violations.append(_violation(
+            "hors_creneau", WARNING,
+            "Hors des créneaux d'examen (" + ", ".join(f"{hour}h" for hour in SLOT_HOURS) + ", du lundi au vendredi)"
+        ))
+
+    if proposal.salle_id is not None:
+        if index.extra_rooms.get(proposal.id) and current is not None and proposal.salle_id != current.salle_id:
+            violations.append(_violation(
+                "examen_reparti", ERROR, "Examen réparti sur plusieurs salles: salle non modifiable"
+            ))
+        # Examen réparti: toutes ses salles (app.services.seating)
+        rooms = [index.rooms.get(salle_id) for salle_id in index.exam_rooms(proposal)]
+        if any(room is None or not room["disponible"] for room in rooms):
+            violations.append(_violation("salle_indisponible", ERROR, "Salle inexistante ou indisponible"))
+        else:
+            capacity = sum(room["capacite_examen"] for room in rooms)
+            if nb_inscrits > capacity:
+                violations.append(_violation(
+                    "capacite", ERROR,
+                    f"Capacité insuffisante: {nb_inscrits} inscrits pour {capacity} places",
+                    etudiants=nb_inscrits - capacity
+                ))
+            for room in rooms:
+                overlaps = index.room_timeline(room["id"]).conflicts(proposal.start, proposal.end, ignore)
+                if overlaps:
+                    violations.append(_violation(
+                        "chevauchement_salle", ERROR, f"Salle {room['code']} déjà occupée", overlaps
+                    ))
+
+    if proposal.prof_id is not None:
+        prof = index.professors.get(proposal.prof_id)
+        if prof is None:
+            violations.append(_violation("enseignant_inconnu", ERROR, "Enseignant inexistant"))
+        else:
+            overlaps = index.prof_timeline(prof["id"]).conflicts(proposal.start, proposal.end, ignore)
+            if overlaps:
+                violations.append(_violation(
+                    "chevauchement_enseignant", ERROR, f"{prof['nom']} surveille déjà un examen", overlaps
+                ))
+            load = index.prof_load(prof["id"], day, ignore=current)
+            if load >= prof["max_surveillances"]:
+                violations.append(_violation(
+                    "charge_enseignant", ERROR,
+                    f"{prof['nom']} a déjà {load} examens ce jour-là (maximum {prof['max_surveillances']})"
+                ))
+
+    load = index.formation_load(proposal.formation_id, day, ignore=current)
+    if load >= MAX_EXAMS_PER_FORMATION_DAY:
+        violations.append(_violation(
+            "limite_formation", WARNING,
+            f"La formation a déjà {load} examens ce jour-là (maximum {MAX_EXAMS_PER_FORMATION_DAY})"
+        ))
+
+    same_day_ids, same_day_students = [], 0
+    for other in index.exams_of_modules(shared):
+        count = shared[other.module_id]
+        if other.id == proposal.id:
+            continue
+        if other.start < proposal.end and proposal.start < other.end:
+            violations.append(_violation(
+                "conflit_etudiants", ERROR,
+                f"{count} étudiants ont un autre examen au même moment", [other.id], count
+            ))
+        elif other.start.date() == day:
+            same_day_ids.append(other.id)
+            same_day_students += count
+    if same_day_ids:
+        violations.append(_violation(
+            "etudiants_meme_jour", WARNING,
+            "Des étudiants ont un autre examen le même jour", sorted(same_day_ids), same_day_students
+        ))
+
+    return violations
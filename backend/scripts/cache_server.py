@@ -0,0 +1,158 @@
+"""
+Serveur de cache local (sous-ensemble du protocole Redis)
+
+Remplaçant léger de Redis pour le développement et les tests du backend de
+cache "resp" (CACHE_BACKEND=resp). Commandes: PING, GET, GETDEL, SET [EX|PX] [NX],
+DEL, INCR, EXISTS, FLUSHDB, DBSIZE, SELECT, AUTH.
+
+Usage:
+    python scripts/cache_server.py --port 6379 --max-keys 100000
+"""
+import argparse
+import asyncio
+import time
+from collections import OrderedDict
+from typing import List, Optional
+
+
+class Store:
+    """Dictionnaire LRU avec expiration des clés"""
+
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        self.data: "OrderedDict[bytes, tuple]" = OrderedDict()
+
+    def get(self, key: bytes) -> Optional[bytes]:
+        entry = self.data.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self.data[key]
+            return None
+        self.data.move_to_end(key)
+        return value
+
+    def set(self, key: bytes, value: bytes, ttl: Optional[float]) -> None:
+        self.data[key] = (value, time.monotonic() + ttl if ttl else None)
+        self.data.move_to_end(key)
+        while len(self.data) > self.max_keys:
+            self.data.popitem(last=False)
+
+
+def encode(value) -> bytes:
+    if value is None:
+        return b"$-1\r\n"
+    if isinstance(value, int):
+        return b":%d\r\n" % value
+    if isinstance(value, str):
+        return b"+" + value.encode() + b"\r\n"
+    return b"$%d\r\n%s\r\n" % (len(value), value)
+
+
+def error(message: str) -> bytes:
+    return b"-ERR " + message.encode() + b"\r\n"
+
+
+def execute(store: Store, args: List[bytes]) -> bytes:
+    command = args[0].upper()
+    if command == b"PING":
+        return encode("PONG")
+    if command in (b"SELECT", b"AUTH"):
+        return encode("OK")
+    if command == b"GET" and len(args) == 2:
+        return encode(store.get(args[1]))
+    if command == b"GETDEL" and len(args) == 2:
+        value = store.get(args[1])
+        store.data.pop(args[1], None)
+        return encode(value)
+    if command == b"SET" and len(args) >= 3:
+        ttl, nx = None, False
+        options = [arg.upper() for arg in args[3:]]
+        idx = 0
+        while idx < len(options):
+            if options[idx] == b"NX":
+                nx = True
+            elif options[idx] in (b"EX", b"PX") and idx + 1 < len(options):
+                ttl = float(options[idx + 1]) / (1000 if options[idx] == b"PX" else 1)
+                idx += 1
+            else:
+                return error("syntax error")
+            idx += 1
+        if nx and store.get(args[1]) is not None:
+            return encode(None)
+        store.set(args[1], args[2], ttl)
+        return encode("OK")
+    if command == b"DEL":
+        return encode(sum(1 for key in args[1:] if store.data.pop(key, None) is not None))
+    if command == b"EXISTS":
+        return encode(sum(1 for key in args[1:] if store.get(key) is not None))
+    if command == b"INCR" and len(args) == 2:
+        try:
+            value = int(store.get(args[1]) or 0) + 1
+        except ValueError:
+            return error("value is not an integer")
+        # INCR conserve l'expiration éventuelle de la clé
+        expires_at = store.data[args[1]][1] if args[1] in store.data else None
+        store.set(args[1], str(value).encode(), None)
+        store.data[args[1]] = (str(value).encode(), expires_at)
+        return encode(value)
+    if command == b"FLUSHDB":
+        store.data.clear()
+        return encode("OK")
+    if command == b"DBSIZE":
+        return encode(len(store.data))
+    return error(f"unknown command '{args[0].decode(errors='replace')}'")
+
+
+async def read_command(reader: asyncio.StreamReader) -> Optional[List[bytes]]:
+    line = await reader.readline()
+    if not line:
+        return None
+    if not line.startswith(b"*"):
+        # Commande "inline" (ex: telnet)
+        return line.strip().split()
+    args = []
+    for _ in range(int(line[1:-2])):
+        length = int((await reader.readline())[1:-2])
+        args.append((await reader.readexactly(length + 2))[:-2])
+    return args
+
+
+async def serve(host: str, port: int, max_keys: int) -> None:
+    store = Store(max_keys)
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                args = await read_command(reader)
+                if args is None:
+                    break
+                if args:
+                    writer.write(execute(store, args))
+                    await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(handle, host, port)
+    print(f"🗄️  Serveur de cache à l'écoute sur {host}:{port} (max {max_keys} clés)")
+    async with server:
+        await server.serve_forever()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serveur de cache local compatible Redis")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6379)
+    parser.add_argument("--max-keys", type=int, default=100000)
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port, args.max_keys))
+    except KeyboardInterrupt:
+        print("\n👋 Arrêt du serveur de cache")
+
+
+if __name__ == "__main__":
+    main()
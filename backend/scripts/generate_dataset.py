@@ -0,0 +1,471 @@
+# -*- coding: utf-8 -*-
+"""
+Générateur de jeux de données synthétiques pour les tests de montée en charge
+Plateforme d'Optimisation des Emplois du Temps d'Examens Universitaires
+
+Produit une université complète et paramétrable (départements, formations,
+modules, salles, professeurs, étudiants, inscriptions) avec une distribution
+réaliste des co-inscriptions : tronc commun de la formation, options
+populaires (loi de Zipf) au sein du département et modules repris par les
+redoublants. La génération est déterministe pour une graine donnée et le
+chargement passe par COPY pour atteindre des millions d'inscriptions.
+
+Usage:
+    python scripts/generate_dataset.py --preset moyen --truncate
+    python scripts/generate_dataset.py --preset universite --seed 7 --truncate
+    python scripts/generate_dataset.py --preset petit --csv-dir /tmp/edt_dataset
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import random
+import sys
+import time
+from dataclasses import dataclass, field, replace
+from datetime import date, timedelta
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from dotenv import load_dotenv
+load_dotenv(os.path.join(os.path.dirname(__file__), '..', '.env'))
+
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+@dataclass(frozen=True)
+class DatasetConfig:
+    """Paramètres de l'université générée"""
+    departements: int = 7
+    parcours_licence_par_dept: int = 4      # chaque parcours = L1, L2, L3
+    parcours_master_par_dept: int = 6       # chaque parcours = M1, M2
+    modules_par_formation: Tuple[int, int] = (12, 16)  # sur les deux semestres
+    salles: int = 120
+    professeurs_par_dept: int = 40
+    etudiants: int = 13000
+    options_par_etudiant: Tuple[int, int] = (0, 3)
+    zipf_options: float = 1.2               # popularité des options
+    taux_redoublement: float = 0.12
+    taux_abandon: float = 0.03
+    annee_universitaire: str = "2024-2025"
+    seed: int = 42
+
+
+PRESETS: Dict[str, DatasetConfig] = {
+    "petit": DatasetConfig(
+        departements=3, parcours_licence_par_dept=2, parcours_master_par_dept=2,
+        modules_par_formation=(8, 10), salles=40, professeurs_par_dept=20,
+        etudiants=2000,
+    ),
+    "moyen": DatasetConfig(),
+    "grand": DatasetConfig(
+        departements=10, parcours_licence_par_dept=6, parcours_master_par_dept=8,
+        salles=300, professeurs_par_dept=80, etudiants=40000,
+    ),
+    "universite": DatasetConfig(
+        departements=15, parcours_licence_par_dept=8, parcours_master_par_dept=10,
+        modules_par_formation=(14, 18), salles=600, professeurs_par_dept=120,
+        etudiants=80000, options_par_etudiant=(1, 4),
+    ),
+}
+
+# Tables dans l'ordre de chargement (clés étrangères)
+TABLES = [
+    ("departements", ["id", "nom", "code", "batiment", "telephone", "email"]),
+    ("lieux_examen", ["id", "nom", "code", "capacite", "type", "batiment", "etage",
+                      "disponible", "equipements", "accessibilite_pmr"]),
+    ("formations", ["id", "nom", "code", "dept_id", "nb_modules", "niveau",
+                    "type_formation", "capacite_max"]),
+    ("modules", ["id", "nom", "code", "formation_id", "credits", "semestre",
+                 "duree_examen_min", "coefficient"]),
+    ("professeurs", ["id", "matricule", "nom", "prenom", "dept_id", "specialite",
+                     "email", "telephone", "grade", "max_surveillances"]),
+    ("etudiants", ["id", "matricule", "nom", "prenom", "formation_id", "promo",
+                   "email", "date_naissance"]),
+    ("inscriptions", ["etudiant_id", "module_id", "annee_universitaire", "statut"]),
+]
+
+TRUNCATE_SQL = """
+    TRUNCATE surveillances, examens, sessions_generation, inscriptions,
+             etudiants, modules, formations, professeurs, lieux_examen,
+             departements
+    RESTART IDENTITY CASCADE
+"""
+
+DEPARTEMENTS = [
+    ("Informatique", "INFO"), ("Mathématiques", "MATH"), ("Physique", "PHYS"),
+    ("Chimie", "CHIM"), ("Biologie", "BIO"), ("Sciences Économiques", "ECO"),
+    ("Langues et Lettres", "LET"), ("Droit", "DROIT"), ("Histoire", "HIST"),
+    ("Géographie", "GEO"), ("Psychologie", "PSY"), ("Sociologie", "SOC"),
+    ("Sciences de la Terre", "STER"), ("Mécanique", "MECA"), ("Électronique", "ELEC"),
+]
+
+MATIERES = [
+    "Algèbre", "Analyse", "Probabilités", "Statistiques", "Algorithmique",
+    "Programmation", "Bases de données", "Réseaux", "Systèmes", "Optique",
+    "Thermodynamique", "Mécanique quantique", "Chimie organique", "Génétique",
+    "Écologie", "Microéconomie", "Macroéconomie", "Économétrie", "Littérature",
+    "Linguistique", "Anglais", "Méthodologie", "Droit civil", "Histoire moderne",
+    "Cartographie", "Psychologie cognitive", "Sociologie urbaine", "Géologie",
+    "Électronique numérique", "Traitement du signal", "Optimisation", "Compilation",
+]
+
+NOMS = [
+    "Martin", "Bernard", "Thomas", "Petit", "Robert", "Richard", "Durand",
+    "Dubois", "Moreau", "Laurent", "Simon", "Michel", "Lefebvre", "Leroy",
+    "Roux", "David", "Bertrand", "Morel", "Fournier", "Girard", "Bonnet",
+    "Dupont", "Lambert", "Fontaine", "Rousseau", "Vincent", "Muller", "Lefevre",
+    "Faure", "Andre", "Mercier", "Blanc", "Guerin", "Boyer", "Garnier", "Chevalier",
+    "Benali", "Haddad", "Mansouri", "Nguyen", "Diallo", "Traore", "Cohen", "Garcia",
+]
+
+PRENOMS = [
+    "Lucas", "Emma", "Louis", "Jade", "Hugo", "Louise", "Gabriel", "Alice",
+    "Arthur", "Chloé", "Jules", "Lina", "Adam", "Léa", "Raphaël", "Manon",
+    "Nathan", "Inès", "Yanis", "Sarah", "Sofiane", "Amira", "Paul", "Camille",
+    "Mohamed", "Yasmine", "Théo", "Zoé", "Noah", "Julia", "Karim", "Nour",
+]
+
+NIVEAUX_LICENCE = ["L1", "L2", "L3"]
+NIVEAUX_MASTER = ["M1", "M2"]
+POIDS_NIVEAU = {"L1": 3.0, "L2": 2.4, "L3": 2.0, "M1": 0.8, "M2": 0.7}
+GRADES = ["MCF", "PR", "ATER", "Vacataire", "PRAG"]
+
+# (type, capacité min, capacité max, proportion, équipements)
+TYPES_SALLES = [
+    ("amphi", 150, 500, 0.12, {"videoprojection": True, "micro": True}),
+    ("salle_td", 30, 80, 0.55, {"videoprojection": True}),
+    ("salle_tp", 24, 40, 0.15, {"equipement_labo": True}),
+    ("salle_info", 30, 50, 0.18, {"internet": True}),
+]
+
+
+# ============================================================================
+# GÉNÉRATION
+# ============================================================================
+
+@dataclass
+class University:
+    """Université générée (les inscriptions sont produites à la demande)"""
+    config: DatasetConfig
+    rows: Dict[str, List[tuple]] = field(default_factory=dict)
+    # formation_id -> modules du tronc commun
+    modules_par_formation: Dict[int, List[int]] = field(default_factory=dict)
+    # formation_id -> formation du niveau inférieur dans le même parcours
+    formation_precedente: Dict[int, int] = field(default_factory=dict)
+    # (dept_id, niveau) -> (modules proposés en option, poids cumulés)
+    options: Dict[Tuple[int, str], Tuple[List[int], List[float]]] = field(default_factory=dict)
+    formation_info: Dict[int, Tuple[int, str]] = field(default_factory=dict)
+
+    def inscriptions(self) -> Iterator[tuple]:
+        """
+        Produit les inscriptions étudiant → module.
+
+        Le générateur est re-créé à partir de la graine à chaque appel :
+        deux parcours successifs produisent exactement les mêmes lignes.
+        """
+        config = self.config
+        rng = random.Random(config.seed * 7919 + 1)
+        annee = config.annee_universitaire
+
+        for etudiant in self.rows["etudiants"]:
+            etudiant_id, formation_id = etudiant[0], etudiant[4]
+            dept_id, niveau = self.formation_info[formation_id]
+            modules = list(self.modules_par_formation[formation_id])
+            choisis = set(modules)
+
+            # Redoublants : reprise de modules du niveau précédent
+            precedente = self.formation_precedente.get(formation_id)
+            if precedente and rng.random() < config.taux_redoublement:
+                reprises = self.modules_par_formation[precedente]
+                for module_id in rng.sample(reprises, k=min(len(reprises), rng.randint(1, 3))):
+                    if module_id not in choisis:
+                        modules.append(module_id)
+                        choisis.add(module_id)
+
+            # Options populaires du département (distribution de Zipf)
+            pool = self.options.get((dept_id, niveau))
+            if pool:
+                candidats, poids_cumules = pool
+                nb_options = rng.randint(*config.options_par_etudiant)
+                for module_id in rng.choices(candidats, cum_weights=poids_cumules, k=nb_options):
+                    if module_id not in choisis:
+                        modules.append(module_id)
+                        choisis.add(module_id)
+
+            for module_id in modules:
+                statut = "withdrawn" if rng.random() < config.taux_abandon else "active"
+                yield (etudiant_id, module_id, annee, statut)
+
+
+def build_university(config: DatasetConfig) -> University:
+    """Construit toutes les entités (hors inscriptions) de façon déterministe"""
+    rng = random.Random(config.seed)
+    uni = University(config=config)
+
+    # Départements
+    departements = []
+    for idx in range(config.departements):
+        nom, code = DEPARTEMENTS[idx % len(DEPARTEMENTS)]
+        if idx >= len(DEPARTEMENTS):
+            nom, code = f"{nom} {idx // len(DEPARTEMENTS) + 1}", f"{code[:7]}{idx:02d}"
+        batiment = f"Bâtiment {chr(ord('A') + idx % 26)}"
+        departements.append((idx + 1, nom, code, batiment,
+                             f"01 23 45 {idx // 100:02d} {idx % 100:02d}",
+                             f"{code.lower()}@univ.edu"))
+    uni.rows["departements"] = departements
+    batiments = sorted({d[3] for d in departements})
+
+    # Salles
+    salles = []
+    poids_types = [t[3] for t in TYPES_SALLES]
+    for idx in range(config.salles):
+        type_salle, cap_min, cap_max, _, equipements = rng.choices(TYPES_SALLES, weights=poids_types)[0]
+        code = f"{type_salle.upper().replace('SALLE_', '')}-{idx + 1:04d}"
+        salles.append((
+            idx + 1, f"Salle {code}", code, rng.randint(cap_min, cap_max), type_salle,
+            rng.choice(batiments), rng.randint(0, 4), rng.random() > 0.03,
+            json.dumps(equipements), rng.random() < 0.4,
+        ))
+    uni.rows["lieux_examen"] = salles
+
+    # Formations (par parcours pour relier les niveaux) et modules
+    formations, modules = [], []
+    poids_formation: List[float] = []
+    par_niveau: Dict[Tuple[int, str], List[int]] = {}
+    formation_id = module_id = 0
+    for dept in departements:
+        dept_id, dept_nom, dept_code = dept[0], dept[1], dept[2]
+        parcours = ([NIVEAUX_LICENCE] * config.parcours_licence_par_dept
+                    + [NIVEAUX_MASTER] * config.parcours_master_par_dept)
+        for num_parcours, niveaux in enumerate(parcours, start=1):
+            type_formation = "licence" if niveaux is NIVEAUX_LICENCE else "master"
+            taille_parcours = rng.uniform(0.5, 1.5)
+            precedente = None
+            for niveau in niveaux:
+                formation_id += 1
+                nb_modules = rng.randint(*config.modules_par_formation)
+                poids = POIDS_NIVEAU[niveau] * taille_parcours
+                formations.append((
+                    formation_id, f"{type_formation.capitalize()} {dept_nom} {niveau} P{num_parcours}",
+                    f"{niveau}-{dept_code}{num_parcours:02d}", dept_id, nb_modules, niveau,
+                    type_formation, 0,  # capacité fixée après répartition
+                ))
+                poids_formation.append(poids)
+                uni.formation_info[formation_id] = (dept_id, niveau)
+                if precedente:
+                    uni.formation_precedente[formation_id] = precedente
+                precedente = formation_id
+
+                tronc = []
+                for num_module in range(1, nb_modules + 1):
+                    module_id += 1
+                    matiere = rng.choice(MATIERES)
+                    modules.append((
+                        module_id, f"{matiere} {niveau} ({num_module})",
+                        f"{dept_code[:6]}{formation_id:04d}M{num_module:02d}", formation_id,
+                        rng.randint(2, 6), 1 if num_module <= (nb_modules + 1) // 2 else 2,
+                        rng.choice((90, 120, 120, 180)), rng.choice((1.0, 1.5, 2.0, 3.0)),
+                    ))
+                    tronc.append(module_id)
+                uni.modules_par_formation[formation_id] = tronc
+                par_niveau.setdefault((dept_id, niveau), []).extend(tronc)
+
+    # Options : modules des autres formations du même département et niveau,
+    # popularité décroissante selon une loi de Zipf
+    for key, candidats in par_niveau.items():
+        candidats = list(candidats)
+        rng.shuffle(candidats)
+        cumul, total = [], 0.0
+        for rang in range(len(candidats)):
+            total += 1.0 / (rang + 1) ** config.zipf_options
+            cumul.append(total)
+        uni.options[key] = (candidats, cumul)
+
+    # Étudiants répartis proportionnellement au poids des formations
+    ids_formations = [f[0] for f in formations]
+    affectations = rng.choices(ids_formations, weights=poids_formation, k=config.etudiants)
+    effectifs: Dict[int, int] = {}
+    etudiants = []
+    naissance_base = date(1996, 1, 1)
+    for idx, f_id in enumerate(affectations, start=1):
+        effectifs[f_id] = effectifs.get(f_id, 0) + 1
+        nom, prenom = rng.choice(NOMS), rng.choice(PRENOMS)
+        matricule = f"E{idx:07d}"
+        niveau = uni.formation_info[f_id][1]
+        promo = str(2024 - (NIVEAUX_LICENCE + NIVEAUX_MASTER).index(niveau))
+        etudiants.append((
+            idx, matricule, nom, prenom, f_id, promo,
+            f"{matricule.lower()}@etu.univ.edu",
+            (naissance_base + timedelta(days=rng.randint(0, 3650))).isoformat(),
+        ))
+    uni.rows["etudiants"] = etudiants
+    uni.rows["formations"] = [
+        f[:-1] + (max(20, int(effectifs.get(f[0], 0) * 1.2)),) for f in formations
+    ]
+    uni.rows["modules"] = modules
+
+    # Professeurs
+    professeurs = []
+    prof_id = 0
+    for dept in departements:
+        for _ in range(config.professeurs_par_dept):
+            prof_id += 1
+            matricule = f"P{prof_id:06d}"
+            professeurs.append((
+                prof_id, matricule, rng.choice(NOMS), rng.choice(PRENOMS), dept[0],
+                rng.choice(MATIERES), f"{matricule.lower()}@univ.edu",
+                f"06 {prof_id // 10000:02d} {prof_id // 100 % 100:02d} {prof_id % 100:02d} 00",
+                rng.choice(GRADES), 3,
+            ))
+    uni.rows["professeurs"] = professeurs
+
+    return uni
+
+
+# ============================================================================
+# CHARGEMENT
+# ============================================================================
+
+def _csv_chunks(rows: Iterator[Sequence], chunk_size: int) -> Iterator[Tuple[io.StringIO, int]]:
+    """Découpe un flux de lignes en tampons CSV prêts pour COPY"""
+    buffer, count = io.StringIO(), 0
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow(row)
+        count += 1
+        if count >= chunk_size:
+            buffer.seek(0)
+            yield buffer, count
+            buffer, count = io.StringIO(), 0
+            writer = csv.writer(buffer)
+    if count:
+        buffer.seek(0)
+        yield buffer, count
+
+
+def copy_rows(cursor, table: str, columns: List[str], rows, chunk_size: int = 200_000) -> int:
+    """Charge des lignes avec COPY ... FROM STDIN par blocs"""
+    sql = f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)"
+    total = 0
+    for buffer, count in _csv_chunks(iter(rows), chunk_size):
+        cursor.copy_expert(sql, buffer)
+        total += count
+    return total
+
+
+def load_into_database(
+    database_url: str,
+    config: DatasetConfig,
+    truncate: bool = False,
+    verbose: bool = True
+) -> Dict[str, int]:
+    """
+    Génère l'université et la charge dans la base en une transaction.
+
+    Returns:
+        Nombre de lignes chargées par table
+    """
+    from sqlalchemy import create_engine
+
+    uni = build_university(config)
+    engine = create_engine(database_url)
+    conn = engine.raw_connection()
+    counts: Dict[str, int] = {}
+    try:
+        cursor = conn.cursor()
+        if truncate:
+            cursor.execute(TRUNCATE_SQL)
+
+        for table, columns in TABLES:
+            start = time.perf_counter()
+            rows = uni.inscriptions() if table == "inscriptions" else uni.rows[table]
+            counts[table] = copy_rows(cursor, table, columns, rows)
+            if verbose:
+                print(f"  ✅ {table}: {counts[table]:,} lignes en {time.perf_counter() - start:.1f}s")
+
+        # Réaligner les séquences SERIAL après des identifiants explicites
+        for table, columns in TABLES:
+            cursor.execute(
+                f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+                f"COALESCE((SELECT MAX(id) FROM {table}), 0) + 1, false)"
+            )
+        conn.commit()
+
+        # ANALYZE hors transaction pour des plans réalistes dès le premier benchmark
+        conn.autocommit = True
+        for table, _ in TABLES:
+            cursor.execute(f"ANALYZE {table}")
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+        engine.dispose()
+    return counts
+
+
+def write_csv(directory: str, config: DatasetConfig) -> Dict[str, int]:
+    """Écrit un fichier CSV (avec en-tête) par table"""
+    uni = build_university(config)
+    os.makedirs(directory, exist_ok=True)
+    counts: Dict[str, int] = {}
+    for table, columns in TABLES:
+        rows = uni.inscriptions() if table == "inscriptions" else uni.rows[table]
+        with open(os.path.join(directory, f"{table}.csv"), "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(columns)
+            counts[table] = 0
+            for row in rows:
+                writer.writerow(row)
+                counts[table] += 1
+    return counts
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Génère une université synthétique pour les tests de charge")
+    parser.add_argument("--preset", choices=sorted(PRESETS), default="moyen")
+    parser.add_argument("--seed", type=int, help="Graine aléatoire (reproductibilité)")
+    parser.add_argument("--etudiants", type=int, help="Surcharge du nombre d'étudiants")
+    parser.add_argument("--departements", type=int, help="Surcharge du nombre de départements")
+    parser.add_argument("--salles", type=int, help="Surcharge du nombre de salles")
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL"))
+    parser.add_argument("--truncate", action="store_true",
+                        help="Vide les tables métier avant chargement (irréversible)")
+    parser.add_argument("--csv-dir", help="Écrit des fichiers CSV au lieu de charger la base")
+    args = parser.parse_args(argv)
+
+    overrides = {
+        key: value for key, value in (
+            ("seed", args.seed), ("etudiants", args.etudiants),
+            ("departements", args.departements), ("salles", args.salles),
+        ) if value is not None
+    }
+    config = replace(PRESETS[args.preset], **overrides)
+
+    print("=" * 60)
+    print(f"GÉNÉRATION DU JEU DE DONNÉES '{args.preset}' (graine {config.seed})")
+    print("=" * 60)
+    start = time.perf_counter()
+
+    if args.csv_dir:
+        counts = write_csv(args.csv_dir, config)
+        for table, count in counts.items():
+            print(f"  ✅ {table}.csv: {count:,} lignes")
+    else:
+        if not args.database_url:
+            print("❌ DATABASE_URL non défini (utiliser --database-url)")
+            return 1
+        counts = load_into_database(args.database_url, config, truncate=args.truncate)
+
+    print(f"\n✅ Terminé en {time.perf_counter() - start:.1f}s "
+          f"({counts.get('inscriptions', 0):,} inscriptions)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
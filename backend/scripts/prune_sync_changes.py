@@ -0,0 +1,41 @@
+"""
+Purge du journal de synchronisation (sync_changes)
+
+Supprime les entrées plus anciennes que SYNC_RETENTION_DAYS (ou --days).
+Les clients dont le curseur précède la purge reçoivent reset=true de
+/api/sync et rechargent leurs listes. À lancer périodiquement (cron).
+
+Usage:
+    python scripts/prune_sync_changes.py --days 30
+"""
+import argparse
+import os
+import sys
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.core.change_log import prune_changes
+from app.core.config import settings
+from app.core.database import SessionLocal
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Purge du journal de synchronisation")
+    parser.add_argument("--days", type=int, default=settings.SYNC_RETENTION_DAYS)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        boundary = prune_changes(db, datetime.utcnow() - timedelta(days=args.days))
+    finally:
+        db.close()
+
+    if boundary is None:
+        print(f"✅ Rien à purger (entrées de moins de {args.days} jours)")
+    else:
+        print(f"🧹 Journal purgé jusqu'au changement n°{boundary}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""
+Réconciliation des compteurs d'inscrits (modules.nb_inscrits_actifs)
+
+Recalcule chaque compteur à partir des inscriptions actives et corrige les
+écarts (chargements en masse sans triggers, corrections manuelles). Les
+écritures d'inscriptions sont bloquées le temps du recalcul.
+
+Usage:
+    python scripts/reconcile_inscriptions.py            # corrige
+    python scripts/reconcile_inscriptions.py --dry-run  # affiche seulement
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.core.database import SessionLocal
+from app.services.enrolment import reconcile_enrolment_counts
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Réconciliation des compteurs d'inscrits par module")
+    parser.add_argument("--dry-run", action="store_true", help="Affiche les écarts sans les corriger")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        drift = reconcile_enrolment_counts(db, dry_run=args.dry_run)
+    finally:
+        db.close()
+
+    if not drift:
+        print("✅ Tous les compteurs sont à jour")
+        return
+    for module_id, stored, counted in drift:
+        print(f"  module {module_id}: {stored} -> {counted}")
+    verb = "à corriger" if args.dry_run else "corrigés"
+    print(f"{'🔍' if args.dry_run else '🔧'} {len(drift)} compteur(s) {verb}")
+
+
+if __name__ == "__main__":
+    main()
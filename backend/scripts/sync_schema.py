@@ -0,0 +1,72 @@
+"""
+Synchronisation de database/schema.sql avec le DDL Python
+
+Les fonctions, triggers et index maintenus par l'application sont définis une
+seule fois, dans les listes de app.core.bootstrap.SCHEMA_SECTIONS (appliquées
+au démarrage sur les bases existantes). Ce script réécrit les sections
+générées correspondantes de database/schema.sql, entre les marqueurs
+"-- DÉBUT GÉNÉRÉ: <section>" et "-- FIN GÉNÉRÉ: <section>".
+
+Usage:
+    python scripts/sync_schema.py          # réécrit schema.sql
+    python scripts/sync_schema.py --check  # échoue si schema.sql n'est pas à jour
+"""
+import argparse
+import os
+import re
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.core.bootstrap import SCHEMA_SECTIONS
+
+SCHEMA_PATH = os.path.join(os.path.dirname(__file__), '..', '..', 'database', 'schema.sql')
+
+
+def render(statements) -> str:
+    return "\n\n".join(statement.strip() + ";" for statement in statements)
+
+
+def sync(sql: str):
+    """Renvoie (nouveau contenu, sections modifiées); ValueError si un marqueur manque"""
+    changed = []
+    for name, statements in SCHEMA_SECTIONS.items():
+        pattern = re.compile(
+            rf"(-- DÉBUT GÉNÉRÉ: {re.escape(name)}\n)(.*?)(\n-- FIN GÉNÉRÉ: {re.escape(name)}\n)", re.S
+        )
+        match = pattern.search(sql)
+        if match is None:
+            raise ValueError(f"Section générée absente de schema.sql: {name}")
+        body = render(statements)
+        if match.group(2) != body:
+            changed.append(name)
+            sql = sql[:match.start(2)] + body + sql[match.end(2):]
+    return sql, changed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Régénère les sections DDL de database/schema.sql")
+    parser.add_argument("--check", action="store_true", help="Vérifie sans écrire (code 1 si écart)")
+    args = parser.parse_args()
+
+    with open(SCHEMA_PATH, encoding="utf-8") as f:
+        sql = f.read()
+    try:
+        updated, changed = sync(sql)
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    if not changed:
+        print("✅ schema.sql est à jour")
+        return
+    if args.check:
+        print(f"❌ Sections à régénérer: {', '.join(changed)}")
+        sys.exit(1)
+    with open(SCHEMA_PATH, "w", encoding="utf-8") as f:
+        f.write(updated)
+    print(f"🔧 Sections régénérées: {', '.join(changed)}")
+
+
+if __name__ == "__main__":
+    main()
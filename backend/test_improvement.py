@@ -0,0 +1,71 @@
+"""
+Consistency check of the simulated annealing objective
+
+Replays random moves on a small synthetic schedule (movable and fixed exams
+sharing formations and students) and checks that the cost tracked through the
+deltas of try_moves() stays equal to total_cost().
+
+Run with: python -m pytest test_improvement.py (or python test_improvement.py)
+"""
+import random
+from datetime import datetime, timedelta
+
+from app.services.availability import ExamSlot, OccupancyIndex
+from app.services.improvement import ScheduleImprover
+
+
+def build_improver(seed: int) -> ScheduleImprover:
+    rng = random.Random(seed)
+    days = [datetime(2026, 11, 2) + timedelta(days=d) for d in range(6)]
+    slots = [day.replace(hour=hour) for day in days for hour in (8, 11, 14)]
+    rooms = {
+        r: {"id": r, "code": f"S{r}", "disponible": True, "capacite_examen": rng.choice((30, 60, 120))}
+        for r in range(1, 9)
+    }
+    professors = {p: {"id": p, "max_surveillances": 3} for p in range(1, 7)}
+
+    exams, movable = {}, []
+    for exam_id in range(1, 31):
+        start = rng.choice(slots)
+        exam = ExamSlot(
+            id=exam_id, module_id=exam_id, formation_id=rng.randint(1, 4),
+            prof_id=rng.choice((None, *professors)), salle_id=rng.choice(tuple(rooms)),
+            start=start, end=start + timedelta(minutes=rng.choice((60, 90, 120)))
+        )
+        exams[exam_id] = exam
+        # Un tiers des examens reste figé (hors génération en cours)
+        if exam_id % 3:
+            movable.append(exam)
+    shared = {}
+    for _ in range(60):
+        a, b = rng.sample(range(1, 31), 2)
+        count = rng.randint(1, 20)
+        shared.setdefault(a, {})[b] = count
+        shared.setdefault(b, {})[a] = count
+    index = OccupancyIndex(rooms, professors, exams, version=0)
+    nb_inscrits = {exam.id: rng.randint(5, 30) for exam in movable}
+    return ScheduleImprover(index, movable, nb_inscrits, slots, shared, seed=seed)
+
+
+def test_tracked_cost_matches_total_cost():
+    for seed in range(5):
+        improver = build_improver(seed)
+        rng = random.Random(seed)
+        cost = improver.total_cost()
+        n, nb_slots = len(improver.exams), len(improver.slots)
+        for _ in range(2000):
+            i, t = rng.randrange(n), rng.randrange(nb_slots)
+            if t == improver.slot[i]:
+                continue
+            moves = improver._kempe_chain(i, t) if rng.random() < 0.3 else [(i, t)]
+            if moves is None:
+                continue
+            delta = improver.try_moves(moves, temperature=1e6)
+            if delta is not None:
+                cost += delta
+            assert abs(cost - improver.total_cost()) < 1e-6
+
+
+if __name__ == "__main__":
+    test_tracked_cost_matches_total_cost()
+    print("OK")
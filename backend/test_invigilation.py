@@ -0,0 +1,116 @@
+"""
+Checks of the invigilator assignment (min-cost flow)
+
+Solves a small network whose optimum is known by hand, then runs
+plan_invigilation() on synthetic exams and professors (no database) and
+checks the assignment rules: one exam per professor within a group of
+overlapping exams, daily caps, busy slots, and invigilators taken from the
+exam's own department first.
+
+Run with: python -m pytest test_invigilation.py (or python test_invigilation.py)
+"""
+from collections import Counter
+from datetime import datetime, timedelta
+
+from app.services.invigilation import InvigilationExam, InvigilationProf, MinCostFlow, plan_invigilation
+
+DAY = datetime(2026, 11, 2)
+
+
+def exam(exam_id, hour, dept_id, needed, minutes=120, day=0):
+    start = DAY + timedelta(days=day, hours=hour)
+    return InvigilationExam(exam_id, start, start + timedelta(minutes=minutes), dept_id, None, needed)
+
+
+def test_min_cost_flow_known_network():
+    # 0 = source, 3 = puits; optimum: 0-1-2-3, 0-2-3 et 0-1-3 (coût 3 + 3 + 4)
+    network = MinCostFlow(4)
+    s1 = network.add_arc(0, 1, 2, 1)
+    s2 = network.add_arc(0, 2, 1, 2)
+    a12 = network.add_arc(1, 2, 1, 1)
+    a13 = network.add_arc(1, 3, 1, 3)
+    a23 = network.add_arc(2, 3, 2, 1)
+    assert network.solve(0, 3) == (3, 10)
+    assert [network.flow(arc) for arc in (s1, s2, a12, a13, a23)] == [2, 1, 1, 1, 2]
+
+
+def test_min_cost_flow_prefers_cheap_paths_before_saturation():
+    # Deux chemins parallèles: le moins cher est saturé avant l'autre
+    network = MinCostFlow(3)
+    network.add_arc(0, 1, 5)
+    cheap = network.add_arc(1, 2, 2, 1)
+    costly = network.add_arc(1, 2, 10, 7)
+    assert network.solve(0, 2) == (5, 2 * 1 + 3 * 7)
+    assert (network.flow(cheap), network.flow(costly)) == (2, 3)
+
+
+def test_one_exam_per_professor_in_overlapping_group():
+    # 10h-12h chevauche 8h-10h30 et 11h-13h: un seul groupe de trois examens
+    exams = [exam(1, 8, 1, 2, minutes=150), exam(2, 10, 1, 2), exam(3, 11, 2, 2)]
+    profs = [InvigilationProf(p, 1 if p <= 4 else 2, 3) for p in range(1, 9)]
+    assigned = plan_invigilation(exams, profs, {}, {}, {})
+    assert all(len(assigned[e.id]) == e.needed for e in exams)
+    chosen = [prof_id for prof_ids in assigned.values() for prof_id in prof_ids]
+    assert len(chosen) == len(set(chosen))
+
+
+def test_daily_cap_and_busy_slots():
+    # Trois examens disjoints le même jour, deux le lendemain
+    exams = [exam(1, 8, 1, 1), exam(2, 11, 1, 1), exam(3, 14, 1, 1),
+             exam(4, 8, 1, 1, day=1), exam(5, 11, 1, 1, day=1)]
+    profs = [InvigilationProf(p, 1, 1) for p in range(1, 5)]
+    # Enseignant 1 déjà à son plafond le premier jour, enseignant 2 occupé le lendemain
+    day_load = {(1, DAY.date()): 1}
+    busy = {2: [(DAY + timedelta(days=1), DAY + timedelta(days=1, hours=23))]}
+    assigned = plan_invigilation(exams, profs, busy, {1: 1}, day_load)
+    assert all(len(assigned[e.id]) == 1 for e in exams)
+    per_day = Counter()
+    for e in exams:
+        for prof_id in assigned[e.id]:
+            per_day[prof_id, e.start.date()] += 1
+    assert max(per_day.values()) == 1
+    assert (1, DAY.date()) not in per_day
+    assert not any(prof_id == 2 and day != DAY.date() for prof_id, day in per_day)
+
+
+def test_load_is_balanced():
+    # Un enseignant déjà chargé n'est sollicité qu'en dernier
+    exams = [exam(e, 8, 1, 1, day=e) for e in range(1, 5)]
+    profs = [InvigilationProf(p, 1, 2) for p in range(1, 4)]
+    assigned = plan_invigilation(exams, profs, {}, {1: 5}, {})
+    counts = Counter(prof_id for prof_ids in assigned.values() for prof_id in prof_ids)
+    assert sum(counts.values()) == 4
+    assert counts[1] == 0 and counts[2] == counts[3] == 2
+
+
+def test_own_department_first():
+    # Examens simultanés de deux départements, chacun avec assez d'enseignants
+    exams = [exam(1, 8, 1, 2), exam(2, 8, 2, 2)]
+    depts = {1: 1, 2: 1, 3: 2, 4: 2}
+    profs = [InvigilationProf(p, dept, 2) for p, dept in depts.items()]
+    assigned = plan_invigilation(exams, profs, {}, {}, {})
+    assert sorted(assigned[1]) == [1, 2]
+    assert sorted(assigned[2]) == [3, 4]
+
+
+def test_other_department_fills_the_gap():
+    # Le département 1 n'a qu'un enseignant: le second vient du vivier, et
+    # les enseignants du département 2 restent sur leur examen
+    exams = [exam(1, 8, 1, 2), exam(2, 8, 2, 1)]
+    depts = {1: 1, 2: 2, 3: 2}
+    profs = [InvigilationProf(p, dept, 2) for p, dept in depts.items()]
+    assigned = plan_invigilation(exams, profs, {}, {}, {})
+    assert 1 in assigned[1] and len(assigned[1]) == 2
+    assert len(assigned[2]) == 1 and assigned[2][0] in (2, 3)
+    assert len(set(assigned[1]) | set(assigned[2])) == 3
+
+
+if __name__ == "__main__":
+    test_min_cost_flow_known_network()
+    test_min_cost_flow_prefers_cheap_paths_before_saturation()
+    test_one_exam_per_professor_in_overlapping_group()
+    test_daily_cap_and_busy_slots()
+    test_load_is_balanced()
+    test_own_department_first()
+    test_other_department_fills_the_gap()
+    print("OK")
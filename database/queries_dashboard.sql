@@ -16,7 +16,7 @@ SELECT
     (SELECT COUNT(*) FROM etudiants) as nb_etudiants,
     (SELECT COUNT(*) FROM inscriptions) as nb_inscriptions,
     (SELECT COUNT(*) FROM lieux_examen) as nb_salles,
-    (SELECT COUNT(*) FROM examens WHERE statut NOT IN ('cancelled', 'draft')) as nb_examens_planifies;
+    (SELECT COUNT(*) FROM examens WHERE statut NOT IN ('cancelled', 'draft') AND NOT EXISTS (SELECT 1 FROM sessions_generation sg WHERE sg.id = examens.session_id AND sg.brouillon)) as nb_examens_planifies;
 
 -- ============================================================================
 -- 2. KPIs PAR DÉPARTEMENT
@@ -40,7 +40,7 @@ LEFT JOIN formations f ON f.dept_id = d.id
 LEFT JOIN modules m ON m.formation_id = f.id
 LEFT JOIN professeurs p ON p.dept_id = d.id
 LEFT JOIN etudiants et ON et.formation_id = f.id
-LEFT JOIN examens e ON e.module_id = m.id AND e.statut NOT IN ('cancelled', 'draft')
+LEFT JOIN examens e ON e.module_id = m.id AND e.statut NOT IN ('cancelled', 'draft') AND NOT EXISTS (SELECT 1 FROM sessions_generation sg WHERE sg.id = e.session_id AND sg.brouillon)
 GROUP BY d.id, d.nom, d.code
 ORDER BY d.nom;
 
@@ -60,11 +60,11 @@ SELECT
     COALESCE(SUM(e.nb_inscrits), 0) as total_etudiants,
     ROUND(
         100.0 * COUNT(e.id) / 
-        NULLIF((SELECT COUNT(*) FROM examens WHERE statut NOT IN ('cancelled', 'draft')), 0),
+        NULLIF((SELECT COUNT(*) FROM examens WHERE statut NOT IN ('cancelled', 'draft') AND NOT EXISTS (SELECT 1 FROM sessions_generation sg WHERE sg.id = examens.session_id AND sg.brouillon)), 0),
         2
     ) as part_examens_pct
 FROM lieux_examen l
-LEFT JOIN examens e ON e.salle_id = l.id AND e.statut NOT IN ('cancelled', 'draft')
+LEFT JOIN examens e ON e.salle_id = l.id AND e.statut NOT IN ('cancelled', 'draft') AND NOT EXISTS (SELECT 1 FROM sessions_generation sg WHERE sg.id = e.session_id AND sg.brouillon)
 GROUP BY l.id, l.nom, l.code, l.capacite, l.type, l.batiment
 ORDER BY nb_examens DESC;
 
@@ -85,8 +85,8 @@ SELECT
 FROM examens e1
 JOIN examens e2 ON e1.salle_id = e2.salle_id 
     AND e1.id < e2.id
-    AND e1.statut NOT IN ('cancelled', 'draft')
-    AND e2.statut NOT IN ('cancelled', 'draft')
+    AND e1.statut NOT IN ('cancelled', 'draft') AND NOT EXISTS (SELECT 1 FROM sessions_generation sg WHERE sg.id = e1.session_id AND sg.brouillon)
+    AND e2.statut NOT IN ('cancelled', 'draft') AND NOT EXISTS (SELECT 1 FROM sessions_generation sg WHERE sg.id = e2.session_id AND sg.brouillon)
 JOIN lieux_examen l ON l.id = e1.salle_id
 WHERE (e1.date_heure, e1.date_heure + (e1.duree_minutes || ' minutes')::INTERVAL)
     OVERLAPS (e2.date_heure, e2.date_heure + (e2.duree_minutes || ' minutes')::INTERVAL);
@@ -101,7 +101,7 @@ SELECT
     'SURCHARGE PROFESSEUR' as type_conflit
 FROM examens e
 JOIN professeurs p ON p.id = e.prof_id
-WHERE e.statut NOT IN ('cancelled', 'draft')
+WHERE e.statut NOT IN ('cancelled', 'draft') AND NOT EXISTS (SELECT 1 FROM sessions_generation sg WHERE sg.id = e.session_id AND sg.brouillon)
 GROUP BY p.id, p.nom, p.prenom, DATE(e.date_heure)
 HAVING COUNT(*) > 3
 ORDER BY jour, nb_examens DESC;
@@ -142,19 +142,19 @@ SELECT
     d.nom as departement,
     COUNT(e.id) as nb_surveillances,
     p.max_surveillances * 
-        (SELECT COUNT(DISTINCT DATE(date_heure)) FROM examens WHERE statut NOT IN ('cancelled', 'draft')) 
+        (SELECT COUNT(DISTINCT DATE(date_heure)) FROM examens WHERE statut NOT IN ('cancelled', 'draft') AND NOT EXISTS (SELECT 1 FROM sessions_generation sg WHERE sg.id = examens.session_id AND sg.brouillon)) 
         as max_possible,
     ROUND(
         100.0 * COUNT(e.id) / NULLIF(
             p.max_surveillances * 
-            (SELECT COUNT(DISTINCT DATE(date_heure)) FROM examens WHERE statut NOT IN ('cancelled', 'draft')),
+            (SELECT COUNT(DISTINCT DATE(date_heure)) FROM examens WHERE statut NOT IN ('cancelled', 'draft') AND NOT EXISTS (SELECT 1 FROM sessions_generation sg WHERE sg.id = examens.session_id AND sg.brouillon)),
             0
         ),
         2
     ) as taux_charge_pct
 FROM professeurs p
 JOIN departements d ON d.id = p.dept_id
-LEFT JOIN examens e ON e.prof_id = p.id AND e.statut NOT IN ('cancelled', 'draft')
+LEFT JOIN examens e ON e.prof_id = p.id AND e.statut NOT IN ('cancelled', 'draft') AND NOT EXISTS (SELECT 1 FROM sessions_generation sg WHERE sg.id = e.session_id AND sg.brouillon)
 GROUP BY p.id, p.matricule, p.prenom, p.nom, d.nom, p.max_surveillances
 ORDER BY nb_surveillances DESC;
 
@@ -169,7 +169,7 @@ SELECT
     SUM(e.nb_inscrits) as total_etudiants,
     COUNT(DISTINCT e.salle_id) as salles_utilisees
 FROM examens e
-WHERE e.statut NOT IN ('cancelled', 'draft')
+WHERE e.statut NOT IN ('cancelled', 'draft') AND NOT EXISTS (SELECT 1 FROM sessions_generation sg WHERE sg.id = e.session_id AND sg.brouillon)
 GROUP BY DATE(e.date_heure), EXTRACT(HOUR FROM e.date_heure)
 ORDER BY jour, heure;
 
@@ -192,7 +192,7 @@ SELECT
 FROM examens e
 JOIN modules m ON m.id = e.module_id
 JOIN lieux_examen l ON l.id = e.salle_id
-WHERE e.statut NOT IN ('cancelled', 'draft')
+WHERE e.statut NOT IN ('cancelled', 'draft') AND NOT EXISTS (SELECT 1 FROM sessions_generation sg WHERE sg.id = e.session_id AND sg.brouillon)
 ORDER BY difference DESC;
 
 -- ============================================================================
@@ -228,7 +228,7 @@ SELECT
 FROM modules m
 JOIN formations f ON f.id = m.formation_id
 WHERE NOT EXISTS (
-    SELECT 1 FROM examens e WHERE e.module_id = m.id AND e.statut NOT IN ('cancelled', 'draft')
+    SELECT 1 FROM examens e WHERE e.module_id = m.id AND e.statut NOT IN ('cancelled', 'draft') AND NOT EXISTS (SELECT 1 FROM sessions_generation sg WHERE sg.id = e.session_id AND sg.brouillon)
 )
 AND EXISTS (
     SELECT 1 FROM inscriptions i WHERE i.module_id = m.id AND i.statut = 'active'
@@ -246,5 +246,5 @@ FROM examens e
 JOIN modules m ON m.id = e.module_id
 LEFT JOIN lieux_examen l ON l.id = e.salle_id
 WHERE e.prof_id IS NULL
-AND e.statut NOT IN ('cancelled', 'draft')
+AND e.statut NOT IN ('cancelled', 'draft') AND NOT EXISTS (SELECT 1 FROM sessions_generation sg WHERE sg.id = e.session_id AND sg.brouillon)
 ORDER BY e.date_heure;
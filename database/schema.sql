@@ -11,6 +11,7 @@
 -- ============================================================================
 CREATE EXTENSION IF NOT EXISTS "uuid-ossp";
 CREATE EXTENSION IF NOT EXISTS "pgcrypto";
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
 
 -- ============================================================================
 -- TYPES ÉNUMÉRÉS
@@ -73,6 +74,7 @@ CREATE TABLE modules (
     pre_req_id INTEGER REFERENCES modules(id) ON DELETE SET NULL,
     duree_examen_min INTEGER DEFAULT 120 CHECK (duree_examen_min >= 30 AND duree_examen_min <= 240),
     coefficient DECIMAL(3,1) DEFAULT 1.0,
+    nb_inscrits_actifs INTEGER NOT NULL DEFAULT 0,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
@@ -81,6 +83,7 @@ CREATE INDEX idx_modules_formation ON modules(formation_id);
 CREATE INDEX idx_modules_semestre ON modules(semestre);
 
 COMMENT ON TABLE modules IS 'Modules/Matières par formation (6-9 modules par formation)';
+COMMENT ON COLUMN modules.nb_inscrits_actifs IS 'Inscriptions actives, maintenu par trigger (réparé par scripts/reconcile_inscriptions.py)';
 
 -- ============================================================================
 -- TABLE: LIEUX_EXAMEN
@@ -239,6 +242,9 @@ CREATE TABLE sessions_generation (
     nb_conflits_resolus INTEGER DEFAULT 0,
     temps_execution_ms INTEGER,
     log TEXT,
+    metriques JSONB DEFAULT '{}',
+    brouillon BOOLEAN NOT NULL DEFAULT FALSE,
+    publiee_at TIMESTAMP,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
@@ -246,6 +252,9 @@ CREATE INDEX idx_sessions_user ON sessions_generation(user_id);
 CREATE INDEX idx_sessions_statut ON sessions_generation(statut);
 
 COMMENT ON TABLE sessions_generation IS 'Sessions de génération automatique d''EDT';
+COMMENT ON COLUMN sessions_generation.metriques IS 'Profil d''exécution: durée, requêtes SQL et lignes par phase, statistiques du solveur, mémoire';
+COMMENT ON COLUMN sessions_generation.brouillon IS 'Examens générés invisibles tant que la session n''est pas publiée';
+COMMENT ON COLUMN sessions_generation.publiee_at IS 'Publication des examens générés (brouillon passé à FALSE)';
 
 -- ============================================================================
 -- TABLE: SURVEILLANCES (Table de liaison pour répartition équitable)
@@ -264,10 +273,155 @@ CREATE INDEX idx_surveillances_prof ON surveillances(prof_id);
 
 COMMENT ON TABLE surveillances IS 'Répartition équitable des surveillances entre enseignants';
 
+-- ============================================================================
+-- TABLE: EXAMEN_SALLES (Examens répartis sur plusieurs salles)
+-- ============================================================================
+CREATE TABLE examen_salles (
+    id SERIAL PRIMARY KEY,
+    examen_id INTEGER NOT NULL REFERENCES examens(id) ON DELETE CASCADE,
+    salle_id INTEGER NOT NULL REFERENCES lieux_examen(id) ON DELETE CASCADE,
+    nb_places INTEGER DEFAULT 0,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE(examen_id, salle_id)
+);
+
+CREATE INDEX idx_examen_salles_examen ON examen_salles(examen_id);
+CREATE INDEX idx_examen_salles_salle ON examen_salles(salle_id);
+
+COMMENT ON TABLE examen_salles IS 'Salles d''un examen réparti sur plusieurs salles (salle principale comprise)';
+
+-- ============================================================================
+-- TABLE: PLACES_EXAMEN (Salle et place de chaque étudiant)
+-- ============================================================================
+CREATE TABLE places_examen (
+    id SERIAL PRIMARY KEY,
+    examen_id INTEGER NOT NULL REFERENCES examens(id) ON DELETE CASCADE,
+    etudiant_id INTEGER NOT NULL REFERENCES etudiants(id) ON DELETE CASCADE,
+    salle_id INTEGER NOT NULL REFERENCES lieux_examen(id) ON DELETE CASCADE,
+    numero_place INTEGER,
+    UNIQUE(examen_id, etudiant_id)
+);
+
+CREATE INDEX idx_places_examen_etudiant ON places_examen(etudiant_id);
+
+COMMENT ON TABLE places_examen IS 'Répartition des étudiants entre les salles d''un examen (place facultative)';
+
+-- ============================================================================
+-- TABLE: APP_METADATA (Version du schéma et des données initiales)
+-- ============================================================================
+CREATE TABLE app_metadata (
+    key VARCHAR(100) PRIMARY KEY,
+    value VARCHAR(255) NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+COMMENT ON TABLE app_metadata IS 'Marqueurs internes (version d''initialisation lue au démarrage de l''API)';
+
+-- ============================================================================
+-- TABLE: SYNC_CHANGES (Journal pour la synchronisation incrémentale des clients)
+-- ============================================================================
+CREATE SEQUENCE edt_change_seq;
+
+CREATE TABLE sync_changes (
+    change_seq BIGINT PRIMARY KEY DEFAULT nextval('edt_change_seq'),
+    entity VARCHAR(20) NOT NULL CHECK (entity IN ('examen', 'salle', 'session')),
+    entity_id INTEGER NOT NULL,
+    op VARCHAR(10) NOT NULL CHECK (op IN ('INSERT', 'UPDATE', 'DELETE')),
+    changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    -- Examen modifié ou supprimé: état précédent (périmètre des suppressions)
+    old_module_id INTEGER,
+    old_prof_id INTEGER,
+    old_statut VARCHAR(20)
+);
+
+CREATE INDEX idx_sync_changes_changed_at ON sync_changes(changed_at);
+
+COMMENT ON TABLE sync_changes IS 'Modifications des examens, salles et sessions (curseur de /api/sync; DELETE = suppression)';
+
+-- ============================================================================
+-- TABLE: EDT_SNAPSHOTS (Versions d'EDT: promotion et retour arrière)
+-- ============================================================================
+CREATE TABLE edt_snapshots (
+    id SERIAL PRIMARY KEY,
+    session_id INTEGER REFERENCES sessions_generation(id) ON DELETE SET NULL,
+    user_id INTEGER REFERENCES users(id) ON DELETE SET NULL,
+    type VARCHAR(20) NOT NULL DEFAULT 'manuel' CHECK (type IN ('generation', 'manuel', 'sauvegarde')),
+    libelle VARCHAR(150),
+    nb_examens INTEGER DEFAULT 0,
+    donnees JSONB NOT NULL,
+    sauvegarde_id INTEGER REFERENCES edt_snapshots(id) ON DELETE SET NULL,
+    promu_at TIMESTAMP,
+    annule_at TIMESTAMP,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX idx_edt_snapshots_session ON edt_snapshots(session_id);
+
+COMMENT ON TABLE edt_snapshots IS 'Versions d''EDT: tableaux par module (créneau, durée, salle, enseignant, statut)';
+COMMENT ON COLUMN edt_snapshots.sauvegarde_id IS 'EDT en place avant la promotion (retour arrière)';
+
+-- ============================================================================
+-- TABLE: EXAMENS_PLANNING (Vue dénormalisée des examens, maintenue par triggers)
+-- ============================================================================
+CREATE TABLE examens_planning (
+    examen_id INTEGER PRIMARY KEY REFERENCES examens(id) ON DELETE CASCADE,
+    module_id INTEGER NOT NULL,
+    module_code VARCHAR(20) NOT NULL,
+    module_nom VARCHAR(150) NOT NULL,
+    formation_id INTEGER NOT NULL,
+    formation_code VARCHAR(20) NOT NULL,
+    formation_nom VARCHAR(150) NOT NULL,
+    dept_id INTEGER NOT NULL,
+    dept_code VARCHAR(10) NOT NULL,
+    dept_nom VARCHAR(100) NOT NULL,
+    prof_id INTEGER,
+    prof_nom VARCHAR(201),
+    salle_id INTEGER,
+    salle_code VARCHAR(20),
+    salle_nom VARCHAR(100),
+    salle_batiment VARCHAR(50),
+    salle_capacite INTEGER,
+    date_heure TIMESTAMP NOT NULL,
+    date_fin TIMESTAMP NOT NULL,
+    duree_minutes INTEGER NOT NULL,
+    statut VARCHAR(20) NOT NULL,
+    session_id INTEGER,
+    nb_inscrits INTEGER DEFAULT 0,
+    updated_at TIMESTAMP
+);
+
+CREATE INDEX idx_planning_dept_date ON examens_planning(dept_id, date_heure);
+CREATE INDEX idx_planning_formation_date ON examens_planning(formation_id, date_heure);
+CREATE INDEX idx_planning_salle_date ON examens_planning(salle_id, date_heure);
+CREATE INDEX idx_planning_prof_date ON examens_planning(prof_id, date_heure);
+CREATE INDEX idx_planning_date ON examens_planning(date_heure);
+CREATE INDEX idx_planning_statut ON examens_planning(statut);
+CREATE INDEX idx_planning_module_search_trgm ON examens_planning
+    USING gin ((module_code || ' ' || module_nom) gin_trgm_ops);
+
+COMMENT ON TABLE examens_planning IS 'Examens avec module, formation, département, salle et enseignant (lectures sans jointure)';
+
+-- ============================================================================
+-- RECHERCHE (Index trigrammes pg_trgm pour /api/search et le filtre des examens)
+-- ============================================================================
+
+-- DÉBUT GÉNÉRÉ: RECHERCHE
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX IF NOT EXISTS idx_modules_search_trgm ON modules USING gin ((code || ' ' || nom) gin_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS idx_professeurs_search_trgm ON professeurs USING gin ((matricule || ' ' || prenom || ' ' || nom) gin_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS idx_etudiants_search_trgm ON etudiants USING gin ((matricule || ' ' || prenom || ' ' || nom) gin_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS idx_lieux_search_trgm ON lieux_examen USING gin ((code || ' ' || nom || ' ' || batiment) gin_trgm_ops);
+-- FIN GÉNÉRÉ: RECHERCHE
+
 -- ============================================================================
 -- CONTRAINTES MÉTIER (Fonctions et Triggers)
 -- ============================================================================
 
+-- DÉBUT GÉNÉRÉ: CONTRAINTES MÉTIER
 -- Fonction: Vérifier qu'un étudiant n'a pas plus d'1 examen par jour
 CREATE OR REPLACE FUNCTION check_student_exam_per_day()
 RETURNS TRIGGER AS $$
@@ -282,7 +436,9 @@ BEGIN
     )
     AND DATE(e.date_heure) = DATE(NEW.date_heure)
     AND e.id != COALESCE(NEW.id, 0)
-    AND e.statut NOT IN ('cancelled', 'draft');
+    AND e.statut NOT IN ('cancelled', 'draft')
+    -- Examens des sessions non publiées: invisibles (brouillons)
+    AND NOT EXISTS (SELECT 1 FROM sessions_generation sg WHERE sg.id = e.session_id AND sg.brouillon);
     
     IF conflict_count > 0 THEN
         RAISE WARNING 'Conflit détecté: % étudiant(s) ont déjà un examen ce jour', conflict_count;
@@ -292,6 +448,12 @@ BEGIN
 END;
 $$ LANGUAGE plpgsql;
 
+DROP TRIGGER IF EXISTS trg_check_student_exam ON examens;
+
+CREATE TRIGGER trg_check_student_exam
+    BEFORE INSERT OR UPDATE ON examens
+    FOR EACH ROW EXECUTE FUNCTION check_student_exam_per_day();
+
 -- Fonction: Vérifier qu'un professeur n'a pas plus de 3 examens par jour
 CREATE OR REPLACE FUNCTION check_professor_exam_limit()
 RETURNS TRIGGER AS $$
@@ -300,11 +462,12 @@ DECLARE
 BEGIN
     IF NEW.prof_id IS NOT NULL THEN
         SELECT COUNT(*) INTO exam_count
-        FROM examens
-        WHERE prof_id = NEW.prof_id
-        AND DATE(date_heure) = DATE(NEW.date_heure)
-        AND id != COALESCE(NEW.id, 0)
-        AND statut NOT IN ('cancelled', 'draft');
+        FROM examens e
+        WHERE e.prof_id = NEW.prof_id
+        AND DATE(e.date_heure) = DATE(NEW.date_heure)
+        AND e.id != COALESCE(NEW.id, 0)
+        AND e.statut NOT IN ('cancelled', 'draft')
+        AND NOT EXISTS (SELECT 1 FROM sessions_generation sg WHERE sg.id = e.session_id AND sg.brouillon);
         
         IF exam_count >= 3 THEN
             RAISE EXCEPTION 'Le professeur a déjà 3 examens planifiés ce jour';
@@ -315,6 +478,243 @@ BEGIN
 END;
 $$ LANGUAGE plpgsql;
 
+DROP TRIGGER IF EXISTS trg_check_professor_limit ON examens;
+
+CREATE TRIGGER trg_check_professor_limit
+    BEFORE INSERT OR UPDATE ON examens
+    FOR EACH ROW EXECUTE FUNCTION check_professor_exam_limit();
+-- FIN GÉNÉRÉ: CONTRAINTES MÉTIER
+
+-- check_room_capacity(): section COMPTEURS D'INSCRITS
+-- check_room_overlap(): section SALLES MULTIPLES
+
+-- ============================================================================
+-- FONCTIONS UTILITAIRES
+-- ============================================================================
+
+-- Fonction: Mise à jour automatique de updated_at
+CREATE OR REPLACE FUNCTION update_updated_at_column()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.updated_at = CURRENT_TIMESTAMP;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Appliquer sur toutes les tables
+CREATE TRIGGER update_departements_updated_at BEFORE UPDATE ON departements
+    FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
+CREATE TRIGGER update_formations_updated_at BEFORE UPDATE ON formations
+    FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
+CREATE TRIGGER update_modules_updated_at BEFORE UPDATE ON modules
+    FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
+CREATE TRIGGER update_lieux_updated_at BEFORE UPDATE ON lieux_examen
+    FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
+CREATE TRIGGER update_professeurs_updated_at BEFORE UPDATE ON professeurs
+    FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
+CREATE TRIGGER update_etudiants_updated_at BEFORE UPDATE ON etudiants
+    FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
+CREATE TRIGGER update_inscriptions_updated_at BEFORE UPDATE ON inscriptions
+    FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
+CREATE TRIGGER update_examens_updated_at BEFORE UPDATE ON examens
+    FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
+CREATE TRIGGER update_users_updated_at BEFORE UPDATE ON users
+    FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
+
+-- ============================================================================
+-- NOTIFICATIONS (Invalidation des caches via LISTEN/NOTIFY)
+-- ============================================================================
+
+-- DÉBUT GÉNÉRÉ: NOTIFICATIONS
+-- Fonction: Publier les clés affectées par un changement d'examen sur edt_changes
+CREATE OR REPLACE FUNCTION notify_examen_change()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_examen_id INTEGER;
+    v_module_ids INTEGER[] := ARRAY[]::INTEGER[];
+    v_salle_ids INTEGER[] := ARRAY[]::INTEGER[];
+    v_prof_ids INTEGER[] := ARRAY[]::INTEGER[];
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        v_examen_id := OLD.id;
+        v_module_ids := v_module_ids || OLD.module_id;
+        v_salle_ids := v_salle_ids || OLD.salle_id;
+        v_prof_ids := v_prof_ids || OLD.prof_id;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        v_examen_id := NEW.id;
+        v_module_ids := v_module_ids || NEW.module_id;
+        v_salle_ids := v_salle_ids || NEW.salle_id;
+        v_prof_ids := v_prof_ids || NEW.prof_id;
+    END IF;
+
+    PERFORM pg_notify('edt_changes', json_build_object(
+        'table', 'examens',
+        'op', TG_OP,
+        'examen_ids', ARRAY[v_examen_id],
+        'module_ids', (SELECT array_agg(DISTINCT x) FROM unnest(v_module_ids) x WHERE x IS NOT NULL),
+        'salle_ids', (SELECT array_agg(DISTINCT x) FROM unnest(v_salle_ids) x WHERE x IS NOT NULL),
+        'prof_ids', (SELECT array_agg(DISTINCT x) FROM unnest(v_prof_ids) x WHERE x IS NOT NULL),
+        'formation_ids', (SELECT array_agg(DISTINCT m.formation_id) FROM modules m
+                          WHERE m.id = ANY(v_module_ids)),
+        'dept_ids', (SELECT array_agg(DISTINCT f.dept_id) FROM modules m
+                     JOIN formations f ON f.id = m.formation_id
+                     WHERE m.id = ANY(v_module_ids))
+    )::text);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_notify_examen_change ON examens;
+
+CREATE TRIGGER trg_notify_examen_change
+    AFTER INSERT OR UPDATE OR DELETE ON examens
+    FOR EACH ROW EXECUTE FUNCTION notify_examen_change();
+
+-- Fonction: Publier la fin ou la publication d'une session de génération
+CREATE OR REPLACE FUNCTION notify_session_change()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM pg_notify('edt_changes', json_build_object(
+        'table', 'sessions_generation',
+        'op', TG_OP,
+        'session_id', NEW.id,
+        'statut', CASE WHEN OLD.brouillon AND NOT NEW.brouillon THEN 'published' ELSE NEW.statut::TEXT END
+    )::text);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_notify_session_change ON sessions_generation;
+
+CREATE TRIGGER trg_notify_session_change
+    AFTER UPDATE OF statut, brouillon ON sessions_generation
+    FOR EACH ROW
+    WHEN ((OLD.statut IS DISTINCT FROM NEW.statut AND NEW.statut IN ('completed', 'failed'))
+          OR (OLD.brouillon AND NOT NEW.brouillon))
+    EXECUTE FUNCTION notify_session_change();
+-- FIN GÉNÉRÉ: NOTIFICATIONS
+
+-- ============================================================================
+-- SYNCHRONISATION (Journal des modifications, numéroté dans l'ordre des commits)
+-- ============================================================================
+
+-- DÉBUT GÉNÉRÉ: SYNCHRONISATION
+-- Fonction: Ajouter une entrée au journal (déclenchée au commit)
+CREATE OR REPLACE FUNCTION record_sync_change()
+RETURNS TRIGGER AS $$
+BEGIN
+    -- Verrou tenu jusqu'au commit: numéros attribués dans l'ordre des commits
+    PERFORM pg_advisory_xact_lock(724202);
+    IF TG_ARGV[0] = 'examen' AND TG_OP <> 'INSERT' THEN
+        -- Périmètre avant modification: seuls ceux qui voyaient l'examen reçoivent sa suppression
+        INSERT INTO sync_changes (change_seq, entity, entity_id, op, changed_at,
+                                  old_module_id, old_prof_id, old_statut)
+        VALUES (
+            nextval('edt_change_seq'), TG_ARGV[0], OLD.id, TG_OP, clock_timestamp(),
+            OLD.module_id, OLD.prof_id,
+            -- Examen d'une session non publiée: invisible comme un brouillon
+            CASE WHEN EXISTS (
+                SELECT 1 FROM sessions_generation sg WHERE sg.id = OLD.session_id AND sg.brouillon
+            ) THEN 'draft' ELSE OLD.statut::TEXT END
+        );
+    ELSE
+        INSERT INTO sync_changes (change_seq, entity, entity_id, op, changed_at)
+        VALUES (
+            nextval('edt_change_seq'),
+            TG_ARGV[0],
+            CASE WHEN TG_OP = 'DELETE' THEN OLD.id ELSE NEW.id END,
+            TG_OP,
+            clock_timestamp()
+        );
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_sync_examens ON examens;
+
+CREATE CONSTRAINT TRIGGER trg_sync_examens
+    AFTER INSERT OR UPDATE OR DELETE ON examens
+    DEFERRABLE INITIALLY DEFERRED
+    FOR EACH ROW EXECUTE FUNCTION record_sync_change('examen');
+
+DROP TRIGGER IF EXISTS trg_sync_lieux_examen ON lieux_examen;
+
+CREATE CONSTRAINT TRIGGER trg_sync_lieux_examen
+    AFTER INSERT OR UPDATE OR DELETE ON lieux_examen
+    DEFERRABLE INITIALLY DEFERRED
+    FOR EACH ROW EXECUTE FUNCTION record_sync_change('salle');
+
+DROP TRIGGER IF EXISTS trg_sync_sessions_generation ON sessions_generation;
+
+CREATE CONSTRAINT TRIGGER trg_sync_sessions_generation
+    AFTER INSERT OR UPDATE OR DELETE ON sessions_generation
+    DEFERRABLE INITIALLY DEFERRED
+    FOR EACH ROW EXECUTE FUNCTION record_sync_change('session');
+-- FIN GÉNÉRÉ: SYNCHRONISATION
+
+-- ============================================================================
+-- COMPTEURS D'INSCRITS (modules.nb_inscrits_actifs)
+-- ============================================================================
+
+-- DÉBUT GÉNÉRÉ: COMPTEURS D'INSCRITS
+ALTER TABLE modules ADD COLUMN IF NOT EXISTS nb_inscrits_actifs INTEGER NOT NULL DEFAULT 0;
+
+-- Fonction: Appliquer le delta d'inscriptions actives par module (une fois par instruction)
+CREATE OR REPLACE FUNCTION apply_inscriptions_delta()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        UPDATE modules m SET nb_inscrits_actifs = m.nb_inscrits_actifs + d.delta
+        FROM (SELECT module_id, COUNT(*) AS delta FROM new_rows
+              WHERE statut = 'active' GROUP BY module_id) d
+        WHERE m.id = d.module_id;
+    ELSIF TG_OP = 'DELETE' THEN
+        UPDATE modules m SET nb_inscrits_actifs = m.nb_inscrits_actifs - d.delta
+        FROM (SELECT module_id, COUNT(*) AS delta FROM old_rows
+              WHERE statut = 'active' GROUP BY module_id) d
+        WHERE m.id = d.module_id;
+    ELSE
+        UPDATE modules m SET nb_inscrits_actifs = m.nb_inscrits_actifs + d.delta
+        FROM (SELECT module_id, SUM(delta) AS delta FROM (
+                  SELECT module_id, 1 AS delta FROM new_rows WHERE statut = 'active'
+                  UNION ALL
+                  SELECT module_id, -1 AS delta FROM old_rows WHERE statut = 'active'
+              ) changes GROUP BY module_id HAVING SUM(delta) <> 0) d
+        WHERE m.id = d.module_id;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_inscriptions_count_insert ON inscriptions;
+
+CREATE TRIGGER trg_inscriptions_count_insert
+    AFTER INSERT ON inscriptions
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION apply_inscriptions_delta();
+
+DROP TRIGGER IF EXISTS trg_inscriptions_count_update ON inscriptions;
+
+CREATE TRIGGER trg_inscriptions_count_update
+    AFTER UPDATE ON inscriptions
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION apply_inscriptions_delta();
+
+DROP TRIGGER IF EXISTS trg_inscriptions_count_delete ON inscriptions;
+
+CREATE TRIGGER trg_inscriptions_count_delete
+    AFTER DELETE ON inscriptions
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION apply_inscriptions_delta();
+
+UPDATE modules m SET nb_inscrits_actifs = c.nb
+FROM (SELECT mo.id, COUNT(i.id) AS nb FROM modules mo
+      LEFT JOIN inscriptions i ON i.module_id = mo.id AND i.statut = 'active'
+      GROUP BY mo.id) c
+WHERE m.id = c.id AND m.nb_inscrits_actifs <> c.nb;
+
 -- Fonction: Vérifier la capacité de la salle
 CREATE OR REPLACE FUNCTION check_room_capacity()
 RETURNS TRIGGER AS $$
@@ -323,99 +723,288 @@ DECLARE
     student_count INTEGER;
 BEGIN
     IF NEW.salle_id IS NOT NULL THEN
-        SELECT capacite_examen INTO room_capacity
+        SELECT capacite / 2 INTO room_capacity
         FROM lieux_examen WHERE id = NEW.salle_id;
-        
-        SELECT COUNT(*) INTO student_count
-        FROM inscriptions WHERE module_id = NEW.module_id AND statut = 'active';
-        
+
+        SELECT nb_inscrits_actifs INTO student_count
+        FROM modules WHERE id = NEW.module_id;
+
         IF student_count > room_capacity THEN
             RAISE WARNING 'Capacité insuffisante: % étudiants pour % places', student_count, room_capacity;
         END IF;
-        
+
         NEW.nb_inscrits := student_count;
     END IF;
-    
+
     RETURN NEW;
 END;
 $$ LANGUAGE plpgsql;
 
--- Fonction: Vérifier les chevauchements horaires pour une salle
+DROP TRIGGER IF EXISTS trg_check_room_capacity ON examens;
+
+CREATE TRIGGER trg_check_room_capacity
+    BEFORE INSERT OR UPDATE ON examens
+    FOR EACH ROW EXECUTE FUNCTION check_room_capacity();
+-- FIN GÉNÉRÉ: COMPTEURS D'INSCRITS
+
+-- ============================================================================
+-- PLANNING (Maintien de la vue dénormalisée examens_planning)
+-- ============================================================================
+
+-- DÉBUT GÉNÉRÉ: PLANNING
+-- Fonction: (Re)calculer les lignes de examens_planning pour des examens
+CREATE OR REPLACE FUNCTION refresh_examens_planning(p_ids INTEGER[])
+RETURNS VOID AS $$
+BEGIN
+    IF p_ids IS NULL OR cardinality(p_ids) = 0 THEN
+        RETURN;
+    END IF;
+
+    INSERT INTO examens_planning (
+        examen_id, module_id, module_code, module_nom,
+        formation_id, formation_code, formation_nom,
+        dept_id, dept_code, dept_nom,
+        prof_id, prof_nom,
+        salle_id, salle_code, salle_nom, salle_batiment, salle_capacite,
+        date_heure, date_fin, duree_minutes, statut, session_id, nb_inscrits, updated_at
+    )
+    SELECT
+        e.id, m.id, m.code, m.nom,
+        f.id, f.code, f.nom,
+        d.id, d.code, d.nom,
+        p.id, p.prenom || ' ' || p.nom,
+        l.id, l.code, l.nom, l.batiment, l.capacite / 2,
+        e.date_heure, e.date_heure + make_interval(mins => e.duree_minutes), e.duree_minutes,
+        e.statut::text, e.session_id, e.nb_inscrits, e.updated_at
+    FROM examens e
+    JOIN modules m ON m.id = e.module_id
+    JOIN formations f ON f.id = m.formation_id
+    JOIN departements d ON d.id = f.dept_id
+    LEFT JOIN professeurs p ON p.id = e.prof_id
+    LEFT JOIN lieux_examen l ON l.id = e.salle_id
+    WHERE e.id = ANY(p_ids)
+    ON CONFLICT (examen_id) DO UPDATE SET
+        module_id = EXCLUDED.module_id,
+        module_code = EXCLUDED.module_code,
+        module_nom = EXCLUDED.module_nom,
+        formation_id = EXCLUDED.formation_id,
+        formation_code = EXCLUDED.formation_code,
+        formation_nom = EXCLUDED.formation_nom,
+        dept_id = EXCLUDED.dept_id,
+        dept_code = EXCLUDED.dept_code,
+        dept_nom = EXCLUDED.dept_nom,
+        prof_id = EXCLUDED.prof_id,
+        prof_nom = EXCLUDED.prof_nom,
+        salle_id = EXCLUDED.salle_id,
+        salle_code = EXCLUDED.salle_code,
+        salle_nom = EXCLUDED.salle_nom,
+        salle_batiment = EXCLUDED.salle_batiment,
+        salle_capacite = EXCLUDED.salle_capacite,
+        date_heure = EXCLUDED.date_heure,
+        date_fin = EXCLUDED.date_fin,
+        duree_minutes = EXCLUDED.duree_minutes,
+        statut = EXCLUDED.statut,
+        session_id = EXCLUDED.session_id,
+        nb_inscrits = EXCLUDED.nb_inscrits,
+        updated_at = EXCLUDED.updated_at;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Fonction: Rafraîchir les examens insérés ou modifiés (une fois par instruction)
+CREATE OR REPLACE FUNCTION sync_examens_planning()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM refresh_examens_planning(ARRAY(SELECT id FROM new_rows));
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_examens_planning_insert ON examens;
+
+CREATE TRIGGER trg_examens_planning_insert
+    AFTER INSERT ON examens
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION sync_examens_planning();
+
+DROP TRIGGER IF EXISTS trg_examens_planning_update ON examens;
+
+CREATE TRIGGER trg_examens_planning_update
+    AFTER UPDATE ON examens
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION sync_examens_planning();
+
+-- Fonction: Propager les changements de module, formation, département, enseignant ou salle
+CREATE OR REPLACE FUNCTION sync_examens_planning_refs()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_ids INTEGER[];
+BEGIN
+    IF TG_TABLE_NAME = 'modules' THEN
+        SELECT array_agg(id) INTO v_ids FROM examens WHERE module_id = NEW.id;
+    ELSIF TG_TABLE_NAME = 'formations' THEN
+        SELECT array_agg(examen_id) INTO v_ids FROM examens_planning WHERE formation_id = NEW.id;
+    ELSIF TG_TABLE_NAME = 'departements' THEN
+        SELECT array_agg(examen_id) INTO v_ids FROM examens_planning WHERE dept_id = NEW.id;
+    ELSIF TG_TABLE_NAME = 'professeurs' THEN
+        SELECT array_agg(id) INTO v_ids FROM examens WHERE prof_id = NEW.id;
+    ELSIF TG_TABLE_NAME = 'lieux_examen' THEN
+        SELECT array_agg(id) INTO v_ids FROM examens WHERE salle_id = NEW.id;
+    END IF;
+    PERFORM refresh_examens_planning(v_ids);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_planning_modules ON modules;
+
+CREATE TRIGGER trg_planning_modules
+    AFTER UPDATE OF code, nom, formation_id ON modules
+    FOR EACH ROW EXECUTE FUNCTION sync_examens_planning_refs();
+
+DROP TRIGGER IF EXISTS trg_planning_formations ON formations;
+
+CREATE TRIGGER trg_planning_formations
+    AFTER UPDATE OF code, nom, dept_id ON formations
+    FOR EACH ROW EXECUTE FUNCTION sync_examens_planning_refs();
+
+DROP TRIGGER IF EXISTS trg_planning_departements ON departements;
+
+CREATE TRIGGER trg_planning_departements
+    AFTER UPDATE OF code, nom ON departements
+    FOR EACH ROW EXECUTE FUNCTION sync_examens_planning_refs();
+
+DROP TRIGGER IF EXISTS trg_planning_professeurs ON professeurs;
+
+CREATE TRIGGER trg_planning_professeurs
+    AFTER UPDATE OF nom, prenom ON professeurs
+    FOR EACH ROW EXECUTE FUNCTION sync_examens_planning_refs();
+
+DROP TRIGGER IF EXISTS trg_planning_lieux_examen ON lieux_examen;
+
+CREATE TRIGGER trg_planning_lieux_examen
+    AFTER UPDATE OF code, nom, batiment, capacite ON lieux_examen
+    FOR EACH ROW EXECUTE FUNCTION sync_examens_planning_refs();
+
+CREATE INDEX IF NOT EXISTS idx_planning_module_search_trgm ON examens_planning USING gin ((module_code || ' ' || module_nom) gin_trgm_ops);
+
+SELECT refresh_examens_planning(ARRAY(SELECT id FROM examens));
+-- FIN GÉNÉRÉ: PLANNING
+
+-- ============================================================================
+-- SALLES MULTIPLES (Chevauchements des salles supplémentaires d'un examen)
+-- ============================================================================
+
+-- DÉBUT GÉNÉRÉ: SALLES MULTIPLES
+-- Fonction: Vérifier les chevauchements horaires pour une salle (salles supplémentaires comprises)
 CREATE OR REPLACE FUNCTION check_room_overlap()
 RETURNS TRIGGER AS $$
 DECLARE
     overlap_count INTEGER;
+    rooms INTEGER[];
 BEGIN
-    IF NEW.salle_id IS NOT NULL AND NEW.date_heure IS NOT NULL THEN
+    IF NEW.date_heure IS NOT NULL THEN
+        -- Salle principale et salles supplémentaires de l'examen
+        rooms := ARRAY(SELECT salle_id FROM examen_salles WHERE examen_id = COALESCE(NEW.id, 0));
+        IF NEW.salle_id IS NOT NULL THEN
+            rooms := rooms || NEW.salle_id;
+        END IF;
+        IF cardinality(rooms) = 0 THEN
+            RETURN NEW;
+        END IF;
+
         SELECT COUNT(*) INTO overlap_count
-        FROM examens
-        WHERE salle_id = NEW.salle_id
-        AND id != COALESCE(NEW.id, 0)
-        AND statut NOT IN ('cancelled', 'draft')
+        FROM examens e
+        WHERE e.id IN (
+            SELECT id FROM examens WHERE salle_id = ANY(rooms)
+            UNION
+            SELECT examen_id FROM examen_salles WHERE salle_id = ANY(rooms)
+        )
+        AND e.id != COALESCE(NEW.id, 0)
+        AND e.statut NOT IN ('cancelled', 'draft')
+        -- Examens des sessions non publiées: invisibles (brouillons)
+        AND NOT EXISTS (SELECT 1 FROM sessions_generation sg WHERE sg.id = e.session_id AND sg.brouillon)
         AND (
             (NEW.date_heure, NEW.date_heure + (NEW.duree_minutes || ' minutes')::INTERVAL)
             OVERLAPS
-            (date_heure, date_heure + (duree_minutes || ' minutes')::INTERVAL)
+            (e.date_heure, e.date_heure + (e.duree_minutes || ' minutes')::INTERVAL)
         );
-        
+
         IF overlap_count > 0 THEN
             RAISE EXCEPTION 'La salle est déjà occupée pendant ce créneau';
         END IF;
     END IF;
-    
+
     RETURN NEW;
 END;
 $$ LANGUAGE plpgsql;
 
--- Application des triggers
-CREATE TRIGGER trg_check_student_exam
-    BEFORE INSERT OR UPDATE ON examens
-    FOR EACH ROW EXECUTE FUNCTION check_student_exam_per_day();
-
-CREATE TRIGGER trg_check_professor_limit
-    BEFORE INSERT OR UPDATE ON examens
-    FOR EACH ROW EXECUTE FUNCTION check_professor_exam_limit();
-
-CREATE TRIGGER trg_check_room_capacity
-    BEFORE INSERT OR UPDATE ON examens
-    FOR EACH ROW EXECUTE FUNCTION check_room_capacity();
+DROP TRIGGER IF EXISTS trg_check_room_overlap ON examens;
 
 CREATE TRIGGER trg_check_room_overlap
     BEFORE INSERT OR UPDATE ON examens
     FOR EACH ROW EXECUTE FUNCTION check_room_overlap();
 
--- ============================================================================
--- FONCTIONS UTILITAIRES
--- ============================================================================
-
--- Fonction: Mise à jour automatique de updated_at
-CREATE OR REPLACE FUNCTION update_updated_at_column()
+-- Fonction: Vérifier qu'une salle supplémentaire est libre pendant l'examen
+CREATE OR REPLACE FUNCTION check_examen_salle_overlap()
 RETURNS TRIGGER AS $$
+DECLARE
+    overlap_count INTEGER;
 BEGIN
-    NEW.updated_at = CURRENT_TIMESTAMP;
+    SELECT COUNT(*) INTO overlap_count
+    FROM examens own
+    JOIN examens e ON e.id != own.id
+    WHERE own.id = NEW.examen_id
+    AND e.id IN (
+        SELECT id FROM examens WHERE salle_id = NEW.salle_id
+        UNION
+        SELECT examen_id FROM examen_salles WHERE salle_id = NEW.salle_id
+    )
+    AND e.statut NOT IN ('cancelled', 'draft')
+    AND NOT EXISTS (SELECT 1 FROM sessions_generation sg WHERE sg.id = e.session_id AND sg.brouillon)
+    AND (
+        (own.date_heure, own.date_heure + (own.duree_minutes || ' minutes')::INTERVAL)
+        OVERLAPS
+        (e.date_heure, e.date_heure + (e.duree_minutes || ' minutes')::INTERVAL)
+    );
+
+    IF overlap_count > 0 THEN
+        RAISE EXCEPTION 'La salle est déjà occupée pendant ce créneau';
+    END IF;
+
     RETURN NEW;
 END;
 $$ LANGUAGE plpgsql;
 
--- Appliquer sur toutes les tables
-CREATE TRIGGER update_departements_updated_at BEFORE UPDATE ON departements
-    FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
-CREATE TRIGGER update_formations_updated_at BEFORE UPDATE ON formations
-    FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
-CREATE TRIGGER update_modules_updated_at BEFORE UPDATE ON modules
-    FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
-CREATE TRIGGER update_lieux_updated_at BEFORE UPDATE ON lieux_examen
-    FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
-CREATE TRIGGER update_professeurs_updated_at BEFORE UPDATE ON professeurs
-    FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
-CREATE TRIGGER update_etudiants_updated_at BEFORE UPDATE ON etudiants
-    FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
-CREATE TRIGGER update_inscriptions_updated_at BEFORE UPDATE ON inscriptions
-    FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
-CREATE TRIGGER update_examens_updated_at BEFORE UPDATE ON examens
-    FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
-CREATE TRIGGER update_users_updated_at BEFORE UPDATE ON users
-    FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
+DROP TRIGGER IF EXISTS trg_check_examen_salle_overlap ON examen_salles;
+
+CREATE TRIGGER trg_check_examen_salle_overlap
+    BEFORE INSERT OR UPDATE ON examen_salles
+    FOR EACH ROW EXECUTE FUNCTION check_examen_salle_overlap();
+
+-- Vue: Planning étudiant
+CREATE OR REPLACE VIEW v_planning_etudiant AS
+SELECT
+    et.id as etudiant_id,
+    et.nom,
+    et.prenom,
+    et.matricule,
+    e.id as examen_id,
+    m.nom as module_nom,
+    e.date_heure,
+    e.duree_minutes,
+    l.nom as salle,
+    l.batiment,
+    e.statut,
+    p.numero_place
+FROM etudiants et
+JOIN inscriptions i ON i.etudiant_id = et.id AND i.statut = 'active'
+JOIN modules m ON m.id = i.module_id
+JOIN examens e ON e.module_id = m.id
+    AND NOT EXISTS (SELECT 1 FROM sessions_generation sg WHERE sg.id = e.session_id AND sg.brouillon)
+LEFT JOIN places_examen p ON p.examen_id = e.id AND p.etudiant_id = et.id
+LEFT JOIN lieux_examen l ON l.id = COALESCE(p.salle_id, e.salle_id)
+ORDER BY et.id, e.date_heure;
+-- FIN GÉNÉRÉ: SALLES MULTIPLES
 
 -- ============================================================================
 -- VUES POUR LE DASHBOARD
@@ -453,7 +1042,8 @@ JOIN examens e2 ON e1.salle_id = e2.salle_id
     AND e2.statut NOT IN ('cancelled', 'draft')
 JOIN lieux_examen l ON l.id = e1.salle_id
 WHERE (e1.date_heure, e1.date_heure + (e1.duree_minutes || ' minutes')::INTERVAL)
-    OVERLAPS (e2.date_heure, e2.date_heure + (e2.duree_minutes || ' minutes')::INTERVAL);
+    OVERLAPS (e2.date_heure, e2.date_heure + (e2.duree_minutes || ' minutes')::INTERVAL)
+    AND NOT EXISTS (SELECT 1 FROM sessions_generation sg WHERE sg.id IN (e1.session_id, e2.session_id) AND sg.brouillon);
 
 -- Vue: Occupation des salles
 CREATE OR REPLACE VIEW v_occupation_salles AS
@@ -468,6 +1058,7 @@ SELECT
     SUM(COALESCE(e.nb_inscrits, 0)) as total_etudiants
 FROM lieux_examen l
 LEFT JOIN examens e ON e.salle_id = l.id AND e.statut NOT IN ('cancelled', 'draft')
+    AND NOT EXISTS (SELECT 1 FROM sessions_generation sg WHERE sg.id = e.session_id AND sg.brouillon)
 GROUP BY l.id, l.nom, l.code, l.capacite_examen, l.type, l.batiment;
 
 -- Vue: Planning professeur
@@ -485,31 +1076,11 @@ SELECT
     e.statut
 FROM professeurs p
 JOIN examens e ON e.prof_id = p.id
+    AND NOT EXISTS (SELECT 1 FROM sessions_generation sg WHERE sg.id = e.session_id AND sg.brouillon)
 JOIN modules m ON m.id = e.module_id
 LEFT JOIN lieux_examen l ON l.id = e.salle_id
 ORDER BY p.id, e.date_heure;
 
--- Vue: Planning étudiant
-CREATE OR REPLACE VIEW v_planning_etudiant AS
-SELECT 
-    et.id as etudiant_id,
-    et.nom,
-    et.prenom,
-    et.matricule,
-    e.id as examen_id,
-    m.nom as module_nom,
-    e.date_heure,
-    e.duree_minutes,
-    l.nom as salle,
-    l.batiment,
-    e.statut
-FROM etudiants et
-JOIN inscriptions i ON i.etudiant_id = et.id AND i.statut = 'active'
-JOIN modules m ON m.id = i.module_id
-JOIN examens e ON e.module_id = m.id
-LEFT JOIN lieux_examen l ON l.id = e.salle_id
-ORDER BY et.id, e.date_heure;
-
 -- ============================================================================
 -- INDEX PARTIELS POUR OPTIMISATION
 -- ============================================================================
@@ -25,7 +25,7 @@ import {
     SettingOutlined,
 } from '@ant-design/icons';
 import dayjs from 'dayjs';
-import { examensApi, EDTGenerationResponse } from '../services/api';
+import { examensApi, sessionsApi, EDTGenerationResponse } from '../services/api';
 
 const { Title, Text, Paragraph } = Typography;
 const { RangePicker } = DatePicker;
@@ -35,6 +35,21 @@ const AdminDashboard: React.FC = () => {
     const [generating, setGenerating] = useState(false);
     const [result, setResult] = useState<EDTGenerationResponse | null>(null);
     const [showResult, setShowResult] = useState(false);
+    const [publishing, setPublishing] = useState(false);
+
+    const handlePublish = async () => {
+        if (!result) return;
+        try {
+            setPublishing(true);
+            const response = await sessionsApi.publish(result.session_id);
+            setResult({ ...result, publiee: true, message: response.message });
+            message.success(response.message);
+        } catch (error: any) {
+            message.error(error.response?.data?.detail || 'Erreur lors de la publication');
+        } finally {
+            setPublishing(false);
+        }
+    };
 
     const handleGenerate = async (values: any) => {
         try {
@@ -241,9 +256,15 @@ const AdminDashboard: React.FC = () => {
                     <Button key="close" onClick={() => setShowResult(false)}>
                         Fermer
                     </Button>,
-                    <Button key="view" type="primary" onClick={() => window.location.href = '/examens'}>
-                        Voir les Examens
-                    </Button>,
+                    result?.publiee === false && result.nb_examens_planifies > 0 ? (
+                        <Button key="publish" type="primary" loading={publishing} onClick={handlePublish}>
+                            Publier l'EDT
+                        </Button>
+                    ) : (
+                        <Button key="view" type="primary" onClick={() => window.location.href = '/examens'}>
+                            Voir les Examens
+                        </Button>
+                    ),
                 ]}
                 width={600}
             >
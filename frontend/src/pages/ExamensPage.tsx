@@ -1,4 +1,4 @@
-import React, { useEffect, useState } from 'react';
+import React, { useEffect, useRef, useState } from 'react';
 import {
     Card,
     Table,
@@ -16,6 +16,7 @@ import {
     message,
     Popconfirm,
     TimePicker,
+    Alert,
 } from 'antd';
 import {
     PlusOutlined,
@@ -27,7 +28,7 @@ import {
     ReloadOutlined,
 } from '@ant-design/icons';
 import dayjs from 'dayjs';
-import { examensApi, dashboardApi, Examen, Module, PaginatedResponse } from '../services/api';
+import { examensApi, dashboardApi, ContrainteViolation, Examen, Module, PaginatedResponse } from '../services/api';
 import { useAuth } from '../context/AuthContext';
 
 const { Title, Text } = Typography;
@@ -44,6 +45,13 @@ const ExamensPage: React.FC = () => {
     const [modalVisible, setModalVisible] = useState(false);
     const [creating, setCreating] = useState(false);
     const [editingExam, setEditingExam] = useState<Examen | null>(null);
+    const [violations, setViolations] = useState<ContrainteViolation[]>([]);
+    const [validationError, setValidationError] = useState<string | null>(null);
+    // Vérification différée pendant la saisie; seule la dernière réponse compte
+    const validationTimer = useRef<ReturnType<typeof setTimeout>>();
+    const validationRequest = useRef(0);
+
+    useEffect(() => () => clearTimeout(validationTimer.current), []);
 
     useEffect(() => {
         loadData();
@@ -117,6 +125,45 @@ const ExamensPage: React.FC = () => {
         setModalVisible(true);
     };
 
+    const resetValidation = () => {
+        clearTimeout(validationTimer.current);
+        validationRequest.current += 1;
+        setViolations([]);
+        setValidationError(null);
+    };
+
+    // Vérification du déplacement après chaque modification (sans enregistrer)
+    const handleValuesChange = (_: any, values: any) => {
+        clearTimeout(validationTimer.current);
+        if (!editingExam || !values.date || !values.time) {
+            return;
+        }
+        const examId = editingExam.id;
+        validationTimer.current = setTimeout(async () => {
+            const request = ++validationRequest.current;
+            try {
+                const result = await examensApi.validate(examId, {
+                    date_heure: values.date
+                        .hour(values.time.hour())
+                        .minute(values.time.minute())
+                        .toISOString(),
+                    duree_minutes: values.duree_minutes,
+                });
+                if (request !== validationRequest.current) {
+                    return;
+                }
+                setViolations(result.violations);
+                setValidationError(null);
+            } catch (error: any) {
+                if (request !== validationRequest.current) {
+                    return;
+                }
+                setViolations([]);
+                setValidationError(error.response?.data?.detail || 'Vérification des contraintes impossible');
+            }
+        }, 300);
+    };
+
     const handleCreateOrUpdate = async (values: any) => {
         try {
             setCreating(true);
@@ -144,6 +191,7 @@ const ExamensPage: React.FC = () => {
 
             setModalVisible(false);
             setEditingExam(null);
+            resetValidation();
             form.resetFields();
             loadData();
         } catch (error: any) {
@@ -420,6 +468,7 @@ const ExamensPage: React.FC = () => {
                 onCancel={() => {
                     setModalVisible(false);
                     setEditingExam(null);
+                    resetValidation();
                     form.resetFields();
                 }}
                 footer={null}
@@ -429,6 +478,7 @@ const ExamensPage: React.FC = () => {
                     form={form}
                     layout="vertical"
                     onFinish={handleCreateOrUpdate}
+                    onValuesChange={handleValuesChange}
                 >
                     <Form.Item
                         name="module_id"
@@ -496,11 +546,35 @@ const ExamensPage: React.FC = () => {
                         />
                     </Form.Item>
 
+                    {validationError && (
+                        <Alert
+                            type="error"
+                            showIcon
+                            style={{ marginBottom: 8 }}
+                            message="Contraintes non vérifiées"
+                            description={validationError}
+                        />
+                    )}
+
+                    {violations.map((violation, index) => (
+                        <Alert
+                            key={`${violation.type}-${index}`}
+                            type={violation.severite === 'erreur' ? 'error' : 'warning'}
+                            showIcon
+                            style={{ marginBottom: 8 }}
+                            message={violation.description}
+                            description={violation.etudiants_concernes
+                                ? `${violation.etudiants_concernes} étudiant(s) concerné(s)`
+                                : undefined}
+                        />
+                    ))}
+
                     <Form.Item style={{ marginBottom: 0, marginTop: 24 }}>
                         <Space style={{ width: '100%', justifyContent: 'flex-end' }}>
                             <Button onClick={() => {
                                 setModalVisible(false);
                                 setEditingExam(null);
+                                resetValidation();
                                 form.resetFields();
                             }}>
                                 Annuler
@@ -71,7 +71,8 @@ const StudentDashboard: React.FC = () => {
                 dayjs(exam.date_heure).format('DD/MM/YYYY'),
                 dayjs(exam.date_heure).format('HH:mm'),
                 `${exam.duree_minutes} min`,
-                exam.salle?.nom || '-',
+                (exam.place?.salle_nom ?? exam.salle?.nom ?? '-')
+                    + (exam.place?.numero_place ? ` (place ${exam.place.numero_place})` : ''),
                 exam.statut === 'confirmed' ? 'Confirmé' : 'Planifié'
             ]);
 
@@ -265,7 +266,13 @@ const StudentDashboard: React.FC = () => {
                                                 <ClockCircleOutlined style={{ marginRight: 6 }} />
                                                 {dayjs(exam.date_heure).format('HH:mm')} - {exam.duree_minutes} min
                                             </Text>
-                                            {exam.salle && (
+                                            {exam.place ? (
+                                                <Text type="secondary" style={{ fontSize: 12 }}>
+                                                    <EnvironmentOutlined style={{ marginRight: 6 }} />
+                                                    {exam.place.salle_nom} - {exam.place.salle_batiment}
+                                                    {exam.place.numero_place && ` - place ${exam.place.numero_place}`}
+                                                </Text>
+                                            ) : exam.salle && (
                                                 <Text type="secondary" style={{ fontSize: 12 }}>
                                                     <EnvironmentOutlined style={{ marginRight: 6 }} />
                                                     {exam.salle.nom} - {exam.salle.batiment}
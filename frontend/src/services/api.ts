@@ -87,6 +87,99 @@ export interface Examen {
         nom: string;
         batiment: string;
     };
+    // Étudiant: sa salle (examen sur plusieurs salles) et sa place
+    place?: {
+        salle_id: number;
+        salle_nom: string;
+        salle_batiment: string | null;
+        numero_place: number | null;
+    } | null;
+}
+
+export interface ExamenSalle {
+    salle_id: number;
+    code: string;
+    nom: string;
+    batiment: string | null;
+    capacite_examen: number;
+    nb_places: number;
+    principale: boolean;
+}
+
+export interface SeatAllocationResponse {
+    nb_examens: number;
+    nb_etudiants_places: number;
+    nb_sans_place: number;
+    message: string;
+}
+
+export interface ExamenPlanning {
+    examen_id: number;
+    module_id: number;
+    module_code: string;
+    module_nom: string;
+    formation_id: number;
+    formation_code: string;
+    formation_nom: string;
+    dept_id: number;
+    dept_code: string;
+    dept_nom: string;
+    prof_id: number | null;
+    prof_nom: string | null;
+    salle_id: number | null;
+    salle_code: string | null;
+    salle_nom: string | null;
+    salle_batiment: string | null;
+    salle_capacite: number | null;
+    date_heure: string;
+    date_fin: string;
+    duree_minutes: number;
+    statut: string;
+    session_id: number | null;
+    nb_inscrits: number;
+}
+
+export interface ExamenPlacementCheck {
+    date_heure?: string;
+    salle_id?: number;
+    prof_id?: number;
+    duree_minutes?: number;
+}
+
+export interface ContrainteViolation {
+    type: string;
+    severite: 'erreur' | 'avertissement';
+    description: string;
+    examens_ids: number[];
+    etudiants_concernes: number;
+}
+
+export interface ExamenValidationResponse {
+    examen_id: number;
+    valide: boolean;
+    violations: ContrainteViolation[];
+    took_ms: number;
+}
+
+export interface ExamenSuggestion {
+    date_heure: string;
+    salle_id: number;
+    salle_code: string;
+    salle_nom: string;
+    capacite_examen: number;
+    prof_id: number;
+    prof_nom: string;
+    score: number;
+    changements: string[];
+}
+
+export interface ExamenSuggestionsResponse {
+    examen_id: number;
+    date_debut: string;
+    date_fin: string;
+    candidats_evalues: number;
+    took_ms: number;
+    suggestions: ExamenSuggestion[];
 }
 
 export interface Salle {
@@ -100,12 +193,17 @@ export interface Salle {
     disponible: boolean;
 }
 
+export interface SalleDisponible extends Salle {
+    prochain_examen: string | null;
+}
+
 export interface EDTGenerationRequest {
     date_debut: string;
     date_fin: string;
     dept_ids?: number[];
     formation_ids?: number[];
     force_regenerate?: boolean;
+    publier?: boolean;
 }
 
 export interface EDTGenerationResponse {
@@ -114,9 +212,56 @@ export interface EDTGenerationResponse {
     nb_examens_planifies: number;
     nb_conflits_resolus: number;
     temps_execution_ms: number;
+    publiee?: boolean | null;
     message: string;
 }
 
+export interface ExamenBatchRequest {
+    action: 'confirm' | 'cancel' | 'move' | 'delete';
+    examen_ids?: number[];
+    session_id?: number;
+    dept_id?: number;
+    formation_id?: number;
+    date_debut?: string;
+    date_fin?: string;
+    decalage_minutes?: number;
+    salle_id?: number;
+    prof_id?: number;
+    duree_minutes?: number;
+}
+
+export interface ExamenBatchResponse {
+    action: string;
+    nb_selectionnes: number;
+    nb_appliques: number;
+    nb_ignores: number;
+    resultats: { examen_id: number; resultat: 'applique' | 'ignore' | 'introuvable'; raison: string | null }[];
+}
+
+export interface EDTRepairRequest {
+    examen_ids?: number[];
+    salle_ids?: number[];
+    prof_ids?: number[];
+    jours?: string[];
+    fenetre_jours?: number;
+}
+
+export interface ExamenDeplacement {
+    examen_id: number;
+    ancienne_date: string;
+    nouvelle_date: string;
+    ancienne_salle_id: number | null;
+    nouvelle_salle_id: number;
+    ancien_prof_id: number | null;
+    nouveau_prof_id: number;
+    changements: string[];
+}
+
+export interface EDTRepairResponse extends EDTGenerationResponse {
+    examens_deplaces: ExamenDeplacement[];
+    examens_non_replaces: number[];
+}
+
 export interface ConflictInfo {
     type: string;
     description: string;
@@ -131,6 +276,23 @@ export interface PaginatedResponse<T> {
     pages: number;
 }
 
+export interface SyncDeletion {
+    entity: 'examen' | 'salle' | 'session';
+    id: number;
+    change_seq: number | null;
+    deleted_at: string | null;
+}
+
+export interface SyncResponse {
+    cursor: number;
+    has_more: boolean;
+    reset: boolean;
+    examens: Examen[];
+    salles: Salle[];
+    sessions: Record<string, unknown>[];
+    suppressions: SyncDeletion[];
+}
+
 // API instance
 // Use VITE_API_URL for production (set in Railway), fallback to /api for local dev
 // VITE_API_URL should be the base backend URL without /api suffix
@@ -256,6 +418,26 @@ export const dashboardApi = {
         return response.data;
     },
 
+    getSallesDisponibles: async (filters: {
+        debut: string;
+        fin: string;
+        capacite_min?: number;
+        type?: string;
+        batiment?: string;
+        pmr?: boolean;
+        equipement?: string[];
+        exclude_examen_id?: number;
+    }): Promise<SalleDisponible[]> => {
+        const { equipement, ...rest } = filters;
+        const params = new URLSearchParams();
+        Object.entries(rest).forEach(([key, value]) => {
+            if (value !== undefined) params.append(key, String(value));
+        });
+        equipement?.forEach((item) => params.append('equipement', item));
+        const response = await api.get('/dashboard/salles/disponibles', { params });
+        return response.data;
+    },
+
     getModules: async (params?: { formation_id?: number; semestre?: number }): Promise<PaginatedResponse<Module>> => {
         const response = await api.get('/dashboard/modules', { params: { ...params, size: 100 } });
         return response.data;
@@ -277,6 +459,23 @@ export const examensApi = {
         return response.data;
     },
 
+    // Planning à plat (vue dénormalisée examens_planning)
+    planning: async (params?: {
+        page?: number;
+        size?: number;
+        dept_id?: number;
+        formation_id?: number;
+        salle_id?: number;
+        prof_id?: number;
+        statut?: string;
+        date_debut?: string;
+        date_fin?: string;
+        search?: string;
+    }): Promise<PaginatedResponse<ExamenPlanning>> => {
+        const response = await api.get('/examens/planning', { params });
+        return response.data;
+    },
+
     get: async (id: number): Promise<Examen> => {
         const response = await api.get(`/examens/${id}`);
         return response.data;
@@ -301,11 +500,60 @@ export const examensApi = {
         return response.data;
     },
 
+    // Confirme, annule, déplace ou supprime un ensemble d'examens en une transaction
+    batch: async (data: ExamenBatchRequest): Promise<ExamenBatchResponse> => {
+        const response = await api.post('/examens/batch', data);
+        return response.data;
+    },
+
+    // Replanifie uniquement les examens touchés par une perturbation
+    repairEDT: async (data: EDTRepairRequest): Promise<EDTRepairResponse> => {
+        const response = await api.post('/examens/repair', data);
+        return response.data;
+    },
+
     detectConflicts: async (): Promise<ConflictInfo[]> => {
         const response = await api.get('/examens/conflicts/detect');
         return response.data;
     },
 
+    // Salles de l'examen et nombre d'étudiants placés dans chacune
+    salles: async (id: number): Promise<ExamenSalle[]> => {
+        const response = await api.get(`/examens/${id}/salles`);
+        return response.data;
+    },
+
+    // Répartition des inscrits entre les salles (et numéros de place)
+    allocateSeats: async (id: number, numeroter = true): Promise<SeatAllocationResponse> => {
+        const response = await api.post(`/examens/${id}/places`, null, { params: { numeroter } });
+        return response.data;
+    },
+
+    // Vérifie un déplacement sans l'enregistrer (contraintes violées)
+    validate: async (id: number, placement: ExamenPlacementCheck): Promise<ExamenValidationResponse> => {
+        const response = await api.post(`/examens/${id}/validate`, placement);
+        return response.data;
+    },
+
+    // Déplacements possibles d'un examen, du moins au plus perturbant
+    suggestions: async (id: number, options?: {
+        k?: number;
+        date_debut?: string;
+        date_fin?: string;
+        exclure_salle_id?: number[];
+        exclure_prof_id?: number[];
+    }): Promise<ExamenSuggestionsResponse> => {
+        const { exclure_salle_id, exclure_prof_id, ...rest } = options ?? {};
+        const params = new URLSearchParams();
+        Object.entries(rest).forEach(([key, value]) => {
+            if (value !== undefined) params.append(key, String(value));
+        });
+        exclure_salle_id?.forEach((salleId) => params.append('exclure_salle_id', String(salleId)));
+        exclure_prof_id?.forEach((profId) => params.append('exclure_prof_id', String(profId)));
+        const response = await api.get(`/examens/${id}/suggestions`, { params });
+        return response.data;
+    },
+
     confirm: async (id: number): Promise<void> => {
         await api.post(`/examens/${id}/confirm`);
     },
@@ -315,4 +563,212 @@ export const examensApi = {
     },
 };
 
+// Sync API (changements depuis un curseur)
+export const syncApi = {
+    changes: async (cursor?: number, limit?: number): Promise<SyncResponse> => {
+        const response = await api.get('/sync', { params: { cursor, limit } });
+        return response.data;
+    },
+};
+
+// Search API
+export interface SearchResult {
+    type: 'module' | 'professeur' | 'etudiant' | 'salle';
+    id: number;
+    label: string;
+    detail: string | null;
+    score: number;
+}
+
+export const searchApi = {
+    search: async (q: string, types?: SearchResult['type'][], limit = 10): Promise<SearchResult[]> => {
+        const params = new URLSearchParams({ q, limit: String(limit) });
+        types?.forEach((type) => params.append('types', type));
+        const response = await api.get('/search', { params });
+        return response.data.results;
+    },
+};
+
+// Versions d'EDT (instantanés, comparaison, promotion, retour arrière)
+export interface Snapshot {
+    id: number;
+    session_id: number | null;
+    user_id: number | null;
+    type: 'generation' | 'manuel' | 'sauvegarde';
+    libelle: string | null;
+    nb_examens: number;
+    sauvegarde_id: number | null;
+    promu_at: string | null;
+    annule_at: string | null;
+    created_at: string | null;
+}
+
+export interface PlacementInfo {
+    examen_id: number | null;
+    date_heure: string;
+    duree_minutes: number | null;
+    salle_id: number | null;
+    prof_id: number | null;
+    statut: string | null;
+}
+
+export interface SnapshotDiffItem {
+    module_id: number;
+    module_code: string | null;
+    nb_inscrits: number;
+    avant: PlacementInfo | null;
+    apres: PlacementInfo | null;
+    changements: string[];
+}
+
+export interface SnapshotDiff {
+    avant_id: number | null;
+    apres_id: number;
+    deplaces: SnapshotDiffItem[];
+    ajoutes: SnapshotDiffItem[];
+    supprimes: SnapshotDiffItem[];
+    nb_inchanges: number;
+    etudiants_concernes: number;
+}
+
+export interface SnapshotPromoteResponse {
+    snapshot_id: number;
+    sauvegarde_id: number;
+    nb_examens_modifies: number;
+    message: string;
+}
+
+export const snapshotsApi = {
+    list: async (params?: { session_id?: number; type?: Snapshot['type']; limit?: number }): Promise<Snapshot[]> => {
+        const response = await api.get('/snapshots/', { params });
+        return response.data;
+    },
+
+    create: async (data: { session_id?: number; dept_ids?: number[]; libelle?: string }): Promise<Snapshot> => {
+        const response = await api.post('/snapshots/', data);
+        return response.data;
+    },
+
+    diff: async (id: number, avec?: number): Promise<SnapshotDiff> => {
+        const response = await api.get(`/snapshots/${id}/diff`, { params: { avec } });
+        return response.data;
+    },
+
+    promote: async (id: number): Promise<SnapshotPromoteResponse> => {
+        const response = await api.post(`/snapshots/${id}/promote`);
+        return response.data;
+    },
+
+    rollback: async (id: number): Promise<SnapshotPromoteResponse> => {
+        const response = await api.post(`/snapshots/${id}/rollback`);
+        return response.data;
+    },
+};
+
+export interface SessionPublishResponse {
+    session_id: number;
+    nb_examens: number;
+    publiee_at: string | null;
+    message: string;
+}
+
+export const sessionsApi = {
+    publish: async (id: number): Promise<SessionPublishResponse> => {
+        const response = await api.post(`/sessions/${id}/publish`);
+        return response.data;
+    },
+
+    discardDraft: async (id: number): Promise<SessionPublishResponse> => {
+        const response = await api.delete(`/sessions/${id}/draft`);
+        return response.data;
+    },
+};
+
+export interface Surveillance {
+    id: number;
+    examen_id: number;
+    prof_id: number;
+    role: 'responsable' | 'surveillant';
+    created_at: string | null;
+}
+
+export interface SurveillanceAssignResponse {
+    nb_examens: number;
+    nb_surveillances: number;
+    nb_postes_non_pourvus: number;
+    nb_examens_incomplets: number;
+    charge_min: number;
+    charge_max: number;
+    charge_moyenne: number;
+    temps_calcul_ms: number;
+    message: string;
+}
+
+export const surveillancesApi = {
+    list: async (params?: { examen_id?: number; prof_id?: number; session_id?: number; limit?: number }): Promise<Surveillance[]> => {
+        const response = await api.get('/surveillances/', { params });
+        return response.data;
+    },
+
+    assign: async (data: { session_id?: number; dept_ids?: number[]; date_debut?: string; date_fin?: string }): Promise<SurveillanceAssignResponse> => {
+        const response = await api.post('/surveillances/assign', data);
+        return response.data;
+    },
+};
+
+// Changements poussés par le serveur (WebSocket /api/ws/changes)
+export interface ChangeEvent {
+    type: 'changes' | 'resync' | 'ping';
+    examen_ids?: number[];
+    dept_ids?: number[];
+    sessions?: { id: number; statut: string | null }[];
+}
+
+const getWebSocketUrl = (path: string) => {
+    const base = API_BASE_URL.startsWith('http')
+        ? API_BASE_URL
+        : `${window.location.origin}${API_BASE_URL}`;
+    return `${base.replace(/^http/, 'ws')}${path}`;
+};
+
+// Reconnexion automatique; renvoie une fonction de désabonnement
+export const subscribeChanges = (
+    onEvent: (event: ChangeEvent) => void,
+    params?: { dept_id?: number }
+): (() => void) => {
+    let socket: WebSocket | null = null;
+    let closed = false;
+    let retryDelay = 1000;
+
+    const connect = () => {
+        const token = localStorage.getItem('access_token');
+        if (!token || closed) return;
+        const query = new URLSearchParams({ token });
+        if (params?.dept_id) query.set('dept_id', String(params.dept_id));
+
+        socket = new WebSocket(getWebSocketUrl(`/ws/changes?${query}`));
+        socket.onopen = () => {
+            retryDelay = 1000;
+        };
+        socket.onmessage = (message) => {
+            const event: ChangeEvent = JSON.parse(message.data);
+            if (event.type !== 'ping') onEvent(event);
+        };
+        socket.onclose = (close) => {
+            // 4401/4403: jeton invalide ou rôle non autorisé, inutile de réessayer
+            if (closed || close.code === 4401 || close.code === 4403) return;
+            // Des événements ont pu être manqués pendant la coupure
+            onEvent({ type: 'resync' });
+            setTimeout(connect, retryDelay);
+            retryDelay = Math.min(retryDelay * 2, 30000);
+        };
+    };
+
+    connect();
+    return () => {
+        closed = true;
+        socket?.close();
+    };
+};
+
 export default api;